@@ -0,0 +1,436 @@
+import re
+from collections.abc import Callable, Iterable
+from copy import deepcopy
+from dataclasses import dataclass
+from datetime import timedelta
+from typing import Any, Optional, TYPE_CHECKING
+
+from common.hogvm.python.execute import BytecodeResult
+from common.hogvm.python.program import (
+    HogChunk,
+    HogProgram,
+    _op_and,
+    _op_array,
+    _op_call_global,
+    _op_constant,
+    _op_dict,
+    _op_divide,
+    _op_end,
+    _op_eq,
+    _op_false,
+    _op_get_global,
+    _op_get_property,
+    _op_get_property_nullish,
+    _op_gt,
+    _op_gt_eq,
+    _op_ilike,
+    _op_in,
+    _op_iregex,
+    _op_jump,
+    _op_jump_if_false,
+    _op_jump_if_stack_not_null,
+    _op_like,
+    _op_lt,
+    _op_lt_eq,
+    _op_minus,
+    _op_mod,
+    _op_multiply,
+    _op_not,
+    _op_not_eq,
+    _op_not_ilike,
+    _op_not_in,
+    _op_not_iregex,
+    _op_not_like,
+    _op_not_regex,
+    _op_null,
+    _op_or,
+    _op_plus,
+    _op_pop,
+    _op_regex,
+    _op_return,
+    _op_true,
+    _op_tuple,
+    _ProgramRun,
+    get_program,
+)
+from common.hogvm.python.stl import STL
+from common.hogvm.python.utils import get_nested_value, like, unify_comparison_types
+
+if TYPE_CHECKING:
+    from posthog.models import Team
+
+# STL functions whose result only depends on their arguments. Calls to these can be evaluated once per distinct input.
+PURE_STL_FUNCTIONS = frozenset(
+    {
+        "concat",
+        "match",
+        "like",
+        "ilike",
+        "notLike",
+        "notILike",
+        "toString",
+        "toUUID",
+        "toInt",
+        "toFloat",
+        "isNull",
+        "isNotNull",
+        "length",
+        "empty",
+        "notEmpty",
+        "lower",
+        "upper",
+        "reverse",
+        "JSONHas",
+        "isValidJSON",
+        "JSONLength",
+        "JSONExtractBool",
+        "JSONExtractFloat",
+        "JSONExtractInt",
+        "JSONExtractString",
+        "encodeURLComponent",
+        "decodeURLComponent",
+        "replaceOne",
+        "replaceAll",
+        "position",
+        "positionCaseInsensitive",
+        "trim",
+        "trimLeft",
+        "trimRight",
+        "splitByString",
+        "isIPAddressInRange",
+        "indexOf",
+        "has",
+        "startsWith",
+        "substring",
+        "coalesce",
+        "equals",
+        "notEquals",
+        "greater",
+        "greaterOrEquals",
+        "less",
+        "lessOrEquals",
+        "typeof",
+        "md5Hex",
+        "sha256Hex",
+    }
+)
+
+
+def _compare(operation: Callable[[Any, Any], bool]) -> Callable[[Any, Any], bool]:
+    def compare(left: Any, right: Any) -> bool:
+        var1, var2 = unify_comparison_types(left, right)
+        return operation(var1, var2)
+
+    return compare
+
+
+# Value level equivalents of the interpreter's operation handlers. Arguments come in the order the handler pops them.
+_OPERATIONS: dict[Callable, Callable[..., Any]] = {
+    _op_not: lambda value: not value,
+    _op_plus: lambda left, right: left + right,
+    _op_minus: lambda left, right: left - right,
+    _op_divide: lambda left, right: left / right,
+    _op_multiply: lambda left, right: left * right,
+    _op_mod: lambda left, right: left % right,
+    _op_eq: _compare(lambda left, right: left == right),
+    _op_not_eq: _compare(lambda left, right: left != right),
+    _op_gt: _compare(lambda left, right: left > right),
+    _op_gt_eq: _compare(lambda left, right: left >= right),
+    _op_lt: _compare(lambda left, right: left < right),
+    _op_lt_eq: _compare(lambda left, right: left <= right),
+    _op_like: lambda value, pattern: like(value, pattern),
+    _op_ilike: lambda value, pattern: like(value, pattern, re.IGNORECASE),
+    _op_not_like: lambda value, pattern: not like(value, pattern),
+    _op_not_ilike: lambda value, pattern: not like(value, pattern, re.IGNORECASE),
+    _op_in: lambda value, container: value in container,
+    _op_not_in: lambda value, container: value not in container,
+    _op_regex: lambda value, pattern: bool(re.search(re.compile(pattern), value)) if value and pattern else False,
+    _op_not_regex: lambda value, pattern: not bool(re.search(re.compile(pattern), value))
+    if value and pattern
+    else False,
+    _op_iregex: lambda value, pattern: bool(re.search(re.compile(pattern, re.RegexFlag.IGNORECASE), value))
+    if value and pattern
+    else False,
+    _op_not_iregex: lambda value, pattern: not bool(re.search(re.compile(pattern, re.RegexFlag.IGNORECASE), value))
+    if value and pattern
+    else False,
+    _op_get_property: lambda property, obj: get_nested_value(obj, [property]),
+    _op_get_property_nullish: lambda property, obj: get_nested_value(obj, [property], nullish=True),
+}
+
+_CONSTANT_VALUES = {_op_true: True, _op_false: False, _op_null: None}
+
+
+@dataclass(eq=False)
+class _Node:
+    kind: str  # "constant", "global", "operation", "all", "any", "call", "array", "tuple", "dict", "if" or "if_null"
+    value: Any
+    children: tuple["_Node", ...]
+    # Global chains this node depends on
+    chains: frozenset[tuple]
+
+
+class _NotAnExpression(Exception):
+    pass
+
+
+class _MissingGlobal(Exception):
+    pass
+
+
+_NOT_AN_EXPRESSION = object()
+
+
+class _ExpressionBuilder:
+    """
+    Turns the root chunk of a program into an expression tree by running it symbolically. Only loop free programs
+    without side effects qualify: constants, globals, operators, pure STL calls and the forward jumps that `if`,
+    `multiIf` and `ifNull` compile to. Identical sub-expressions are merged into the same node.
+    """
+
+    def __init__(self, program: HogProgram):
+        self.chunk: HogChunk = program.chunk("root")
+        self.version = program.version
+        self.nodes: dict[tuple, _Node] = {}
+
+    def node(self, kind: str, value: Any, children: tuple[_Node, ...] = (), chains: frozenset = frozenset()) -> _Node:
+        key = (kind, _value_key(value), tuple(id(child) for child in children))
+        node = self.nodes.get(key)
+        if node is None:
+            for child in children:
+                chains = chains | child.chains
+            node = _Node(kind=kind, value=value, children=children, chains=chains)
+            self.nodes[key] = node
+        return node
+
+    def build(self) -> _Node:
+        stack, _ = self.segment(self.chunk.start_ip, len(self.chunk.bytecode), [])
+        if len(stack) > 1:
+            raise _NotAnExpression()
+        return stack[0] if stack else self.node("constant", None)
+
+    def segment(self, ip: int, end: int, stack: list[_Node]) -> tuple[list[_Node], bool]:
+        while ip < end:
+            handler, args, next_ip = self.chunk.instruction_at(ip)
+            if handler is _op_end or handler is _op_return:
+                return stack, True
+            if handler is _op_constant:
+                stack.append(self.node("constant", args[0]))
+            elif handler in _CONSTANT_VALUES:
+                stack.append(self.node("constant", _CONSTANT_VALUES[handler]))
+            elif handler in _OPERATIONS:
+                count = 1 if handler is _op_not else 2
+                stack.append(self.node("operation", handler, self.pop(stack, count)))
+            elif handler is _op_and or handler is _op_or:
+                stack.append(self.node("all" if handler is _op_and else "any", None, self.pop(stack, args[0])))
+            elif handler is _op_array or handler is _op_tuple:
+                stack.append(self.node("array" if handler is _op_array else "tuple", None, self.pop(stack, args[0])))
+            elif handler is _op_dict:
+                stack.append(self.node("dict", None, self.pop(stack, args[0] * 2)))
+            elif handler is _op_get_global:
+                chain = tuple(reversed([child.value for child in self.pop(stack, args[0], constants=True)]))
+                if not chain:
+                    raise _NotAnExpression()
+                stack.append(self.node("global", chain, chains=frozenset([chain])))
+            elif handler is _op_call_global:
+                name, arg_count = args[0], args[1]
+                if name not in PURE_STL_FUNCTIONS or args[2] is None:
+                    raise _NotAnExpression()
+                children = self.pop(stack, arg_count)
+                if self.version == 0:
+                    children = tuple(reversed(children))
+                stack.append(self.node("call", name, children))
+            elif handler is _op_jump_if_stack_not_null:
+                # ifNull(expr, alternative) compiles to: expr, JUMP_IF_STACK_NOT_NULL, POP, alternative
+                target = args[0]
+                if not stack or target > end or next_ip >= end or self.chunk.instruction_at(next_ip)[0] is not _op_pop:
+                    raise _NotAnExpression()
+                alternative = self.single(self.chunk.instruction_at(next_ip)[2], target)
+                stack.append(self.node("if_null", None, (stack.pop(), alternative)))
+                next_ip = target
+            elif handler is _op_jump_if_false:
+                # if(cond, then, else) compiles to: cond, JUMP_IF_FALSE, then, JUMP, else
+                target = args[0]
+                if not stack or target > end or target - 2 < next_ip:
+                    raise _NotAnExpression()
+                jump = self.chunk.instructions[target - 2]
+                if jump is None or jump[0] is not _op_jump or jump[2] != target or jump[1][0] > end:
+                    raise _NotAnExpression()
+                condition = stack.pop()
+                then = self.single(next_ip, target - 2)
+                otherwise = self.single(target, jump[1][0])
+                stack.append(self.node("if", None, (condition, then, otherwise)))
+                next_ip = jump[1][0]
+            else:
+                raise _NotAnExpression()
+            if next_ip <= ip:
+                raise _NotAnExpression()
+            ip = next_ip
+        return stack, False
+
+    def single(self, ip: int, end: int) -> _Node:
+        stack, returned = self.segment(ip, end, [])
+        if returned or len(stack) != 1:
+            raise _NotAnExpression()
+        return stack[0]
+
+    def pop(self, stack: list[_Node], count: int, constants: bool = False) -> tuple[_Node, ...]:
+        if count < 0 or count > len(stack):
+            raise _NotAnExpression()
+        if count == 0:
+            return ()
+        children = tuple(stack[-count:])
+        del stack[-count:]
+        if constants and any(child.kind != "constant" for child in children):
+            raise _NotAnExpression()
+        return children
+
+
+def _value_key(value: Any) -> Any:
+    # 1, 1.0 and True are equal as dict keys, but not to the VM
+    return (type(value), value) if not callable(value) else value
+
+
+def _memo_key(value: Any) -> Optional[tuple]:
+    if value is None or isinstance(value, str | int | float | bool):
+        return (type(value), value)
+    return None
+
+
+def _get_expression(program: HogProgram) -> Optional[_Node]:
+    if program.expression is None:
+        try:
+            program.expression = _ExpressionBuilder(program).build()
+        except _NotAnExpression:
+            program.expression = _NOT_AN_EXPRESSION
+    return None if program.expression is _NOT_AN_EXPRESSION else program.expression
+
+
+def _read_global(globals: Optional[dict[str, Any]], chain: tuple) -> Any:
+    if not globals or chain[0] not in globals:
+        # Let the interpreter deal with functions, STL closures and errors
+        raise _MissingGlobal()
+    return get_nested_value(globals, list(chain), True)
+
+
+def _bind(node: _Node, team: Optional["Team"], timeout_seconds: float, bound: dict[int, Callable]) -> Callable:
+    """Creates an evaluator for one batch. Nodes that depend on at most one global are memoized by its value."""
+    if id(node) in bound:
+        return bound[id(node)]
+
+    children = [_bind(child, team, timeout_seconds, bound) for child in node.children]
+    evaluate: Callable[[Optional[dict[str, Any]]], Any]
+
+    if node.kind == "constant":
+        constant = node.value
+        evaluate = lambda globals: constant
+    elif node.kind == "global":
+        chain = node.value
+        evaluate = lambda globals: _read_global(globals, chain)
+    elif node.kind == "operation":
+        operation = _OPERATIONS[node.value]
+        if len(children) == 1:
+            (child,) = children
+            evaluate = lambda globals: operation(child(globals))
+        else:
+            first, second = children
+            # Children are evaluated in the order they were pushed, the operation gets them in the order they are popped
+            evaluate = lambda globals: operation(*reversed((first(globals), second(globals))))
+    elif node.kind == "all":
+        evaluate = lambda globals: all([child(globals) for child in children])  # noqa: C419
+    elif node.kind == "any":
+        evaluate = lambda globals: any([child(globals) for child in children])  # noqa: C419
+    elif node.kind == "array":
+        evaluate = lambda globals: [child(globals) for child in children]
+    elif node.kind == "tuple":
+        evaluate = lambda globals: tuple(child(globals) for child in children)
+    elif node.kind == "dict":
+
+        def evaluate(globals):
+            elems = [child(globals) for child in children]
+            return {elems[i]: elems[i + 1] for i in range(0, len(elems), 2)}
+
+    elif node.kind == "call":
+        stl_fn = STL[node.value].fn
+        evaluate = lambda globals: stl_fn([child(globals) for child in children], team, [], timeout_seconds)
+    elif node.kind == "if":
+        condition, then, otherwise = children
+        evaluate = lambda globals: then(globals) if condition(globals) else otherwise(globals)
+    elif node.kind == "if_null":
+        expr, alternative = children
+
+        def evaluate(globals):
+            value = expr(globals)
+            return value if value is not None else alternative(globals)
+
+    else:
+        raise ValueError(f"Unknown expression node: {node.kind}")
+
+    if node.kind not in ("constant", "global") and len(node.chains) <= 1:
+        evaluate = _memoize(evaluate, next(iter(node.chains), None))
+
+    bound[id(node)] = evaluate
+    return evaluate
+
+
+def _memoize(evaluate: Callable, chain: Optional[tuple]) -> Callable:
+    memo: dict[Optional[tuple], Any] = {}
+
+    def memoized(globals):
+        key = _memo_key(_read_global(globals, chain)) if chain is not None else (None, None)
+        if key is None:
+            return evaluate(globals)
+        if key in memo:
+            return memo[key]
+        value = memo[key] = evaluate(globals)
+        return value
+
+    return memoized
+
+
+def execute_bytecode_batch(
+    bytecode: HogProgram | list[Any] | dict,
+    globals_list: Iterable[Optional[dict[str, Any]]],
+    functions: Optional[dict[str, Callable[..., Any]]] = None,
+    timeout=timedelta(seconds=5),
+    team: Optional["Team"] = None,
+) -> list[BytecodeResult]:
+    """
+    Runs the same bytecode against many globals, e.g. a HogFunction filter against a list of events. Returns one
+    result per globals dict, exactly as `execute_bytecode` would.
+
+    The program is decoded once and one interpreter is reused for all events. Loop free expressions without side
+    effects, which is what filters compile to, skip the interpreter altogether: they are evaluated as an expression
+    tree in which every sub-expression depending on a single global, like `event = '$pageview'`, is computed once per
+    distinct value of that global across the batch.
+    """
+    program = bytecode if isinstance(bytecode, HogProgram) else get_program(bytecode)
+    run = _ProgramRun(program, None, functions, timeout, team)
+
+    evaluate: Optional[Callable] = None
+    expression = _get_expression(program)
+    if expression is not None and not (functions and _called_functions(expression) & functions.keys()):
+        evaluate = _bind(expression, team, run.timeout_seconds, {})
+
+    results: list[BytecodeResult] = []
+    for globals in globals_list:
+        if evaluate is not None:
+            try:
+                value = evaluate(globals)
+            except _MissingGlobal:
+                pass
+            else:
+                if isinstance(value, dict | list | tuple):
+                    value = deepcopy(value)
+                results.append(BytecodeResult(result=value, stdout=[], bytecodes=program.bytecodes))
+                continue
+        run.reset(globals)
+        results.append(run.run())
+    return results
+
+
+def _called_functions(node: _Node) -> set[str]:
+    names = {node.value} if node.kind == "call" else set()
+    for child in node.children:
+        names |= _called_functions(child)
+    return names
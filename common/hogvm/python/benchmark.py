@@ -0,0 +1,58 @@
+# Compares the reference interpreter in execute.py with the compiled program interpreter in program.py, running the
+# programs from common/hogvm/__tests__. Usage: python -m common.hogvm.python.benchmark [--runs=10] [name ...]
+import json
+import sys
+import time
+from datetime import timedelta
+from pathlib import Path
+
+from .execute import execute_bytecode
+from .program import compile_program, execute_program
+
+SNAPSHOTS_DIR = Path(__file__).parent.parent / "__tests__" / "__snapshots__"
+SKIPPED = {"sql"}  # only runs on the Node.js VM
+
+modifiers = [arg for arg in sys.argv[1:] if arg.startswith("-")]
+names = [arg for arg in sys.argv[1:] if not arg.startswith("-")]
+runs = 10
+for modifier in modifiers:
+    if modifier.startswith("--runs="):
+        runs = int(modifier.split("=", 1)[1])
+
+timeout = timedelta(seconds=60)
+paths = sorted(SNAPSHOTS_DIR.glob("*.hoge"))
+if names:
+    paths = [path for path in paths if path.stem in names]
+
+print(f"{'program':<16} {'reference ms':>14} {'compiled ms':>14} {'speedup':>9}")  # noqa: T201
+total_reference = total_compiled = 0.0
+for path in paths:
+    if path.stem in SKIPPED:
+        continue
+    bytecode = json.loads(path.read_text())
+
+    start = time.perf_counter()
+    for _ in range(runs):
+        expected = execute_bytecode(bytecode, timeout=timeout)
+    reference = (time.perf_counter() - start) / runs
+
+    program = compile_program(bytecode)
+    start = time.perf_counter()
+    for _ in range(runs):
+        response = execute_program(program, timeout=timeout)
+    compiled = (time.perf_counter() - start) / runs
+
+    if response.stdout != expected.stdout:
+        raise ValueError(f"Output of {path.stem} differs between the reference and the compiled interpreter")
+
+    total_reference += reference
+    total_compiled += compiled
+    print(  # noqa: T201
+        f"{path.stem:<16} {reference * 1000:>14.3f} {compiled * 1000:>14.3f} {reference / compiled:>8.2f}x"
+    )
+
+if total_compiled:
+    print(  # noqa: T201
+        f"{'total':<16} {total_reference * 1000:>14.3f} {total_compiled * 1000:>14.3f} "
+        f"{total_reference / total_compiled:>8.2f}x"
+    )
@@ -0,0 +1,979 @@
+import re
+import threading
+import time
+from collections import OrderedDict
+from collections.abc import Callable
+from copy import deepcopy
+from dataclasses import dataclass, field
+from datetime import timedelta
+from typing import Any, Optional, TYPE_CHECKING
+
+from common.hogvm.python.execute import (
+    BytecodeResult,
+    MAX_FUNCTION_ARGS_LENGTH,
+    MAX_MEMORY,
+)
+from common.hogvm.python.objects import (
+    CallFrame,
+    ThrowFrame,
+    is_hog_error,
+    is_hog_upvalue,
+    new_hog_callable,
+    new_hog_closure,
+)
+from common.hogvm.python.operation import Operation, HOGQL_BYTECODE_IDENTIFIER, HOGQL_BYTECODE_IDENTIFIER_V0
+from common.hogvm.python.stl import STL
+from common.hogvm.python.stl.bytecode import BYTECODE_STL
+from common.hogvm.python.utils import (
+    COST_PER_UNIT,
+    HogVMException,
+    HogVMMemoryExceededException,
+    HogVMRuntimeExceededException,
+    UncaughtHogVMException,
+    calculate_cost,
+    get_nested_value,
+    like,
+    set_nested_value,
+    unify_comparison_types,
+)
+
+if TYPE_CHECKING:
+    from posthog.models import Team
+
+# How many compiled programs to keep around per process, see `get_program`
+PROGRAM_CACHE_SIZE = 1024
+
+# An instruction is a pre-decoded operation: the handler to run, its already read operands, and the ip to continue
+# from. Jump and call targets are resolved to absolute positions at compile time, so the interpreter never touches
+# the raw bytecode list again. Positions still refer to indexes in the original bytecode, which keeps the "ip" of
+# callables and the catch positions of try blocks identical to the ones produced by `execute_bytecode`.
+Instruction = tuple[Callable[["_ProgramRun", tuple], Optional[BytecodeResult]], tuple, int]
+
+
+@dataclass
+class HogChunk:
+    name: str
+    bytecode: list[Any]
+    globals: Optional[dict[str, Any]]
+    start_ip: int
+    instructions: list[Optional[Instruction]]
+
+    @property
+    def last_op(self) -> int:
+        return len(self.bytecode) - 1
+
+    def instruction_at(self, ip: int) -> Instruction:
+        instruction = self.instructions[ip]
+        if instruction is None:
+            # Someone jumped into the middle of an instruction. Decode from here, just like the reference VM would.
+            instruction = _decode_instruction(self.bytecode, ip)
+            self.instructions[ip] = instruction
+        return instruction
+
+
+@dataclass
+class HogProgram:
+    """A bytecode (or a dict of bytecode chunks) decoded once, ready to be executed many times with `execute_program`."""
+
+    bytecodes: dict[str, Any]
+    version: int
+    chunks: dict[str, HogChunk] = field(default_factory=dict)
+    # Set by `execute_bytecode_batch` once it has analyzed the program, see batch.py
+    expression: Optional[Any] = None
+
+    def chunk(self, name: str) -> HogChunk:
+        if not name:
+            name = "root"
+        chunk = self.chunks.get(name)
+        if chunk is not None:
+            return chunk
+        if name.startswith("stl/") and name[4:] in BYTECODE_STL:
+            return _stl_chunk(name)
+        if name == "root" or self.bytecodes.get(name):
+            chunk = _compile_chunk(
+                name,
+                self.bytecodes[name].get("bytecode", []) or [],
+                self.bytecodes[name].get("globals", {}) if name != "root" else None,
+            )
+            self.chunks[name] = chunk
+            return chunk
+        raise HogVMException(f"Unknown chunk: {name}")
+
+
+def compile_program(input: list[Any] | dict) -> HogProgram:
+    bytecodes = input if isinstance(input, dict) else {"root": {"bytecode": input}}
+    root_bytecode = bytecodes.get("root", {}).get("bytecode", []) or []
+
+    if (
+        not root_bytecode
+        or len(root_bytecode) == 0
+        or (root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER and root_bytecode[0] != HOGQL_BYTECODE_IDENTIFIER_V0)
+    ):
+        raise HogVMException(f"Invalid bytecode. Must start with '{HOGQL_BYTECODE_IDENTIFIER}'")
+    version = root_bytecode[1] if len(root_bytecode) >= 2 and root_bytecode[0] == HOGQL_BYTECODE_IDENTIFIER else 0
+    program = HogProgram(bytecodes=bytecodes, version=version)
+    program.chunk("root")
+    return program
+
+
+_program_cache: OrderedDict[int, tuple[list[Any] | dict, HogProgram]] = OrderedDict()
+_program_cache_lock = threading.Lock()
+
+
+def get_program(input: list[Any] | dict) -> HogProgram:
+    """
+    Returns the compiled program for a bytecode, compiling it on first use.
+
+    Programs are cached by the identity of the bytecode object, which is held on to for as long as the entry lives.
+    Bytecode is treated as immutable: mutating a list after it has been executed once will not be picked up.
+    """
+    key = id(input)
+    with _program_cache_lock:
+        cached = _program_cache.get(key)
+        if cached is not None and cached[0] is input:
+            _program_cache.move_to_end(key)
+            return cached[1]
+
+    program = compile_program(input)
+    with _program_cache_lock:
+        _program_cache[key] = (input, program)
+        _program_cache.move_to_end(key)
+        while len(_program_cache) > PROGRAM_CACHE_SIZE:
+            _program_cache.popitem(last=False)
+    return program
+
+
+def clear_program_cache() -> None:
+    with _program_cache_lock:
+        _program_cache.clear()
+
+
+def execute_program(
+    program: HogProgram | list[Any] | dict,
+    globals: Optional[dict[str, Any]] = None,
+    functions: Optional[dict[str, Callable[..., Any]]] = None,
+    timeout=timedelta(seconds=5),
+    team: Optional["Team"] = None,
+) -> BytecodeResult:
+    """
+    Runs a compiled program. Behaves like `execute_bytecode`, which stays the reference implementation and is the one
+    to use for debugging, but skips decoding the bytecode and dispatches every operation through a lookup table.
+    """
+    if not isinstance(program, HogProgram):
+        program = get_program(program)
+    return _ProgramRun(program, globals, functions, timeout, team).run()
+
+
+class _ProgramRun:
+    __slots__ = (
+        "program",
+        "globals",
+        "functions",
+        "team",
+        "timeout_seconds",
+        "start_time",
+        "version",
+        "stack",
+        "mem_stack",
+        "mem_used",
+        "upvalues",
+        "upvalues_by_id",
+        "call_stack",
+        "throw_stack",
+        "declared_functions",
+        "ops",
+        "stdout",
+        "frame",
+        "chunk",
+        "chunk_globals",
+    )
+
+    def __init__(
+        self,
+        program: HogProgram,
+        globals: Optional[dict[str, Any]],
+        functions: Optional[dict[str, Callable[..., Any]]],
+        timeout: timedelta | int,
+        team: Optional["Team"],
+    ):
+        if isinstance(timeout, int):
+            timeout = timedelta(seconds=timeout)
+        self.program = program
+        self.functions = functions
+        self.team = team
+        self.timeout_seconds = timeout.total_seconds()
+        self.version = program.version
+        self.stack: list = []
+        self.mem_stack: list[int] = []
+        self.upvalues: list[dict] = []
+        self.upvalues_by_id: dict[int, dict] = {}
+        self.throw_stack: list[ThrowFrame] = []
+        self.declared_functions: dict[str, tuple[int, int]] = {}
+        self.call_stack: list[CallFrame] = []
+        self.reset(globals)
+
+    def reset(self, globals: Optional[dict[str, Any]]) -> None:
+        """Prepares to run the program again with new globals, reusing the allocated stacks."""
+        self.globals = globals
+        self.start_time = time.time()
+        self.stack.clear()
+        self.mem_stack.clear()
+        self.mem_used = 0
+        self.upvalues.clear()
+        self.upvalues_by_id.clear()
+        self.throw_stack.clear()
+        self.declared_functions.clear()
+        self.ops = 0
+        self.stdout: list[str] = []
+        self.frame = CallFrame(
+            ip=0,
+            chunk="root",
+            stack_start=0,
+            arg_len=0,
+            closure=new_hog_closure(
+                new_hog_callable(type="local", arg_count=0, upvalue_count=0, ip=0, chunk="root", name="")
+            ),
+        )
+        self.call_stack.clear()
+        self.call_stack.append(self.frame)
+        self.enter_chunk()
+
+    def enter_chunk(self) -> None:
+        frame = self.frame
+        chunk = self.program.chunk(frame.chunk)
+        self.chunk = chunk
+        if chunk.name == "root":
+            self.chunk_globals = self.globals
+        elif chunk.name.startswith("stl/"):
+            self.chunk_globals = {}
+        else:
+            self.chunk_globals = chunk.globals
+        if frame.ip == 0 and chunk.start_ip:
+            frame.ip = chunk.start_ip
+
+    def call(self, frame: CallFrame) -> None:
+        self.frame = frame
+        self.enter_chunk()
+        self.call_stack.append(frame)
+
+    def run(self) -> BytecodeResult:
+        while True:
+            frame = self.frame
+            chunk = self.chunk
+            ip = frame.ip
+            # Return or jump back to the previous call frame if ran out of bytecode to execute in this one
+            if ip > chunk.last_op:
+                last_call_frame = self.call_stack.pop()
+                if len(self.call_stack) == 0 or last_call_frame is None:
+                    if len(self.stack) > 1:
+                        raise HogVMException("Invalid bytecode. More than one value left on stack")
+                    return self.result(self.pop() if len(self.stack) > 0 else None)
+                self.stack_keep_first_elements(last_call_frame.stack_start)
+                self.push(None)
+                self.frame = self.call_stack[-1]
+                self.enter_chunk()
+                continue
+
+            self.ops += 1
+            if (self.ops & 127) == 0:  # every 128th operation
+                self.check_timeout()
+            instruction = chunk.instructions[ip]
+            if instruction is None:
+                instruction = chunk.instruction_at(ip)
+            handler, args, frame.ip = instruction
+            result = handler(self, args)
+            if result is not None:
+                return result
+
+    def result(self, value: Any) -> BytecodeResult:
+        return BytecodeResult(result=value, stdout=self.stdout, bytecodes=self.program.bytecodes)
+
+    def check_timeout(self) -> None:
+        if time.time() - self.start_time > self.timeout_seconds:
+            raise HogVMRuntimeExceededException(timeout_seconds=self.timeout_seconds, ops_performed=self.ops)
+
+    def push(self, value: Any, cost: Optional[int] = None) -> None:
+        if cost is None:
+            cost = calculate_cost(value)
+        self.stack.append(value)
+        self.mem_stack.append(cost)
+        self.mem_used += cost
+        if self.mem_used > MAX_MEMORY:
+            raise HogVMMemoryExceededException(memory_limit=MAX_MEMORY, attempted_memory=self.mem_used)
+
+    def pop(self) -> Any:
+        if not self.stack:
+            raise HogVMException("Stack underflow")
+        self.mem_used -= self.mem_stack.pop()
+        return self.stack.pop()
+
+    def pop_many(self, count: int) -> list[Any]:
+        if count < 0 or len(self.stack) < count:
+            raise HogVMException("Stack underflow")
+        if count == 0:
+            return []
+        elems = self.stack[-count:]
+        del self.stack[-count:]
+        self.mem_used -= sum(self.mem_stack[-count:])
+        del self.mem_stack[-count:]
+        return elems
+
+    def stack_keep_first_elements(self, count: int) -> list[Any]:
+        stack = self.stack
+        if count < 0 or len(stack) < count:
+            raise HogVMException("Stack underflow")
+        for upvalue in reversed(self.upvalues):
+            if upvalue["location"] >= count:
+                if not upvalue["closed"]:
+                    upvalue["closed"] = True
+                    upvalue["value"] = stack[upvalue["location"]]
+            else:
+                break
+        removed = stack[count:]
+        del stack[count:]
+        self.mem_used -= sum(self.mem_stack[count:])
+        del self.mem_stack[count:]
+        return removed
+
+    def capture_upvalue(self, index: int) -> dict:
+        for upvalue in reversed(self.upvalues):
+            if upvalue["location"] < index:
+                break
+            if upvalue["location"] == index:
+                return upvalue
+        created_upvalue = {
+            "__hogUpValue__": True,
+            "location": index,
+            "closed": False,
+            "value": None,
+            "id": len(self.upvalues) + 1,
+        }
+        self.upvalues.append(created_upvalue)
+        self.upvalues_by_id[created_upvalue["id"]] = created_upvalue
+        self.upvalues.sort(key=lambda x: x["location"])
+        return created_upvalue
+
+    def get_upvalue(self, index: int) -> dict:
+        closure = self.frame.closure
+        if index >= len(closure["upvalues"]):
+            raise HogVMException(f"Invalid upvalue index: {index}")
+        upvalue = self.upvalues_by_id[closure["upvalues"][index]]
+        if not is_hog_upvalue(upvalue):
+            raise HogVMException(f"Invalid upvalue: {upvalue}")
+        return upvalue
+
+    def call_args(self, arg_count: int) -> list[Any]:
+        if self.version == 0:
+            return [self.pop() for _ in range(arg_count)]
+        return self.stack_keep_first_elements(len(self.stack) - arg_count)
+
+
+# Operation handlers. Each receives the running program and the operands decoded at compile time. `frame.ip` already
+# points at the next instruction when a handler runs; handlers that jump or call simply overwrite it.
+
+
+def _op_end(vm: _ProgramRun, args: tuple) -> Optional[BytecodeResult]:
+    return vm.result(vm.pop() if len(vm.stack) > 0 else None)
+
+
+def _op_constant(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(args[0], args[1])
+
+
+def _op_true(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(True, COST_PER_UNIT)
+
+
+def _op_false(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(False, COST_PER_UNIT)
+
+
+def _op_null(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(None, COST_PER_UNIT)
+
+
+def _op_not(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(not vm.pop(), COST_PER_UNIT)
+
+
+def _op_and(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(all([vm.pop() for _ in range(args[0])]), COST_PER_UNIT)  # noqa: C419
+
+
+def _op_or(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(any([vm.pop() for _ in range(args[0])]), COST_PER_UNIT)  # noqa: C419
+
+
+def _op_plus(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() + vm.pop())
+
+
+def _op_minus(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() - vm.pop())
+
+
+def _op_divide(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() / vm.pop())
+
+
+def _op_multiply(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() * vm.pop())
+
+
+def _op_mod(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() % vm.pop())
+
+
+def _op_eq(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 == var2, COST_PER_UNIT)
+
+
+def _op_not_eq(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 != var2, COST_PER_UNIT)
+
+
+def _op_gt(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 > var2, COST_PER_UNIT)
+
+
+def _op_gt_eq(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 >= var2, COST_PER_UNIT)
+
+
+def _op_lt(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 < var2, COST_PER_UNIT)
+
+
+def _op_lt_eq(vm: _ProgramRun, args: tuple) -> None:
+    var1, var2 = unify_comparison_types(vm.pop(), vm.pop())
+    vm.push(var1 <= var2, COST_PER_UNIT)
+
+
+def _op_like(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(like(vm.pop(), vm.pop()), COST_PER_UNIT)
+
+
+def _op_ilike(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(like(vm.pop(), vm.pop(), re.IGNORECASE), COST_PER_UNIT)
+
+
+def _op_not_like(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(not like(vm.pop(), vm.pop()), COST_PER_UNIT)
+
+
+def _op_not_ilike(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(not like(vm.pop(), vm.pop(), re.IGNORECASE), COST_PER_UNIT)
+
+
+def _op_in(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() in vm.pop(), COST_PER_UNIT)
+
+
+def _op_not_in(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop() not in vm.pop(), COST_PER_UNIT)
+
+
+def _op_regex(vm: _ProgramRun, args: tuple) -> None:
+    value, pattern = vm.pop(), vm.pop()
+    vm.push(bool(re.search(re.compile(pattern), value)) if value and pattern else False, COST_PER_UNIT)
+
+
+def _op_not_regex(vm: _ProgramRun, args: tuple) -> None:
+    value, pattern = vm.pop(), vm.pop()
+    vm.push(not bool(re.search(re.compile(pattern), value)) if value and pattern else False, COST_PER_UNIT)
+
+
+def _op_iregex(vm: _ProgramRun, args: tuple) -> None:
+    value, pattern = vm.pop(), vm.pop()
+    vm.push(
+        bool(re.search(re.compile(pattern, re.RegexFlag.IGNORECASE), value)) if value and pattern else False,
+        COST_PER_UNIT,
+    )
+
+
+def _op_not_iregex(vm: _ProgramRun, args: tuple) -> None:
+    value, pattern = vm.pop(), vm.pop()
+    vm.push(
+        not bool(re.search(re.compile(pattern, re.RegexFlag.IGNORECASE), value)) if value and pattern else False,
+        COST_PER_UNIT,
+    )
+
+
+def _op_get_global(vm: _ProgramRun, args: tuple) -> None:
+    chain = [vm.pop() for _ in range(args[0])]
+    chunk_globals = vm.chunk_globals
+    functions = vm.functions
+    if chunk_globals and chain[0] in chunk_globals:
+        vm.push(deepcopy(get_nested_value(chunk_globals, chain, True)))
+    elif functions and chain[0] in functions:
+        vm.push(
+            new_hog_closure(
+                new_hog_callable(type="stl", name=chain[0], arg_count=0, upvalue_count=0, ip=-1, chunk="stl")
+            )
+        )
+    elif chain[0] in STL and len(chain) == 1:
+        vm.push(
+            new_hog_closure(
+                new_hog_callable(
+                    type="stl",
+                    name=chain[0],
+                    arg_count=STL[chain[0]].maxArgs or 0,
+                    upvalue_count=0,
+                    ip=-1,
+                    chunk="stl",
+                )
+            )
+        )
+    elif chain[0] in BYTECODE_STL and len(chain) == 1:
+        vm.push(
+            new_hog_closure(
+                new_hog_callable(
+                    type="stl",
+                    name=chain[0],
+                    arg_count=len(BYTECODE_STL[chain[0]][0]),
+                    upvalue_count=0,
+                    ip=0,
+                    chunk=f"stl/{chain[0]}",
+                )
+            )
+        )
+    else:
+        raise HogVMException(f"Global variable not found: {chain[0]}")
+
+
+def _op_pop(vm: _ProgramRun, args: tuple) -> None:
+    vm.pop()
+
+
+def _op_close_upvalue(vm: _ProgramRun, args: tuple) -> None:
+    vm.stack_keep_first_elements(len(vm.stack) - 1)
+
+
+def _op_return(vm: _ProgramRun, args: tuple) -> Optional[BytecodeResult]:
+    response = vm.pop()
+    last_call_frame = vm.call_stack.pop()
+    if len(vm.call_stack) == 0 or last_call_frame is None:
+        return vm.result(response)
+    vm.stack_keep_first_elements(last_call_frame.stack_start)
+    vm.push(response)
+    vm.frame = vm.call_stack[-1]
+    vm.enter_chunk()
+    return None
+
+
+def _op_get_local(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.stack[args[0] + vm.frame.stack_start])
+
+
+def _op_set_local(vm: _ProgramRun, args: tuple) -> None:
+    value = vm.pop()
+    index = args[0] + vm.frame.stack_start
+    vm.stack[index] = value
+    last_cost = vm.mem_stack[index]
+    vm.mem_stack[index] = calculate_cost(value)
+    vm.mem_used += vm.mem_stack[index] - last_cost
+
+
+def _op_get_property(vm: _ProgramRun, args: tuple) -> None:
+    property = vm.pop()
+    vm.push(get_nested_value(vm.pop(), [property]))
+
+
+def _op_get_property_nullish(vm: _ProgramRun, args: tuple) -> None:
+    property = vm.pop()
+    vm.push(get_nested_value(vm.pop(), [property], nullish=True))
+
+
+def _op_set_property(vm: _ProgramRun, args: tuple) -> None:
+    value = vm.pop()
+    field = vm.pop()
+    set_nested_value(vm.pop(), [field], value)
+
+
+def _op_dict(vm: _ProgramRun, args: tuple) -> None:
+    elems = vm.pop_many(args[0] * 2)
+    vm.push({elems[i]: elems[i + 1] for i in range(0, len(elems), 2)})
+
+
+def _op_array(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(vm.pop_many(args[0]))
+
+
+def _op_tuple(vm: _ProgramRun, args: tuple) -> None:
+    vm.push(tuple(vm.pop_many(args[0])))
+
+
+def _op_jump(vm: _ProgramRun, args: tuple) -> None:
+    vm.frame.ip = args[0]
+
+
+def _op_jump_if_false(vm: _ProgramRun, args: tuple) -> None:
+    if not vm.pop():
+        vm.frame.ip = args[0]
+
+
+def _op_jump_if_stack_not_null(vm: _ProgramRun, args: tuple) -> None:
+    if len(vm.stack) > 0 and vm.stack[-1] is not None:
+        vm.frame.ip = args[0]
+
+
+def _op_declare_fn(vm: _ProgramRun, args: tuple) -> None:
+    # DEPRECATED
+    name, func_ip, arg_len, after_body = args
+    vm.declared_functions[name] = (func_ip, arg_len)
+    vm.frame.ip = after_body
+
+
+def _op_callable(vm: _ProgramRun, args: tuple) -> None:
+    name, arg_count, upvalue_count, body_ip, after_body = args
+    vm.push(
+        new_hog_callable(
+            type="local",
+            name=name,
+            chunk=vm.frame.chunk,
+            arg_count=arg_count,
+            upvalue_count=upvalue_count,
+            ip=body_ip,
+        )
+    )
+    vm.frame.ip = after_body
+
+
+def _op_closure(vm: _ProgramRun, args: tuple) -> None:
+    upvalue_count, captures = args
+    closure_callable = vm.pop()
+    closure = new_hog_closure(closure_callable)
+    if upvalue_count != closure_callable["upvalueCount"]:
+        raise HogVMException(f"Invalid upvalue count. Expected {closure_callable['upvalueCount']}, got {upvalue_count}")
+    frame = vm.frame
+    for is_local, index in captures:
+        if is_local:
+            closure["upvalues"].append(vm.capture_upvalue(frame.stack_start + index)["id"])
+        else:
+            closure["upvalues"].append(frame.closure["upvalues"][index])
+    vm.push(closure)
+
+
+def _op_get_upvalue(vm: _ProgramRun, args: tuple) -> None:
+    upvalue = vm.get_upvalue(args[0])
+    if upvalue["closed"]:
+        vm.push(upvalue["value"])
+    else:
+        vm.push(vm.stack[upvalue["location"]])
+
+
+def _op_set_upvalue(vm: _ProgramRun, args: tuple) -> None:
+    upvalue = vm.get_upvalue(args[0])
+    if upvalue["closed"]:
+        upvalue["value"] = vm.pop()
+    else:
+        vm.stack[upvalue["location"]] = vm.pop()
+
+
+def _op_call_global(vm: _ProgramRun, args: tuple) -> None:
+    vm.check_timeout()
+    name, arg_count, stl_fn, bytecode_stl = args
+    frame = vm.frame
+    # This is for backwards compatibility. We use a closure on the stack with local functions now.
+    if name in vm.declared_functions:
+        func_ip, arg_len = vm.declared_functions[name]
+        if arg_len > arg_count:
+            for _ in range(arg_len - arg_count):
+                vm.push(None, COST_PER_UNIT)
+        vm.call(
+            CallFrame(
+                ip=func_ip,
+                chunk=frame.chunk,
+                stack_start=len(vm.stack) - arg_len,
+                arg_len=arg_len,
+                closure=new_hog_closure(
+                    new_hog_callable(
+                        type="local", name=name, arg_count=arg_len, upvalue_count=0, ip=func_ip, chunk=frame.chunk
+                    )
+                ),
+            )
+        )
+    elif name == "import":
+        if arg_count != 1:
+            raise HogVMException("Function import requires exactly 1 argument")
+        module_name = vm.pop()
+        vm.call(
+            CallFrame(
+                ip=0,
+                chunk=module_name,
+                stack_start=len(vm.stack),
+                arg_len=0,
+                closure=new_hog_closure(
+                    new_hog_callable(
+                        type="local", name=module_name, arg_count=0, upvalue_count=0, ip=0, chunk=module_name
+                    )
+                ),
+            )
+        )
+    elif vm.functions is not None and name in vm.functions:
+        vm.push(vm.functions[name](*vm.call_args(arg_count)))
+    elif stl_fn is not None:
+        vm.push(stl_fn.fn(vm.call_args(arg_count), vm.team, vm.stdout, vm.timeout_seconds))
+    elif bytecode_stl is not None:
+        if len(bytecode_stl[0]) != arg_count:
+            raise HogVMException(f"Function {name} requires exactly {len(bytecode_stl[0])} arguments")
+        vm.call(
+            CallFrame(
+                ip=0,
+                chunk=f"stl/{name}",
+                stack_start=len(vm.stack) - arg_count,
+                arg_len=arg_count,
+                closure=new_hog_closure(
+                    new_hog_callable(
+                        type="stl", name=name, arg_count=arg_count, upvalue_count=0, ip=0, chunk=f"stl/{name}"
+                    )
+                ),
+            )
+        )
+    else:
+        raise HogVMException(f"Unsupported function call: {name}")
+
+
+def _op_call_local(vm: _ProgramRun, args: tuple) -> None:
+    vm.check_timeout()
+    closure = vm.pop()
+    if not isinstance(closure, dict) or closure.get("__hogClosure__") is None:
+        raise HogVMException(f"Invalid closure: {closure}")
+    callable = closure.get("callable")
+    if not isinstance(callable, dict) or callable.get("__hogCallable__") is None:
+        raise HogVMException(f"Invalid callable: {callable}")
+    args_length = args[0]
+    if args_length > MAX_FUNCTION_ARGS_LENGTH:
+        raise HogVMException("Too many arguments")
+
+    if callable.get("__hogCallable__") == "local":
+        if callable["argCount"] > args_length:
+            # TODO: specify minimum required arguments somehow
+            for _ in range(callable["argCount"] - args_length):
+                vm.push(None, COST_PER_UNIT)
+        elif callable["argCount"] < args_length:
+            raise HogVMException(f"Too many arguments. Passed {args_length}, expected {callable['argCount']}")
+        vm.call(
+            CallFrame(
+                ip=callable["ip"],
+                chunk=callable["chunk"],
+                stack_start=len(vm.stack) - callable["argCount"],
+                arg_len=callable["argCount"],
+                closure=closure,
+            )
+        )
+
+    elif callable.get("__hogCallable__") == "stl":
+        if callable["name"] not in STL:
+            raise HogVMException(f"Unsupported function call: {callable['name']}")
+        stl_fn = STL[callable["name"]]
+        if stl_fn.minArgs is not None and args_length < stl_fn.minArgs:
+            raise HogVMException(f"Function {callable['name']} requires at least {stl_fn.minArgs} arguments")
+        if stl_fn.maxArgs is not None and args_length > stl_fn.maxArgs:
+            raise HogVMException(f"Function {callable['name']} requires at most {stl_fn.maxArgs} arguments")
+        if vm.version == 0:
+            fn_args = [vm.pop() for _ in range(args_length)]
+        else:
+            fn_args = list(reversed([vm.pop() for _ in range(args_length)]))
+            if stl_fn.maxArgs is not None and len(fn_args) < stl_fn.maxArgs:
+                fn_args = [*fn_args, *([None] * (stl_fn.maxArgs - len(fn_args)))]
+        vm.push(stl_fn.fn(fn_args, vm.team, vm.stdout, vm.timeout_seconds))
+
+    elif callable.get("__hogCallable__") == "async":
+        raise HogVMException("Async functions are not supported")
+
+    else:
+        raise HogVMException("Invalid callable")
+
+
+def _op_try(vm: _ProgramRun, args: tuple) -> None:
+    vm.throw_stack.append(
+        ThrowFrame(call_stack_len=len(vm.call_stack), stack_len=len(vm.stack), catch_ip=args[0]),
+    )
+
+
+def _op_pop_try(vm: _ProgramRun, args: tuple) -> None:
+    if vm.throw_stack:
+        vm.throw_stack.pop()
+    else:
+        raise HogVMException("Invalid operation POP_TRY: no try block to pop")
+
+
+def _op_throw(vm: _ProgramRun, args: tuple) -> None:
+    exception = vm.pop()
+    if not is_hog_error(exception):
+        raise HogVMException("Can not throw: value is not of type Error")
+    if vm.throw_stack:
+        last_throw = vm.throw_stack.pop()
+        vm.stack_keep_first_elements(last_throw.stack_len)
+        del vm.call_stack[last_throw.call_stack_len :]
+        vm.push(exception)
+        vm.frame = vm.call_stack[-1]
+        vm.enter_chunk()
+        vm.frame.ip = last_throw.catch_ip
+    else:
+        raise UncaughtHogVMException(
+            type=exception.get("type"),
+            message=exception.get("message"),
+            payload=exception.get("payload"),
+        )
+
+
+def _op_unexpected_end(vm: _ProgramRun, args: tuple) -> None:
+    raise HogVMException("Unexpected end of bytecode")
+
+
+def _op_unknown(vm: _ProgramRun, args: tuple) -> None:
+    raise HogVMException(f'Unexpected node while running bytecode in chunk "{vm.frame.chunk}": {args[0]}')
+
+
+# Operation -> (handler, operand count). Operations with a variable number of operands are decoded separately.
+_DISPATCH: dict[int, tuple[Callable[[_ProgramRun, tuple], Optional[BytecodeResult]], int]] = {
+    Operation.TRUE: (_op_true, 0),
+    Operation.FALSE: (_op_false, 0),
+    Operation.NULL: (_op_null, 0),
+    Operation.NOT: (_op_not, 0),
+    Operation.AND: (_op_and, 1),
+    Operation.OR: (_op_or, 1),
+    Operation.PLUS: (_op_plus, 0),
+    Operation.MINUS: (_op_minus, 0),
+    Operation.DIVIDE: (_op_divide, 0),
+    Operation.MULTIPLY: (_op_multiply, 0),
+    Operation.MOD: (_op_mod, 0),
+    Operation.EQ: (_op_eq, 0),
+    Operation.NOT_EQ: (_op_not_eq, 0),
+    Operation.GT: (_op_gt, 0),
+    Operation.GT_EQ: (_op_gt_eq, 0),
+    Operation.LT: (_op_lt, 0),
+    Operation.LT_EQ: (_op_lt_eq, 0),
+    Operation.LIKE: (_op_like, 0),
+    Operation.ILIKE: (_op_ilike, 0),
+    Operation.NOT_LIKE: (_op_not_like, 0),
+    Operation.NOT_ILIKE: (_op_not_ilike, 0),
+    Operation.IN: (_op_in, 0),
+    Operation.NOT_IN: (_op_not_in, 0),
+    Operation.REGEX: (_op_regex, 0),
+    Operation.NOT_REGEX: (_op_not_regex, 0),
+    Operation.IREGEX: (_op_iregex, 0),
+    Operation.NOT_IREGEX: (_op_not_iregex, 0),
+    Operation.GET_GLOBAL: (_op_get_global, 1),
+    Operation.POP: (_op_pop, 0),
+    Operation.CLOSE_UPVALUE: (_op_close_upvalue, 0),
+    Operation.RETURN: (_op_return, 0),
+    Operation.GET_LOCAL: (_op_get_local, 1),
+    Operation.SET_LOCAL: (_op_set_local, 1),
+    Operation.GET_PROPERTY: (_op_get_property, 0),
+    Operation.GET_PROPERTY_NULLISH: (_op_get_property_nullish, 0),
+    Operation.SET_PROPERTY: (_op_set_property, 0),
+    Operation.DICT: (_op_dict, 1),
+    Operation.ARRAY: (_op_array, 1),
+    Operation.TUPLE: (_op_tuple, 1),
+    Operation.GET_UPVALUE: (_op_get_upvalue, 1),
+    Operation.SET_UPVALUE: (_op_set_upvalue, 1),
+    Operation.CALL_LOCAL: (_op_call_local, 1),
+    Operation.POP_TRY: (_op_pop_try, 0),
+    Operation.THROW: (_op_throw, 0),
+}
+
+
+def _decode_instruction(bytecode: list[Any], ip: int) -> Instruction:
+    symbol = bytecode[ip]
+    last_op = len(bytecode) - 1
+
+    def operands(count: int) -> Optional[tuple]:
+        if ip + count > last_op:
+            return None
+        return tuple(bytecode[ip + 1 : ip + 1 + count])
+
+    if symbol is None:
+        return (_op_end, (), ip + 1)
+    if symbol in (Operation.STRING, Operation.INTEGER, Operation.FLOAT):
+        args = operands(1)
+        if args is None:
+            return (_op_unexpected_end, (), ip)
+        return (_op_constant, (args[0], calculate_cost(args[0])), ip + 2)
+    if symbol in (Operation.JUMP, Operation.JUMP_IF_FALSE, Operation.JUMP_IF_STACK_NOT_NULL, Operation.TRY):
+        args = operands(1)
+        if args is None:
+            return (_op_unexpected_end, (), ip)
+        if symbol == Operation.TRY:
+            # The reference VM reads the catch offset relative to the TRY operation itself
+            return (_op_try, (ip + 1 + args[0],), ip + 2)
+        handler = {
+            Operation.JUMP: _op_jump,
+            Operation.JUMP_IF_FALSE: _op_jump_if_false,
+            Operation.JUMP_IF_STACK_NOT_NULL: _op_jump_if_stack_not_null,
+        }[symbol]
+        return (handler, (ip + 2 + args[0],), ip + 2)
+    if symbol == Operation.DECLARE_FN:
+        args = operands(3)
+        if args is None:
+            return (_op_unexpected_end, (), ip)
+        name, arg_len, body_len = args
+        return (_op_declare_fn, (name, ip + 4, arg_len, ip + 4 + body_len), ip + 4)
+    if symbol == Operation.CALLABLE:
+        args = operands(4)
+        if args is None:
+            return (_op_unexpected_end, (), ip)
+        name, arg_count, upvalue_count, body_length = args
+        return (_op_callable, (name, arg_count, upvalue_count, ip + 5, ip + 5 + body_length), ip + 5)
+    if symbol == Operation.CLOSURE:
+        args = operands(1)
+        if args is None or not isinstance(args[0], int):
+            return (_op_unexpected_end, (), ip)
+        upvalue_count = args[0]
+        captures = operands(1 + upvalue_count * 2)
+        if captures is None:
+            return (_op_unexpected_end, (), ip)
+        pairs = tuple((captures[i], captures[i + 1]) for i in range(1, len(captures), 2))
+        return (_op_closure, (upvalue_count, pairs), ip + 2 + upvalue_count * 2)
+    if symbol == Operation.CALL_GLOBAL:
+        args = operands(2)
+        if args is None:
+            return (_op_unexpected_end, (), ip)
+        name, arg_count = args
+        return (_op_call_global, (name, arg_count, STL.get(name), BYTECODE_STL.get(name)), ip + 3)
+
+    dispatch = _DISPATCH.get(symbol) if isinstance(symbol, int) else None
+    if dispatch is None:
+        return (_op_unknown, (symbol,), ip)
+    handler, operand_count = dispatch
+    args = operands(operand_count) if operand_count else ()
+    if args is None:
+        return (_op_unexpected_end, (), ip)
+    return (handler, args, ip + 1 + operand_count)
+
+
+def _compile_chunk(name: str, bytecode: list[Any], globals: Optional[dict[str, Any]]) -> HogChunk:
+    start_ip = 0
+    if bytecode and bytecode[0] == HOGQL_BYTECODE_IDENTIFIER:
+        start_ip = 2
+    elif bytecode and bytecode[0] == HOGQL_BYTECODE_IDENTIFIER_V0:
+        start_ip = 1
+    instructions: list[Optional[Instruction]] = [None] * len(bytecode)
+    ip = start_ip
+    while ip < len(bytecode):
+        instruction = _decode_instruction(bytecode, ip)
+        instructions[ip] = instruction
+        if instruction[2] <= ip:
+            # Unknown operation or truncated bytecode. Anything after this is decoded lazily if ever reached.
+            break
+        # Function declarations continue with their inline body, so it gets decoded as well
+        ip = instruction[2]
+    return HogChunk(name=name, bytecode=bytecode, globals=globals, start_ip=start_ip, instructions=instructions)
+
+
+_stl_chunks: dict[str, HogChunk] = {}
+
+
+def _stl_chunk(name: str) -> HogChunk:
+    chunk = _stl_chunks.get(name)
+    if chunk is None:
+        chunk = _compile_chunk(name, BYTECODE_STL[name[4:]][1], {})
+        _stl_chunks[name] = chunk
+    return chunk
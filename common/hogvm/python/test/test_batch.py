@@ -0,0 +1,93 @@
+from typing import Any
+from unittest.mock import patch
+
+import pytest
+
+from common.hogvm.python.batch import _get_expression, execute_bytecode_batch
+from common.hogvm.python.execute import execute_bytecode
+from common.hogvm.python.operation import (
+    Operation as op,
+    HOGQL_BYTECODE_IDENTIFIER as _H,
+    HOGQL_BYTECODE_VERSION as VERSION,
+)
+from common.hogvm.python.program import compile_program
+from common.hogvm.python.stl import STL, STLFunction
+from common.hogvm.python.utils import HogVMException
+
+
+def _event_is(name: str) -> list[Any]:
+    return [op.STRING, name, op.STRING, "event", op.GET_GLOBAL, 1, op.EQ]
+
+
+def _property(key: str) -> list[Any]:
+    return [op.STRING, key, op.STRING, "properties", op.GET_GLOBAL, 2]
+
+
+# ifNull(properties.$browser = 'Chrome', false)
+BROWSER_IS_CHROME = [op.STRING, "Chrome", *_property("$browser"), op.EQ]
+BROWSER_IS_CHROME += [op.JUMP_IF_STACK_NOT_NULL, 2, op.POP, op.FALSE]
+# toString(properties.$current_url) ilike '%posthog%'
+URL_MATCHES = [op.STRING, "%posthog%", *_property("$current_url"), op.CALL_GLOBAL, "toString", 1, op.ILIKE]
+
+# (event = '$pageview' and <browser>) or (event = '$autocapture' and <browser> and <url>)
+FILTER = [_H, VERSION, *_event_is("$pageview"), *BROWSER_IS_CHROME, op.AND, 2]
+FILTER += [*_event_is("$autocapture"), *BROWSER_IS_CHROME, *URL_MATCHES, op.AND, 3, op.OR, 2]
+
+EVENTS = [
+    {"event": event, "properties": {"$browser": browser, "$current_url": url}}
+    for event in ["$pageview", "$autocapture", "$identify"]
+    for browser in ["Chrome", "Firefox", None]
+    for url in ["https://posthog.com/", "https://example.com/", None]
+]
+
+
+class TestExecuteBytecodeBatch:
+    @pytest.mark.parametrize(
+        "bytecode",
+        [
+            FILTER,
+            # if(event = '$pageview', 1, 2)
+            [_H, VERSION, *_event_is("$pageview"), op.JUMP_IF_FALSE, 4, op.INTEGER, 1, op.JUMP, 2, op.INTEGER, 2],
+            [_H, VERSION, *_property("$browser"), op.RETURN],
+            [_H, VERSION, op.INTEGER, 1, op.STRING, "a", op.ARRAY, 2],
+            # programs the expression evaluator doesn't handle still go through the interpreter
+            [_H, VERSION, op.INTEGER, 1, op.INTEGER, 2, op.SET_LOCAL, 0],
+            [_H, VERSION, op.STRING, "properties", op.CALL_GLOBAL, "print", 1],
+        ],
+    )
+    def test_matches_execute_bytecode(self, bytecode: list[Any]):
+        expected = [execute_bytecode(bytecode, globals) for globals in EVENTS]
+        results = execute_bytecode_batch(bytecode, EVENTS)
+        assert [result.result for result in results] == [result.result for result in expected]
+        assert [result.stdout for result in results] == [result.stdout for result in expected]
+
+    def test_filters_are_expressions(self):
+        assert _get_expression(compile_program(FILTER)) is not None
+        assert _get_expression(compile_program([_H, VERSION, op.INTEGER, 1, op.INTEGER, 2, op.SET_LOCAL, 0])) is None
+
+    def test_shared_sub_expressions_are_evaluated_once_per_value(self):
+        calls: list[Any] = []
+
+        def to_string(args, team, stdout, timeout):
+            calls.append(args[0])
+            return str(args[0])
+
+        bytecode = [_H, VERSION, *_property("$current_url"), op.CALL_GLOBAL, "toString", 1]
+        with patch.dict(STL, {"toString": STLFunction(fn=to_string, minArgs=1, maxArgs=1)}):
+            execute_bytecode_batch(bytecode, EVENTS)
+        assert sorted(calls, key=str) == sorted(["https://posthog.com/", "https://example.com/", None], key=str)
+
+    def test_functions_override_stl(self):
+        bytecode = [_H, VERSION, *_property("$browser"), op.CALL_GLOBAL, "lower", 1]
+        results = execute_bytecode_batch(bytecode, EVENTS[:2], functions={"lower": lambda value: "overridden"})
+        assert [result.result for result in results] == ["overridden", "overridden"]
+
+    def test_missing_globals_use_the_interpreter(self):
+        with pytest.raises(HogVMException, match="Global variable not found: event"):
+            execute_bytecode_batch(FILTER, [EVENTS[0], {"properties": {}}])
+
+    def test_results_are_not_shared(self):
+        bytecode = [_H, VERSION, op.STRING, "a", op.INTEGER, 1, op.ARRAY, 2]
+        first, second = execute_bytecode_batch(bytecode, [{}, {}])
+        first.result.append(2)
+        assert second.result == ["a", 1]
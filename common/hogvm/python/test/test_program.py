@@ -0,0 +1,92 @@
+import json
+from pathlib import Path
+from typing import Any
+
+import pytest
+
+from common.hogvm.python.execute import execute_bytecode
+from common.hogvm.python.operation import (
+    Operation as op,
+    HOGQL_BYTECODE_IDENTIFIER as _H,
+    HOGQL_BYTECODE_VERSION as VERSION,
+)
+from common.hogvm.python.program import clear_program_cache, compile_program, execute_program, get_program
+from common.hogvm.python.utils import HogVMException, UncaughtHogVMException
+
+SNAPSHOTS_DIR = Path(__file__).parent.parent.parent / "__tests__" / "__snapshots__"
+# sql.hog is only tested against the Node.js VM
+SNAPSHOT_PROGRAMS = sorted(path.stem for path in SNAPSHOTS_DIR.glob("*.hoge") if path.stem != "sql")
+
+
+def _error(fn, *args) -> str:
+    with pytest.raises(Exception) as e:
+        fn(*args)
+    return str(e.value)
+
+
+class TestProgramExecute:
+    @pytest.mark.parametrize("name", SNAPSHOT_PROGRAMS)
+    def test_snapshots(self, name: str):
+        bytecode = json.loads((SNAPSHOTS_DIR / f"{name}.hoge").read_text())
+        expected = (SNAPSHOTS_DIR / f"{name}.stdout").read_text()
+        response = execute_program(bytecode, timeout=60)
+        assert "\n".join(response.stdout).strip() == expected.strip()
+
+    def test_results_match_reference(self):
+        programs: list[list[Any]] = [
+            [_H, VERSION, op.INTEGER, 2, op.INTEGER, 1, op.PLUS],
+            [_H, VERSION, op.STRING, "b", op.STRING, "a", op.CALL_GLOBAL, "concat", 2, op.RETURN],
+            ["_h", op.STRING, "1", op.STRING, "2", op.CALL_GLOBAL, "concat", 2, op.RETURN],
+            [_H, VERSION, op.STRING, "foo", op.STRING, "properties", op.GET_GLOBAL, 2],
+            [_H, VERSION, op.STRING, "a", op.INTEGER, 1, op.STRING, "b", op.NULL, op.DICT, 2],
+            [_H, VERSION, op.INTEGER, 1, op.INTEGER, 2, op.INTEGER, 3, op.TUPLE, 3],
+        ]
+        globals = {"properties": {"foo": "bar"}}
+        for bytecode in programs:
+            assert execute_program(bytecode, globals).result == execute_bytecode(bytecode, globals).result
+
+    def test_errors_match_reference(self):
+        programs: list[list[Any]] = [
+            [_H, VERSION, op.TRUE, op.CALL_GLOBAL, "notAFunction", 1],
+            [_H, VERSION, op.CALL_GLOBAL, "replaceOne", 1],
+            [_H, VERSION, op.TRUE, op.TRUE, op.NOT],
+            [_H, VERSION, op.STRING],
+            [_H, VERSION, 999],
+            # let string := 'banana'; for (let i := 0; i < 100; i := i + 1) { string := string || string }
+            [
+                *["_h", 32, "banana", 33, 0, 33, 100, 36, 1, 15, 40, 18, 36, 0, 36, 0, 2, "concat", 2, 37, 0, 33, 1],
+                *[36, 1, 6, 37, 1, 39, -25, 35, 35],
+            ],
+        ]
+        for bytecode in programs:
+            assert _error(execute_program, bytecode, {}) == _error(execute_bytecode, bytecode, {})
+
+    def test_invalid_bytecode(self):
+        with pytest.raises(HogVMException, match="Invalid bytecode. Must start with '_H'"):
+            compile_program([op.TRUE])
+
+    def test_uncaught_errors(self):
+        bytecode = [_H, VERSION, op.STRING, "Not a good day", op.CALL_GLOBAL, "Error", 1, op.THROW]
+        with pytest.raises(UncaughtHogVMException) as e:
+            execute_program(bytecode)
+        assert str(e.value) == "Error('Not a good day')"
+
+    def test_functions(self):
+        bytecode = [_H, VERSION, op.INTEGER, 1, op.CALL_GLOBAL, "stringify", 1, op.RETURN]
+        functions = {"stringify": lambda value: "one" if value == 1 else "zero"}
+        assert execute_program(bytecode, {}, functions).result == "one"
+
+    def test_multiple_bytecodes(self):
+        ret = lambda string: {"bytecode": ["_H", 1, op.STRING, string, op.RETURN]}
+        call = lambda chunk: {"bytecode": ["_H", 1, op.STRING, chunk, op.CALL_GLOBAL, "import", 1, op.RETURN]}
+        res = execute_program({"root": call("code2"), "code2": call("code3"), "code3": ret("tomato")})
+        assert res.result == "tomato"
+
+    def test_program_cache(self):
+        clear_program_cache()
+        bytecode = [_H, VERSION, op.STRING, "foo", op.STRING, "properties", op.GET_GLOBAL, 2]
+        program = get_program(bytecode)
+        assert get_program(bytecode) is program
+        assert get_program(list(bytecode)) is not program
+        assert execute_program(program, {"properties": {"foo": "bar"}}).result == "bar"
+        assert execute_program(program, {"properties": {"foo": "baz"}}).result == "baz"
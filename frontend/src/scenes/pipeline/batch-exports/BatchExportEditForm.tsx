@@ -169,6 +169,7 @@ export function BatchExportsEditFields({
                                     options={[
                                         { value: 'gzip', label: 'gzip' },
                                         { value: 'brotli', label: 'brotli' },
+                                        { value: 'zstd', label: 'zstd' },
                                         { value: null, label: 'No compression' },
                                     ]}
                                 />
@@ -3,14 +3,17 @@ import json
 import re
 from random import random
 
+import orjson
 import sentry_sdk
 import structlog
+import threading
 import time
-from collections.abc import Iterator
+from asgiref.sync import sync_to_async
+from collections.abc import Iterable, Iterator
 from datetime import datetime, timedelta, UTC
 from dateutil import parser
 from django.conf import settings
-from django.http import JsonResponse
+from django.http import HttpResponse, JsonResponse
 from django.utils import timezone
 from django.views.decorators.csrf import csrf_exempt
 from enum import Enum
@@ -28,7 +31,7 @@ from posthog.api.utils import get_data, get_token, safe_clickhouse_string
 from posthog.cache_utils import cache_for
 from posthog.exceptions import generate_exception_response
 from posthog.exceptions_capture import capture_exception
-from posthog.kafka_client.client import KafkaProducer, session_recording_kafka_producer
+from posthog.kafka_client.client import KafkaProducer, async_kafka_producer, session_recording_kafka_producer
 from posthog.kafka_client.topics import (
     KAFKA_EVENTS_PLUGIN_INGESTION_HISTORICAL,
     KAFKA_SESSION_RECORDING_EVENTS,
@@ -38,6 +41,7 @@ from posthog.kafka_client.topics import (
 )
 from posthog.logging.timing import timed
 from posthog.metrics import KLUDGES_COUNTER, LABEL_RESOURCE_TYPE
+from posthog.models.event_ingestion_restriction_config import DYNAMIC_CONFIG_REDIS_KEY_PREFIX, RestrictionType
 from posthog.models.utils import UUIDT
 from posthog.redis import get_client
 from posthog.session_recordings.session_recording_helpers import (
@@ -99,6 +103,12 @@ PARTITION_KEY_CAPACITY_EXCEEDED_COUNTER = Counter(
     labelnames=["partition_key"],
 )
 
+EVENTS_DROPPED_BY_RESTRICTION_COUNTER = Counter(
+    "capture_events_dropped_by_restriction_total",
+    "Events dropped by capture due to an ingestion restriction, per whether the token or its distinct_id matched.",
+    labelnames=["match"],
+)
+
 TOKEN_SHAPE_INVALID_COUNTER = Counter(
     "capture_token_shape_invalid_total",
     "Events dropped due to an invalid token shape, per reason.",
@@ -161,6 +171,7 @@ LIKELY_ANONYMOUS_IDS = {
 }
 
 OVERFLOWING_REDIS_KEY = "@posthog/capture-overflow/"
+PARTITION_KEY_USAGE_REDIS_KEY = "@posthog/capture-partition-key-usage/"
 
 TOKEN_DISTINCT_ID_PAIRS_TO_DROP: Optional[set[str]] = None
 
@@ -177,6 +188,102 @@ def get_tokens_to_drop() -> set[str]:
     return TOKEN_DISTINCT_ID_PAIRS_TO_DROP
 
 
+@dataclasses.dataclass(frozen=True)
+class TokenRestriction:
+    token_restricted: bool = False
+    distinct_ids: frozenset[str] = frozenset()
+
+    def matches(self, distinct_id: str) -> bool:
+        return self.token_restricted or distinct_id in self.distinct_ids
+
+
+UNRESTRICTED = TokenRestriction()
+
+
+@dataclasses.dataclass(frozen=True)
+class IngestionRestrictions:
+    """
+    The restrictions of DROP_EVENTS_BY_TOKEN_DISTINCT_ID and of EventIngestionRestrictionConfig compiled by restriction
+    type and token, so that a request looks its token up once and checking an event is a single set lookup.
+    """
+
+    restrictions: dict[str, dict[str, TokenRestriction]]
+
+    @classmethod
+    def compile(cls, entries_by_type: dict[str, Iterable[str]]) -> "IngestionRestrictions":
+        """Entries are tokens, restricted altogether, or token:distinct_id pairs, as the plugin server reads them."""
+        restrictions: dict[str, dict[str, TokenRestriction]] = {}
+        for restriction_type, entries in entries_by_type.items():
+            restricted_tokens: set[str] = set()
+            distinct_ids_by_token: dict[str, set[str]] = {}
+            for entry in entries:
+                token, separator, distinct_id = entry.partition(":")
+                if separator:
+                    distinct_ids_by_token.setdefault(token, set()).add(distinct_id)
+                else:
+                    restricted_tokens.add(token)
+            restrictions[restriction_type] = {
+                token: TokenRestriction(
+                    token_restricted=token in restricted_tokens,
+                    distinct_ids=frozenset(distinct_ids_by_token.get(token, ())),
+                )
+                for token in restricted_tokens | distinct_ids_by_token.keys()
+            }
+        return cls(restrictions)
+
+    def for_token(self, restriction_type: str, token: str) -> TokenRestriction:
+        return self.restrictions.get(restriction_type, {}).get(token, UNRESTRICTED)
+
+
+NO_INGESTION_RESTRICTION_CONFIG: dict[str, list[str]] = {}
+# the sources the restrictions were last compiled from, which are only compiled again once one of them changes
+_compiled_ingestion_restrictions: tuple[Any, Any, IngestionRestrictions] = (None, None, IngestionRestrictions({}))
+
+
+def get_ingestion_restrictions() -> IngestionRestrictions:
+    global _compiled_ingestion_restrictions
+
+    tokens_to_drop = get_tokens_to_drop()
+    config = NO_INGESTION_RESTRICTION_CONFIG
+    if settings.CAPTURE_INGESTION_RESTRICTION_CONFIG_ENABLED:
+        try:
+            config = _get_ingestion_restriction_config()
+        except Exception as e:
+            logger.warning("capture_ingestion_restriction_config_unavailable", exc_info=e)
+
+    compiled_tokens_to_drop, compiled_config, restrictions = _compiled_ingestion_restrictions
+    # both sources hand out the same objects until they change, so comparing identities is enough
+    if tokens_to_drop is not compiled_tokens_to_drop or config is not compiled_config:
+        drop_entries = [*tokens_to_drop, *config.get(RestrictionType.DROP_EVENT_FROM_INGESTION, [])]
+        restrictions = IngestionRestrictions.compile(
+            {**config, RestrictionType.DROP_EVENT_FROM_INGESTION: drop_entries}
+        )
+        _compiled_ingestion_restrictions = (tokens_to_drop, config, restrictions)
+    return restrictions
+
+
+@cache_for(timedelta(seconds=30), background_refresh=True)
+def _get_ingestion_restriction_config() -> dict[str, list[str]]:
+    """The EventIngestionRestrictionConfig entries the plugin server reads from Redis, by restriction type."""
+    restriction_types = list(RestrictionType)
+    values = get_client(settings.PLUGINS_RELOAD_REDIS_URL).mget(
+        [f"{DYNAMIC_CONFIG_REDIS_KEY_PREFIX}:{restriction_type}" for restriction_type in restriction_types]
+    )
+    return {
+        restriction_type: json.loads(value)
+        for restriction_type, value in zip(restriction_types, values)
+        if value is not None
+    }
+
+
+def is_dropped_by_restriction(restriction: TokenRestriction, token: str, distinct_id: str) -> bool:
+    if not restriction.matches(distinct_id):
+        return False
+    EVENTS_DROPPED_BY_RESTRICTION_COUNTER.labels(match="token" if restriction.token_restricted else "distinct_id").inc()
+    logger.warning("Dropping event", token=token, distinct_id=distinct_id)
+    return True
+
+
 class InputType(Enum):
     EVENTS = "events"
     REPLAY = "replay"
@@ -325,6 +432,34 @@ def _check_token_shape(token: Any) -> Optional[str]:
     return None
 
 
+def _get_invalid_token_reason(token: Any) -> Optional[str]:
+    try:
+        return _check_token_shape(token)
+    except Exception as e:
+        logger.warning(
+            "capture_token_shape_exception",
+            token=token,
+            reason="exception",
+            exception=e,
+        )
+        return "exception"
+
+
+def _invalid_token_response(request, token: Any, invalid_token_reason: str) -> HttpResponse:
+    TOKEN_SHAPE_INVALID_COUNTER.labels(reason=invalid_token_reason).inc()
+    logger.warning("capture_token_shape_invalid", token=token, reason=invalid_token_reason)
+    return cors_response(
+        request,
+        generate_exception_response(
+            "capture",
+            f"Provided API key is not valid: {invalid_token_reason}",
+            type="authentication_error",
+            code=invalid_token_reason,
+            status_code=status.HTTP_401_UNAUTHORIZED,
+        ),
+    )
+
+
 def get_distinct_id(data: dict[str, Any]) -> str:
     raw_value: Any = ""
     try:
@@ -359,69 +494,203 @@ class EventsOverQuotaResult:
     recordings_were_limited: bool
 
 
-def drop_events_over_quota(token: str, events: list[Any]) -> EventsOverQuotaResult:
-    if not settings.EE_AVAILABLE:
-        return EventsOverQuotaResult(events, False, False, False)
+class EventsOverQuotaFilter:
+    """Decides for one event at a time whether it is kept, counting the events received and dropped over quota."""
 
-    from ee.billing.quota_limiting import QuotaResource, list_limited_team_attributes
+    def __init__(self, token: str):
+        from ee.billing.quota_limiting import QuotaResource, list_limited_team_attributes
 
-    results = []
-    limited_tokens_events = list_limited_team_attributes(
-        QuotaResource.EVENTS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
-    )
-    limited_tokens_exceptions = list_limited_team_attributes(
-        QuotaResource.EXCEPTIONS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
-    )
-    limited_tokens_recordings = list_limited_team_attributes(
-        QuotaResource.RECORDINGS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
-    )
+        self.token = token
+        self.limited_tokens_events = list_limited_team_attributes(
+            QuotaResource.EVENTS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
+        )
+        self.limited_tokens_exceptions = list_limited_team_attributes(
+            QuotaResource.EXCEPTIONS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
+        )
+        self.limited_tokens_recordings = list_limited_team_attributes(
+            QuotaResource.RECORDINGS, QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY
+        )
 
-    recordings_were_limited = False
-    exceptions_were_limited = False
-    events_were_limited = False
-    for event in events:
+        self.recordings_were_limited = False
+        self.exceptions_were_limited = False
+        self.events_were_limited = False
+
+    def keep(self, event: Any) -> bool:
+        token = self.token
         if event.get("event") in SESSION_RECORDING_EVENT_NAMES:
             EVENTS_RECEIVED_COUNTER.labels(resource_type="recordings").inc()
-            if token in limited_tokens_recordings:
+            if token in self.limited_tokens_recordings:
                 EVENTS_DROPPED_OVER_QUOTA_COUNTER.labels(resource_type="recordings", token=token).inc()
                 if settings.QUOTA_LIMITING_ENABLED:
-                    recordings_were_limited = True
-                    continue
+                    self.recordings_were_limited = True
+                    return False
 
         elif event.get("event") == "$exception":
             EVENTS_RECEIVED_COUNTER.labels(resource_type="exceptions").inc()
-            if token in limited_tokens_exceptions:
+            if token in self.limited_tokens_exceptions:
                 EVENTS_DROPPED_OVER_QUOTA_COUNTER.labels(resource_type="exceptions", token=token).inc()
                 if settings.QUOTA_LIMITING_ENABLED:
-                    exceptions_were_limited = True
-                    continue
+                    self.exceptions_were_limited = True
+                    return False
 
         else:
             EVENTS_RECEIVED_COUNTER.labels(resource_type="events").inc()
-            if token in limited_tokens_events:
+            if token in self.limited_tokens_events:
                 EVENTS_DROPPED_OVER_QUOTA_COUNTER.labels(resource_type="events", token=token).inc()
                 if settings.QUOTA_LIMITING_ENABLED:
-                    events_were_limited = True
-                    continue
+                    self.events_were_limited = True
+                    return False
+
+        return True
+
+
+def drop_events_over_quota(token: str, events: list[Any]) -> EventsOverQuotaResult:
+    if not settings.EE_AVAILABLE:
+        return EventsOverQuotaResult(events, False, False, False)
 
-        results.append(event)
+    quota_filter = EventsOverQuotaFilter(token)
+    results = [event for event in events if quota_filter.keep(event)]
 
     return EventsOverQuotaResult(
         results,
-        events_were_limited=events_were_limited,
-        exceptions_were_limited=exceptions_were_limited,
-        recordings_were_limited=recordings_were_limited,
+        events_were_limited=quota_filter.events_were_limited,
+        exceptions_were_limited=quota_filter.exceptions_were_limited,
+        recordings_were_limited=quota_filter.recordings_were_limited,
     )
 
 
+class InvalidTokenShapeError(Exception):
+    def __init__(self, token: Any, reason: str):
+        super().__init__(reason)
+        self.token = token
+        self.reason = reason
+
+
+class StreamedEventsFilter:
+    """
+    Checks the shape of the token and drops events over quota while a payload is being parsed, for
+    CAPTURE_STREAMING_DECOMPRESSION_ENABLED. The token is the one get_token finds in the request and the first event,
+    or in the keys of a batch payload that come before the batch, so a bad token fails the request before the rest of
+    the body is inflated. The first event is always kept, so that get_token finds the same token once the payload is
+    parsed and a payload of events over quota isn't mistaken for an empty one, and goes through the quota filter then.
+    Performance events are dropped as drop_performance_events would, so the quota counters see the same events either
+    way.
+    """
+
+    def __init__(self, request):
+        self.request = request
+        self.token: Optional[str] = None
+        self.quota_filter: Optional[EventsOverQuotaFilter] = None
+        self.first_event: Any = None
+        self._seen_first_event = False
+
+    def __call__(self, event: Any, payload: Optional[dict]) -> bool:
+        if not self._seen_first_event:
+            self._seen_first_event = True
+            self.first_event = event
+            self._check_token(payload if payload is not None else event)
+            return True
+
+        if not isinstance(event, dict):
+            return True
+        if event.get("event") == "$performance_event":
+            # drop_performance_events would drop it later, and it mustn't be counted by the quota filter first
+            return False
+        if self.quota_filter is None:
+            return True
+        return self.quota_filter.keep(event)
+
+    def _check_token(self, data: Any) -> None:
+        if not isinstance(data, dict):
+            return
+        token = get_token(data, self.request)
+        if not token:
+            # e.g. a batch with its api_key after the events, which is checked once the payload is parsed
+            return
+        invalid_token_reason = _get_invalid_token_reason(token)
+        if invalid_token_reason:
+            raise InvalidTokenShapeError(token, invalid_token_reason)
+
+        self.token = token
+        if settings.EE_AVAILABLE:
+            self.quota_filter = EventsOverQuotaFilter(token)
+
+
 def lib_version_from_query_params(request) -> str:
     # url has a ver parameter from posthog-js
     return request.GET.get("ver", "unknown")
 
 
+@dataclasses.dataclass
+class CapturedEvents:
+    """What is left to do for a capture request once its analytics events have been handed to the producer."""
+
+    data: Any
+    token: str
+    futures: list[FutureRecordMetadata]
+    replay_events: list[Any]
+    ip: Optional[str]
+    site_url: str
+    now: datetime
+    sent_at: Optional[datetime]
+    retry_count: Optional[int]
+    recordings_were_quota_limited: bool
+
+
 @csrf_exempt
 @timed("posthog_cloud_event_endpoint")
 def get_event(request):
+    captured = _capture_events(request)
+    if isinstance(captured, HttpResponse):
+        return captured
+
+    with start_span(op="kafka.wait") as span:
+        span.set_tag("future.count", len(captured.futures))
+        start_time = time.monotonic()
+        try:
+            if settings.CAPTURE_BATCH_PRODUCE_ENABLED and captured.futures:
+                # sends everything that is still buffered at once, so the futures below are mostly resolved already
+                KafkaProducer().flush(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS)
+            for future in captured.futures:
+                future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
+        except KafkaError as exc:
+            return _kafka_produce_failure_response(request, exc, captured.data)
+
+    return _capture_replay_events(request, captured)
+
+
+async def get_event_async(request):
+    """
+    get_event for ASGI workers: parsing the request and handing events to the producer run in a worker thread, but
+    the acks of the analytics events are awaited on the event loop, so a request waiting for Kafka holds no thread.
+    """
+    timer = statsd.timer("posthog_cloud_event_endpoint").start()
+    try:
+        captured = await sync_to_async(_capture_events, thread_sensitive=False)(request)
+        if isinstance(captured, HttpResponse):
+            return captured
+
+        with start_span(op="kafka.wait") as span:
+            span.set_tag("future.count", len(captured.futures))
+            try:
+                await async_kafka_producer().wait_for_acks(
+                    captured.futures, timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS
+                )
+            except KafkaError as exc:
+                return _kafka_produce_failure_response(request, exc, captured.data)
+
+        if captured.replay_events:
+            return await sync_to_async(_capture_replay_events, thread_sensitive=False)(request, captured)
+        return _capture_replay_events(request, captured)
+    finally:
+        timer.stop()
+
+
+# Django 4.2's csrf_exempt decorator doesn't keep views async, so the marker it sets is set directly
+get_event_async.csrf_exempt = True  # type: ignore
+
+
+def _capture_events(request) -> HttpResponse | CapturedEvents:
     structlog.contextvars.unbind_contextvars("team_id")
 
     # handle cors request
@@ -430,7 +699,11 @@ def get_event(request):
 
     now = timezone.now()
 
-    data, error_response = get_data(request)
+    streamed_events_filter = StreamedEventsFilter(request) if settings.CAPTURE_STREAMING_DECOMPRESSION_ENABLED else None
+    try:
+        data, error_response = get_data(request, keep_event=streamed_events_filter)
+    except InvalidTokenShapeError as e:
+        return _invalid_token_response(request, e.token, e.reason)
 
     if error_response:
         return error_response
@@ -457,30 +730,9 @@ def get_event(request):
                 ),
             )
 
-        try:
-            invalid_token_reason = _check_token_shape(token)
-        except Exception as e:
-            invalid_token_reason = "exception"
-            logger.warning(
-                "capture_token_shape_exception",
-                token=token,
-                reason="exception",
-                exception=e,
-            )
-
+        invalid_token_reason = _get_invalid_token_reason(token)
         if invalid_token_reason:
-            TOKEN_SHAPE_INVALID_COUNTER.labels(reason=invalid_token_reason).inc()
-            logger.warning("capture_token_shape_invalid", token=token, reason=invalid_token_reason)
-            return cors_response(
-                request,
-                generate_exception_response(
-                    "capture",
-                    f"Provided API key is not valid: {invalid_token_reason}",
-                    type="authentication_error",
-                    code=invalid_token_reason,
-                    status_code=status.HTTP_401_UNAUTHORIZED,
-                ),
-            )
+            return _invalid_token_response(request, token, invalid_token_reason)
 
     structlog.contextvars.bind_contextvars(token=token)
 
@@ -522,9 +774,20 @@ def get_event(request):
         # we're not going to change the response for events
         recordings_were_quota_limited = False
         try:
-            events_over_quota_result = drop_events_over_quota(token, events)
-            events = events_over_quota_result.events
-            recordings_were_quota_limited = events_over_quota_result.recordings_were_limited
+            if (
+                streamed_events_filter is not None
+                and streamed_events_filter.quota_filter is not None
+                and streamed_events_filter.token == token
+            ):
+                # all events but the first went through the quota filter while the payload was parsed
+                quota_filter = streamed_events_filter.quota_filter
+                first_event = streamed_events_filter.first_event
+                events = [event for event in events if event is not first_event or quota_filter.keep(event)]
+                recordings_were_quota_limited = quota_filter.recordings_were_limited
+            else:
+                events_over_quota_result = drop_events_over_quota(token, events)
+                events = events_over_quota_result.events
+                recordings_were_quota_limited = events_over_quota_result.recordings_were_limited
         except Exception as e:
             # NOTE: Whilst we are testing this code we want to track exceptions but allow the events through if anything goes wrong
             capture_exception(e)
@@ -557,70 +820,90 @@ def get_event(request):
 
     with start_span(op="kafka.produce") as span:
         span.set_tag("event.count", len(processed_events))
-        for event, event_uuid, distinct_id in processed_events:
-            if f"{token}:{distinct_id}" in get_tokens_to_drop():
-                logger.warning("Dropping event", token=token, distinct_id=distinct_id)
-                continue
+        try:
+            if settings.CAPTURE_BATCH_PRODUCE_ENABLED:
+                futures = capture_batch_internal(
+                    processed_events, ip, site_url, now, sent_at, token, historical=historical
+                )
+            else:
+                dropped = get_ingestion_restrictions().for_token(RestrictionType.DROP_EVENT_FROM_INGESTION, token)
+                for event, event_uuid, distinct_id in processed_events:
+                    if is_dropped_by_restriction(dropped, token, distinct_id):
+                        continue
 
-            try:
-                futures.append(
-                    capture_internal(
-                        event,
-                        distinct_id,
-                        ip,
-                        site_url,
-                        now,
-                        sent_at,
-                        event_uuid,
-                        token,
-                        historical=historical,
+                    futures.append(
+                        capture_internal(
+                            event,
+                            distinct_id,
+                            ip,
+                            site_url,
+                            now,
+                            sent_at,
+                            event_uuid,
+                            token,
+                            historical=historical,
+                        )
                     )
-                )
-            except Exception as exc:
-                capture_exception(exc, {"data": data})
-                statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
-                logger.exception("kafka_produce_failure", exc_info=exc)
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
+        except Exception as exc:
+            capture_exception(exc, {"data": data})
+            statsd.incr("posthog_cloud_raw_endpoint_failure", tags={"endpoint": "capture"})
+            logger.exception("kafka_produce_failure", exc_info=exc)
+            return cors_response(
+                request,
+                generate_exception_response(
+                    "capture",
+                    "Unable to store event. Please try again. If you are the owner of this app you can check the logs for further details.",
+                    code="server_error",
+                    type="server_error",
+                    status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+                ),
+            )
+
+    return CapturedEvents(
+        data=data,
+        token=token,
+        futures=futures,
+        replay_events=replay_events,
+        ip=ip,
+        site_url=site_url,
+        now=now,
+        sent_at=sent_at,
+        retry_count=retry_count,
+        recordings_were_quota_limited=recordings_were_quota_limited,
+    )
 
-    with start_span(op="kafka.wait"):
-        span.set_tag("future.count", len(futures))
-        start_time = time.monotonic()
-        for future in futures:
-            try:
-                future.get(timeout=settings.KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS - (time.monotonic() - start_time))
-            except KafkaError as exc:
-                # TODO: distinguish between retriable errors and non-retriable
-                # errors, and set Retry-After header accordingly.
-                # TODO: return 400 error for non-retriable errors that require the
-                # client to change their request.
-
-                logger.exception(
-                    "kafka_produce_failure",
-                    exc_info=exc,
-                    name=exc.__class__.__name__,
-                    # data could be large, so we don't always want to include it,
-                    # but we do want to include it for some errors to aid debugging
-                    data=data if isinstance(exc, MessageSizeTooLargeError) else None,
-                )
-                return cors_response(
-                    request,
-                    generate_exception_response(
-                        "capture",
-                        "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
-                        code="server_error",
-                        type="server_error",
-                        status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
-                    ),
-                )
+
+def _kafka_produce_failure_response(request, exc: KafkaError, data: Any) -> HttpResponse:
+    # TODO: distinguish between retriable errors and non-retriable
+    # errors, and set Retry-After header accordingly.
+    # TODO: return 400 error for non-retriable errors that require the
+    # client to change their request.
+
+    logger.exception(
+        "kafka_produce_failure",
+        exc_info=exc,
+        name=exc.__class__.__name__,
+        # data could be large, so we don't always want to include it,
+        # but we do want to include it for some errors to aid debugging
+        data=data if isinstance(exc, MessageSizeTooLargeError) else None,
+    )
+    return cors_response(
+        request,
+        generate_exception_response(
+            "capture",
+            "Unable to store some events. Please try again. If you are the owner of this app you can check the logs for further details.",
+            code="server_error",
+            type="server_error",
+            status_code=status.HTTP_503_SERVICE_UNAVAILABLE,
+        ),
+    )
+
+
+def _capture_replay_events(request, captured: CapturedEvents) -> HttpResponse:
+    """Produces the replay events of a capture request, whose analytics events have been acked, and responds."""
+    data, token, replay_events = captured.data, captured.token, captured.replay_events
+    ip, site_url, now, sent_at = captured.ip, captured.site_url, captured.now, captured.sent_at
+    retry_count = captured.retry_count
 
     try:
         if replay_events:
@@ -730,7 +1013,7 @@ def get_event(request):
     # if this has an unexpected effect we don't want it to have an unexpected effect on all clients at once,
     # so we check if a random number if less than the given sample rate
     # that means we can set SAMPLE_RATE to 0 to disable this and 1 to turn on for all clients
-    if recordings_were_quota_limited and random() < settings.RECORDINGS_QUOTA_LIMITING_RESPONSES_SAMPLE_RATE:
+    if captured.recordings_were_quota_limited and random() < settings.RECORDINGS_QUOTA_LIMITING_RESPONSES_SAMPLE_RATE:
         EVENTS_REJECTED_OVER_QUOTA_COUNTER.labels(resource_type="recordings").inc()
         response_body["quota_limited"] = ["recordings"]
 
@@ -943,6 +1226,104 @@ def capture_internal(
     )
 
 
+def capture_batch_internal(
+    events: list[tuple[dict[str, Any], UUIDT, str]],
+    ip: Optional[str],
+    site_url: str,
+    now: datetime,
+    sent_at: Optional[datetime],
+    token: str,
+    historical: bool = False,
+) -> list[FutureRecordMetadata]:
+    """
+    Produces analytics events like capture_internal does one at a time, with what is the same for the whole batch done
+    once: events are serialized with orjson, the token's restrictions are looked up once and each partition key's token
+    bucket is consumed once for all of its events. Replay events are not handled here, they go through
+    capture_internal. The futures are returned without flushing the producer.
+    """
+    dropped = get_ingestion_restrictions().for_token(RestrictionType.DROP_EVENT_FROM_INGESTION, token)
+    safe_ip = safe_clickhouse_string(ip) if ip else ip
+    safe_site_url = safe_clickhouse_string(site_url)
+    now_isoformat = now.isoformat()
+    sent_at_isoformat = sent_at.isoformat() if sent_at else ""
+
+    kept_events: list[tuple[dict[str, Any], UUIDT, str]] = []
+    candidate_partition_keys: list[str] = []
+    for event, event_uuid, distinct_id in events:
+        if is_dropped_by_restriction(dropped, token, distinct_id):
+            continue
+        kept_events.append((event, event_uuid, distinct_id))
+        if event.get("properties", {}).get(COOKIELESS_MODE_FLAG_PROPERTY):
+            candidate_partition_keys.append(f"{token}:{ip}")
+        else:
+            candidate_partition_keys.append(f"{token}:{distinct_id}")
+
+    partition_keys = _batch_partition_keys(
+        candidate_partition_keys, [distinct_id for _, _, distinct_id in kept_events], historical
+    )
+
+    producer = KafkaProducer()
+    futures: list[FutureRecordMetadata] = []
+    for (event, event_uuid, distinct_id), partition_key in zip(kept_events, partition_keys):
+        kafka_event_data = _json_dumps(
+            {
+                "uuid": str(event_uuid),
+                "distinct_id": safe_clickhouse_string(distinct_id),
+                "ip": safe_ip,
+                "site_url": safe_site_url,
+                "data": _json_dumps(event).decode("utf-8"),
+                "now": now_isoformat,
+                "sent_at": sent_at_isoformat,
+                "token": token,
+            }
+        )
+        futures.append(
+            producer.produce(
+                topic=_kafka_topic(event["event"], historical=historical),
+                data=kafka_event_data,
+                key=partition_key,
+                headers=[("token", token), ("distinct_id", distinct_id)],
+                value_serializer=lambda serialized: serialized,
+            )
+        )
+
+    statsd.incr("posthog_cloud_plugin_server_ingestion", len(futures))
+    return futures
+
+
+def _batch_partition_keys(
+    candidate_partition_keys: list[str], distinct_ids: list[str], historical: bool
+) -> list[Optional[str]]:
+    """The partition keys capture_internal would pick for the events one by one."""
+    if historical or not settings.CAPTURE_ALLOW_RANDOM_PARTITIONING:
+        return list(candidate_partition_keys)
+
+    is_anonymous = [distinct_id.lower() in LIKELY_ANONYMOUS_IDS for distinct_id in distinct_ids]
+    event_counts: dict[str, int] = {}
+    for candidate_partition_key, anonymous in zip(candidate_partition_keys, is_anonymous):
+        if not anonymous:
+            event_counts[candidate_partition_key] = event_counts.get(candidate_partition_key, 0) + 1
+    # The first events of each key keep it, as long as its bucket has tokens for them
+    keeping_key = {key: count - count_randomly_partitioned(key, count) for key, count in event_counts.items()}
+
+    partition_keys: list[Optional[str]] = []
+    for candidate_partition_key, anonymous in zip(candidate_partition_keys, is_anonymous):
+        if anonymous or keeping_key[candidate_partition_key] == 0:
+            partition_keys.append(None)
+        else:
+            keeping_key[candidate_partition_key] -= 1
+            partition_keys.append(candidate_partition_key)
+    return partition_keys
+
+
+def _json_dumps(value: Any) -> bytes:
+    try:
+        return orjson.dumps(value)
+    except orjson.JSONEncodeError:
+        # e.g. integers that don't fit in 64 bits or lone surrogates, which json.dumps still handles
+        return json.dumps(value).encode("utf-8")
+
+
 def is_randomly_partitioned(candidate_partition_key: str) -> bool:
     """Check whether event with given partition key is to be randomly partitioned.
 
@@ -959,7 +1340,10 @@ def is_randomly_partitioned(candidate_partition_key: str) -> bool:
        the candidate partition key can be used.
 
     Token-bucket algorithm (step 1) is ignored if the
-    PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED setting is set to False.
+    PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED setting is set to False. With
+    PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS set, a key also exceeds its
+    capacity when all capture processes together took more from their buckets
+    than one bucket allows, as last reconciled by PARTITION_KEY_USAGE.
 
     Args:
         candidate_partition_key: The partition key that would be used if we decide
@@ -968,13 +1352,36 @@ def is_randomly_partitioned(candidate_partition_key: str) -> bool:
     Returns:
         Whether the given partition key should be used.
     """
+    return count_randomly_partitioned(candidate_partition_key, 1) == 1
+
+
+def count_randomly_partitioned(candidate_partition_key: str, event_count: int) -> int:
+    """Count how many of `event_count` events with the same partition key are to be randomly partitioned.
+
+    Events draw one token each from the key's bucket, like `event_count` calls to is_randomly_partitioned would,
+    so when the bucket has fewer tokens than events, the first events keep the key and only the rest are randomly
+    partitioned.
+
+    Returns:
+        How many of the last events with the given partition key should not use it.
+    """
     if settings.PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED:
-        has_capacity = LIMITER.consume(candidate_partition_key)
+        with_capacity = 0
+        while with_capacity < event_count and LIMITER.consume(candidate_partition_key):
+            with_capacity += 1
+
+        if settings.PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS:
+            PARTITION_KEY_USAGE.add(candidate_partition_key, event_count)
+            if PARTITION_KEY_USAGE.is_overflowing(candidate_partition_key):
+                with_capacity = 0
+
+        if with_capacity < event_count:
+            if candidate_partition_key in settings.EVENT_PARTITION_KEYS_TO_OVERRIDE:
+                with_capacity = 0
 
-        if not has_capacity:
             if not LOG_RATE_LIMITER.consume(candidate_partition_key):
                 # Return early if we have logged this key already.
-                return True
+                return event_count - with_capacity
 
             PARTITION_KEY_CAPACITY_EXCEEDED_COUNTER.labels(partition_key=candidate_partition_key.split(":")[0]).inc()
             statsd.incr(
@@ -984,13 +1391,72 @@ def is_randomly_partitioned(candidate_partition_key: str) -> bool:
             logger.warning(
                 "Partition key %s overridden as bucket capacity of %s tokens exceeded",
                 candidate_partition_key,
-                LIMITER._capacity,
+                settings.PARTITION_KEY_BUCKET_CAPACITY,
             )
-            return True
+            return event_count - with_capacity
 
     keys_to_override = settings.EVENT_PARTITION_KEYS_TO_OVERRIDE
 
-    return candidate_partition_key in keys_to_override
+    return event_count if candidate_partition_key in keys_to_override else 0
+
+
+class PartitionKeyUsage:
+    """
+    LIMITER only sees the events of its own process, so with many capture processes a key can take many times the
+    bucket capacity before any of them overflows it. PartitionKeyUsage counts the events of each key in process, and a
+    background thread adds the counts of all processes up in Redis once per interval and keeps the keys that took more
+    than a bucket allows in the current interval, so deciding on a key never waits on Redis. Only keys a process took at
+    least PARTITION_KEY_BUCKET_RECONCILE_MIN_COUNT events of are sent, and Redis keeps the
+    PARTITION_KEY_BUCKET_RECONCILE_MAX_KEYS busiest keys of each interval.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._counts: dict[str, int] = {}
+        self._overflowing: frozenset[str] = frozenset()
+        self._thread: Optional[threading.Thread] = None
+
+    def add(self, partition_key: str, event_count: int) -> None:
+        with self._lock:
+            self._counts[partition_key] = self._counts.get(partition_key, 0) + event_count
+            # started on first use, so that it runs in the worker processes rather than the one they are forked from
+            if self._thread is None or not self._thread.is_alive():
+                self._thread = threading.Thread(target=self._reconcile_periodically, daemon=True)
+                self._thread.start()
+
+    def is_overflowing(self, partition_key: str) -> bool:
+        return partition_key in self._overflowing
+
+    def reconcile(self) -> None:
+        with self._lock:
+            counts, self._counts = self._counts, {}
+
+        interval = settings.PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS
+        redis_key = f"{PARTITION_KEY_USAGE_REDIS_KEY}{int(time.time() // interval)}"
+        allowed = settings.PARTITION_KEY_BUCKET_CAPACITY + settings.PARTITION_KEY_BUCKET_REPLENTISH_RATE * interval
+
+        pipeline = get_client().pipeline(transaction=False)
+        for partition_key, count in counts.items():
+            if count >= settings.PARTITION_KEY_BUCKET_RECONCILE_MIN_COUNT:
+                pipeline.zincrby(redis_key, count, partition_key)
+        # keeps the keys that took the most events, which are the only ones that can overflow
+        pipeline.zremrangebyrank(redis_key, 0, -settings.PARTITION_KEY_BUCKET_RECONCILE_MAX_KEYS - 1)
+        pipeline.expire(redis_key, interval * 2)
+        pipeline.zrangebyscore(redis_key, min=f"({allowed}", max="+inf")
+        overflowing = pipeline.execute()[-1]
+        self._overflowing = frozenset(partition_key.decode("utf-8") for partition_key in overflowing)
+
+    def _reconcile_periodically(self) -> None:
+        while interval := settings.PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS:
+            time.sleep(interval)
+            try:
+                self.reconcile()
+            except Exception as e:
+                # the keys that were overflowing stay so until Redis is back
+                logger.warning("partition_key_usage_reconcile_failed", exc_info=e)
+
+
+PARTITION_KEY_USAGE = PartitionKeyUsage()
 
 
 @cache_for(timedelta(seconds=30), background_refresh=True)
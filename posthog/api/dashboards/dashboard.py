@@ -1,4 +1,6 @@
 import json
+from collections.abc import Iterable
+from contextlib import AbstractContextManager
 from typing import Any, Optional, cast
 
 import structlog
@@ -27,12 +29,24 @@ from posthog.api.utils import action
 from posthog.event_usage import report_user_action
 from posthog.helpers import create_dashboard_from_template
 from posthog.helpers.dashboard_templates import create_from_template
-from posthog.models import Dashboard, DashboardTile, Insight, Text
+from posthog.models import Dashboard, DashboardTile, Insight, Team, Text
 from posthog.models.dashboard_templates import DashboardTemplate
 from posthog.models.tagged_item import TaggedItem
 from posthog.models.user import User
 from posthog.user_permissions import UserPermissionsSerializerMixin
-from posthog.utils import filters_override_requested_by_client, variables_override_requested_by_client
+from posthog.api.services.query import get_query_cache_key
+from posthog.hogql_queries.legacy_compatibility.flagged_conversion_manager import conversion_to_query_based
+from posthog.hogql_queries.query_cache import prefetched_query_cache
+from posthog.hogql_queries.query_runner import (
+    ExecutionMode,
+    execution_mode_from_refresh,
+    shared_insights_execution_mode,
+)
+from posthog.utils import (
+    filters_override_requested_by_client,
+    refresh_requested_by_client,
+    variables_override_requested_by_client,
+)
 from posthog.clickhouse.client.async_task_chain import task_chain_context
 from contextlib import nullcontext
 import posthoganalytics
@@ -454,7 +468,10 @@ class DashboardSerializer(DashboardBasicSerializer):
             ),
         )
 
-        with task_chain_context() if chained_tile_refresh_enabled else nullcontext():
+        with (
+            task_chain_context() if chained_tile_refresh_enabled else nullcontext(),
+            self._prefetch_tile_results(dashboard, team, sorted_tiles),
+        ):
             for order, tile in enumerate(sorted_tiles):
                 self.context.update(
                     {
@@ -471,6 +488,43 @@ class DashboardSerializer(DashboardBasicSerializer):
 
         return serialized_tiles
 
+    def _prefetch_tile_results(
+        self, dashboard: Dashboard, team: Team, tiles: Iterable[DashboardTile]
+    ) -> AbstractContextManager:
+        """Read the cached results of all insight tiles in one Redis round-trip, rather than one per tile."""
+        request = self.context["request"]
+        execution_mode = execution_mode_from_refresh(refresh_requested_by_client(request))
+        if self.context.get("is_shared", False):
+            execution_mode = shared_insights_execution_mode(execution_mode)
+        if execution_mode in (ExecutionMode.CALCULATE_BLOCKING_ALWAYS, ExecutionMode.CALCULATE_ASYNC_ALWAYS):
+            return nullcontext()  # The cache isn't read
+
+        filters_override = filters_override_requested_by_client(request)
+        variables_override = variables_override_requested_by_client(request)
+        cache_keys: list[str] = []
+        for tile in tiles:
+            if tile.insight is None or tile.insight.deleted:
+                continue
+            try:
+                with conversion_to_query_based(tile.insight):
+                    if not tile.insight.query:
+                        continue
+                    cache_key = get_query_cache_key(
+                        team,
+                        tile.insight.query,
+                        dashboard_filters_json=filters_override if filters_override is not None else dashboard.filters,
+                        variables_override_json=(
+                            variables_override if variables_override is not None else dashboard.variables
+                        ),
+                    )
+            except Exception:
+                # Errors surface when the tile itself is calculated, it just isn't prefetched
+                continue
+            if cache_key:
+                cache_keys.append(cache_key)
+
+        return prefetched_query_cache(cache_keys)
+
     def get_filters(self, dashboard: Dashboard) -> dict:
         request = self.context.get("request")
         if request:
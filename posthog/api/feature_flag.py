@@ -3,8 +3,10 @@ import time
 import logging
 from typing import Any, Optional, cast
 from datetime import datetime
+import orjson
 from django.db import transaction
 from django.db.models import QuerySet, Q, deletion, Prefetch
+from django.http import StreamingHttpResponse
 from django.conf import settings
 from drf_spectacular.utils import OpenApiParameter
 from drf_spectacular.types import OpenApiTypes
@@ -60,6 +62,7 @@ from posthog.models.feature_flag import (
     get_all_feature_flags,
     get_user_blast_radius,
 )
+from posthog.models.feature_flag.bulk_flag_matching import get_feature_flags_for_distinct_ids
 from posthog.models.feature_flag.flag_analytics import increment_request_count
 from posthog.models.feature_flag.flag_matching import check_flag_evaluation_query_is_ok
 from posthog.models.surveys.survey import Survey
@@ -86,6 +89,9 @@ SURVEY_TARGETING_FLAG_PREFIX = "survey-targeting-"
 MAX_PROPERTY_VALUES = 1000
 
 
+BULK_EVALUATION_MAX_DISTINCT_IDS = 100_000
+
+
 class FeatureFlagThrottle(BurstRateThrottle):
     # Throttle class that's scoped just to the local evaluation endpoint.
     # This makes the rate limit independent of other endpoints.
@@ -1138,6 +1144,43 @@ class FeatureFlagViewSet(
             }
         )
 
+    @action(methods=["POST"], detail=False, required_scopes=["feature_flag:read"])
+    def bulk_evaluation(self, request: request.Request, **kwargs):
+        distinct_ids = request.data.get("distinct_ids")
+        groups = request.data.get("groups") or {}
+        flag_keys = request.data.get("flag_keys")
+
+        if (
+            not isinstance(distinct_ids, list)
+            or not distinct_ids
+            or not all(isinstance(distinct_id, str) for distinct_id in distinct_ids)
+        ):
+            raise exceptions.ValidationError(detail="distinct_ids must be a non-empty list of strings")
+        if len(distinct_ids) > BULK_EVALUATION_MAX_DISTINCT_IDS:
+            raise exceptions.ValidationError(
+                detail=f"At most {BULK_EVALUATION_MAX_DISTINCT_IDS} distinct_ids can be evaluated at once"
+            )
+        if not isinstance(groups, dict):
+            raise exceptions.ValidationError(detail="groups must be an object of group types to group keys")
+        if flag_keys is not None and not isinstance(flag_keys, list):
+            raise exceptions.ValidationError(detail="flag_keys must be a list")
+
+        matches = get_feature_flags_for_distinct_ids(self.team, distinct_ids, groups, flag_keys)
+        return StreamingHttpResponse(
+            (
+                orjson.dumps(
+                    {
+                        "distinct_id": match.distinct_id,
+                        "flags": match.flags,
+                        "errors_while_computing_flags": match.errors_while_computing_flags,
+                    }
+                )
+                + b"\n"
+                for match in matches
+            ),
+            content_type="application/x-ndjson",
+        )
+
     @action(methods=["POST"], detail=True)
     def create_static_cohort_for_flag(self, request: request.Request, **kwargs):
         feature_flag = self.get_object()
@@ -68,6 +68,35 @@ def process_query_dict(
     )
 
 
+def get_query_cache_key(
+    team: Team,
+    query_json: dict,
+    *,
+    dashboard_filters_json: Optional[dict] = None,
+    variables_override_json: Optional[dict] = None,
+    limit_context: Optional[LimitContext] = None,
+) -> Optional[str]:
+    """Cache key the query runner of `process_query_dict` called with the same arguments would use, if any."""
+    model = QuerySchemaRoot.model_validate(query_json)
+    query: BaseModel = model.root
+    while True:
+        try:
+            query_runner = get_query_runner(query, team, limit_context=limit_context)
+            break
+        except ValueError:
+            if not (hasattr(query, "source") and isinstance(query.source, BaseModel)):
+                return None
+            query = query.source
+
+    if dashboard_filters_json:
+        query_runner.apply_dashboard_filters(DashboardFilter.model_validate(dashboard_filters_json))
+    if variables_override_json:
+        query_runner.apply_variable_overrides(
+            [HogQLVariable.model_validate(n) for n in variables_override_json.values()]
+        )
+    return query_runner.get_cache_key()
+
+
 def process_query_model(
     team: Team,
     query: BaseModel,  # mypy has problems with unions and isinstance
@@ -4,6 +4,7 @@ import json
 import pathlib
 import random
 import string
+import time
 from collections import Counter
 from datetime import datetime, timedelta, UTC
 from typing import Any, Union, cast
@@ -16,11 +17,12 @@ import lzstring
 import pytest
 import structlog
 import zlib
+from asgiref.sync import async_to_sync
 from boto3 import resource
 from botocore.client import Config
 from botocore.exceptions import ClientError
 from django.http import HttpResponse
-from django.test import override_settings
+from django.test import AsyncClient, RequestFactory, override_settings
 from django.test.client import MULTIPART_CONTENT, Client
 from django.utils import timezone
 from freezegun import freeze_time
@@ -48,6 +50,8 @@ from posthog.kafka_client.topics import (
     KAFKA_SESSION_RECORDING_SNAPSHOT_ITEM_EVENTS,
     KAFKA_SESSION_RECORDING_SNAPSHOT_ITEM_OVERFLOW,
 )
+from posthog.middleware import CaptureMiddleware
+from posthog.models.event_ingestion_restriction_config import EventIngestionRestrictionConfig, RestrictionType
 from posthog.redis import get_client
 from posthog.settings import (
     DATA_UPLOAD_MAX_MEMORY_SIZE,
@@ -430,6 +434,78 @@ class TestCapture(BaseTest):
                 ):
                     assert capture.is_randomly_partitioned(partition_key) is False
 
+    @override_settings(PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED=True, EVENT_PARTITION_KEYS_TO_OVERRIDE=[])
+    def test_batch_partition_keys_draw_one_token_per_event(self):
+        """Assert a batch only randomly partitions the events its partition key's bucket has no tokens left for."""
+        partition_key = f"{self.team.pk}:100"
+        other_partition_key = f"{self.team.pk}:200"
+        limiter = Limiter(
+            rate=1,
+            capacity=3,
+            storage=MemoryStorage(),
+        )
+
+        with patch("posthog.api.capture.LIMITER", new=limiter), freeze_time(datetime.now(UTC)):
+            assert capture.is_randomly_partitioned(partition_key) is False
+
+            partition_keys = capture._batch_partition_keys(
+                [partition_key, other_partition_key, partition_key, partition_key, partition_key],
+                ["100", "200", "100", "100", "100"],
+                historical=False,
+            )
+
+        assert partition_keys == [partition_key, other_partition_key, partition_key, None, None]
+
+    @override_settings(
+        PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED=True,
+        PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS=60,
+        PARTITION_KEY_BUCKET_CAPACITY=1000,
+        PARTITION_KEY_BUCKET_REPLENTISH_RATE=0,
+    )
+    def test_partition_key_usage_is_reconciled_across_processes(self):
+        partition_key = f"{self.team.pk}:100"
+        get_client().delete(f"{capture.PARTITION_KEY_USAGE_REDIS_KEY}{int(time.time() // 60)}")
+        # two capture processes, neither of which took more than the bucket capacity on its own
+        first_process, second_process = capture.PartitionKeyUsage(), capture.PartitionKeyUsage()
+
+        with patch("threading.Thread.start"):
+            first_process.add(partition_key, 600)
+            first_process.add(f"{self.team.pk}:200", 10)
+            second_process.add(partition_key, 600)
+        first_process.reconcile()
+        assert not first_process.is_overflowing(partition_key)
+
+        second_process.reconcile()
+        assert second_process.is_overflowing(partition_key)
+        assert not second_process.is_overflowing(f"{self.team.pk}:200")
+
+        with patch("posthog.api.capture.PARTITION_KEY_USAGE", new=second_process):
+            assert capture.is_randomly_partitioned(partition_key) is True
+            assert capture.is_randomly_partitioned(f"{self.team.pk}:200") is False
+
+    @override_settings(
+        PARTITION_KEY_AUTOMATIC_OVERRIDE_ENABLED=True,
+        PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS=60,
+        PARTITION_KEY_BUCKET_RECONCILE_MIN_COUNT=100,
+        PARTITION_KEY_BUCKET_RECONCILE_MAX_KEYS=2,
+    )
+    def test_partition_key_usage_only_keeps_the_busiest_keys(self):
+        redis_key = f"{capture.PARTITION_KEY_USAGE_REDIS_KEY}{int(time.time() // 60)}"
+        get_client().delete(redis_key)
+        usage = capture.PartitionKeyUsage()
+
+        with patch("threading.Thread.start"):
+            usage.add(f"{self.team.pk}:quiet", 99)
+            for distinct_id, count in [("busy", 300), ("busier", 400), ("busiest", 500)]:
+                usage.add(f"{self.team.pk}:{distinct_id}", count)
+        usage.reconcile()
+
+        assert get_client().zrange(redis_key, 0, -1, withscores=True) == [
+            (f"{self.team.pk}:busier".encode(), 400),
+            (f"{self.team.pk}:busiest".encode(), 500),
+        ]
+        assert 0 < get_client().ttl(redis_key) <= 120
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_capture_event(self, kafka_produce):
         data = {
@@ -1136,6 +1212,124 @@ class TestCapture(BaseTest):
             },
         )
 
+    @override_settings(CAPTURE_BATCH_PRODUCE_ENABLED=True)
+    @patch("posthog.kafka_client.client._KafkaProducer.flush")
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_batch_produced_at_once(self, kafka_produce, kafka_flush):
+        data = [
+            {"type": "capture", "event": "user signed up", "distinct_id": "2", "properties": {"emoji": "🦔"}},
+            {"type": "capture", "event": "$pageview", "distinct_id": "undefined"},
+            {"type": "capture", "event": "$pageview", "distinct_id": "3"},
+        ]
+        with self.settings(EVENT_PARTITION_KEYS_TO_OVERRIDE=[f"{self.team.api_token}:3"]):
+            response = self.client.post(
+                "/batch/",
+                data={"api_key": self.team.api_token, "batch": data},
+                content_type="application/json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert kafka_flush.call_count == 1
+        assert [call.kwargs["key"] for call in kafka_produce.call_args_list] == [f"{self.team.api_token}:2", None, None]
+        assert [call.kwargs["headers"] for call in kafka_produce.call_args_list] == [
+            [("token", self.team.api_token), ("distinct_id", distinct_id)] for distinct_id in ["2", "undefined", "3"]
+        ]
+
+        first_call = kafka_produce.call_args_list[0].kwargs
+        produced = json.loads(first_call["value_serializer"](first_call["data"]))
+        assert first_call["topic"] == KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC
+        assert produced == {
+            "uuid": mock.ANY,
+            "distinct_id": "2",
+            "ip": "127.0.0.1",
+            "site_url": "http://testserver",
+            "data": mock.ANY,
+            "now": mock.ANY,
+            "sent_at": mock.ANY,
+            "token": self.team.api_token,
+        }
+        assert json.loads(produced["data"]) == data[0]
+
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_async_capture_awaits_acks(self, kafka_produce):
+        produce_future = FutureProduceResult(topic_partition=TopicPartition(KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC, 1))
+        future = FutureRecordMetadata(
+            produce_future=produce_future,
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+        produce_future.success(None)
+        future.success(None)
+        kafka_produce.return_value = future
+        request = RequestFactory().post(
+            "/batch/",
+            data={
+                "api_key": self.team.api_token,
+                "batch": [{"type": "capture", "event": "user signed up", "distinct_id": "2"}] * 3,
+            },
+            content_type="application/json",
+        )
+
+        response = async_to_sync(capture.get_event_async)(request)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert kafka_produce.call_count == 3
+
+    @override_settings(CAPTURE_ASYNC_ENABLED=True)
+    @patch.object(CaptureMiddleware, "sync_capable", False)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_async_capture_through_middleware(self, kafka_produce):
+        produce_future = FutureProduceResult(topic_partition=TopicPartition(KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC, 1))
+        future = FutureRecordMetadata(
+            produce_future=produce_future,
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+        produce_future.success(None)
+        future.success(None)
+        kafka_produce.return_value = future
+
+        with patch("posthog.middleware.get_event_async", wraps=capture.get_event_async) as get_event_async:
+            response = async_to_sync(AsyncClient().post)(
+                "/e/",
+                data={"api_key": self.team.api_token, "event": "user signed up", "distinct_id": "2"},
+                content_type="application/json",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        get_event_async.assert_awaited_once()
+        assert kafka_produce.call_count == 1
+
+    @override_settings(KAFKA_PRODUCE_ACK_TIMEOUT_SECONDS=0.01)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_async_capture_503_when_acks_time_out(self, kafka_produce):
+        kafka_produce.return_value = FutureRecordMetadata(
+            produce_future=FutureProduceResult(topic_partition=TopicPartition(KAFKA_EVENTS_PLUGIN_INGESTION_TOPIC, 1)),
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+        request = RequestFactory().post(
+            "/e/",
+            data={"api_key": self.team.api_token, "event": "user signed up", "distinct_id": "2"},
+            content_type="application/json",
+        )
+
+        response = async_to_sync(capture.get_event_async)(request)
+
+        assert response.status_code == status.HTTP_503_SERVICE_UNAVAILABLE
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_batch_with_invalid_event(self, kafka_produce):
         data = [
@@ -1232,6 +1426,104 @@ class TestCapture(BaseTest):
 
         validate_response(openapi_spec, response)
 
+    @override_settings(CAPTURE_STREAMING_DECOMPRESSION_ENABLED=True)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_batch_gzip_streaming_decompression(self, kafka_produce):
+        data = {
+            "api_key": self.team.api_token,
+            "batch": [
+                {"type": "capture", "event": "user signed up", "distinct_id": "2"},
+                {"type": "capture", "event": "$pageview", "distinct_id": "3"},
+            ],
+        }
+
+        response = self.client.generic(
+            "POST",
+            "/batch/",
+            data=gzip.compress(json.dumps(data).encode()),
+            content_type="application/json",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [call.kwargs["data"]["distinct_id"] for call in kafka_produce.call_args_list] == ["2", "3"]
+
+    @override_settings(CAPTURE_STREAMING_DECOMPRESSION_ENABLED=True)
+    @patch("posthog.api.capture.get_token", wraps=capture.get_token)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_batch_gzip_streaming_decompression_fails_at_the_first_event_with_an_invalid_token(
+        self, kafka_produce, get_token
+    ):
+        events = [{"event": "$pageview", "properties": {"distinct_id": "2", "token": "phx_personal"}}] * 10
+
+        response = self.client.generic(
+            "POST",
+            "/e/",
+            data=gzip.compress(json.dumps(events).encode()),
+            content_type="text/plain",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+        assert response.status_code == status.HTTP_401_UNAUTHORIZED
+        assert response.json()["code"] == "personal_api_key"
+        # the token was checked as the first event was parsed, the payload never made it to the view
+        get_token.assert_called_once()
+        kafka_produce.assert_not_called()
+
+    @override_settings(CAPTURE_STREAMING_DECOMPRESSION_ENABLED=True, QUOTA_LIMITING_ENABLED=True)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    @pytest.mark.ee
+    def test_batch_gzip_streaming_decompression_drops_events_over_quota(self, kafka_produce):
+        from ee.billing.quota_limiting import QuotaResource, replace_limited_team_tokens
+
+        replace_limited_team_tokens(
+            QuotaResource.EVENTS,
+            {self.team.api_token: int(timezone.now().timestamp() + 10000)},
+            QuotaLimitingCaches.QUOTA_LIMITER_CACHE_KEY,
+        )
+        events = [
+            {"event": "$pageview", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+            {"event": "$exception", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+            {"event": "$pageview", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+        ]
+
+        response = self.client.generic(
+            "POST",
+            "/e/",
+            data=gzip.compress(json.dumps(events).encode()),
+            content_type="text/plain",
+            HTTP_CONTENT_ENCODING="gzip",
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert [call.kwargs["topic"] for call in kafka_produce.call_args_list] == ["exceptions_ingestion_test"]
+
+    @parameterized.expand([(False,), (True,)])
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    @pytest.mark.ee
+    def test_performance_events_are_not_counted_by_the_quota_filter(self, streaming_decompression, kafka_produce):
+        events = [
+            {"event": "$pageview", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+            {"event": "$performance_event", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+            {"event": "$pageview", "properties": {"distinct_id": "2", "token": self.team.api_token}},
+        ]
+
+        with (
+            override_settings(CAPTURE_STREAMING_DECOMPRESSION_ENABLED=streaming_decompression),
+            patch("posthog.api.capture.EVENTS_RECEIVED_COUNTER") as events_received_counter,
+        ):
+            response = self.client.generic(
+                "POST",
+                "/e/",
+                data=gzip.compress(json.dumps(events).encode()),
+                content_type="text/plain",
+                HTTP_CONTENT_ENCODING="gzip",
+            )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert events_received_counter.labels.call_args_list == [call(resource_type="events")] * 2
+        assert kafka_produce.call_count == 2
+
     @patch("posthog.kafka_client.client._KafkaProducer.produce")
     def test_batch_gzip_param(self, kafka_produce):
         data = {
@@ -2305,6 +2597,44 @@ class TestCapture(BaseTest):
             self.assertEqual(response.status_code, 200)
             self.assertEqual(kafka_produce.call_count, expected_result)
 
+    def test_ingestion_restrictions_are_compiled_by_token(self):
+        restrictions = capture.IngestionRestrictions.compile(
+            {
+                RestrictionType.DROP_EVENT_FROM_INGESTION: ["token1", "token2:id1", "token2:id:with:colons"],
+                RestrictionType.SKIP_PERSON_PROCESSING: ["token3:id3"],
+            }
+        )
+
+        dropped = restrictions.for_token(RestrictionType.DROP_EVENT_FROM_INGESTION, "token1")
+        assert dropped.matches("any") is True
+        dropped = restrictions.for_token(RestrictionType.DROP_EVENT_FROM_INGESTION, "token2")
+        assert dropped.matches("id1") is True
+        assert dropped.matches("id:with:colons") is True
+        assert dropped.matches("id2") is False
+        assert restrictions.for_token(RestrictionType.DROP_EVENT_FROM_INGESTION, "token3").matches("id3") is False
+        assert restrictions.for_token(RestrictionType.SKIP_PERSON_PROCESSING, "token3").matches("id3") is True
+        assert restrictions.for_token(RestrictionType.FORCE_OVERFLOW_FROM_INGESTION, "token1") is capture.UNRESTRICTED
+
+    @override_settings(CAPTURE_INGESTION_RESTRICTION_CONFIG_ENABLED=True)
+    @patch("posthog.kafka_client.client._KafkaProducer.produce")
+    def test_capture_drops_events_restricted_by_config(self, kafka_produce: MagicMock) -> None:
+        EventIngestionRestrictionConfig.objects.create(
+            token=self.team.api_token,
+            restriction_type=RestrictionType.DROP_EVENT_FROM_INGESTION,
+            distinct_ids=["id1"],
+        )
+
+        for distinct_id, expected_result in [("id1", 0), ("id2", 1)]:
+            kafka_produce.reset_mock()
+            response = self.client.post(
+                "/e/",
+                data={"api_key": self.team.api_token, "type": "capture", "event": "test", "distinct_id": distinct_id},
+                content_type="application/json",
+            )
+
+            self.assertEqual(response.status_code, 200)
+            self.assertEqual(kafka_produce.call_count, expected_result)
+
     def test_capture_replay_to_bucket_when_random_number_is_less_than_sample_rate(self):
         sample_rate = 0.001
         random_number = sample_rate / 2
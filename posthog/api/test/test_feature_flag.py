@@ -4219,6 +4219,112 @@ class TestFeatureFlag(APIBaseTest, ClickhouseTestMixin):
             },
         )
 
+    def test_bulk_evaluation(self):
+        FeatureFlag.objects.all().delete()
+        Person.objects.create(team=self.team, distinct_ids=["paid-1", "paid-2"], properties={"plan": "paid"})
+        Person.objects.create(team=self.team, distinct_ids=["free"], properties={"plan": "free"})
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="paid-feature",
+            created_by=self.user,
+            filters={"groups": [{"properties": [{"key": "plan", "value": "paid", "type": "person"}]}]},
+        )
+        FeatureFlag.objects.create(
+            team=self.team,
+            key="variant-feature",
+            created_by=self.user,
+            filters={
+                "groups": [{"rollout_percentage": 50}],
+                "multivariate": {
+                    "variants": [
+                        {"key": "control", "rollout_percentage": 50},
+                        {"key": "test", "rollout_percentage": 50},
+                    ]
+                },
+            },
+        )
+        distinct_ids = ["paid-1", "paid-2", "free", "unknown", *(f"user-{index}" for index in range(20))]
+
+        response = self.client.post(
+            f"/api/projects/{self.team.id}/feature_flags/bulk_evaluation",
+            {"distinct_ids": distinct_ids},
+            format="json",
+        )
+
+        self.assertEqual(response.status_code, status.HTTP_200_OK)
+        self.assertEqual(response["Content-Type"], "application/x-ndjson")
+        lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+        self.assertEqual([line["distinct_id"] for line in lines], distinct_ids)
+        for line in lines:
+            flags, _, _, errors = get_all_feature_flags(self.team, line["distinct_id"])
+            self.assertEqual(line["flags"], flags)
+            self.assertEqual(line["errors_while_computing_flags"], errors)
+        self.assertEqual(lines[0]["flags"]["paid-feature"], True)
+        self.assertEqual(lines[2]["flags"]["paid-feature"], False)
+
+    def test_bulk_evaluation_of_cohorts_and_missing_properties(self):
+        FeatureFlag.objects.all().delete()
+        for index in range(30):
+            Person.objects.create(
+                team=self.team,
+                distinct_ids=[f"user-{index}"],
+                properties={"plan": "paid"} if index % 3 else {"email": f"user-{index}@posthog.com"},
+            )
+        static_cohort = Cohort.objects.create(team=self.team, is_static=True, name="static")
+        static_cohort.insert_users_by_list([f"user-{index}" for index in range(0, 30, 2)])
+        paid_cohort = Cohort.objects.create(
+            team=self.team,
+            name="paid",
+            filters={
+                "properties": {
+                    "type": "OR",
+                    "values": [{"type": "AND", "values": [{"key": "plan", "value": "paid", "type": "person"}]}],
+                }
+            },
+        )
+        for key, properties in (
+            ("static-cohort", [{"key": "id", "value": static_cohort.pk, "type": "cohort"}]),
+            ("paid-cohort", [{"key": "id", "value": paid_cohort.pk, "type": "cohort"}]),
+            ("not-paid", [{"key": "plan", "value": "paid", "operator": "is_not", "type": "person"}]),
+            ("no-email", [{"key": "email", "operator": "is_not_set", "type": "person"}]),
+            ("email", [{"key": "email", "value": "posthog", "operator": "icontains", "type": "person"}]),
+        ):
+            FeatureFlag.objects.create(
+                team=self.team, key=key, created_by=self.user, filters={"groups": [{"properties": properties}]}
+            )
+
+        def evaluate(distinct_ids: list[str]) -> tuple[list[dict], int]:
+            with capture_db_queries() as queries:
+                response = self.client.post(
+                    f"/api/projects/{self.team.id}/feature_flags/bulk_evaluation",
+                    {"distinct_ids": distinct_ids},
+                    format="json",
+                )
+                lines = [json.loads(line) for line in b"".join(response.streaming_content).splitlines()]
+            return lines, len(queries.captured_queries)
+
+        distinct_ids = ["unknown", *(f"user-{index}" for index in range(30))]
+        # Warms up the flags cache
+        evaluate(distinct_ids[:3])
+        _, query_count_of_few = evaluate(distinct_ids[:3])
+        lines, query_count = evaluate(distinct_ids)
+
+        # Conditions are matched against what was loaded for the batch, not queried per person
+        self.assertEqual(query_count, query_count_of_few)
+        for line in lines:
+            flags, _, _, errors = get_all_feature_flags(self.team, line["distinct_id"])
+            self.assertEqual(line["flags"], flags)
+            self.assertEqual(line["errors_while_computing_flags"], errors)
+        self.assertEqual(lines[1]["flags"], {**lines[1]["flags"], "static-cohort": True, "email": True})
+        self.assertEqual(lines[2]["flags"], {**lines[2]["flags"], "paid-cohort": True, "no-email": True})
+
+    def test_bulk_evaluation_validation(self):
+        for data in ({}, {"distinct_ids": []}, {"distinct_ids": [1]}, {"distinct_ids": ["a"], "groups": ["b"]}):
+            response = self.client.post(
+                f"/api/projects/{self.team.id}/feature_flags/bulk_evaluation", data, format="json"
+            )
+            self.assertEqual(response.status_code, status.HTTP_400_BAD_REQUEST, data)
+
     def test_validation_person_properties(self):
         person_request = self._create_flag_with_properties(
             "person-flag",
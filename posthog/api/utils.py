@@ -3,6 +3,7 @@ import re
 import socket
 import time
 import urllib.parse
+from collections.abc import Callable
 from enum import Enum, auto
 from functools import wraps
 from ipaddress import ip_address
@@ -187,10 +188,10 @@ def get_project_id(data, request) -> Optional[int]:
     return None
 
 
-def get_data(request):
+def get_data(request, keep_event: Optional[Callable[[Any, Optional[dict]], bool]] = None):
     data = None
     try:
-        data = load_data_from_request(request)
+        data = load_data_from_request(request, keep_event=keep_event)
     except (RequestParsingError, UnspecifiedCompressionFallbackParsingError) as error:
         statsd.incr("capture_endpoint_invalid_payload")
         logger.exception(f"Invalid payload", error=error)
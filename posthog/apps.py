@@ -60,6 +60,9 @@ class PostHogConfig(AppConfig):
         if not posthoganalytics.disabled and posthoganalytics.feature_flag_definitions() is None:
             posthoganalytics.load_feature_flags()
 
+        # Connects the receivers invalidating cached HogQL databases when their schema changes
+        from posthog.hogql.database import schema_version_receivers  # noqa: F401
+
         from posthog.async_migrations.setup import setup_async_migrations
 
         if settings.SKIP_ASYNC_MIGRATIONS_SETUP:
@@ -37,18 +37,19 @@ class DataGenerator:
             for person, distinct_id in zip(self.people, self.distinct_ids)
         ]
         PersonDistinctId.objects.bulk_create(pids)
-        from posthog.models.person.util import create_person, create_person_distinct_id
-
-        for person in self.people:
-            create_person(
-                uuid=str(person.uuid),
-                team_id=person.team.pk,
-                properties=person.properties,
-                is_identified=person.is_identified,
-                version=0,
-            )
-        for pid in pids:
-            create_person_distinct_id(pid.team.pk, pid.distinct_id, str(pid.person.uuid))  # use dummy number for id
+        from posthog.models.person.util import BulkPersonWriter
+
+        with BulkPersonWriter() as writer:
+            for person in self.people:
+                writer.create_person(
+                    uuid=str(person.uuid),
+                    team_id=person.team.pk,
+                    properties=person.properties,
+                    is_identified=person.is_identified,
+                    version=0,
+                )
+            for pid in pids:
+                writer.create_person_distinct_id(pid.team.pk, pid.distinct_id, str(pid.person.uuid))
 
     def make_person(self, index):
         return Person(team=self.team, properties={"is_demo": True})
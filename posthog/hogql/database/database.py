@@ -1,9 +1,13 @@
 import dataclasses
+import threading
 from collections.abc import Callable
 from typing import TYPE_CHECKING, Any, ClassVar, Literal, Optional, TypeAlias, Union, cast
 from zoneinfo import ZoneInfo, ZoneInfoNotFoundError
 
+from cachetools import TTLCache
+from django.conf import settings
 from django.db.models import Prefetch, Q
+from prometheus_client import Counter
 from pydantic import BaseModel, ConfigDict
 
 from posthog.exceptions_capture import capture_exception
@@ -77,6 +81,7 @@ from posthog.hogql.database.schema.sessions_v2 import (
     join_events_table_to_sessions_table_v2,
 )
 from posthog.hogql.database.schema.static_cohort_people import StaticCohortPeople
+from posthog.hogql.database.schema_version import get_schema_version
 from posthog.hogql.errors import QueryError, ResolutionError
 from posthog.hogql.parser import parse_expr
 from posthog.hogql.timings import HogQLTimings
@@ -165,6 +170,8 @@ class Database(BaseModel):
 
     _timezone: Optional[str]
     _week_start_day: Optional[WeekStartDay]
+    # Set by `create_hogql_database`, whereas databases put together by hand are never assumed to match a team's schema
+    _built_for_team_id: Optional[int] = None
 
     def __init__(self, timezone: Optional[str] = None, week_start_day: Optional[WeekStartDay] = None):
         super().__init__()
@@ -180,6 +187,9 @@ class Database(BaseModel):
     def get_week_start_day(self) -> WeekStartDay:
         return self._week_start_day or WeekStartDay.SUNDAY
 
+    def is_built_for_team(self, team_id: int) -> bool:
+        return self._built_for_team_id == team_id
+
     def has_table(self, table_name: str | list[str]) -> bool:
         if not isinstance(table_name, list) and "." not in table_name:
             return hasattr(self, table_name)
@@ -341,6 +351,64 @@ def _use_error_tracking_issue_id_from_error_tracking_issue_overrides(database: D
 TableStore = dict[str, Table | TableGroup]
 
 
+HOGQL_DATABASE_CACHE_COUNTER = Counter(
+    "posthog_hogql_database_cache_total",
+    "Lookups of built HogQL databases in the per-process cache.",
+    labelnames=["result"],
+)
+
+_database_cache: Optional[TTLCache] = None
+_database_cache_lock = threading.Lock()
+
+
+def _get_database_cache() -> TTLCache:
+    global _database_cache
+    if _database_cache is None:
+        _database_cache = TTLCache(
+            maxsize=settings.HOGQL_DATABASE_CACHE_MAX_SIZE, ttl=settings.HOGQL_DATABASE_CACHE_TTL_SECONDS
+        )
+    return _database_cache
+
+
+def clear_hogql_database_cache() -> None:
+    with _database_cache_lock:
+        _get_database_cache().clear()
+
+
+def _copy_database(database: Database) -> Database:
+    """
+    Copy of a database that can be modified without affecting the original. Tables and table groups are copied along
+    with their dicts of fields and tables, and lazy joins are copied to point at the copied tables, so that the copy
+    is consistent. Everything else, like the field definitions and their expressions, is shared and treated as
+    immutable once the database is built.
+    """
+    copies: dict[int, Any] = {}
+
+    def copy_field_or_table(value: Any) -> Any:
+        if not isinstance(value, Table | TableGroup | LazyJoin):
+            return value
+        if id(value) in copies:
+            return copies[id(value)]
+        copied = value.model_copy()
+        copies[id(value)] = copied  # Before recursing, as tables and joins can refer back to each other
+        if isinstance(value, Table):
+            copied.fields = {name: copy_field_or_table(field) for name, field in value.fields.items()}
+        elif isinstance(value, TableGroup):
+            copied.tables = {name: copy_field_or_table(table) for name, table in value.tables.items()}
+        else:
+            copied.join_table = copy_field_or_table(value.join_table)
+        return copied
+
+    database_copy = database.model_copy()
+    for name, value in {**database.__dict__, **(database.__pydantic_extra__ or {})}.items():
+        if isinstance(value, Table | TableGroup):
+            setattr(database_copy, name, copy_field_or_table(value))
+    database_copy._warehouse_table_names = list(database._warehouse_table_names)
+    database_copy._warehouse_self_managed_table_names = list(database._warehouse_self_managed_table_names)
+    database_copy._view_table_names = list(database._view_table_names)
+    return database_copy
+
+
 def create_hogql_database(
     team_id: Optional[int] = None,
     *,
@@ -348,13 +416,8 @@ def create_hogql_database(
     modifiers: Optional[HogQLQueryModifiers] = None,
     timings: Optional[HogQLTimings] = None,
 ) -> Database:
-    from posthog.hogql.database.s3_table import S3Table
     from posthog.hogql.query import create_default_modifiers_for_team
     from posthog.models import Team
-    from posthog.warehouse.models import (
-        DataWarehouseJoin,
-        DataWarehouseSavedQuery,
-    )
 
     if timings is None:
         timings = HogQLTimings()
@@ -374,7 +437,44 @@ def create_hogql_database(
 
     with timings.measure("modifiers"):
         modifiers = create_default_modifiers_for_team(team, modifiers)
+
+    if not settings.HOGQL_DATABASE_CACHE_ENABLED:
+        return _build_hogql_database(team_id, team, modifiers, timings)
+
+    with timings.measure("database_cache"):
+        # Read before building, so that a change made while building invalidates what's built
+        schema_version = get_schema_version(team.pk)
+        cache_key = (team.pk, schema_version, team.timezone, team.week_start_day, modifiers.model_dump_json())
+        cached_database: Optional[Database] = None
+        if schema_version is not None:
+            with _database_cache_lock:
+                cached_database = _get_database_cache().get(cache_key)
+        if cached_database is not None:
+            HOGQL_DATABASE_CACHE_COUNTER.labels(result="hit").inc()
+            return _copy_database(cached_database)
+
+    HOGQL_DATABASE_CACHE_COUNTER.labels(result="miss").inc()
+    database = _build_hogql_database(team_id, team, modifiers, timings)
+    if schema_version is not None:
+        with timings.measure("database_cache"):
+            database_copy = _copy_database(database)
+            with _database_cache_lock:
+                _get_database_cache()[cache_key] = database_copy
+    return database
+
+
+def _build_hogql_database(
+    team_id: Optional[int], team: "Team", modifiers: HogQLQueryModifiers, timings: HogQLTimings
+) -> Database:
+    from posthog.hogql.database.s3_table import S3Table
+    from posthog.warehouse.models import (
+        DataWarehouseJoin,
+        DataWarehouseSavedQuery,
+    )
+
+    with timings.measure("modifiers"):
         database = Database(timezone=team.timezone, week_start_day=team.week_start_day)
+        database._built_for_team_id = team.pk
 
         if modifiers.personsOnEventsMode == PersonsOnEventsMode.DISABLED:
             # no change
@@ -0,0 +1,45 @@
+from functools import partial
+from typing import Optional
+
+from django.db import transaction
+
+from posthog import redis
+from posthog.exceptions_capture import capture_exception
+
+# Versions are only ever compared for equality with the one a cached database was built at, and those are dropped long
+# before this, so a counter expiring and starting over is harmless
+SCHEMA_VERSION_TTL_SECONDS = 24 * 60 * 60
+
+
+def _schema_version_key(team_id: int) -> str:
+    return f"hogql_database_schema_version:{team_id}"
+
+
+def get_schema_version(team_id: int) -> Optional[int]:
+    """
+    Counter bumped whenever a model that `create_hogql_database` reads for the team changes. None if it can't be read,
+    in which case the database must not be served from cache.
+    """
+    try:
+        version = redis.get_client().get(_schema_version_key(team_id))
+    except Exception as e:
+        capture_exception(e)
+        return None
+    return int(version) if version is not None else 0
+
+
+def bump_schema_version(*team_ids: int) -> None:
+    try:
+        pipeline = redis.get_client().pipeline(transaction=False)
+        for team_id in team_ids:
+            pipeline.incr(_schema_version_key(team_id))
+            pipeline.expire(_schema_version_key(team_id), SCHEMA_VERSION_TTL_SECONDS)
+        pipeline.execute()
+    except Exception as e:
+        capture_exception(e)
+
+
+def bump_schema_version_on_commit(*team_ids: int) -> None:
+    # Bumping before the change is committed would let another process build the database from the old rows in the
+    # meantime, and cache it under the new version
+    transaction.on_commit(partial(bump_schema_version, *team_ids))
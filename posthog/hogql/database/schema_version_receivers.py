@@ -0,0 +1,51 @@
+"""
+Receivers bumping the schema version of the teams whose HogQL database a change affects. Connected in
+PostHogConfig.ready(), as importing the models from posthog.hogql.database would be circular.
+"""
+
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from posthog.hogql.database.schema_version import bump_schema_version_on_commit
+from posthog.models.group_type_mapping import GroupTypeMapping
+from posthog.models.team.team import Team
+from posthog.models.team.team_revenue_analytics_config import TeamRevenueAnalyticsConfig
+from posthog.warehouse.models import (
+    DataWarehouseCredential,
+    DataWarehouseJoin,
+    DataWarehouseSavedQuery,
+    DataWarehouseTable,
+    ExternalDataSchema,
+    ExternalDataSource,
+)
+
+
+@receiver(post_save, sender=Team)
+@receiver(post_delete, sender=Team)
+def team_schema_changed(sender, instance: Team, **kwargs):
+    bump_schema_version_on_commit(instance.pk)
+
+
+@receiver(post_save, sender=GroupTypeMapping)
+@receiver(post_delete, sender=GroupTypeMapping)
+def group_type_mapping_schema_changed(sender, instance: GroupTypeMapping, **kwargs):
+    # Group types are shared by all environments of a project
+    bump_schema_version_on_commit(*Team.objects.filter(project_id=instance.project_id).values_list("pk", flat=True))
+
+
+@receiver(post_save, sender=TeamRevenueAnalyticsConfig)
+@receiver(post_save, sender=DataWarehouseCredential)
+@receiver(post_save, sender=DataWarehouseJoin)
+@receiver(post_save, sender=DataWarehouseSavedQuery)
+@receiver(post_save, sender=DataWarehouseTable)
+@receiver(post_save, sender=ExternalDataSchema)
+@receiver(post_save, sender=ExternalDataSource)
+@receiver(post_delete, sender=TeamRevenueAnalyticsConfig)
+@receiver(post_delete, sender=DataWarehouseCredential)
+@receiver(post_delete, sender=DataWarehouseJoin)
+@receiver(post_delete, sender=DataWarehouseSavedQuery)
+@receiver(post_delete, sender=DataWarehouseTable)
+@receiver(post_delete, sender=ExternalDataSchema)
+@receiver(post_delete, sender=ExternalDataSource)
+def team_model_schema_changed(sender, instance, **kwargs):
+    bump_schema_version_on_commit(instance.team_id)
@@ -7,7 +7,8 @@ from django.test import override_settings
 from parameterized import parameterized
 
 from posthog.hogql.constants import MAX_SELECT_RETURNED_ROWS
-from posthog.hogql.database.database import create_hogql_database, serialize_database
+from posthog.hogql.database import database as database_module
+from posthog.hogql.database.database import clear_hogql_database_cache, create_hogql_database, serialize_database
 from posthog.hogql.database.models import (
     FieldTraverser,
     LazyJoin,
@@ -991,3 +992,68 @@ class TestDatabase(BaseTest, QueryMatchingTest):
         )
 
         print_ast(parse_select("SELECT events.distinct_id FROM subscriptions"), context, dialect="clickhouse")
+
+
+@override_settings(HOGQL_DATABASE_CACHE_ENABLED=True)
+class TestDatabaseCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        clear_hogql_database_cache()
+        self.addCleanup(clear_hogql_database_cache)
+
+    def test_database_is_built_once(self):
+        with patch.object(
+            database_module, "_build_hogql_database", wraps=database_module._build_hogql_database
+        ) as build_hogql_database:
+            create_hogql_database(team=self.team)
+            db = create_hogql_database(team=self.team)
+
+        assert build_hogql_database.call_count == 1
+        assert db.events.fields["event"] == StringDatabaseField(name="event", nullable=False)
+
+    def test_modifications_do_not_leak_into_cache(self):
+        db = create_hogql_database(team=self.team)
+        db.numbers.fields["expression"] = ExpressionField(name="expression", expr=parse_expr("1 + 1"))
+        db.add_views(my_view=Table(fields={}))
+
+        for _ in range(2):
+            other_db = create_hogql_database(team=self.team)
+            assert "expression" not in other_db.numbers.fields
+            assert not other_db.has_table("my_view")
+            assert "my_view" not in other_db.get_views()
+            other_db.numbers.fields["expression"] = ExpressionField(name="expression", expr=parse_expr("1 + 1"))
+
+    def test_copies_keep_joins_consistent(self):
+        create_hogql_database(team=self.team)
+        db = create_hogql_database(team=self.team)
+
+        session_join = db.events.fields["session"]
+        assert isinstance(session_join, LazyJoin)
+        assert session_join.join_table is db.sessions
+
+    def test_schema_changes_invalidate_cache(self):
+        create_hogql_database(team=self.team)
+        with self.captureOnCommitCallbacks(execute=True):
+            GroupTypeMapping.objects.create(
+                team=self.team, project_id=self.team.project_id, group_type="test", group_type_index=0
+            )
+            # Not bumped until the change is committed
+            assert "test" not in create_hogql_database(team=self.team).events.fields
+
+        db = create_hogql_database(team=self.team)
+
+        assert db.events.fields["test"] == FieldTraverser(chain=["group_0"])
+
+    def test_cached_per_modifiers(self):
+        create_hogql_database(
+            team=self.team, modifiers=HogQLQueryModifiers(personsOnEventsMode=PersonsOnEventsMode.DISABLED)
+        )
+
+        db = create_hogql_database(
+            team=self.team,
+            modifiers=HogQLQueryModifiers(
+                personsOnEventsMode=PersonsOnEventsMode.PERSON_ID_NO_OVERRIDE_PROPERTIES_ON_EVENTS
+            ),
+        )
+
+        assert db.events.fields["person"] == FieldTraverser(chain=["poe"])
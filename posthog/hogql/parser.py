@@ -1,9 +1,12 @@
-from typing import Literal, Optional, cast
+import threading
+from typing import Any, Literal, Optional, cast
 from collections.abc import Callable
 
 from antlr4 import CommonTokenStream, InputStream, ParseTreeVisitor, ParserRuleContext
 from antlr4.error.ErrorListener import ErrorListener
-from prometheus_client import Histogram
+from cachetools import LRUCache
+from django.conf import settings
+from prometheus_client import Counter, Histogram
 
 from posthog.hogql import ast
 from posthog.hogql.ast import SelectSetNode
@@ -15,6 +18,7 @@ from posthog.hogql.grammar.HogQLParser import HogQLParser
 from posthog.hogql.parse_string import parse_string_literal_text, parse_string_literal_ctx, parse_string_text_ctx
 from posthog.hogql.placeholders import replace_placeholders
 from posthog.hogql.timings import HogQLTimings
+from posthog.hogql.visitor import clone_expr
 from hogql_parser import (
     parse_expr as _parse_expr_cpp,
     parse_order_expr as _parse_order_expr_cpp,
@@ -68,6 +72,65 @@ RULE_TO_HISTOGRAM: dict[Literal["expr", "order_expr", "select", "full_template_s
     for rule in ("expr", "order_expr", "select", "full_template_string")
 }
 
+PARSE_CACHE_COUNTER = Counter(
+    "posthog_hogql_parse_cache_total",
+    "Lookups of parsed HogQL in the per-process parse cache, by rule and result.",
+    labelnames=["rule", "result"],
+)
+
+_parse_cache: Optional[LRUCache] = None
+_parse_cache_lock = threading.Lock()
+
+
+def _get_parse_cache() -> LRUCache:
+    global _parse_cache
+    if _parse_cache is None:
+        _parse_cache = LRUCache(maxsize=settings.HOGQL_PARSE_CACHE_MAX_SIZE)
+    return _parse_cache
+
+
+def clear_parse_cache() -> None:
+    with _parse_cache_lock:
+        _get_parse_cache().clear()
+
+
+def _parse(
+    rule: Literal["expr", "order_expr", "select", "full_template_string", "program"],
+    backend: Literal["python", "cpp"],
+    string: str,
+    *args: Any,
+    placeholders: Optional[dict[str, ast.Expr]] = None,
+    timings: HogQLTimings,
+) -> Any:
+    """
+    Parse `string` with the given rule and fill in placeholders. Trees in the parse cache are never handed out, so
+    callers get a tree of their own either way.
+    """
+    histogram = RULE_TO_HISTOGRAM["expr" if rule == "program" else rule]
+    cache_key = (rule, backend, string, *args)
+    node = None
+    if settings.HOGQL_PARSE_CACHE_ENABLED:
+        with _parse_cache_lock:
+            node = _get_parse_cache().get(cache_key)
+        PARSE_CACHE_COUNTER.labels(rule=rule, result="miss" if node is None else "hit").inc()
+
+    if node is None:
+        with histogram.labels(backend=backend).time():
+            node = RULE_TO_PARSE_FUNCTION[backend][rule](string, *args)
+        if settings.HOGQL_PARSE_CACHE_ENABLED:
+            # Filling in placeholders clones the tree, so the parsed one only needs copying if there are none
+            cached_node = node if placeholders else clone_expr(node)
+            with _parse_cache_lock:
+                _get_parse_cache()[cache_key] = cached_node
+    elif not placeholders:
+        with timings.measure("clone_cached_parse"):
+            return clone_expr(node)
+
+    if placeholders:
+        with timings.measure("replace_placeholders"):
+            node = replace_placeholders(node, placeholders)
+    return node
+
 
 def parse_string_template(
     string: str,
@@ -80,12 +143,7 @@ def parse_string_template(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_full_template_string_{backend}"):
-        with RULE_TO_HISTOGRAM["full_template_string"].labels(backend=backend).time():
-            node = RULE_TO_PARSE_FUNCTION[backend]["full_template_string"]("F'" + string)
-        if placeholders:
-            with timings.measure("replace_placeholders"):
-                node = replace_placeholders(node, placeholders)
-    return node
+        return _parse("full_template_string", backend, "F'" + string, placeholders=placeholders, timings=timings)
 
 
 def parse_expr(
@@ -101,12 +159,7 @@ def parse_expr(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_expr_{backend}"):
-        with RULE_TO_HISTOGRAM["expr"].labels(backend=backend).time():
-            node = RULE_TO_PARSE_FUNCTION[backend]["expr"](expr, start)
-        if placeholders:
-            with timings.measure("replace_placeholders"):
-                node = replace_placeholders(node, placeholders)
-    return node
+        return _parse("expr", backend, expr, start, placeholders=placeholders, timings=timings)
 
 
 def parse_order_expr(
@@ -119,12 +172,7 @@ def parse_order_expr(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_order_expr_{backend}"):
-        with RULE_TO_HISTOGRAM["order_expr"].labels(backend=backend).time():
-            node = RULE_TO_PARSE_FUNCTION[backend]["order_expr"](order_expr)
-        if placeholders:
-            with timings.measure("replace_placeholders"):
-                node = replace_placeholders(node, placeholders)
-    return node
+        return _parse("order_expr", backend, order_expr, placeholders=placeholders, timings=timings)
 
 
 def parse_select(
@@ -137,12 +185,7 @@ def parse_select(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_select_{backend}"):
-        with RULE_TO_HISTOGRAM["select"].labels(backend=backend).time():
-            node = RULE_TO_PARSE_FUNCTION[backend]["select"](statement)
-        if placeholders:
-            with timings.measure("replace_placeholders"):
-                node = replace_placeholders(node, placeholders)
-    return node
+        return _parse("select", backend, statement, placeholders=placeholders, timings=timings)
 
 
 def parse_program(
@@ -154,9 +197,7 @@ def parse_program(
     if timings is None:
         timings = HogQLTimings()
     with timings.measure(f"parse_expr_{backend}"):
-        with RULE_TO_HISTOGRAM["expr"].labels(backend=backend).time():
-            node = RULE_TO_PARSE_FUNCTION[backend]["program"](source)
-    return node
+        return _parse("program", backend, source, timings=timings)
 
 
 def get_parser(query: str) -> HogQLParser:
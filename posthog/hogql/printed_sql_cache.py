@@ -0,0 +1,189 @@
+import dataclasses
+import threading
+from dataclasses import dataclass
+from datetime import date
+from typing import Any, Optional
+
+from cachetools import TTLCache
+from django.conf import settings
+from prometheus_client import Counter
+
+from posthog.hogql import ast
+from posthog.hogql.base import AST
+from posthog.hogql.constants import HogQLGlobalSettings
+from posthog.hogql.context import HogQLContext
+from posthog.hogql.database.schema.cohort_people import RawCohortPeople
+from posthog.hogql.database.schema.static_cohort_people import StaticCohortPeople
+from posthog.hogql.database.schema_version import get_schema_version
+from posthog.hogql.visitor import TraversingVisitor
+
+PRINTED_SQL_CACHE_COUNTER = Counter(
+    "posthog_hogql_printed_sql_cache_total",
+    "Lookups of printed ClickHouse SQL in the per-process cache, by result.",
+    labelnames=["result"],
+)
+
+# Locations are not part of a query's shape, and nodes with types are not cached
+_IGNORED_FIELDS = frozenset({"start", "end", "type"})
+
+
+class _NotCacheable(Exception):
+    pass
+
+
+@dataclass(frozen=True)
+class PrintedSQL:
+    sql: str
+    values: dict[str, Any]
+
+
+@dataclass(frozen=True)
+class PrintedSQLCacheKey:
+    key: tuple
+    # Dates in the query, as anything else in the printed SQL must not depend on when it was printed
+    dates: frozenset
+
+
+_cache: Optional[TTLCache] = None
+_cache_lock = threading.Lock()
+
+
+def _get_cache() -> TTLCache:
+    global _cache
+    if _cache is None:
+        _cache = TTLCache(
+            maxsize=settings.HOGQL_PRINTED_SQL_CACHE_MAX_SIZE, ttl=settings.HOGQL_PRINTED_SQL_CACHE_TTL_SECONDS
+        )
+    return _cache
+
+
+def clear_printed_sql_cache() -> None:
+    with _cache_lock:
+        _get_cache().clear()
+
+
+def get_printed_sql_cache_key(
+    node: AST,
+    context: HogQLContext,
+    stack: Optional[list[ast.SelectQuery]],
+    hogql_settings: Optional[HogQLGlobalSettings],
+    pretty: bool,
+) -> Optional[PrintedSQLCacheKey]:
+    """
+    Key for printing `node` to ClickHouse SQL in `context`, or None if the result can't be cached. That is the case for
+    nested printing, contexts that already hold values, and databases not built for the team by create_hogql_database.
+    """
+    if stack or context.values or context.globals is not None or context.team_id is None:
+        return None
+    database = context.database
+    if database is not None and not database.is_built_for_team(context.team_id):
+        return None
+    schema_version = get_schema_version(context.team_id)
+    if schema_version is None:
+        return None
+
+    dates: set[date] = set()
+    try:
+        shape = _shape(node, dates)
+    except _NotCacheable:
+        return None
+
+    return PrintedSQLCacheKey(
+        key=(
+            context.team_id,
+            schema_version,
+            shape,
+            context.modifiers.model_dump_json(),
+            hogql_settings.model_dump_json() if hogql_settings is not None else None,
+            pretty,
+            context.enable_select_queries,
+            context.limit_top_select,
+            context.within_non_hogql_query,
+            context.output_format,
+            context.debug,
+            database.get_timezone() if database is not None else None,
+            database.get_week_start_day() if database is not None else None,
+        ),
+        dates=frozenset(dates),
+    )
+
+
+def get_printed_sql(cache_key: PrintedSQLCacheKey, context: HogQLContext) -> Optional[str]:
+    with _cache_lock:
+        printed: Optional[PrintedSQL] = _get_cache().get(cache_key.key)
+    if printed is None:
+        PRINTED_SQL_CACHE_COUNTER.labels(result="miss").inc()
+        return None
+
+    PRINTED_SQL_CACHE_COUNTER.labels(result="hit").inc()
+    context.values.update(printed.values)
+    return printed.sql
+
+
+def set_printed_sql(cache_key: PrintedSQLCacheKey, prepared_node: AST, sql: str, context: HogQLContext) -> None:
+    try:
+        inspector = _PreparedNodeInspector.inspect(prepared_node)
+    except Exception:
+        inspector = None
+    if (
+        inspector is None
+        # Something added a date while printing, e.g. clamping to the current time, so this can't be reused
+        or not inspector.dates <= cache_key.dates
+        # Cohorts are looked up by ID or name while printing, and the SQL has the version they were at. Those change
+        # with every recalculation, which doesn't go through the schema version.
+        or inspector.reads_cohorts
+        # These point at positions in the query, which are not part of the key
+        or context.notices
+        or context.warnings
+        or context.errors
+    ):
+        PRINTED_SQL_CACHE_COUNTER.labels(result="uncacheable").inc()
+        return
+
+    printed = PrintedSQL(sql=sql, values=dict(context.values))
+    with _cache_lock:
+        _get_cache()[cache_key.key] = printed
+
+
+def _shape(value: Any, dates: set[date]) -> Any:
+    if isinstance(value, ast.Type) or (isinstance(value, AST) and getattr(value, "type", None) is not None):
+        # Types may come with their own tables and fields, which aren't part of the key
+        raise _NotCacheable()
+    if isinstance(value, AST):
+        return (
+            value.__class__.__name__,
+            *(
+                _shape(getattr(value, field.name), dates)
+                for field in dataclasses.fields(value)
+                if field.name not in _IGNORED_FIELDS
+            ),
+        )
+    if isinstance(value, list | tuple):
+        return tuple(_shape(item, dates) for item in value)
+    if isinstance(value, dict):
+        return tuple((key, _shape(item, dates)) for key, item in value.items())
+    if isinstance(value, date):
+        dates.add(value)
+    # The type is part of the key, as e.g. 1, 1.0 and True are equal but printed differently
+    return value.__class__.__name__, repr(value)
+
+
+class _PreparedNodeInspector(TraversingVisitor):
+    def __init__(self):
+        super().__init__()
+        self.dates: set[date] = set()
+        self.reads_cohorts = False
+
+    @classmethod
+    def inspect(cls, node: AST) -> "_PreparedNodeInspector":
+        inspector = cls()
+        inspector.visit(node)
+        return inspector
+
+    def visit_constant(self, node: ast.Constant):
+        if isinstance(node.value, date):
+            self.dates.add(node.value)
+
+    def visit_table_type(self, node: ast.TableType):
+        if isinstance(node.table, RawCohortPeople | StaticCohortPeople):
+            self.reads_cohorts = True
@@ -6,6 +6,8 @@ from difflib import get_close_matches
 from typing import Literal, Optional, Union, cast
 from uuid import UUID
 
+from django.conf import settings as django_settings
+
 from posthog.clickhouse.materialized_columns import (
     MaterializedColumn,
     TablesWithMaterializedColumns,
@@ -43,6 +45,12 @@ from posthog.hogql.functions import (
 )
 from posthog.hogql.functions.mapping import ALL_EXPOSED_FUNCTION_NAMES, HOGQL_COMPARISON_MAPPING, validate_function_args
 from posthog.hogql.modifiers import create_default_modifiers_for_team, set_default_in_cohort_via
+from posthog.hogql.printed_sql_cache import (
+    PrintedSQLCacheKey,
+    get_printed_sql,
+    get_printed_sql_cache_key,
+    set_printed_sql,
+)
 from posthog.hogql.resolver import resolve_types
 from posthog.hogql.resolver_utils import lookup_field_by_name
 from posthog.hogql.transforms.in_cohort import resolve_in_cohorts, resolve_in_cohorts_conjoined
@@ -100,10 +108,22 @@ def print_ast(
     settings: Optional[HogQLGlobalSettings] = None,
     pretty: bool = False,
 ) -> str:
+    cache_key: Optional[PrintedSQLCacheKey] = None
+    if dialect == "clickhouse" and django_settings.HOGQL_PRINTED_SQL_CACHE_ENABLED:
+        with context.timings.measure("printed_sql_cache"):
+            # Settings of the query are merged into the global settings while preparing, which we skip on a hit
+            _merge_query_settings(node, settings)
+            context.modifiers = set_default_in_cohort_via(context.modifiers)
+            cache_key = get_printed_sql_cache_key(node, context, stack, settings, pretty)
+            printed_sql = get_printed_sql(cache_key, context) if cache_key is not None else None
+        if printed_sql is not None:
+            with context.timings.measure("printed_sql_cache_hit"):
+                return printed_sql
+
     prepared_ast = prepare_ast_for_printing(node=node, context=context, dialect=dialect, stack=stack, settings=settings)
     if prepared_ast is None:
         return ""
-    return print_prepared_ast(
+    printed_sql = print_prepared_ast(
         node=prepared_ast,
         context=context,
         dialect=dialect,
@@ -111,6 +131,10 @@ def print_ast(
         settings=settings,
         pretty=pretty,
     )
+    if cache_key is not None:
+        with context.timings.measure("printed_sql_cache_miss"):
+            set_printed_sql(cache_key, prepared_ast, printed_sql, context)
+    return printed_sql
 
 
 def prepare_ast_for_printing(
@@ -171,13 +195,7 @@ def prepare_ast_for_printing(
                 setTimeZones=True,
             ).visit(node)
 
-        # We support global query settings, and local subquery settings.
-        # If the global query is a select query with settings, merge the two.
-        if isinstance(node, ast.SelectQuery) and node.settings is not None and settings is not None:
-            for key, value in node.settings.model_dump().items():
-                if value is not None:
-                    settings.__setattr__(key, value)
-            node.settings = None
+        _merge_query_settings(node, settings)
 
     if context.modifiers.inCohortVia == InCohortVia.LEFTJOIN:
         with context.timings.measure("resolve_in_cohorts"):
@@ -187,6 +205,16 @@ def prepare_ast_for_printing(
     return node
 
 
+def _merge_query_settings(node: AST, settings: Optional[HogQLGlobalSettings]) -> None:
+    # We support global query settings, and local subquery settings.
+    # If the global query is a select query with settings, merge the two.
+    if isinstance(node, ast.SelectQuery) and node.settings is not None and settings is not None:
+        for key, value in node.settings.model_dump().items():
+            if value is not None:
+                settings.__setattr__(key, value)
+        node.settings = None
+
+
 def print_prepared_ast(
     node: _T_AST,
     context: HogQLContext,
@@ -0,0 +1,72 @@
+from unittest.mock import patch
+
+from django.test import SimpleTestCase, override_settings
+
+from posthog.hogql import ast, parser
+from posthog.hogql.parser import clear_parse_cache, parse_expr, parse_program, parse_select
+
+
+@override_settings(HOGQL_PARSE_CACHE_ENABLED=True)
+class TestParseCache(SimpleTestCase):
+    def setUp(self):
+        super().setUp()
+        clear_parse_cache()
+        self.addCleanup(clear_parse_cache)
+
+    def test_repeated_parses_are_cached(self):
+        with patch.dict(parser.RULE_TO_PARSE_FUNCTION["python"]) as functions:
+            parse_select_function = functions["select"]
+            calls = []
+            functions["select"] = lambda string: calls.append(string) or parse_select_function(string)
+
+            first = parse_select("SELECT event FROM events WHERE 1 = 1", backend="python")
+            second = parse_select("SELECT event FROM events WHERE 1 = 1", backend="python")
+
+        assert len(calls) == 1
+        assert first == second
+        assert first is not second
+        assert first.where is not second.where
+
+    def test_cached_trees_are_not_shared(self):
+        first = parse_expr("event = 'a'", backend="python")
+        assert isinstance(first, ast.CompareOperation)
+        first.right = ast.Constant(value="b")
+
+        second = parse_expr("event = 'a'", backend="python")
+        third = parse_expr("event = 'a'", backend="python")
+        assert isinstance(second, ast.CompareOperation) and isinstance(third, ast.CompareOperation)
+        second.left = ast.Field(chain=["person_id"])
+
+        assert third.left == ast.Field(chain=["event"], start=0, end=5)
+        assert third.right == ast.Constant(value="a", start=8, end=11)
+
+    def test_placeholders_are_filled_in_on_hits(self):
+        first = parse_expr("{a} + 1", {"a": ast.Constant(value=1)}, backend="python")
+        second = parse_expr("{a} + 1", {"a": ast.Constant(value=2)}, backend="python")
+        without_placeholders = parse_expr("{a} + 1", backend="python")
+
+        assert isinstance(first, ast.ArithmeticOperation) and isinstance(second, ast.ArithmeticOperation)
+        assert first.left == ast.Constant(value=1, start=0, end=3)
+        assert second.left == ast.Constant(value=2, start=0, end=3)
+        assert isinstance(without_placeholders, ast.ArithmeticOperation)
+        assert isinstance(without_placeholders.left, ast.Placeholder)
+
+    def test_keyed_on_start(self):
+        with_locations = parse_expr("event", backend="python")
+        without_locations = parse_expr("event", start=None, backend="python")
+
+        assert with_locations.start == 0
+        assert without_locations.start is None
+
+    def test_programs_are_cached(self):
+        first = parse_program("let a := 1; return a;", backend="python")
+        second = parse_program("let a := 1; return a;", backend="python")
+
+        assert first == second
+        assert first.declarations[0] is not second.declarations[0]
+
+    @override_settings(HOGQL_PARSE_CACHE_ENABLED=False)
+    def test_disabled(self):
+        parse_expr("1", backend="python")
+
+        assert len(parser._get_parse_cache()) == 0
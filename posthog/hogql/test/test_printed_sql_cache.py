@@ -0,0 +1,113 @@
+import ast as python_ast
+from datetime import datetime, UTC
+from pathlib import Path
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from posthog.hogql import ast
+from posthog.hogql import printer
+from posthog.hogql.constants import HogQLGlobalSettings
+from posthog.hogql.context import HogQLContext
+from posthog.hogql.database import schema_version
+from posthog.hogql.database.schema_version import bump_schema_version
+from posthog.hogql.parser import parse_select
+from posthog.hogql.printed_sql_cache import clear_printed_sql_cache, get_printed_sql_cache_key, set_printed_sql
+from posthog.hogql.printer import print_ast
+from posthog.models import Cohort
+from posthog.test.base import BaseTest
+
+
+@override_settings(HOGQL_PRINTED_SQL_CACHE_ENABLED=True)
+class TestPrintedSQLCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        clear_printed_sql_cache()
+        self.addCleanup(clear_printed_sql_cache)
+
+    def _print(self, query: str, settings: HogQLGlobalSettings | None = None) -> tuple[str, HogQLContext]:
+        context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+        return print_ast(parse_select(query), context, "clickhouse", settings=settings), context
+
+    def test_repeated_queries_are_not_resolved_again(self):
+        query = "SELECT event, count() FROM events WHERE properties.$browser = 'Chrome' GROUP BY event"
+        with patch.object(
+            printer, "prepare_ast_for_printing", wraps=printer.prepare_ast_for_printing
+        ) as prepare_ast_for_printing:
+            first_sql, first_context = self._print(query)
+            second_sql, second_context = self._print(query)
+
+        assert prepare_ast_for_printing.call_count == 1
+        assert second_sql == first_sql
+        assert second_context.values == first_context.values
+        assert "./printed_sql_cache_hit" in second_context.timings.to_dict()
+
+    def test_different_values_are_printed_again(self):
+        first_sql, first_context = self._print("SELECT event FROM events WHERE event = 'a'")
+        second_sql, second_context = self._print("SELECT event FROM events WHERE event = 'b'")
+
+        assert second_sql == first_sql
+        assert first_context.values != second_context.values
+        assert "./printed_sql_cache_hit" not in second_context.timings.to_dict()
+
+    def test_query_settings_are_merged_on_hits(self):
+        query = "SELECT event FROM events SETTINGS max_execution_time = 10"
+        self._print(query, settings=HogQLGlobalSettings())
+
+        settings = HogQLGlobalSettings()
+        _, context = self._print(query, settings=settings)
+
+        assert "./printed_sql_cache_hit" in context.timings.to_dict()
+        assert settings.max_execution_time == 10
+
+    def test_schema_changes_invalidate_cache(self):
+        self._print("SELECT event FROM events")
+        bump_schema_version(self.team.pk)
+
+        _, context = self._print("SELECT event FROM events")
+
+        assert "./printed_sql_cache_hit" not in context.timings.to_dict()
+
+    def test_printing_that_adds_dates_is_not_cached(self):
+        context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+        query = parse_select("SELECT 1")
+        cache_key = get_printed_sql_cache_key(query, context, stack=None, hogql_settings=None, pretty=False)
+        assert cache_key is not None
+
+        prepared = parse_select("SELECT 1 WHERE now() > {date}", {"date": ast.Constant(value=datetime.now(UTC))})
+        set_printed_sql(cache_key, prepared, "SELECT 1", context)
+
+        _, context = self._print("SELECT 1")
+        assert "./printed_sql_cache_hit" not in context.timings.to_dict()
+
+    def test_queries_reading_cohorts_are_not_cached(self):
+        cohort = Cohort.objects.create(team=self.team, name="cohort", is_static=True)
+        query = f"SELECT event FROM events WHERE person_id IN COHORT {cohort.pk}"
+        self._print(query)
+
+        _, context = self._print(query)
+
+        assert "./printed_sql_cache_hit" not in context.timings.to_dict()
+
+    def test_printing_with_notices_is_not_cached(self):
+        context = HogQLContext(team_id=self.team.pk, enable_select_queries=True)
+        query = parse_select("SELECT 1")
+        cache_key = get_printed_sql_cache_key(query, context, stack=None, hogql_settings=None, pretty=False)
+        assert cache_key is not None
+
+        context.add_notice(message="Notice", start=7, end=8)
+        set_printed_sql(cache_key, query, "SELECT 1", context)
+
+        _, context = self._print("SELECT 1")
+        assert "./printed_sql_cache_hit" not in context.timings.to_dict()
+
+    def test_schema_version_module_imports_no_models(self):
+        # the printer imports the cache, which imports schema_version, and posthog.warehouse.models imports the
+        # printer through the HogQL database, so a model import there would be circular
+        source = Path(schema_version.__file__).read_text()
+        imported_modules = [
+            node.module or ""
+            for node in python_ast.walk(python_ast.parse(source))
+            if isinstance(node, python_ast.ImportFrom)
+        ]
+        assert not [module for module in imported_modules if module.startswith(("posthog.models", "posthog.warehouse"))]
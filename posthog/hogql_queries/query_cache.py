@@ -1,13 +1,185 @@
+import json
+import threading
+import time
+from collections.abc import Iterable, Iterator
+from contextlib import contextmanager
+from contextvars import ContextVar
+from dataclasses import dataclass
 from datetime import datetime, UTC
-from typing import Optional
+from typing import Any, Optional
 
+import orjson
+import structlog
+from cachetools import TTLCache
 from django.conf import settings
 from django.core.cache import cache
+from prometheus_client import Counter
 
 from posthog import redis
 from posthog.cache_utils import OrjsonJsonSerializer
+from posthog.exceptions_capture import capture_exception
+from posthog.hogql_queries.query_cache_encoding import decode_query_response, encode_query_response
 from posthog.utils import get_safe_cache
 
+logger = structlog.get_logger(__name__)
+
+QUERY_CACHE_INVALIDATION_CHANNEL = "query_cache_invalidation"
+# Resubscribing to invalidations after a failure is retried after this many seconds, doubling up to the maximum
+QUERY_CACHE_SUBSCRIBE_RETRY_MIN_SECONDS = 1
+QUERY_CACHE_SUBSCRIBE_RETRY_MAX_SECONDS = 60
+
+LOCAL_QUERY_CACHE_COUNTER = Counter(
+    "posthog_query_cache_local_total",
+    "Lookups, evictions and invalidations of the in-process query result cache.",
+    labelnames=["result"],
+)
+
+
+@dataclass(frozen=True)
+class LocalCacheEntry:
+    serialized: bytes
+    last_refresh: Optional[str]
+
+    @property
+    def size(self) -> int:
+        return len(self.serialized)
+
+
+class _SizeBoundedTTLCache(TTLCache):
+    def popitem(self):
+        key, value = super().popitem()
+        LOCAL_QUERY_CACHE_COUNTER.labels(result="eviction").inc()
+        return key, value
+
+
+class LocalQueryCache:
+    """
+    Query results kept in process memory in front of Redis as plain JSON, bounded by their size. They are parsed on
+    every hit, so that callers changing the response can't change the cached one.
+
+    Every write through `QueryCacheManager.set_cache_data` publishes the new `last_refresh` of the cache key on
+    QUERY_CACHE_INVALIDATION_CHANNEL, and every process drops its copy if it's not of that calculation. Entries also
+    expire after QUERY_CACHE_LOCAL_TTL_SECONDS, which bounds staleness should the subscription drop messages.
+    """
+
+    def __init__(self, max_size_bytes: int, ttl_seconds: int):
+        self._cache: TTLCache[str, LocalCacheEntry] = _SizeBoundedTTLCache(
+            maxsize=max_size_bytes, ttl=ttl_seconds, getsizeof=lambda entry: entry.size
+        )
+        self._lock = threading.Lock()
+        self._subscriber: Optional[threading.Thread] = None
+        self._subscribe_retry_seconds = QUERY_CACHE_SUBSCRIBE_RETRY_MIN_SECONDS
+        self._next_subscribe_at = 0.0
+        # Bumped on every invalidation. Results read from Redis while an invalidation came in are not stored, as they
+        # may predate the write that caused it.
+        self.generation = 0
+
+    def get(self, cache_key: str) -> Optional[dict]:
+        self._ensure_subscribed()
+        with self._lock:
+            entry = self._cache.get(cache_key)
+        if entry is None:
+            LOCAL_QUERY_CACHE_COUNTER.labels(result="miss").inc()
+            return None
+        LOCAL_QUERY_CACHE_COUNTER.labels(result="hit").inc()
+        return orjson.loads(entry.serialized)
+
+    def set(self, cache_key: str, response: dict, generation: int) -> None:
+        entry = LocalCacheEntry(serialized=orjson.dumps(response), last_refresh=response.get("last_refresh"))
+        if entry.size > self._cache.maxsize:
+            return
+        with self._lock:
+            if generation != self.generation:
+                return
+            self._cache[cache_key] = entry
+
+    def invalidate(self, cache_key: str, last_refresh: Optional[str] = None) -> None:
+        with self._lock:
+            self.generation += 1
+            entry = self._cache.get(cache_key)
+            if entry is not None and (last_refresh is None or entry.last_refresh != last_refresh):
+                del self._cache[cache_key]
+                LOCAL_QUERY_CACHE_COUNTER.labels(result="invalidation").inc()
+
+    def clear(self) -> None:
+        with self._lock:
+            self.generation += 1
+            self._cache.clear()
+
+    def handle_invalidation_message(self, message: dict[str, Any]) -> None:
+        try:
+            data = json.loads(message["data"])
+            self.invalidate(data["cache_key"], data.get("last_refresh"))
+        except Exception as e:
+            capture_exception(e)
+
+    def _ensure_subscribed(self) -> None:
+        if self._subscriber is not None and self._subscriber.is_alive():
+            return
+        if time.monotonic() < self._next_subscribe_at:
+            return
+        with self._lock:
+            if self._subscriber is not None and self._subscriber.is_alive():
+                return
+            if time.monotonic() < self._next_subscribe_at:
+                return
+            if self._subscriber is not None:
+                # We may have missed invalidations while the subscription was down
+                logger.warning("query_cache_local_subscription_lost")
+                self.generation += 1
+                self._cache.clear()
+            try:
+                pubsub = redis.get_client().pubsub(ignore_subscribe_messages=True)
+                pubsub.subscribe(**{QUERY_CACHE_INVALIDATION_CHANNEL: self.handle_invalidation_message})
+                self._subscriber = pubsub.run_in_thread(sleep_time=1, daemon=True)
+                # Still wait a little before the next attempt, in case the subscription drops right away
+                self._next_subscribe_at = time.monotonic() + QUERY_CACHE_SUBSCRIBE_RETRY_MIN_SECONDS
+                self._subscribe_retry_seconds = QUERY_CACHE_SUBSCRIBE_RETRY_MIN_SECONDS
+            except Exception as e:
+                capture_exception(e)
+                self._next_subscribe_at = time.monotonic() + self._subscribe_retry_seconds
+                self._subscribe_retry_seconds = min(
+                    self._subscribe_retry_seconds * 2, QUERY_CACHE_SUBSCRIBE_RETRY_MAX_SECONDS
+                )
+
+
+_local_query_cache: Optional[LocalQueryCache] = None
+_local_query_cache_lock = threading.Lock()
+
+
+def get_local_query_cache() -> Optional[LocalQueryCache]:
+    global _local_query_cache
+    if not settings.QUERY_CACHE_LOCAL_ENABLED:
+        return None
+    if _local_query_cache is None:
+        with _local_query_cache_lock:
+            if _local_query_cache is None:
+                _local_query_cache = LocalQueryCache(
+                    max_size_bytes=settings.QUERY_CACHE_LOCAL_MAX_SIZE_BYTES,
+                    ttl_seconds=settings.QUERY_CACHE_LOCAL_TTL_SECONDS,
+                )
+    return _local_query_cache
+
+
+# Serialized results read ahead of time by `prefetched_query_cache`, None for cache keys that weren't in Redis
+_prefetched_cache_data: ContextVar[Optional[dict[str, Optional[bytes]]]] = ContextVar(
+    "prefetched_query_cache_data", default=None
+)
+
+
+@contextmanager
+def prefetched_query_cache(cache_keys: Iterable[str]) -> Iterator[None]:
+    """
+    Reads the results of all `cache_keys` from Redis in one MGET up front, instead of one round-trip per query. Within
+    the block, `QueryCacheManager.get_cache_data` is served from what was read, including misses. Each prefetched
+    result is used at most once, so that a later lookup of the same key sees results calculated in the meantime.
+    """
+    token = _prefetched_cache_data.set(QueryCacheManager.prefetch_cache_data(cache_keys))
+    try:
+        yield
+    finally:
+        _prefetched_cache_data.reset(token)
+
 
 class QueryCacheManager:
     """
@@ -18,6 +190,9 @@ class QueryCacheManager:
 
     Sorted sets are keyed by team_id.
     'cache_timestamps:{team_id}' -> '{self.insight_id}:{self.dashboard_id or ''}' -> timestamp (epoch time when calculated)
+
+    Results are serialized with the QUERY_CACHE_ENCODING, see `query_cache_encoding`.
+    With QUERY_CACHE_LOCAL_ENABLED, decoded results are additionally kept in process memory, see `LocalQueryCache`.
     """
 
     def __init__(
@@ -38,6 +213,19 @@ class QueryCacheManager:
     def identifier(self):
         return f"{self.insight_id}:{self.dashboard_id or ''}"
 
+    @staticmethod
+    def prefetch_cache_data(cache_keys: Iterable[str]) -> dict[str, Optional[bytes]]:
+        keys = list(dict.fromkeys(cache_keys))
+        if not keys:
+            return {}
+        try:
+            cached_responses = cache.get_many(keys)
+        except Exception as e:
+            # Lookups will fall back to reading keys one by one
+            capture_exception(e)
+            return {}
+        return {key: cached_responses.get(key) for key in keys}
+
     @staticmethod
     def get_stale_insights(*, team_id: int, limit: Optional[int] = None) -> list[str]:
         """
@@ -93,8 +281,12 @@ class QueryCacheManager:
         self.redis_client.zrem(f"cache_timestamps:{self.team_id}", self.identifier)
 
     def set_cache_data(self, *, response: dict, target_age: Optional[datetime]) -> None:
-        fresh_response_serialized = OrjsonJsonSerializer({}).dumps(response)
+        fresh_response_serialized = encode_query_response(response)
         cache.set(self.cache_key, fresh_response_serialized, settings.CACHED_RESULTS_TTL)
+        prefetched = _prefetched_cache_data.get()
+        if prefetched is not None:
+            prefetched.pop(self.cache_key, None)
+        self._publish_invalidation(response)
 
         if target_age:
             self.update_target_age(target_age)
@@ -102,8 +294,39 @@ class QueryCacheManager:
             self.remove_last_refresh()
 
     def get_cache_data(self) -> Optional[dict]:
-        cached_response_bytes: Optional[bytes] = get_safe_cache(self.cache_key)
+        local_cache = get_local_query_cache()
+        generation = 0
+        if local_cache is not None:
+            local_response = local_cache.get(self.cache_key)
+            if local_response is not None:
+                return local_response
+            generation = local_cache.generation
+
+        cached_response_bytes: Optional[bytes]
+        prefetched = _prefetched_cache_data.get()
+        if prefetched is not None and self.cache_key in prefetched:
+            cached_response_bytes = prefetched.pop(self.cache_key)
+        else:
+            cached_response_bytes = get_safe_cache(self.cache_key)
         if not cached_response_bytes:
             return None
 
-        return OrjsonJsonSerializer({}).loads(cached_response_bytes)
+        cached_response = decode_query_response(cached_response_bytes)
+        if local_cache is not None and isinstance(cached_response, dict):
+            local_cache.set(self.cache_key, cached_response, generation=generation)
+        return cached_response
+
+    def _publish_invalidation(self, response: dict) -> None:
+        local_cache = get_local_query_cache()
+        if local_cache is None:
+            return
+        # Same representation of last_refresh as in the serialized response, so that readers can compare it
+        last_refresh = OrjsonJsonSerializer({}).loads(OrjsonJsonSerializer({}).dumps(response.get("last_refresh")))
+        local_cache.invalidate(self.cache_key)
+        try:
+            self.redis_client.publish(
+                QUERY_CACHE_INVALIDATION_CHANNEL,
+                json.dumps({"cache_key": self.cache_key, "last_refresh": last_refresh}),
+            )
+        except Exception as e:
+            capture_exception(e)
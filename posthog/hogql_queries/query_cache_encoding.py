@@ -0,0 +1,129 @@
+from typing import Any, Optional
+
+import orjson
+from django.conf import settings
+
+from posthog.cache_utils import OrjsonJsonSerializer
+
+# Columns of result rows whose values are commonly the same for every row, e.g. the dates of all series of a trend
+DICTIONARY_COLUMNS = ("days", "labels")
+
+
+class QueryCacheEncoding:
+    name: str
+    # Prefix identifying values written with this encoding, so that any of them can be read back regardless of settings
+    magic: bytes
+
+    def dumps(self, response: Any) -> bytes:
+        raise NotImplementedError()
+
+    def loads(self, value: bytes) -> Any:
+        raise NotImplementedError()
+
+
+class JsonQueryCacheEncoding(QueryCacheEncoding):
+    """Plain orjson, the format query results were always stored in."""
+
+    name = "json"
+    magic = b""
+
+    def dumps(self, response: Any) -> bytes:
+        return OrjsonJsonSerializer({}).dumps(response)
+
+    def loads(self, value: bytes) -> Any:
+        return OrjsonJsonSerializer({}).loads(value)
+
+
+class ColumnarQueryCacheEncoding(QueryCacheEncoding):
+    """
+    Result rows that are dicts with the same keys are stored as one array per key, and the values of DICTIONARY_COLUMNS
+    are stored once each and referenced by index. This isn't compressed here, the cache compresses values it stores
+    when USE_REDIS_COMPRESSION is on, and the repetition removed here is what makes that effective on large results.
+
+    Layout: magic, then JSON of `[response, columnar_results]`, where the "results" of `response` are null if
+    `columnar_results` is not.
+    """
+
+    name = "columnar"
+    magic = b"\x00phqc1"
+
+    def dumps(self, response: Any) -> bytes:
+        columnar_results = None
+        if isinstance(response, dict) and isinstance(response.get("results"), list):
+            columnar_results = _to_columns(response["results"])
+            if columnar_results is not None:
+                response = {**response, "results": None}
+
+        return self.magic + OrjsonJsonSerializer({}).dumps([response, columnar_results])
+
+    def loads(self, value: bytes) -> Any:
+        response, columnar_results = orjson.loads(value[len(self.magic) :])
+        if columnar_results is not None:
+            response["results"] = _from_columns(columnar_results)
+        return response
+
+
+QUERY_CACHE_ENCODINGS: dict[str, QueryCacheEncoding] = {
+    encoding.name: encoding for encoding in (JsonQueryCacheEncoding(), ColumnarQueryCacheEncoding())
+}
+
+
+def encode_query_response(response: Any) -> bytes:
+    return QUERY_CACHE_ENCODINGS[settings.QUERY_CACHE_ENCODING].dumps(response)
+
+
+def decode_query_response(value: bytes) -> Any:
+    """Decodes a query response stored with any of the encodings."""
+    for encoding in QUERY_CACHE_ENCODINGS.values():
+        if encoding.magic and value.startswith(encoding.magic):
+            return encoding.loads(value)
+    return QUERY_CACHE_ENCODINGS["json"].loads(value)
+
+
+def _to_columns(results: list) -> Optional[dict[str, Any]]:
+    if not results or not isinstance(results[0], dict) or not results[0]:
+        return None
+    keys = list(results[0])
+    for row in results:
+        if not isinstance(row, dict) or list(row) != keys:
+            return None
+
+    columns = {key: [row[key] for row in results] for key in keys}
+    dictionaries: dict[str, list[list[str]]] = {}
+    for key in DICTIONARY_COLUMNS:
+        values = columns.get(key)
+        if values is None:
+            continue
+        codes = _dictionary_encode(values)
+        if codes is not None:
+            columns[key], dictionaries[key] = codes
+
+    return {"keys": keys, "columns": columns, "dictionaries": dictionaries}
+
+
+def _dictionary_encode(values: list[Any]) -> Optional[tuple[list[int], list[list[str]]]]:
+    # Only lists of strings, as e.g. [1] and [1.0] or [True] would be considered equal
+    index: dict[tuple[str, ...], int] = {}
+    unique_values: list[list[str]] = []
+    codes: list[int] = []
+    for value in values:
+        if not isinstance(value, list) or not all(type(item) is str for item in value):
+            return None
+        key = tuple(value)
+        code = index.get(key)
+        if code is None:
+            code = index[key] = len(unique_values)
+            unique_values.append(value)
+        codes.append(code)
+    if len(unique_values) == len(values):
+        return None
+    return codes, unique_values
+
+
+def _from_columns(columnar_results: dict[str, Any]) -> list[dict[str, Any]]:
+    keys: list[str] = columnar_results["keys"]
+    columns: dict[str, list[Any]] = columnar_results["columns"]
+    for key, unique_values in columnar_results["dictionaries"].items():
+        # Every row gets its own list, same as when decoding plain JSON
+        columns[key] = [list(unique_values[code]) for code in columns[key]]
+    return [dict(zip(keys, values)) for values in zip(*(columns[key] for key in keys))]
@@ -0,0 +1,137 @@
+import json
+from datetime import datetime, UTC
+from unittest.mock import patch
+
+from django.test import override_settings
+
+from posthog.hogql_queries import query_cache
+from posthog.hogql_queries.query_cache import LocalQueryCache, QueryCacheManager, prefetched_query_cache
+from posthog.test.base import BaseTest
+
+
+class TestLocalQueryCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        self.local_cache = LocalQueryCache(max_size_bytes=100, ttl_seconds=60)
+        patcher = patch.object(LocalQueryCache, "_ensure_subscribed")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_get_returns_copies(self):
+        self.local_cache.set("key", {"results": [{"count": 1}], "last_refresh": "a"}, generation=0)
+
+        response = self.local_cache.get("key")
+        assert response == {"results": [{"count": 1}], "last_refresh": "a"}
+        assert response is not None
+        response["is_cached"] = True
+        response["results"][0]["count"] = 2
+        assert self.local_cache.get("key") == {"results": [{"count": 1}], "last_refresh": "a"}
+
+    def test_evicts_by_size(self):
+        # each of these is 64 bytes as JSON
+        self.local_cache.set("key1", {"last_refresh": "a", "results": "x" * 31}, generation=0)
+        self.local_cache.set("key2", {"last_refresh": "b", "results": "x" * 31}, generation=0)
+        self.local_cache.set("too_big", {"last_refresh": "c", "results": "x" * 200}, generation=0)
+
+        assert self.local_cache.get("key1") is None
+        assert self.local_cache.get("key2") == {"last_refresh": "b", "results": "x" * 31}
+        assert self.local_cache.get("too_big") is None
+
+    def test_invalidation_keeps_entries_of_the_same_calculation(self):
+        self.local_cache.set("key", {"last_refresh": "a"}, generation=0)
+
+        self.local_cache.handle_invalidation_message({"data": json.dumps({"cache_key": "key", "last_refresh": "a"})})
+        assert self.local_cache.get("key") == {"last_refresh": "a"}
+
+        self.local_cache.handle_invalidation_message({"data": json.dumps({"cache_key": "key", "last_refresh": "b"})})
+        assert self.local_cache.get("key") is None
+
+    def test_set_skipped_after_concurrent_invalidation(self):
+        generation = self.local_cache.generation
+        self.local_cache.invalidate("other_key")
+        self.local_cache.set("key", {"last_refresh": "a"}, generation=generation)
+
+        assert self.local_cache.get("key") is None
+
+
+@override_settings(QUERY_CACHE_LOCAL_ENABLED=True)
+class TestLocalQueryCacheSubscription(BaseTest):
+    def test_resubscribing_backs_off_while_redis_is_down(self):
+        local_cache = LocalQueryCache(max_size_bytes=100, ttl_seconds=60)
+
+        with (
+            patch("posthog.hogql_queries.query_cache.redis.get_client", side_effect=ConnectionError) as get_client,
+            patch("posthog.hogql_queries.query_cache.time.monotonic", return_value=1000.0) as monotonic,
+        ):
+            local_cache.get("key")
+            local_cache.get("key")
+            assert get_client.call_count == 1
+
+            monotonic.return_value = 1001.0
+            local_cache.get("key")
+            assert get_client.call_count == 2
+
+            # the next attempt waits twice as long
+            monotonic.return_value = 1002.0
+            local_cache.get("key")
+            assert get_client.call_count == 2
+            monotonic.return_value = 1003.0
+            local_cache.get("key")
+            assert get_client.call_count == 3
+
+
+class TestQueryCacheManagerLocalCache(BaseTest):
+    def setUp(self):
+        super().setUp()
+        query_cache._local_query_cache = None
+        patcher = patch.object(LocalQueryCache, "_ensure_subscribed")
+        patcher.start()
+        self.addCleanup(patcher.stop)
+        self.addCleanup(setattr, query_cache, "_local_query_cache", None)
+
+    def test_reads_are_served_locally_until_written(self):
+        manager = QueryCacheManager(team_id=self.team.pk, cache_key="local_cache_test")
+        manager.set_cache_data(
+            response={"results": [1], "last_refresh": datetime(2024, 1, 1, tzinfo=UTC)}, target_age=None
+        )
+
+        assert manager.get_cache_data() == {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}
+        with patch("posthog.hogql_queries.query_cache.get_safe_cache") as get_safe_cache:
+            assert manager.get_cache_data() == {"results": [1], "last_refresh": "2024-01-01T00:00:00Z"}
+            get_safe_cache.assert_not_called()
+
+        with patch.object(manager.redis_client, "publish") as publish:
+            manager.set_cache_data(
+                response={"results": [2], "last_refresh": datetime(2024, 1, 2, tzinfo=UTC)}, target_age=None
+            )
+        publish.assert_called_once_with(
+            "query_cache_invalidation",
+            json.dumps({"cache_key": "local_cache_test", "last_refresh": "2024-01-02T00:00:00Z"}),
+        )
+        assert manager.get_cache_data() == {"results": [2], "last_refresh": "2024-01-02T00:00:00Z"}
+
+
+class TestPrefetchedQueryCache(BaseTest):
+    def test_lookups_are_served_from_a_single_read(self):
+        QueryCacheManager(team_id=self.team.pk, cache_key="prefetch_1").set_cache_data(
+            response={"results": [1]}, target_age=None
+        )
+        managers = [QueryCacheManager(team_id=self.team.pk, cache_key=key) for key in ("prefetch_1", "prefetch_2")]
+
+        with (
+            patch("posthog.hogql_queries.query_cache.cache.get_many", wraps=query_cache.cache.get_many) as get_many,
+            patch("posthog.hogql_queries.query_cache.get_safe_cache") as get_safe_cache,
+        ):
+            with prefetched_query_cache(["prefetch_1", "prefetch_2", "prefetch_1"]):
+                assert managers[0].get_cache_data() == {"results": [1]}
+                assert managers[1].get_cache_data() is None
+            get_many.assert_called_once_with(["prefetch_1", "prefetch_2"])
+            get_safe_cache.assert_not_called()
+
+    def test_prefetched_results_are_used_once(self):
+        manager = QueryCacheManager(team_id=self.team.pk, cache_key="prefetch_once")
+
+        with prefetched_query_cache(["prefetch_once"]):
+            assert manager.get_cache_data() is None
+            manager.set_cache_data(response={"results": [2]}, target_age=None)
+            assert manager.get_cache_data() == {"results": [2]}
@@ -0,0 +1,80 @@
+from datetime import datetime, timedelta, UTC
+
+import orjson
+import zstd
+from django.test import SimpleTestCase, override_settings
+
+from posthog.cache_utils import OrjsonJsonSerializer
+from posthog.hogql_queries.query_cache_encoding import (
+    ColumnarQueryCacheEncoding,
+    decode_query_response,
+    encode_query_response,
+)
+
+
+def trends_response(series: int = 20, days: int = 30) -> dict:
+    dates = [datetime(2024, 1, 1) + timedelta(days=day) for day in range(days)]
+    return {
+        "results": [
+            {
+                "action": {"id": "$pageview", "type": "events", "order": 0},
+                "breakdown_value": f"value {index}",
+                "count": index * days,
+                "data": [index] * days,
+                "days": [f"{date:%Y-%m-%d}" for date in dates],
+                "labels": [f"{date:%-d-%b-%Y}" for date in dates],
+                "label": f"$pageview - value {index}",
+            }
+            for index in range(series)
+        ],
+        "is_cached": False,
+        "last_refresh": datetime(2024, 2, 1, tzinfo=UTC),
+        "timezone": "UTC",
+    }
+
+
+def plain_json(response: dict) -> dict:
+    return orjson.loads(OrjsonJsonSerializer({}).dumps(response))
+
+
+class TestQueryCacheEncoding(SimpleTestCase):
+    def test_columnar_round_trip(self):
+        response = trends_response()
+
+        encoded = ColumnarQueryCacheEncoding().dumps(response)
+        decoded = decode_query_response(encoded)
+
+        assert decoded == plain_json(response)
+        assert list(decoded) == list(response)
+        assert decoded["results"][0]["days"] is not decoded["results"][1]["days"]
+        assert len(zstd.compress(encoded)) < len(zstd.compress(OrjsonJsonSerializer({}).dumps(response)))
+
+    def test_round_trip_of_results_that_are_not_columnar(self):
+        for results in (
+            [],
+            [[1, "a"], [2, "b"]],
+            [{"a": 1}, {"b": 2}],
+            [{"a": 1, "b": 2}, {"b": 2, "a": 1}],
+            [{"days": ["a"]}, {"days": [1]}, {"days": ["a"]}],
+            [{"days": ["a"]}, {"days": None}],
+            {"not": "a list"},
+        ):
+            response = {"results": results, "hasMore": False}
+            decoded = decode_query_response(ColumnarQueryCacheEncoding().dumps(response))
+            assert decoded == plain_json(response), results
+
+    def test_reads_plain_json(self):
+        response = trends_response(series=2)
+        serialized = OrjsonJsonSerializer({}).dumps(response)
+
+        assert decode_query_response(serialized) == plain_json(response)
+
+    def test_encoding_follows_setting(self):
+        response = trends_response(series=2)
+
+        with override_settings(QUERY_CACHE_ENCODING="json"):
+            assert encode_query_response(response) == OrjsonJsonSerializer({}).dumps(response)
+        with override_settings(QUERY_CACHE_ENCODING="columnar"):
+            encoded = encode_query_response(response)
+            assert encoded.startswith(ColumnarQueryCacheEncoding.magic)
+            assert decode_query_response(encoded) == plain_json(response)
@@ -1,3 +1,4 @@
+import asyncio
 import json
 from enum import StrEnum
 from typing import Any, Optional
@@ -6,6 +7,7 @@ from collections.abc import Callable
 from django.conf import settings
 from kafka import KafkaConsumer as KC
 from kafka import KafkaProducer as KP
+from kafka.errors import KafkaTimeoutError
 from kafka.producer.future import (
     FutureProduceResult,
     FutureRecordMetadata,
@@ -184,6 +186,62 @@ class _KafkaProducer:
         self.producer.flush()
 
 
+class AsyncKafkaProducer:
+    """
+    Wraps a _KafkaProducer so that acks can be awaited on an event loop. kafka-python resolves futures on its sender
+    thread, which hands the result over to the loop, so waiting for acks doesn't hold a thread.
+    """
+
+    def __init__(self, producer: _KafkaProducer):
+        self.producer = producer
+
+    async def produce(
+        self,
+        topic: str,
+        data: Any,
+        key: Any = None,
+        value_serializer: Optional[Callable[[Any], Any]] = None,
+        headers: Optional[list[tuple[str, str]]] = None,
+    ) -> RecordMetadata:
+        future = self.producer.produce(
+            topic=topic, data=data, key=key, value_serializer=value_serializer, headers=headers
+        )
+        return await self.wait_for_ack(future)
+
+    @staticmethod
+    def wait_for_ack(future: FutureRecordMetadata) -> asyncio.Future:
+        loop = asyncio.get_running_loop()
+        ack: asyncio.Future = loop.create_future()
+
+        def set_result(value: Any) -> None:
+            if not ack.done():
+                ack.set_result(value)
+
+        def set_exception(exc: BaseException) -> None:
+            if not ack.done():
+                ack.set_exception(exc)
+
+        # callbacks run on the sender thread, or right away if the future is resolved already
+        future.add_callback(lambda value: loop.call_soon_threadsafe(set_result, value))
+        future.add_errback(lambda exc: loop.call_soon_threadsafe(set_exception, exc))
+        return ack
+
+    async def wait_for_acks(self, futures: list[FutureRecordMetadata], timeout: float) -> None:
+        """Waits for all acks with a single deadline, raising the first error or KafkaTimeoutError"""
+        if not futures:
+            return
+        acks = [self.wait_for_ack(future) for future in futures]
+        done, pending = await asyncio.wait(acks, timeout=timeout, return_when=asyncio.FIRST_EXCEPTION)
+        for ack in pending:
+            ack.cancel()
+        for ack in done:
+            exception = ack.exception()
+            if exception is not None:
+                raise exception
+        if pending:
+            raise KafkaTimeoutError(f"Timed out after {timeout}s waiting for {len(pending)} of {len(acks)} acks")
+
+
 def can_connect():
     """
     This is intended to validate if we are able to connect to kafka, without
@@ -208,6 +266,10 @@ KafkaProducer = SingletonDecorator(_KafkaProducer)
 SessionRecordingKafkaProducer = SingletonDecorator(_KafkaProducer)
 
 
+def async_kafka_producer() -> AsyncKafkaProducer:
+    return AsyncKafkaProducer(KafkaProducer())
+
+
 def session_recording_kafka_producer() -> _KafkaProducer:
     return SessionRecordingKafkaProducer(
         kafka_hosts=settings.SESSION_RECORDING_KAFKA_HOSTS,
@@ -1,9 +1,13 @@
 from unittest.mock import patch
 
 import kafka
+from asgiref.sync import async_to_sync
 from django.test import TestCase, override_settings
+from kafka.errors import KafkaTimeoutError, MessageSizeTooLargeError
+from kafka.producer.future import FutureProduceResult, FutureRecordMetadata
+from kafka.structs import TopicPartition
 
-from posthog.kafka_client.client import _KafkaProducer, build_kafka_consumer
+from posthog.kafka_client.client import AsyncKafkaProducer, _KafkaProducer, build_kafka_consumer
 
 
 @override_settings(TEST=False)
@@ -75,3 +79,44 @@ class KafkaClientTestCase(TestCase):
             producer = _KafkaProducer(test=False)
         for key, value in expected_sasl_config.items():
             self.assertEqual(value, producer.producer.config[key])  # type: ignore
+
+
+def _record_metadata_future(produce_future: FutureProduceResult) -> FutureRecordMetadata:
+    return FutureRecordMetadata(
+        produce_future=produce_future,
+        relative_offset=0,
+        timestamp_ms=0,
+        checksum=0,
+        serialized_key_size=0,
+        serialized_value_size=0,
+        serialized_header_size=0,
+    )
+
+
+class AsyncKafkaProducerTestCase(TestCase):
+    def test_wait_for_acks_of_resolved_futures(self):
+        producer = AsyncKafkaProducer(_KafkaProducer(test=True))
+
+        async def produce_and_wait():
+            futures = [producer.producer.produce(topic="test_topic", data={"index": index}) for index in range(3)]
+            await producer.wait_for_acks(futures, timeout=1)
+            return await producer.produce(topic="test_topic", data={"index": 3})
+
+        metadata = async_to_sync(produce_and_wait)()
+        self.assertEqual(metadata.topic, "test_topic")
+
+    def test_wait_for_acks_times_out(self):
+        producer = AsyncKafkaProducer(_KafkaProducer(test=True))
+        unresolved = _record_metadata_future(FutureProduceResult(topic_partition=TopicPartition("test_topic", 1)))
+
+        with self.assertRaises(KafkaTimeoutError):
+            async_to_sync(producer.wait_for_acks)([unresolved], timeout=0.01)
+
+    def test_wait_for_acks_raises_produce_errors(self):
+        producer = AsyncKafkaProducer(_KafkaProducer(test=True))
+        produce_result = FutureProduceResult(topic_partition=TopicPartition("test_topic", 1))
+        failed = _record_metadata_future(produce_result)
+        produce_result.failure(MessageSizeTooLargeError())
+
+        with self.assertRaises(MessageSizeTooLargeError):
+            async_to_sync(producer.wait_for_acks)([failed], timeout=1)
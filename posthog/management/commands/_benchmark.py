@@ -0,0 +1,96 @@
+"""
+Synthetic events and timers shared by the benchmark_* management commands. Django doesn't load modules starting with
+an underscore as commands.
+"""
+
+import datetime as dt
+import json
+import time
+import uuid
+from collections.abc import Callable, Iterator
+from contextlib import contextmanager
+
+import pyarrow as pa
+
+from posthog.models.utils import UUIDT
+
+
+class Stopwatch:
+    """Adds up the time spent in its `time` blocks, for timing only part of each run."""
+
+    def __init__(self):
+        self.seconds = 0.0
+
+    @contextmanager
+    def time(self) -> Iterator[None]:
+        start = time.perf_counter()
+        try:
+            yield
+        finally:
+            self.seconds += time.perf_counter() - start
+
+
+def time_runs(run: Callable[[], object], runs: int) -> float:
+    """Seconds `run` takes on average over `runs` calls, after one untimed call to warm up."""
+    run()
+    stopwatch = Stopwatch()
+    with stopwatch.time():
+        for _ in range(runs):
+            run()
+    return stopwatch.seconds / runs
+
+
+def synthetic_event_name(index: int) -> str:
+    return "$pageview" if index % 3 else "$autocapture"
+
+
+def synthetic_properties(index: int, property_count: int = 0) -> dict:
+    return {
+        "$current_url": f"https://example.com/page/{index % 100}",
+        "$browser": "Chrome",
+        **{f"property_{key}": f"value {index % (key + 1)}" for key in range(property_count)},
+    }
+
+
+def synthetic_capture_events(event_count: int, distinct_id_count: int) -> list[tuple[dict, UUIDT, str]]:
+    """Events as capture_internal takes them, with their UUIDs and distinct IDs."""
+    events = []
+    for index in range(event_count):
+        distinct_id = f"user-{index % distinct_id_count}"
+        event = {
+            "event": synthetic_event_name(index),
+            "distinct_id": distinct_id,
+            "properties": {
+                **synthetic_properties(index),
+                "$screen_width": 1920,
+                "$elements": [{"tag_name": "a", "attr__href": f"/link/{index}", "nth_child": 2}] * 5,
+            },
+        }
+        events.append((event, UUIDT(), distinct_id))
+    return events
+
+
+def synthetic_events_record_batch(row_count: int, property_count: int) -> pa.RecordBatch:
+    """Events as the batch exports read them from ClickHouse, with properties as JSON strings."""
+    timestamp = dt.datetime(2024, 1, 1, tzinfo=dt.UTC)
+    return pa.RecordBatch.from_pydict(
+        {
+            "uuid": pa.array([str(uuid.uuid4()) for _ in range(row_count)]),
+            "event": pa.array([synthetic_event_name(index) for index in range(row_count)]),
+            "properties": pa.array(
+                [json.dumps(synthetic_properties(index, property_count)) for index in range(row_count)]
+            ),
+            "distinct_id": pa.array([f"user-{index % 1000}" for index in range(row_count)]),
+            "team_id": pa.array([1] * row_count, type=pa.int64()),
+            "elements_chain": pa.array(
+                [
+                    'a:href="/link"nth-child="2"nth-of-type="1";div.container' if index % 3 == 0 else ""
+                    for index in range(row_count)
+                ]
+            ),
+            "timestamp": pa.array(
+                [timestamp + dt.timedelta(milliseconds=index) for index in range(row_count)],
+                type=pa.timestamp("us", tz="UTC"),
+            ),
+        }
+    )
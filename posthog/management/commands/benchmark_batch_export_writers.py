@@ -0,0 +1,68 @@
+import csv
+
+from django.core.management.base import BaseCommand
+
+from posthog.management.commands._benchmark import synthetic_events_record_batch, time_runs
+from posthog.temporal.batch_exports.temporary_file import (
+    BatchExportTemporaryFile,
+    CSVBatchExportWriter,
+    JSONLBatchExportWriter,
+)
+from posthog.temporal.batch_exports.utils import cast_record_batch_json_columns
+
+
+class Command(BaseCommand):
+    help = """
+        Times serializing synthetic events record batches as JSONL row by row and column by column, and as CSV with
+        the csv module and with Arrow. Only measures serializing into a temporary file, not reading from ClickHouse.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Rows per record batch")
+        parser.add_argument("--properties", type=int, default=20, help="Properties per event")
+        parser.add_argument("--runs", type=int, default=10, help="How many record batches to time")
+
+    def handle(self, *args, **options):
+        record_batch = synthetic_events_record_batch(options["rows"], options["properties"])
+        runs = options["runs"]
+
+        async def noop_flush(*args):
+            pass
+
+        jsonl_writer = JSONLBatchExportWriter(max_bytes=0, flush_callable=noop_flush)
+        csv_writer = CSVBatchExportWriter(
+            max_bytes=0,
+            flush_callable=noop_flush,
+            field_names=record_batch.column_names,
+            delimiter="\t",
+            quoting=csv.QUOTE_MINIMAL,
+            escape_char=None,
+        )
+        arrow_csv_writer = CSVBatchExportWriter(
+            max_bytes=0,
+            flush_callable=noop_flush,
+            field_names=record_batch.column_names,
+            delimiter="\t",
+            quoting=csv.QUOTE_MINIMAL,
+            escape_char=None,
+            use_arrow_csv_writer=True,
+        )
+        # The events batch exports parse JSON columns before writing them as JSONL, the PostgreSQL one doesn't
+        jsonl_record_batch = cast_record_batch_json_columns(record_batch)
+
+        self.stdout.write(f"{record_batch.num_rows} rows of {record_batch.nbytes / 1024**2:.1f} MB, {runs} runs")
+        for name, writer, write in [
+            ("jsonl by row", jsonl_writer, lambda: jsonl_writer._write_record_batch_by_row(jsonl_record_batch)),
+            ("jsonl by column", jsonl_writer, lambda: jsonl_writer._write_record_batch(jsonl_record_batch)),
+            ("csv module", csv_writer, lambda: csv_writer._write_record_batch(record_batch)),
+            ("csv arrow", arrow_csv_writer, lambda: arrow_csv_writer._write_record_batch(record_batch)),
+        ]:
+            with BatchExportTemporaryFile() as batch_export_file:
+                writer._batch_export_file = batch_export_file
+                elapsed = time_runs(write, runs)
+                written_megabytes = batch_export_file.bytes_total / (runs + 1) / 1024**2
+
+            self.stdout.write(
+                f"{name:<24} {elapsed * 1000:>10.2f} ms {record_batch.num_rows / elapsed:>12.0f} rows/s"
+                f" {written_megabytes / elapsed:>8.1f} MB/s written"
+            )
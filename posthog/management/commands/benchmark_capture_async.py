@@ -0,0 +1,131 @@
+import asyncio
+import queue
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import contextmanager
+from typing import Any, Optional
+
+from django.core.management.base import BaseCommand
+from django.test import AsyncClient, Client, override_settings
+from kafka.producer.future import FutureProduceResult, FutureRecordMetadata
+from kafka.structs import TopicPartition
+
+from posthog.kafka_client.client import KafkaProducer, KafkaProducerForTests
+from posthog.middleware import CaptureMiddleware
+
+
+class Command(BaseCommand):
+    help = """
+        Load tests /e/ through the middleware with concurrent requests, once with the sync capture view on a pool of
+        worker threads, and once with CAPTURE_ASYNC_ENABLED, where CaptureMiddleware runs async and the requests wait
+        for their acks on the event loop. Without --kafka the events go to a test producer that acks after
+        --ack-latency-ms, like a broker would.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--requests", type=int, default=2000, help="Requests to send")
+        parser.add_argument("--concurrency", type=int, default=100, help="Requests in flight at once")
+        parser.add_argument("--threads", type=int, default=8, help="Worker threads serving the sync view")
+        parser.add_argument("--ack-latency-ms", type=float, default=20, help="Latency of the test producer's acks")
+        parser.add_argument("--kafka", action="store_true", help="Produce to the configured Kafka instead")
+        parser.add_argument("--token", default="phc_benchmark_capture_async", help="Project API token to send")
+
+    def handle(self, *args, **options):
+        # the producer is a singleton, so whichever is created first is used by capture too
+        producer = KafkaProducer(test=not options["kafka"])
+        if not options["kafka"]:
+            producer.producer = _DelayedAckProducer(options["ack_latency_ms"] / 1000)
+
+        requests = options["requests"]
+        body = {"api_key": options["token"], "event": "$pageview", "distinct_id": "benchmark", "properties": {}}
+
+        def post_sync(client: Client) -> int:
+            return client.post("/e/", data=body, content_type="application/json").status_code
+
+        thread_clients = threading.local()
+
+        def post_from_worker_thread(_) -> int:
+            if not hasattr(thread_clients, "client"):
+                thread_clients.client = Client()
+            return post_sync(thread_clients.client)
+
+        def run_sync() -> list[int]:
+            with ThreadPoolExecutor(max_workers=options["threads"]) as executor:
+                return list(executor.map(post_from_worker_thread, range(requests)))
+
+        async def run_async() -> list[int]:
+            client = AsyncClient()
+            in_flight = asyncio.Semaphore(options["concurrency"])
+
+            async def post() -> int:
+                async with in_flight:
+                    response = await client.post("/e/", data=body, content_type="application/json")
+                    return response.status_code
+
+            return await asyncio.gather(*(post() for _ in range(requests)))
+
+        self.stdout.write(
+            f"{requests} requests, {options['threads']} threads sync, {options['concurrency']} in flight async"
+        )
+        self._report("sync", run_sync)
+        # Django decides whether a middleware runs async when it loads the middleware chain, which each client does
+        with override_settings(CAPTURE_ASYNC_ENABLED=True), _async_capture_middleware():
+            self._report("async", lambda: asyncio.run(run_async()))
+
+    def _report(self, name: str, run) -> None:
+        start = time.perf_counter()
+        status_codes = run()
+        seconds = time.perf_counter() - start
+        failed = sum(1 for status_code in status_codes if status_code != 200)
+        self.stdout.write(
+            f"{name:<24} {len(status_codes) / seconds:>10.0f} requests/s"
+            f" {seconds / len(status_codes) * 1000:>10.2f} ms/request {failed:>6} failed"
+        )
+
+
+@contextmanager
+def _async_capture_middleware():
+    sync_capable = CaptureMiddleware.sync_capable
+    CaptureMiddleware.sync_capable = False
+    try:
+        yield
+    finally:
+        CaptureMiddleware.sync_capable = sync_capable
+
+
+class _DelayedAckProducer(KafkaProducerForTests):
+    """
+    KafkaProducerForTests, but acks arrive a fixed latency after each send, from a background thread as they would from
+    kafka-python's sender thread.
+    """
+
+    def __init__(self, latency: float):
+        self.latency = latency
+        self.pending: queue.SimpleQueue[tuple[float, FutureRecordMetadata]] = queue.SimpleQueue()
+        threading.Thread(target=self._ack, daemon=True).start()
+
+    def send(
+        self,
+        topic: str,
+        value: Any,
+        key: Any = None,
+        headers: Optional[list[tuple[str, bytes]]] = None,
+    ):
+        future = FutureRecordMetadata(
+            produce_future=FutureProduceResult(topic_partition=TopicPartition(topic, 1)),
+            relative_offset=0,
+            timestamp_ms=0,
+            checksum=0,
+            serialized_key_size=0,
+            serialized_value_size=0,
+            serialized_header_size=0,
+        )
+        self.pending.put((time.monotonic() + self.latency, future))
+        return future
+
+    def _ack(self) -> None:
+        while True:
+            acked_at, future = self.pending.get()
+            time.sleep(max(0.0, acked_at - time.monotonic()))
+            future.success(None)
@@ -0,0 +1,46 @@
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from posthog.api.capture import capture_batch_internal, capture_internal
+from posthog.kafka_client.client import KafkaProducer
+from posthog.management.commands._benchmark import synthetic_capture_events, time_runs
+
+
+class Command(BaseCommand):
+    help = """
+        Times producing the events of a /batch/ request one by one through capture_internal, and at once through
+        capture_batch_internal, including waiting for the acks. Without --kafka the events go to the test producer,
+        which only measures what capture itself spends per batch.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--events", type=int, default=1000, help="Events per batch")
+        parser.add_argument("--distinct-ids", type=int, default=50, help="Distinct IDs the events are spread over")
+        parser.add_argument("--runs", type=int, default=20, help="How many batches to time")
+        parser.add_argument("--kafka", action="store_true", help="Produce to the configured Kafka instead")
+
+    def handle(self, *args, **options):
+        # the producer is a singleton, so whichever is created first is used by capture too
+        producer = KafkaProducer(test=not options["kafka"])
+        token = "phc_benchmark_capture_batch"
+        events = synthetic_capture_events(options["events"], options["distinct_ids"])
+        runs = options["runs"]
+
+        def produce_one_by_one():
+            now = timezone.now()
+            futures = [
+                capture_internal(event, distinct_id, "127.0.0.1", "http://localhost", now, None, event_uuid, token)
+                for event, event_uuid, distinct_id in events
+            ]
+            for future in futures:
+                future.get(timeout=10)
+
+        def produce_at_once():
+            futures = capture_batch_internal(events, "127.0.0.1", "http://localhost", timezone.now(), None, token)
+            producer.flush(timeout=10)
+            for future in futures:
+                future.get(timeout=10)
+
+        self.stdout.write(f"{len(events)} events over {options['distinct_ids']} distinct IDs, {runs} runs")
+        for name, produce in [("one by one", produce_one_by_one), ("at once", produce_at_once)]:
+            self.stdout.write(f"{name:<24} {time_runs(produce, runs) * 1000:>10.2f} ms")
@@ -0,0 +1,82 @@
+import time
+
+from django.core.management.base import BaseCommand
+
+from posthog.models.feature_flag import FeatureFlag
+from posthog.models.feature_flag.flag_matching import FeatureFlagMatcher, clear_compiled_flag_conditions
+
+OPERATORS = ["exact", "is_not", "icontains", "regex", "gt", "is_set"]
+
+
+class Command(BaseCommand):
+    help = """
+        Times matching many feature flags against properties passed in by the client, with flag conditions parsed on
+        every request as before, and compiled once and reused. Doesn't touch the database.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--flags", type=int, default=500, help="Number of flags of the synthetic team")
+        parser.add_argument("--conditions", type=int, default=2, help="Release conditions per flag")
+        parser.add_argument("--properties", type=int, default=3, help="Property filters per condition")
+        parser.add_argument("--runs", type=int, default=20, help="How many requests to time")
+
+    def handle(self, *args, **options):
+        flags = _synthetic_flags(options["flags"], options["conditions"], options["properties"])
+        overrides = {f"property_{index}": f"value_{index}" for index in range(options["properties"] * 4)}
+        runs = options["runs"]
+
+        def match_all_flags():
+            FeatureFlagMatcher(
+                team_id=1, project_id=1, feature_flags=flags, distinct_id="user", property_value_overrides=overrides
+            ).get_matches_with_details()
+
+        start = time.perf_counter()
+        for _ in range(runs):
+            clear_compiled_flag_conditions()
+            match_all_flags()
+        uncompiled_time = (time.perf_counter() - start) / runs
+
+        match_all_flags()
+        start = time.perf_counter()
+        for _ in range(runs):
+            match_all_flags()
+        compiled_time = (time.perf_counter() - start) / runs
+
+        self.stdout.write(
+            f"{len(flags)} flags, {options['conditions']} conditions of {options['properties']} properties each"
+        )
+        self.stdout.write(f"{'parsed per request':<24} {uncompiled_time * 1000:>10.2f} ms")
+        self.stdout.write(f"{'compiled':<24} {compiled_time * 1000:>10.2f} ms")
+
+
+def _synthetic_flags(flag_count: int, condition_count: int, property_count: int) -> list[FeatureFlag]:
+    return [
+        FeatureFlag(
+            id=flag_index,
+            team_id=1,
+            key=f"flag-{flag_index}",
+            filters={
+                "groups": [
+                    {
+                        "properties": [
+                            _synthetic_property(flag_index + condition_index + property_index, property_count * 4)
+                            for property_index in range(property_count)
+                        ],
+                        "rollout_percentage": 50 if condition_index else None,
+                    }
+                    for condition_index in range(condition_count)
+                ],
+            },
+        )
+        for flag_index in range(flag_count)
+    ]
+
+
+def _synthetic_property(index: int, key_count: int) -> dict:
+    operator = OPERATORS[index % len(OPERATORS)]
+    return {
+        "key": f"property_{index % key_count}",
+        "operator": operator,
+        "value": "1" if operator == "gt" else f"value_{index % 7}",
+        "type": "person",
+    }
@@ -0,0 +1,80 @@
+import ast as python_ast
+import time
+from pathlib import Path
+
+from django.core.management.base import BaseCommand
+
+from posthog.hogql.errors import BaseHogQLError
+from posthog.hogql.parser import RULE_TO_PARSE_FUNCTION
+from posthog.hogql.visitor import clone_expr
+
+QUERY_RUNNERS_PATH = Path(__file__).parents[2] / "hogql_queries"
+
+FUNCTION_TO_RULE = {"parse_expr": "expr", "parse_select": "select", "parse_order_expr": "order_expr"}
+
+
+class Command(BaseCommand):
+    help = """
+        Compares parsing the constant HogQL templates of the query runners in posthog/hogql_queries with cloning their
+        cached trees, which is what a hit in the HOGQL_PARSE_CACHE costs instead.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--backend", choices=["cpp", "python"], default="cpp", help="Parser backend to compare")
+        parser.add_argument("--runs", type=int, default=20, help="How many times to parse and clone each template")
+        parser.add_argument("--top", type=int, default=10, help="How many of the slowest templates to list")
+
+    def handle(self, *args, **options):
+        backend, runs = options["backend"], options["runs"]
+        templates = _query_runner_templates()
+
+        timings = []
+        for location, rule, template in templates:
+            parse = RULE_TO_PARSE_FUNCTION[backend][rule]
+            parse_args = (template, 0) if rule == "expr" else (template,)
+            try:
+                node = parse(*parse_args)
+            except BaseHogQLError:
+                continue
+
+            start = time.perf_counter()
+            for _ in range(runs):
+                parse(*parse_args)
+            parse_time = (time.perf_counter() - start) / runs
+
+            start = time.perf_counter()
+            for _ in range(runs):
+                clone_expr(node)
+            clone_time = (time.perf_counter() - start) / runs
+
+            timings.append((location, parse_time, clone_time))
+
+        total_parse_time = sum(parse_time for _, parse_time, _ in timings)
+        total_clone_time = sum(clone_time for _, _, clone_time in timings)
+        self.stdout.write(f"{len(timings)} templates, {backend} backend, {runs} runs each")
+        self.stdout.write(f"{'template':<72} {'parse ms':>10} {'clone ms':>10}")
+        for location, parse_time, clone_time in sorted(timings, key=lambda timing: -timing[1])[: options["top"]]:
+            self.stdout.write(f"{location:<72} {parse_time * 1000:>10.3f} {clone_time * 1000:>10.3f}")
+        self.stdout.write(f"{'all templates':<72} {total_parse_time * 1000:>10.3f} {total_clone_time * 1000:>10.3f}")
+
+
+def _query_runner_templates() -> list[tuple[str, str, str]]:
+    """Constant strings passed to parse_expr, parse_select and parse_order_expr, as (location, rule, template)."""
+    templates = []
+    for path in sorted(QUERY_RUNNERS_PATH.rglob("*.py")):
+        if "test" in path.relative_to(QUERY_RUNNERS_PATH).parts[:-1] or path.name.startswith("test_"):
+            continue
+        for node in python_ast.walk(python_ast.parse(path.read_text(), filename=str(path))):
+            if not isinstance(node, python_ast.Call) or not node.args:
+                continue
+            function = node.func
+            name = function.id if isinstance(function, python_ast.Name) else getattr(function, "attr", None)
+            template = node.args[0]
+            if (
+                name in FUNCTION_TO_RULE
+                and isinstance(template, python_ast.Constant)
+                and isinstance(template.value, str)
+            ):
+                location = f"{path.relative_to(QUERY_RUNNERS_PATH)}:{node.lineno}"
+                templates.append((location, FUNCTION_TO_RULE[name], template.value))
+    return templates
@@ -0,0 +1,103 @@
+import asyncio
+import csv
+
+import psycopg
+import pyarrow as pa
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+from posthog.management.commands._benchmark import Stopwatch, synthetic_events_record_batch
+from posthog.temporal.batch_exports.postgres_batch_export import PostgreSQLClient
+from posthog.temporal.batch_exports.temporary_file import WriterFormat, get_batch_export_writer
+
+TABLE_NAME = "benchmark_postgres_batch_export_copy"
+TABLE_FIELDS = [
+    ("uuid", "VARCHAR(200)"),
+    ("event", "VARCHAR(200)"),
+    ("properties", "JSONB"),
+    ("distinct_id", "VARCHAR(200)"),
+    ("team_id", "BIGINT"),
+    ("elements_chain", "TEXT"),
+    ("timestamp", "TIMESTAMP WITH TIME ZONE"),
+]
+
+
+class Command(BaseCommand):
+    help = """
+        Times copying synthetic events record batches into PostgreSQL as TSV, like the PostgreSQL batch export does by
+        default, and in PostgreSQL's binary COPY format. Times serializing and copying separately. Copies into a table
+        in the database PostHog is configured with, which is dropped afterwards.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--rows", type=int, default=10_000, help="Rows per record batch")
+        parser.add_argument("--properties", type=int, default=20, help="Properties per event")
+        parser.add_argument("--runs", type=int, default=10, help="How many record batches to copy")
+
+    def handle(self, *args, **options):
+        asyncio.run(self.benchmark(options["rows"], options["properties"], options["runs"]))
+
+    async def benchmark(self, rows: int, properties: int, runs: int):
+        record_batch = synthetic_events_record_batch(rows, properties)
+        record_batch = record_batch.append_column("_inserted_at", record_batch.column("timestamp"))
+        columns = [name for name, _ in TABLE_FIELDS]
+
+        database = settings.DATABASES["default"]
+        client = PostgreSQLClient(
+            user=database["USER"],
+            password=database["PASSWORD"],
+            host=database["HOST"],
+            port=int(database["PORT"]),
+            database=database["NAME"],
+            has_self_signed_cert=False,
+        )
+        # `PostgreSQLClient.connect` requires SSL outside of tests, which a local PostgreSQL usually doesn't have
+        async with await psycopg.AsyncConnection.connect(
+            user=client.user, password=client.password, dbname=client.database, host=client.host, port=client.port
+        ) as connection:
+            client._connection = connection
+
+            self.stdout.write(f"{record_batch.num_rows} rows of {record_batch.nbytes / 1024**2:.1f} MB, {runs} runs")
+            async with client.managed_table("public", TABLE_NAME, TABLE_FIELDS) as table_name:
+                for name, writer_format, writer_kwargs, copy in [
+                    (
+                        "tsv",
+                        WriterFormat.CSV,
+                        {
+                            "field_names": columns,
+                            "delimiter": "\t",
+                            "quoting": csv.QUOTE_MINIMAL,
+                            "escape_char": None,
+                        },
+                        client.copy_tsv_to_postgres,
+                    ),
+                    ("binary", WriterFormat.POSTGRES_BINARY, {"fields": TABLE_FIELDS}, client.copy_binary_to_postgres),
+                ]:
+                    serialize_seconds, copy_seconds = await _time_copies(
+                        record_batch, runs, writer_format, writer_kwargs, copy, table_name, columns
+                    )
+                    total_seconds = serialize_seconds + copy_seconds
+                    self.stdout.write(
+                        f"{name:<24} {serialize_seconds / runs * 1000:>10.2f} ms serializing"
+                        f" {copy_seconds / runs * 1000:>10.2f} ms copying"
+                        f" {record_batch.num_rows * runs / total_seconds:>12.0f} rows/s"
+                    )
+
+
+async def _time_copies(
+    record_batch: pa.RecordBatch, runs: int, writer_format: WriterFormat, writer_kwargs, copy, table_name, columns
+) -> tuple[float, float]:
+    serializing, copying = Stopwatch(), Stopwatch()
+
+    async def copy_on_flush(batch_export_file, *args):
+        with copying.time():
+            await copy(batch_export_file, "public", table_name, columns)
+
+    writer = get_batch_export_writer(writer_format, copy_on_flush, max_bytes=1024**3, **writer_kwargs)
+
+    for _ in range(runs):
+        async with writer.open_temporary_file():
+            with serializing.time():
+                await writer.write_record_batch(record_batch, flush=False)
+
+    return serializing.seconds, copying.seconds
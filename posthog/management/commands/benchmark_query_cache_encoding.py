@@ -0,0 +1,79 @@
+import time
+from datetime import datetime, timedelta, UTC
+
+from django.core.management.base import BaseCommand
+
+from posthog.caching.tolerant_zlib_compressor import TolerantZlibCompressor
+from posthog.hogql_queries.query_cache_encoding import QUERY_CACHE_ENCODINGS, decode_query_response
+from posthog.utils import get_safe_cache
+
+
+class Command(BaseCommand):
+    help = """
+        Compares the size and encoding/decoding time of cached query results in each QUERY_CACHE_ENCODING, using
+        synthetic trends results with many breakdowns, or the results stored under the given cache keys.
+    """
+
+    def add_arguments(self, parser):
+        parser.add_argument("--series", type=int, default=200, help="Number of breakdown series of synthetic results")
+        parser.add_argument("--days", type=int, default=365, help="Number of daily data points per series")
+        parser.add_argument("--runs", type=int, default=20, help="How many times to encode and decode each response")
+        parser.add_argument("--cache-key", action="append", default=[], help="Benchmark a stored result instead")
+
+    def handle(self, *args, **options):
+        responses = {}
+        for cache_key in options["cache_key"]:
+            value = get_safe_cache(cache_key)
+            if not value:
+                self.stderr.write(f"Nothing cached under {cache_key}")
+                continue
+            responses[cache_key] = decode_query_response(value)
+        if not options["cache_key"]:
+            responses[f"trends {options['series']}x{options['days']}"] = _synthetic_trends_response(
+                options["series"], options["days"]
+            )
+
+        runs = options["runs"]
+        self.stdout.write(
+            f"{'response':<24} {'encoding':<16} {'bytes':>12} {'in redis':>12} {'encode ms':>10} {'decode ms':>10}"
+        )
+        for name, response in responses.items():
+            for encoding in QUERY_CACHE_ENCODINGS.values():
+                start = time.perf_counter()
+                for _ in range(runs):
+                    encoded = encoding.dumps(response)
+                encode_time = (time.perf_counter() - start) / runs
+
+                start = time.perf_counter()
+                for _ in range(runs):
+                    encoding.loads(encoded)
+                decode_time = (time.perf_counter() - start) / runs
+
+                # What's stored in Redis, which compresses it if USE_REDIS_COMPRESSION is on
+                compressed = TolerantZlibCompressor({}).compress(encoded)
+                self.stdout.write(
+                    f"{name:<24} {encoding.name:<16} {len(encoded):>12} {len(compressed):>12} "
+                    f"{encode_time * 1000:>10.2f} {decode_time * 1000:>10.2f}"
+                )
+
+
+def _synthetic_trends_response(series: int, days: int) -> dict:
+    dates = [datetime(2024, 1, 1, tzinfo=UTC) + timedelta(days=day) for day in range(days)]
+    return {
+        "results": [
+            {
+                "action": {"id": "$pageview", "type": "events", "order": 0, "name": "$pageview", "math": "total"},
+                "breakdown_value": f"https://example.com/page/{index}",
+                "count": float(index * days),
+                "data": [float((index * 31 + day * 17) % 1000) for day in range(days)],
+                "days": [date.strftime("%Y-%m-%d") for date in dates],
+                "labels": [date.strftime("%-d-%b-%Y") for date in dates],
+                "label": f"$pageview - https://example.com/page/{index}",
+                "filter": {"insight": "TRENDS", "interval": "day", "display": "ActionsLineGraph"},
+            }
+            for index in range(series)
+        ],
+        "is_cached": False,
+        "last_refresh": datetime.now(UTC),
+        "timezone": "UTC",
+    }
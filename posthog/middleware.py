@@ -8,6 +8,7 @@ from loginas.utils import is_impersonated_session, restore_original_login
 from posthog.rbac.user_access_control import UserAccessControl
 from django.shortcuts import redirect
 import structlog
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
 from corsheaders.middleware import CorsMiddleware
 from django.conf import settings
 from django.contrib.sessions.middleware import SessionMiddleware
@@ -25,7 +26,7 @@ from django_prometheus.middleware import (
 from rest_framework import status
 from statshog.defaults.django import statsd
 
-from posthog.api.capture import get_event
+from posthog.api.capture import get_event, get_event_async
 from posthog.api.decide import get_decide
 from posthog.api.shared import UserBasicSerializer
 from posthog.clickhouse.client.execute import clickhouse_query_counter
@@ -422,16 +423,44 @@ class ShortCircuitMiddleware:
         return response
 
 
+CAPTURE_PATHS = (
+    "/e",
+    "/e/",
+    "/i/v0/e",
+    "/i/v0/e/",
+    "/s",
+    "/s/",
+    "/track",
+    "/track/",
+    "/capture",
+    "/capture/",
+    "/batch",
+    "/batch/",
+    "/engage/",
+    "/engage",
+)
+
+
 class CaptureMiddleware:
     """
     Middleware to serve up capture responses. We specifically want to avoid
     doing any unnecessary work in these endpoints as they are hit very
     frequently, and we want to provide the best availability possible, which
     translates to keeping dependencies to a minimum.
+
+    With CAPTURE_ASYNC_ENABLED, Django runs this middleware async, so under ASGI
+    capture requests wait for Kafka on the event loop with get_event_async.
     """
 
+    # Django only runs a middleware async if it can't run sync or the middlewares after it are async too, which ours
+    # aren't, so opting out of sync is what makes it pick __acall__. Everything past this middleware runs in a thread.
+    sync_capable = not settings.CAPTURE_ASYNC_ENABLED
+    async_capable = True
+
     def __init__(self, get_response):
         self.get_response = get_response
+        if iscoroutinefunction(self.get_response):
+            markcoroutinefunction(self)
 
         middlewares: list[Any] = []
         # based on how we're using these middlewares, only middlewares that
@@ -454,58 +483,64 @@ class CaptureMiddleware:
         self.CAPTURE_MIDDLEWARE = middlewares
 
     def __call__(self, request: HttpRequest):
-        if request.path in (
-            "/e",
-            "/e/",
-            "/i/v0/e",
-            "/i/v0/e/",
-            "/s",
-            "/s/",
-            "/track",
-            "/track/",
-            "/capture",
-            "/capture/",
-            "/batch",
-            "/batch/",
-            "/engage/",
-            "/engage",
-        ):
-            try:
-                # :KLUDGE: Manually tag ClickHouse queries as CHMiddleware is skipped
-                tag_queries(
-                    kind="request",
-                    id=request.path,
-                    route_id=resolve(request.path).route,
-                    container_hostname=settings.CONTAINER_HOSTNAME,
-                    http_referer=request.META.get("HTTP_REFERER"),
-                    http_user_agent=request.META.get("HTTP_USER_AGENT"),
-                )
-
-                for middleware in self.CAPTURE_MIDDLEWARE:
-                    middleware.process_request(request)
-
-                # call process_view for PrometheusAfterMiddleware to get the right metrics in place
-                # simulate how django prepares the url
-                resolver_match = resolve(request.path)
-                request.resolver_match = resolver_match
-                for middleware in self.CAPTURE_MIDDLEWARE:
-                    middleware.process_view(
-                        request,
-                        resolver_match.func,
-                        resolver_match.args,
-                        resolver_match.kwargs,
-                    )
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
 
+        if request.path in CAPTURE_PATHS:
+            try:
+                self._before_capture(request)
                 response: HttpResponse = get_event(request)
+                return self._after_capture(request, response)
+            finally:
+                reset_query_tags()
 
-                for middleware in self.CAPTURE_MIDDLEWARE[::-1]:
-                    middleware.process_response(request, response)
+        response = self.get_response(request)
+        return response
 
-                return response
+    async def __acall__(self, request: HttpRequest):
+        if request.path in CAPTURE_PATHS:
+            try:
+                self._before_capture(request)
+                if settings.CAPTURE_ASYNC_ENABLED:
+                    response: HttpResponse = await get_event_async(request)
+                else:
+                    response = await sync_to_async(get_event, thread_sensitive=False)(request)
+                return self._after_capture(request, response)
             finally:
                 reset_query_tags()
 
-        response = self.get_response(request)
+        return await self.get_response(request)
+
+    def _before_capture(self, request: HttpRequest) -> None:
+        # :KLUDGE: Manually tag ClickHouse queries as CHMiddleware is skipped
+        tag_queries(
+            kind="request",
+            id=request.path,
+            route_id=resolve(request.path).route,
+            container_hostname=settings.CONTAINER_HOSTNAME,
+            http_referer=request.META.get("HTTP_REFERER"),
+            http_user_agent=request.META.get("HTTP_USER_AGENT"),
+        )
+
+        for middleware in self.CAPTURE_MIDDLEWARE:
+            middleware.process_request(request)
+
+        # call process_view for PrometheusAfterMiddleware to get the right metrics in place
+        # simulate how django prepares the url
+        resolver_match = resolve(request.path)
+        request.resolver_match = resolver_match
+        for middleware in self.CAPTURE_MIDDLEWARE:
+            middleware.process_view(
+                request,
+                resolver_match.func,
+                resolver_match.args,
+                resolver_match.kwargs,
+            )
+
+    def _after_capture(self, request: HttpRequest, response: HttpResponse) -> HttpResponse:
+        for middleware in self.CAPTURE_MIDDLEWARE[::-1]:
+            middleware.process_response(request, response)
+
         return response
 
 
@@ -0,0 +1,371 @@
+from collections.abc import Iterator
+from dataclasses import dataclass
+from typing import Optional, Union, cast
+
+from django.db import DatabaseError
+from django.db.models import Q
+
+from posthog.database_healthcheck import DATABASE_FOR_FLAG_MATCHING
+from posthog.models.cohort import Cohort, CohortOrEmpty, CohortPeople
+from posthog.models.group import Group
+from posthog.models.person import PersonDistinctId
+from posthog.models.property import GroupTypeName
+from posthog.models.property.property import Property, PropertyGroup, PropertyOperatorType
+from posthog.models.team.team import Team
+from posthog.models.utils import execute_with_timeout
+from posthog.queries.base import match_property
+from posthog.utils import is_valid_regex
+
+from .feature_flag import FeatureFlag, get_feature_flags_for_team_in_cache, set_feature_flags_for_team_in_cache
+from .flag_matching import (
+    ENTITY_EXISTS_PREFIX,
+    FLAG_MATCHING_QUERY_TIMEOUT_MS,
+    PERSON_KEY,
+    FeatureFlagHashKeyOverride,
+    FeatureFlagMatcher,
+    FlagsMatcherCache,
+    add_local_person_and_group_properties,
+    compile_flag_condition,
+    handle_feature_flag_exception,
+)
+
+BULK_FLAG_MATCHING_BATCH_SIZE = 1000
+
+
+@dataclass(frozen=True)
+class BulkFlagMatch:
+    distinct_id: str
+    flags: dict[str, Union[str, bool]]
+    errors_while_computing_flags: bool
+
+
+def get_feature_flags_for_distinct_ids(
+    team: Team,
+    distinct_ids: list[str],
+    groups: Optional[dict[GroupTypeName, str]] = None,
+    flag_keys: Optional[list[str]] = None,
+    batch_size: int = BULK_FLAG_MATCHING_BATCH_SIZE,
+) -> Iterator[BulkFlagMatch]:
+    """
+    Flags of many distinct IDs, as get_all_feature_flags would match them one by one. Persons, hash key overrides,
+    cohort membership and group properties are loaded per batch of distinct IDs, and conditions are matched against
+    what was loaded, as the flag matching query would match them against the same rows. Hash key overrides are only
+    read, never written.
+    """
+    if groups is None:
+        groups = {}
+    feature_flags = get_feature_flags_for_team_in_cache(team.project_id)
+    if feature_flags is None:
+        feature_flags = set_feature_flags_for_team_in_cache(team.project_id)
+    if flag_keys is not None:
+        flag_keys_set = set(flag_keys)
+        feature_flags = [feature_flag for feature_flag in feature_flags if feature_flag.key in flag_keys_set]
+
+    cache = FlagsMatcherCache(team.project_id)
+    cohorts_cache: dict[int, CohortOrEmpty] = {}
+    try:
+        group_properties = _get_group_properties(team, groups, cache)
+    except DatabaseError as e:
+        handle_feature_flag_exception(e, "[Feature Flags] Error loading group properties for bulk matching")
+        group_properties = {}
+
+    for start in range(0, len(distinct_ids), batch_size):
+        yield from _get_feature_flags_for_batch(
+            team,
+            feature_flags,
+            distinct_ids[start : start + batch_size],
+            groups,
+            group_properties,
+            cache,
+            cohorts_cache,
+        )
+
+
+def _get_feature_flags_for_batch(
+    team: Team,
+    feature_flags: list[FeatureFlag],
+    distinct_ids: list[str],
+    groups: dict[GroupTypeName, str],
+    group_properties: dict[str, dict],
+    cache: FlagsMatcherCache,
+    cohorts_cache: dict[int, CohortOrEmpty],
+) -> Iterator[BulkFlagMatch]:
+    skip_database_flags = False
+    person_properties: dict[str, dict] = {}
+    hash_key_overrides: dict[str, dict[str, str]] = {}
+    static_cohort_membership: dict[str, set[int]] = {}
+    try:
+        person_properties, hash_key_overrides = _get_persons(team, feature_flags, distinct_ids)
+        static_cohort_membership = _get_static_cohort_membership(
+            team,
+            feature_flags,
+            [distinct_id for distinct_id in distinct_ids if distinct_id in person_properties],
+            cohorts_cache,
+        )
+    except DatabaseError as e:
+        handle_feature_flag_exception(e, "[Feature Flags] Error loading persons for bulk matching")
+        skip_database_flags = True
+
+    hashes = _calculate_hashes(feature_flags, distinct_ids)
+    for index, distinct_id in enumerate(distinct_ids):
+        property_value_overrides, group_property_value_overrides = add_local_person_and_group_properties(
+            distinct_id, groups, person_properties.get(distinct_id), group_properties
+        )
+        query_conditions = None
+        if not skip_database_flags:
+            try:
+                query_conditions = _evaluate_conditions(
+                    feature_flags,
+                    cache,
+                    property_value_overrides if distinct_id in person_properties else None,
+                    {
+                        group_type: properties if group_type in group_properties else None
+                        for group_type, properties in group_property_value_overrides.items()
+                    },
+                    _CohortMembership(cohorts_cache, static_cohort_membership.get(distinct_id, set())),
+                )
+            except Exception as e:
+                # The matcher falls back to querying, and reports the error if that fails the same way
+                handle_feature_flag_exception(e, "[Feature Flags] Error evaluating conditions for bulk matching")
+        flags, _, _, errors, _ = FeatureFlagMatcher(
+            team.id,
+            team.project_id,
+            feature_flags,
+            distinct_id,
+            groups,
+            cache,
+            hash_key_overrides.get(distinct_id),
+            property_value_overrides,
+            group_property_value_overrides,
+            skip_database_flags,
+            cohorts_cache=cohorts_cache,
+            precomputed_hashes=hashes,
+            precomputed_hash_index=index,
+            precomputed_query_conditions=query_conditions,
+        ).get_matches_with_details()
+        yield BulkFlagMatch(distinct_id=distinct_id, flags=flags, errors_while_computing_flags=errors)
+
+
+def _get_persons(
+    team: Team, feature_flags: list[FeatureFlag], distinct_ids: list[str]
+) -> tuple[dict[str, dict], dict[str, dict[str, str]]]:
+    """Properties and hash key overrides of the persons of the given distinct IDs, by distinct ID."""
+    with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
+        persons = list(
+            PersonDistinctId.objects.db_manager(DATABASE_FOR_FLAG_MATCHING)
+            .filter(team_id=team.id, distinct_id__in=distinct_ids)
+            .values_list("distinct_id", "person_id", "person__properties")
+        )
+
+        overrides_by_person_id: dict[int, dict[str, str]] = {}
+        if any(feature_flag.ensure_experience_continuity for feature_flag in feature_flags):
+            for person_id, feature_flag_key, hash_key in (
+                FeatureFlagHashKeyOverride.objects.db_manager(DATABASE_FOR_FLAG_MATCHING)
+                .filter(team_id=team.id, person_id__in={person_id for _, person_id, _ in persons})
+                .values_list("person_id", "feature_flag_key", "hash_key")
+            ):
+                overrides_by_person_id.setdefault(person_id, {})[feature_flag_key] = hash_key
+
+    person_properties = {distinct_id: properties or {} for distinct_id, _, properties in persons}
+    hash_key_overrides = {
+        distinct_id: overrides_by_person_id[person_id]
+        for distinct_id, person_id, _ in persons
+        if person_id in overrides_by_person_id
+    }
+    return person_properties, hash_key_overrides
+
+
+def _get_static_cohort_membership(
+    team: Team, feature_flags: list[FeatureFlag], distinct_ids: list[str], cohorts_cache: dict[int, CohortOrEmpty]
+) -> dict[str, set[int]]:
+    """
+    The static cohorts the persons of the given distinct IDs are in, by distinct ID, out of those person flags use,
+    directly or in other cohorts. Loads all cohorts of the project into `cohorts_cache` if it's empty.
+    """
+    cohort_ids = [
+        _cohort_id(property)
+        for feature_flag in feature_flags
+        if feature_flag.aggregation_group_type_index is None
+        for condition in [*feature_flag.conditions, *(feature_flag.super_conditions or [])]
+        for property in compile_flag_condition(condition).properties
+        if property.type == "cohort"
+    ]
+    if not cohort_ids or not distinct_ids:
+        return {}
+
+    with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS * 2, DATABASE_FOR_FLAG_MATCHING):
+        if not cohorts_cache:
+            cohorts_cache.update(
+                (cohort.pk, cohort)
+                for cohort in Cohort.objects.db_manager(DATABASE_FOR_FLAG_MATCHING).filter(
+                    team__project_id=team.project_id, deleted=False
+                )
+            )
+
+        static_cohort_ids: set[int] = set()
+        seen_cohort_ids: set[int] = set()
+        while cohort_ids:
+            cohort_id = cohort_ids.pop()
+            cohort = cohorts_cache.get(cohort_id)
+            if cohort_id in seen_cohort_ids or not cohort:
+                continue
+            seen_cohort_ids.add(cohort_id)
+            if cohort.is_static:
+                static_cohort_ids.add(cohort_id)
+            else:
+                cohort_ids.extend(
+                    _cohort_id(property) for property in cohort.properties.flat if property.type == "cohort"
+                )
+        if not static_cohort_ids:
+            return {}
+
+        membership: dict[str, set[int]] = {}
+        for distinct_id, cohort_id in (
+            CohortPeople.objects.db_manager(DATABASE_FOR_FLAG_MATCHING)
+            .filter(
+                cohort_id__in=static_cohort_ids,
+                person__persondistinctid__team_id=team.id,
+                person__persondistinctid__distinct_id__in=distinct_ids,
+            )
+            .values_list("person__persondistinctid__distinct_id", "cohort_id")
+        ):
+            membership.setdefault(distinct_id, set()).add(cohort_id)
+        return membership
+
+
+@dataclass(frozen=True)
+class _CohortMembership:
+    cohorts_cache: dict[int, CohortOrEmpty]
+    static_cohort_ids: set[int]
+
+    def contains(self, cohort_id: int, properties: dict) -> bool:
+        """Whether a person with the given properties is in the cohort, as properties_to_Q would match it."""
+        cohort = self.cohorts_cache.get(cohort_id)
+        if not cohort:
+            return False
+        if cohort.is_static:
+            return cohort_id in self.static_cohort_ids
+        return self._group_matches(cohort.properties, properties)
+
+    def _group_matches(self, property_group: PropertyGroup, properties: dict) -> bool:
+        if not property_group or not property_group.values:
+            return True
+        matches = (
+            self._group_matches(value, properties)
+            if isinstance(value, PropertyGroup)
+            else _property_matches(value, properties, self) != bool(value.negation)
+            for value in property_group.values
+        )
+        return any(matches) if property_group.type == PropertyOperatorType.OR else all(matches)
+
+
+def _evaluate_conditions(
+    feature_flags: list[FeatureFlag],
+    cache: FlagsMatcherCache,
+    person_properties: Optional[dict],
+    group_properties: dict[GroupTypeName, Optional[dict]],
+    cohort_membership: _CohortMembership,
+) -> dict[str, bool]:
+    """
+    What FeatureFlagMatcher.query_conditions would return, from the loaded properties of the person and of the given
+    groups, which are None for those that don't exist. Properties that weren't loaded are not set.
+    """
+    conditions: dict[str, bool] = {f"{ENTITY_EXISTS_PREFIX}{PERSON_KEY}": person_properties is not None}
+    for group_type, properties in group_properties.items():
+        group_type_index = cache.group_types_to_indexes.get(group_type)
+        if group_type_index is not None:
+            conditions[f"{ENTITY_EXISTS_PREFIX}{group_type_index}"] = properties is not None
+
+    for feature_flag in feature_flags:
+        if feature_flag.aggregation_group_type_index is None:
+            properties = person_properties
+        else:
+            group_type = cache.group_type_index_to_name.get(feature_flag.aggregation_group_type_index)
+            properties = group_properties.get(group_type) if group_type is not None else None
+        if properties is None:
+            # The query finds no row, so no condition matches
+            continue
+
+        if feature_flag.super_conditions:
+            condition = feature_flag.super_conditions[0]
+            prop_key = (condition.get("properties") or [{}])[0].get("key")
+            if prop_key:
+                conditions[f"flag_{feature_flag.pk}_super_condition"] = _condition_matches(
+                    condition, properties, cohort_membership
+                )
+                conditions[f"flag_{feature_flag.pk}_super_condition_is_set"] = _condition_matches(
+                    {"properties": [{"key": prop_key, "operator": "is_set"}]}, properties, cohort_membership
+                )
+        for index, condition in enumerate(feature_flag.conditions):
+            if condition.get("properties"):
+                conditions[f"flag_{feature_flag.pk}_condition_{index}"] = _condition_matches(
+                    condition, properties, cohort_membership
+                )
+    return conditions
+
+
+def _condition_matches(condition: dict, properties: dict, cohort_membership: _CohortMembership) -> bool:
+    return all(
+        _property_matches(property, properties, cohort_membership)
+        for property in compile_flag_condition(condition).properties
+    )
+
+
+def _property_matches(property: Property, properties: dict, cohort_membership: _CohortMembership) -> bool:
+    if property.type not in ["person", "group", "cohort", "event"]:
+        raise ValueError(f"Can't match properties of type {property.type!r}")
+    if property.type == "cohort":
+        return cohort_membership.contains(_cohort_id(property), properties)
+    if property.key in properties:
+        return match_property(property, properties)
+    # As properties_to_Q matches properties the row doesn't have: only negated operators match
+    operator = property.operator or "exact"
+    if operator in ("regex", "not_regex") and not is_valid_regex(str(property.value)):
+        return False
+    return operator in ("is_not", "is_not_set") or operator.startswith("not_")
+
+
+def _cohort_id(property: Property) -> int:
+    return int(cast(Union[str, int], property._parse_value(property.value)))
+
+
+def _get_group_properties(
+    team: Team, groups: dict[GroupTypeName, str], cache: FlagsMatcherCache
+) -> dict[GroupTypeName, dict]:
+    group_filter = Q()
+    for group_type, group_key in groups.items():
+        group_type_index = cache.group_types_to_indexes.get(group_type)
+        if group_type_index is not None:
+            group_filter |= Q(group_type_index=group_type_index, group_key=group_key)
+    if not group_filter:
+        return {}
+
+    with execute_with_timeout(FLAG_MATCHING_QUERY_TIMEOUT_MS, DATABASE_FOR_FLAG_MATCHING):
+        rows = (
+            Group.objects.db_manager(DATABASE_FOR_FLAG_MATCHING)
+            .filter(group_filter, team_id=team.id)
+            .values_list("group_type_index", "group_properties")
+        )
+        return {
+            cache.group_type_index_to_name[group_type_index]: properties or {} for group_type_index, properties in rows
+        }
+
+
+def _calculate_hashes(feature_flags: list[FeatureFlag], distinct_ids: list[str]) -> dict[tuple[str, str], list[float]]:
+    """
+    Rollout, variant and holdout hashes of the distinct IDs for every person flag, by prefix and salt, in the order of
+    the distinct IDs. The matcher calculates those of flags hashing a hash key override instead.
+    """
+    hashes: dict[tuple[str, str], list[float]] = {}
+    for feature_flag in feature_flags:
+        if feature_flag.aggregation_group_type_index is not None:
+            # Group flags hash the group key, which is the same for the whole batch
+            continue
+        salts = ["", "variant"] if feature_flag.variants else [""]
+        for salt in salts:
+            hashes[(f"{feature_flag.key}.", salt)] = FeatureFlagMatcher.calculate_hashes(
+                f"{feature_flag.key}.", distinct_ids, salt
+            ).tolist()
+    if any(feature_flag.holdout_conditions for feature_flag in feature_flags):
+        hashes[("holdout-", "")] = FeatureFlagMatcher.calculate_hashes("holdout-", distinct_ids).tolist()
+    return hashes
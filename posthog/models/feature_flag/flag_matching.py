@@ -1,10 +1,14 @@
 import hashlib
+import threading
 from dataclasses import dataclass
 from enum import StrEnum
 import time
+import numpy as np
+import orjson
 import structlog
 from typing import Literal, Optional, Union, cast
 
+from cachetools import LRUCache
 from prometheus_client import Counter
 from django.conf import settings
 from django.db import DatabaseError, IntegrityError
@@ -66,6 +70,12 @@ FLAG_CACHE_HIT_COUNTER = Counter(
     labelnames=[LABEL_TEAM_ID, "cache_hit"],
 )
 
+COMPILED_FLAG_CONDITIONS_CACHE_COUNTER = Counter(
+    "flag_compiled_conditions_cache_total",
+    "Lookups of parsed flag conditions in the per-process cache, by result.",
+    labelnames=["result"],
+)
+
 ENTITY_EXISTS_PREFIX = "flag_entity_exists_"
 PERSON_KEY = "person"
 
@@ -119,6 +129,71 @@ class FeatureFlagDetails:
     description: Optional[str] = None
 
 
+@dataclass(frozen=True)
+class CompiledFlagCondition:
+    """A release condition with its property filters parsed, so that they aren't re-derived from JSON on every request."""
+
+    properties: list[Property]
+    property_keys: frozenset[str]
+    uses_cohorts: bool
+    match_if_entity_doesnt_exist: bool
+
+    def can_compute_locally(self, target_properties: dict) -> bool:
+        return not self.uses_cohorts and self.property_keys <= target_properties.keys()
+
+    def matches_locally(self, target_properties: dict) -> bool:
+        return all(match_property(property, target_properties) for property in self.properties)
+
+
+_compiled_flag_conditions: Optional[LRUCache] = None
+_compiled_flag_conditions_lock = threading.Lock()
+
+
+def _get_compiled_flag_conditions() -> LRUCache:
+    global _compiled_flag_conditions
+    if _compiled_flag_conditions is None:
+        _compiled_flag_conditions = LRUCache(maxsize=settings.DECIDE_COMPILED_FLAG_CONDITIONS_CACHE_SIZE)
+    return _compiled_flag_conditions
+
+
+def clear_compiled_flag_conditions() -> None:
+    with _compiled_flag_conditions_lock:
+        _get_compiled_flag_conditions().clear()
+
+
+def compile_flag_condition(condition: dict) -> CompiledFlagCondition:
+    """
+    Flags are deserialized from the team's flags cache on every request, so compiled conditions are keyed on their
+    contents rather than on the flag, which also means changes to a flag never see a stale condition.
+    """
+    try:
+        cache_key = orjson.dumps(condition, option=orjson.OPT_SORT_KEYS | orjson.OPT_NON_STR_KEYS)
+    except TypeError:
+        return _compile_flag_condition(condition)
+
+    with _compiled_flag_conditions_lock:
+        compiled = _get_compiled_flag_conditions().get(cache_key)
+    if compiled is not None:
+        COMPILED_FLAG_CONDITIONS_CACHE_COUNTER.labels(result="hit").inc()
+        return compiled
+
+    COMPILED_FLAG_CONDITIONS_CACHE_COUNTER.labels(result="miss").inc()
+    compiled = _compile_flag_condition(condition)
+    with _compiled_flag_conditions_lock:
+        _get_compiled_flag_conditions()[cache_key] = compiled
+    return compiled
+
+
+def _compile_flag_condition(condition: dict) -> CompiledFlagCondition:
+    properties = Filter(data=condition).property_groups.flat
+    return CompiledFlagCondition(
+        properties=properties,
+        property_keys=frozenset(property.key for property in properties),
+        uses_cohorts=any(property.type == "cohort" for property in properties),
+        match_if_entity_doesnt_exist=check_pure_is_not_operator_condition(condition),
+    )
+
+
 class FlagsMatcherCache:
     def __init__(self, project_id: int):
         self.project_id = project_id
@@ -160,6 +235,9 @@ class FeatureFlagMatcher:
         group_property_value_overrides: Optional[dict[str, dict[str, Union[str, int]]]] = None,
         skip_database_flags: bool = False,
         cohorts_cache: Optional[dict[int, CohortOrEmpty]] = None,
+        precomputed_hashes: Optional[dict[tuple[str, str], list[float]]] = None,
+        precomputed_hash_index: int = 0,
+        precomputed_query_conditions: Optional[dict[str, bool]] = None,
     ):
         if group_property_value_overrides is None:
             group_property_value_overrides = {}
@@ -179,6 +257,12 @@ class FeatureFlagMatcher:
         self.property_value_overrides = property_value_overrides
         self.group_property_value_overrides = group_property_value_overrides
         self.skip_database_flags = skip_database_flags
+        # calculate_hash results for many distinct IDs by (prefix, salt), for when they were calculated in bulk
+        # beforehand, with this distinct ID's at precomputed_hash_index.
+        self.precomputed_hashes = precomputed_hashes or {}
+        self.precomputed_hash_index = precomputed_hash_index
+        # Used instead of query_conditions, for when conditions were evaluated in bulk beforehand
+        self.precomputed_query_conditions = precomputed_query_conditions
 
         if cohorts_cache is None:
             self.cohorts_cache = {}
@@ -416,24 +500,18 @@ class FeatureFlagMatcher:
     ) -> tuple[bool, FeatureFlagMatchReason]:
         rollout_percentage = condition.get("rollout_percentage")
         if len(condition.get("properties", [])) > 0:
-            properties = Filter(data=condition).property_groups.flat
-            if self.can_compute_locally(properties, feature_flag.aggregation_group_type_index):
+            compiled_condition = compile_flag_condition(condition)
+            target_properties = self._target_properties(feature_flag.aggregation_group_type_index)
+            if compiled_condition.can_compute_locally(target_properties):
                 # :TRICKY: If overrides are enough to determine if a condition is a match,
                 # we can skip checking the query.
                 # This ensures match even if the person hasn't been ingested yet.
-                target_properties = self.property_value_overrides
-                if feature_flag.aggregation_group_type_index is not None:
-                    target_properties = self.group_property_value_overrides.get(
-                        self.cache.group_type_index_to_name[feature_flag.aggregation_group_type_index],
-                        {},
-                    )
-                condition_match = all(match_property(property, target_properties) for property in properties)
+                condition_match = compiled_condition.matches_locally(target_properties)
             else:
-                match_if_entity_doesnt_exist = check_pure_is_not_operator_condition(condition)
                 condition_match = self._condition_matches(
                     feature_flag,
                     condition_index,
-                    match_if_entity_doesnt_exist,
+                    compiled_condition.match_if_entity_doesnt_exist,
                     feature_flag.aggregation_group_type_index,
                 )
 
@@ -498,6 +576,8 @@ class FeatureFlagMatcher:
 
     @cached_property
     def query_conditions(self) -> dict[str, bool]:
+        if self.precomputed_query_conditions is not None:
+            return self.precomputed_query_conditions
         try:
             # Some extra wiggle room here for timeouts because this depends on the number of flags as well,
             # and not just the database query.
@@ -546,7 +626,7 @@ class FeatureFlagMatcher:
                         annotate_query = True
                         nonlocal person_query
 
-                        property_list = Filter(data=condition).property_groups.flat
+                        property_list = compile_flag_condition(condition).properties
                         properties_with_math_operators = get_all_properties_with_math_operators(
                             property_list, self.cohorts_cache, self.project_id
                         )
@@ -668,6 +748,12 @@ class FeatureFlagMatcher:
                             description=f"feature_flag={feature_flag.pk} key={feature_flag.key}",
                         ):
                             for index, condition in enumerate(feature_flag.conditions):
+                                if (
+                                    settings.DECIDE_SKIP_LOCAL_FLAG_CONDITIONS_IN_POSTGRES
+                                    and self._is_condition_computed_locally(feature_flag, condition)
+                                ):
+                                    # is_condition_match never looks these up, so there's no need to query them
+                                    continue
                                 key = f"flag_{feature_flag.pk}_condition_{index}"
                                 condition_eval(key, condition)
 
@@ -729,14 +815,22 @@ class FeatureFlagMatcher:
     # uniformly distributed between 0 and 1, so if we want to show this feature to 20% of traffic
     # we can do _hash(key, identifier) < 0.2
     def get_hash(self, feature_flag: FeatureFlag, salt="") -> float:
-        return self.calculate_hash(f"{feature_flag.key}.", self.hashed_identifier(feature_flag), salt)
+        return self._get_hash(f"{feature_flag.key}.", self.hashed_identifier(feature_flag), salt)
 
     # This function takes a identifier and a feature flag and returns a float between 0 and 1.
     # Given the same identifier and key, it'll always return the same float. These floats are
     # uniformly distributed between 0 and 1, and are keyed only on user's distinct id / group key.
     # Thus, irrespective of the flag, the same user will always get the same value.
     def get_holdout_hash(self, feature_flag: FeatureFlag, salt="") -> float:
-        return self.calculate_hash("holdout-", self.hashed_identifier(feature_flag), salt)
+        return self._get_hash("holdout-", self.hashed_identifier(feature_flag), salt)
+
+    def _get_hash(self, prefix: str, hash_identifier: str | None, salt: str) -> float:
+        # Hashes are only precomputed for distinct IDs, flags may hash a hash key override or group key instead
+        if hash_identifier == self.distinct_id:
+            precomputed_hashes = self.precomputed_hashes.get((prefix, salt))
+            if precomputed_hashes is not None:
+                return precomputed_hashes[self.precomputed_hash_index]
+        return self.calculate_hash(prefix, hash_identifier, salt)
 
     @classmethod
     def calculate_hash(cls, prefix: str, hash_identifier: str | None, salt="") -> float:
@@ -749,16 +843,37 @@ class FeatureFlagMatcher:
         hash_val = int(hashlib.sha1(hash_key.encode("utf-8")).hexdigest()[:15], 16)
         return hash_val / __LONG_SCALE__
 
+    @classmethod
+    def calculate_hashes(cls, prefix: str, hash_identifiers: list[str], salt="") -> np.ndarray:
+        """
+        calculate_hash for many identifiers at once. The first 15 hex digits of a SHA1 digest are its first 8 bytes
+        without the last 4 bits, so the digests can be converted to hashes as one array.
+        """
+        digests = b"".join(
+            hashlib.sha1(f"{prefix}{hash_identifier}{salt}".encode()).digest()[:8]
+            for hash_identifier in hash_identifiers
+        )
+        return (np.frombuffer(digests, dtype=">u8") >> 4) / __LONG_SCALE__
+
+    def _target_properties(self, group_type_index: Optional[GroupTypeIndex]) -> dict:
+        if group_type_index is None:
+            return self.property_value_overrides
+        return self.group_property_value_overrides.get(self.cache.group_type_index_to_name[group_type_index], {})
+
+    def _is_condition_computed_locally(self, feature_flag: FeatureFlag, condition: dict) -> bool:
+        group_type_index = feature_flag.aggregation_group_type_index
+        if not condition.get("properties"):
+            return False
+        if group_type_index is not None and group_type_index not in self.cache.group_type_index_to_name:
+            return False
+        return compile_flag_condition(condition).can_compute_locally(self._target_properties(group_type_index))
+
     def can_compute_locally(
         self,
         properties: list[Property],
         group_type_index: Optional[GroupTypeIndex] = None,
     ) -> bool:
-        target_properties = self.property_value_overrides
-        if group_type_index is not None:
-            target_properties = self.group_property_value_overrides.get(
-                self.cache.group_type_index_to_name[group_type_index], {}
-            )
+        target_properties = self._target_properties(group_type_index)
         for property in properties:
             # can't locally compute if property is a cohort
             # need to atleast fetch the cohort
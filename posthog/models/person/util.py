@@ -1,9 +1,12 @@
 import datetime
 import json
+import time
 from contextlib import ExitStack
+from dataclasses import dataclass
 from typing import Optional, Union
 from uuid import UUID
 
+import structlog
 from zoneinfo import ZoneInfo
 from dateutil.parser import isoparse
 from django.db.models.query import QuerySet
@@ -32,6 +35,8 @@ from posthog.models.team import Team
 from posthog.models.utils import UUIDT
 from posthog.settings import TEST
 
+logger = structlog.get_logger(__name__)
+
 if TEST:
     # :KLUDGE: Hooks are kept around for tests. All other code goes through plugin-server or the other methods explicitly
 
@@ -135,6 +140,32 @@ def create_person(
     timestamp: Optional[Union[datetime.datetime, str]] = None,
     created_at: Optional[datetime.datetime] = None,
 ) -> str:
+    data = _person_data(
+        team_id=team_id,
+        version=version,
+        uuid=uuid,
+        properties=properties,
+        is_identified=is_identified,
+        is_deleted=is_deleted,
+        timestamp=timestamp,
+        created_at=created_at,
+    )
+    p = ClickhouseProducer()
+    p.produce(topic=KAFKA_PERSON, sql=INSERT_PERSON_SQL, data=data, sync=sync)
+    return data["id"]
+
+
+def _person_data(
+    *,
+    team_id: int,
+    version: int,
+    uuid: Optional[str] = None,
+    properties: Optional[dict] = None,
+    is_identified: bool = False,
+    is_deleted: bool = False,
+    timestamp: Optional[Union[datetime.datetime, str]] = None,
+    created_at: Optional[datetime.datetime] = None,
+) -> dict:
     if properties is None:
         properties = {}
     if uuid:
@@ -155,7 +186,7 @@ def create_person(
     else:
         created_at = created_at.astimezone(ZoneInfo("UTC"))
 
-    data = {
+    return {
         "id": str(uuid),
         "team_id": team_id,
         "properties": json.dumps(properties),
@@ -165,9 +196,6 @@ def create_person(
         "version": version,
         "_timestamp": timestamp.strftime("%Y-%m-%d %H:%M:%S"),
     }
-    p = ClickhouseProducer()
-    p.produce(topic=KAFKA_PERSON, sql=INSERT_PERSON_SQL, data=data, sync=sync)
-    return uuid
 
 
 def create_person_distinct_id(
@@ -182,17 +210,23 @@ def create_person_distinct_id(
     p.produce(
         topic=KAFKA_PERSON_DISTINCT_ID,
         sql=INSERT_PERSON_DISTINCT_ID2,
-        data={
-            "distinct_id": distinct_id,
-            "person_id": person_id,
-            "team_id": team_id,
-            "version": version,
-            "is_deleted": int(is_deleted),
-        },
+        data=_person_distinct_id_data(team_id, distinct_id, person_id, version, is_deleted),
         sync=sync,
     )
 
 
+def _person_distinct_id_data(
+    team_id: int, distinct_id: str, person_id: str, version: int = 0, is_deleted: bool = False
+) -> dict:
+    return {
+        "distinct_id": distinct_id,
+        "person_id": person_id,
+        "team_id": team_id,
+        "version": version,
+        "is_deleted": int(is_deleted),
+    }
+
+
 def create_person_override(
     team_id: int,
     old_person_uuid: str,
@@ -274,3 +308,181 @@ def _delete_ch_distinct_id(team_id: int, uuid: UUID, distinct_id: str, version:
         is_deleted=True,
         sync=sync,
     )
+
+
+@dataclass
+class BulkPersonWriterStats:
+    persons: int = 0
+    distinct_ids: int = 0
+    deleted_persons: int = 0
+    flushes: int = 0
+    seconds: float = 0.0
+
+    @property
+    def rows_per_second(self) -> float:
+        rows = self.persons + self.distinct_ids + self.deleted_persons
+        return rows / self.seconds if self.seconds else 0.0
+
+
+class BulkPersonWriter:
+    """
+    Writes persons and distinct IDs in bulk, for loops writing many of them such as imports, demo data and deletions.
+    Writes are buffered and flushed every max_rows rows or max_seconds, whichever comes first. A flush bulk creates the
+    Postgres rows of save_person, loads the distinct IDs of all persons to delete in one query, produces every
+    ClickHouse row and then flushes the producer once, instead of a round trip per row. bulk_create sends no post_save,
+    so a flush produces the ClickHouse rows of the persons it saves itself, the same rows the TEST hooks above write.
+
+        with BulkPersonWriter() as writer:
+            for row in rows:
+                writer.create_person(team_id=team.pk, version=0, properties=row)
+
+    Whatever is still buffered is flushed when the block exits, unless it exits with an exception.
+    """
+
+    def __init__(self, max_rows: int = 10_000, max_seconds: float = 5.0, sync: bool = False):
+        self.max_rows = max_rows
+        self.max_seconds = max_seconds
+        self.sync = sync
+        self.stats = BulkPersonWriterStats()
+
+        self._persons_to_save: list[tuple[Person, list[str]]] = []
+        # a saved person is written as a row per distinct ID too
+        self._persons_to_save_rows = 0
+        self._persons_to_delete: list[Person] = []
+        self._rows: list[tuple[str, str, dict]] = []
+        self._buffered_since: Optional[float] = None
+        self._started_at = time.monotonic()
+
+    def __enter__(self) -> "BulkPersonWriter":
+        self._started_at = time.monotonic()
+        return self
+
+    def __exit__(self, exc_type, exc_value, traceback) -> None:
+        if exc_type is None:
+            self.flush()
+        self.stats.seconds = time.monotonic() - self._started_at
+        logger.info(
+            "bulk_person_writer_finished",
+            persons=self.stats.persons,
+            distinct_ids=self.stats.distinct_ids,
+            deleted_persons=self.stats.deleted_persons,
+            flushes=self.stats.flushes,
+            rows_per_second=round(self.stats.rows_per_second, 1),
+        )
+
+    def create_person(self, **kwargs) -> str:
+        """Buffers what create_person would write to ClickHouse, taking the same arguments."""
+        data = _person_data(**kwargs)
+        self._rows.append((KAFKA_PERSON, INSERT_PERSON_SQL, data))
+        self.stats.persons += 1
+        self._buffered()
+        return data["id"]
+
+    def create_person_distinct_id(
+        self, team_id: int, distinct_id: str, person_id: str, version: int = 0, is_deleted: bool = False
+    ) -> None:
+        self._add_person_distinct_id(team_id, distinct_id, person_id, version, is_deleted)
+        self._buffered()
+
+    def save_person(self, person: Person, distinct_ids: list[str]) -> None:
+        """Buffers an unsaved person and its distinct IDs, which are created in Postgres and in ClickHouse."""
+        self._persons_to_save.append((person, distinct_ids))
+        self._persons_to_save_rows += 1 + len(distinct_ids)
+        self._buffered()
+
+    def delete_person(self, person: Person) -> None:
+        """Buffers what delete_person would write to ClickHouse."""
+        self._persons_to_delete.append(person)
+        self._buffered()
+
+    def flush(self) -> None:
+        if self._persons_to_save:
+            self._save_persons()
+        if self._persons_to_delete:
+            self._delete_persons()
+        if self._rows:
+            producer = ClickhouseProducer()
+            for topic, sql, data in self._rows:
+                producer.produce(topic=topic, sql=sql, data=data, sync=self.sync)
+            if producer.producer is not None:
+                producer.producer.flush()
+            self.stats.flushes += 1
+        self._rows = []
+        self._buffered_since = None
+
+    def _add_person_distinct_id(
+        self, team_id: int, distinct_id: str, person_id: str, version: int = 0, is_deleted: bool = False
+    ) -> None:
+        data = _person_distinct_id_data(team_id, distinct_id, person_id, version, is_deleted)
+        self._rows.append((KAFKA_PERSON_DISTINCT_ID, INSERT_PERSON_DISTINCT_ID2, data))
+        self.stats.distinct_ids += 1
+
+    def _buffered(self) -> None:
+        if self._buffered_since is None:
+            self._buffered_since = time.monotonic()
+        buffered_rows = len(self._rows) + self._persons_to_save_rows + len(self._persons_to_delete)
+        if buffered_rows >= self.max_rows or time.monotonic() - self._buffered_since >= self.max_seconds:
+            self.flush()
+
+    def _save_persons(self) -> None:
+        persons_to_save, self._persons_to_save = self._persons_to_save, []
+        self._persons_to_save_rows = 0
+        persons = Person.objects.bulk_create([person for person, _ in persons_to_save])
+        person_distinct_ids = PersonDistinctId.objects.bulk_create(
+            [
+                PersonDistinctId(team_id=person.team_id, person_id=person.pk, distinct_id=distinct_id)
+                for person, (_, distinct_ids) in zip(persons, persons_to_save)
+                for distinct_id in distinct_ids
+            ]
+        )
+        for person in persons:
+            data = _person_data(
+                team_id=person.team_id,
+                version=person.version or 0,
+                uuid=str(person.uuid),
+                properties=person.properties,
+                is_identified=person.is_identified,
+                created_at=person.created_at,
+            )
+            self._rows.append((KAFKA_PERSON, INSERT_PERSON_SQL, data))
+            self.stats.persons += 1
+        uuids_by_person_id = {person.pk: str(person.uuid) for person in persons}
+        for person_distinct_id in person_distinct_ids:
+            self._add_person_distinct_id(
+                team_id=person_distinct_id.team_id,
+                distinct_id=person_distinct_id.distinct_id,
+                person_id=uuids_by_person_id[person_distinct_id.person_id],
+            )
+
+    def _delete_persons(self) -> None:
+        persons_to_delete, self._persons_to_delete = self._persons_to_delete, []
+        distinct_ids_by_person_id: dict[int, list[tuple[str, int]]] = {}
+        for person_id, distinct_id, version in (
+            PersonDistinctId.objects.db_manager(READ_DB_FOR_PERSONS)
+            .filter(
+                team_id__in={person.team_id for person in persons_to_delete},
+                person_id__in=[person.pk for person in persons_to_delete],
+            )
+            .order_by("id")
+            .values_list("person_id", "distinct_id", "version")
+        ):
+            distinct_ids_by_person_id.setdefault(person_id, []).append((distinct_id, int(version or 0)))
+
+        for person in persons_to_delete:
+            data = _person_data(
+                uuid=str(person.uuid),
+                team_id=person.team_id,
+                version=int(person.version or 0) + 100,  # keep in sync with _delete_person
+                created_at=person.created_at,
+                is_deleted=True,
+            )
+            self._rows.append((KAFKA_PERSON, INSERT_PERSON_SQL, data))
+            self.stats.deleted_persons += 1
+            for distinct_id, version in distinct_ids_by_person_id.get(person.pk, []):
+                self._add_person_distinct_id(
+                    team_id=person.team_id,
+                    distinct_id=distinct_id,
+                    person_id=str(person.uuid),
+                    version=version + 100,
+                    is_deleted=True,
+                )
@@ -3,7 +3,7 @@ from uuid import uuid4
 from posthog.clickhouse.client import sync_execute
 from posthog.models import Person, PersonDistinctId
 from posthog.models.event.util import create_event
-from posthog.models.person.util import delete_person
+from posthog.models.person.util import BulkPersonWriter, delete_person
 from posthog.test.base import BaseTest
 
 
@@ -47,3 +47,51 @@ class TestPerson(BaseTest):
             {"team_id": self.team.pk, "distinct_id": "distinct_id1"},
         )
         self.assertEqual(ch_distinct_ids, [(str(person.uuid), 115, 1)])
+
+    def test_bulk_person_writer(self):
+        person_to_delete = Person.objects.create(team=self.team, version=15)
+        PersonDistinctId.objects.create(team=self.team, person=person_to_delete, distinct_id="deleted", version=3)
+
+        with BulkPersonWriter(max_rows=2) as writer:
+            writer.save_person(Person(team=self.team, properties={"a": 1}), ["saved1", "saved2"])
+            writer.save_person(Person(team=self.team, is_identified=True), ["saved3"])
+            created_uuid = writer.create_person(team_id=self.team.pk, version=1, properties={"b": 2})
+            writer.create_person_distinct_id(self.team.pk, "created", created_uuid, version=1)
+            writer.delete_person(person_to_delete)
+
+        assert writer.stats.persons == 3
+        assert writer.stats.distinct_ids == 5
+        assert writer.stats.deleted_persons == 1
+        assert writer.stats.flushes >= 2
+
+        saved_persons = Person.objects.filter(team=self.team, persondistinctid__distinct_id__in=["saved1", "saved3"])
+        assert sorted(saved_persons.values_list("is_identified", flat=True)) == [False, True]
+        ch_persons = sync_execute(
+            "SELECT toString(id), version, is_deleted FROM person FINAL WHERE team_id = %(team_id)s ORDER BY version",
+            {"team_id": self.team.pk},
+        )
+        assert sorted(ch_persons) == sorted(
+            [
+                *[(str(person.uuid), 0, 0) for person in saved_persons],
+                (created_uuid, 1, 0),
+                (str(person_to_delete.uuid), 115, 1),
+            ]
+        )
+        ch_distinct_ids = sync_execute(
+            "SELECT distinct_id, version, is_deleted FROM person_distinct_id2 FINAL WHERE team_id = %(team_id)s",
+            {"team_id": self.team.pk},
+        )
+        assert sorted(ch_distinct_ids) == [
+            ("created", 1, 0),
+            ("deleted", 103, 1),
+            ("saved1", 0, 0),
+            ("saved2", 0, 0),
+            ("saved3", 0, 0),
+        ]
+
+    def test_bulk_person_writer_counts_distinct_ids_towards_max_rows(self):
+        with BulkPersonWriter(max_rows=3) as writer:
+            writer.save_person(Person(team=self.team), ["first", "second"])
+            # a person and its two distinct IDs are three rows, so saving it filled the buffer
+            assert PersonDistinctId.objects.filter(team=self.team, distinct_id="second").exists()
+            assert writer.stats.flushes == 1
@@ -1,8 +1,10 @@
 import json
 import os
 import re
-from collections.abc import Generator
-from contextlib import contextmanager
+import threading
+import time
+from collections.abc import Generator, Iterator
+from contextlib import ExitStack, contextmanager
 from datetime import UTC, datetime, timedelta
 from json import JSONDecodeError
 from typing import Any, Optional, cast, Literal
@@ -14,6 +16,7 @@ from urllib.parse import urlparse
 
 import posthoganalytics
 import requests
+from requests.adapters import HTTPAdapter
 from django.conf import settings
 from django.contrib.auth.models import AnonymousUser
 from django.core.cache import cache
@@ -60,6 +63,12 @@ from posthog.session_recordings.realtime_snapshots import (
     get_realtime_snapshots,
     publish_subscription,
 )
+from posthog.session_recordings.snapshot_prefetch import (
+    PrefetchedBlob,
+    enqueue_snapshot_prefetch,
+    ensure_not_weak,
+    get_prefetched_blob,
+)
 from posthog.storage import object_storage, session_recording_v2_object_storage
 from posthog.session_recordings.ai_data.ai_regex_schema import AiRegexSchema
 from posthog.session_recordings.ai_data.ai_regex_prompts import AI_REGEX_PROMPTS
@@ -71,7 +80,7 @@ from openai.types.chat import (
     ChatCompletionAssistantMessageParam,
 )
 from posthog.session_recordings.utils import clean_prompt_whitespace
-from posthog.session_recordings.session_recording_v2_service import list_blocks
+from posthog.session_recordings.session_recording_v2_service import list_blocks, list_blocks_cached
 from posthog.storage.session_recording_v2_object_storage import BlockFetchError
 from posthog.exceptions_capture import capture_exception
 
@@ -104,6 +113,8 @@ STREAM_RESPONSE_TO_CLIENT_HISTOGRAM = Histogram(
 
 logger = structlog.get_logger(__name__)
 
+MAX_BLOB_V2_BLOCKS_PER_REQUEST = 100
+
 
 def filter_from_params_to_query(params: dict) -> RecordingsQuery:
     data_dict = query_as_params_to_dict(params)
@@ -286,15 +297,21 @@ def list_recordings_response(
     return response
 
 
-def ensure_not_weak(etag: str) -> str:
-    """
-    minio at least doesn't like weak etags, so we need to strip the W/ prefix if it exists.
-    we don't really care about the semantic difference between a strong and a weak etag here,
-    so we can just strip it.
-    """
-    if etag.startswith("W/"):
-        return etag[2:].lstrip('"').rstrip('"')
-    return etag
+_blob_session: requests.Session | None = None
+_blob_session_lock = threading.Lock()
+
+
+def _get_blob_session() -> requests.Session:
+    """One session per process, so that connections to object storage are kept alive between snapshot requests"""
+    global _blob_session
+    with _blob_session_lock:
+        if _blob_session is None:
+            session = requests.Session()
+            adapter = HTTPAdapter(pool_maxsize=settings.SESSION_RECORDING_BLOB_STREAM_POOL_SIZE)
+            session.mount("http://", adapter)
+            session.mount("https://", adapter)
+            _blob_session = session
+        return _blob_session
 
 
 @contextmanager
@@ -310,13 +327,34 @@ def stream_from(url: str, headers: dict | None = None) -> Generator[requests.Res
     if headers is None:
         headers = {}
 
-    session = requests.Session()
-
+    response = _get_blob_session().get(url, headers=headers, stream=True)
     try:
-        response = session.get(url, headers=headers, stream=True)
         yield response
     finally:
-        session.close()
+        # returns the connection to the pool
+        response.close()
+
+
+class RawBlobStream:
+    """
+    The body of an object storage response, passed through in chunks without decompressing it. Django closes the
+    streaming content once the response is sent or abandoned, which is when the object storage response is closed and
+    the time since `started_at` is recorded in STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.
+    """
+
+    def __init__(self, streaming_response: requests.Response, resources: ExitStack, started_at: float) -> None:
+        self.streaming_response = streaming_response
+        self.resources = resources
+        self.started_at = started_at
+
+    def __iter__(self) -> Iterator[bytes]:
+        return self.streaming_response.raw.stream(
+            settings.SESSION_RECORDING_BLOB_STREAM_CHUNK_SIZE, decode_content=False
+        )
+
+    def close(self) -> None:
+        self.resources.close()
+        STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.observe(time.perf_counter() - self.started_at)
 
 
 class SnapshotsBurstRateThrottle(PersonalApiKeyRateThrottle):
@@ -406,10 +444,9 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             query = filter_from_params_to_query(request.GET.dict())
 
             self._maybe_report_recording_list_filters_changed(request, team=self.team)
-            response = list_recordings_response(
-                list_recordings_from_query(query, cast(User, request.user), team=self.team),
-                context=self.get_serializer_context(),
-            )
+            listed_recordings = list_recordings_from_query(query, cast(User, request.user), team=self.team)
+            enqueue_snapshot_prefetch(self.team, listed_recordings[0])
+            response = list_recordings_response(listed_recordings, context=self.get_serializer_context())
 
             return response
         except CHQueryErrorTooManySimultaneousQueries:
@@ -663,8 +700,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         elif source == "blob":
             return self._stream_blob_to_client(recording, request, event_properties)
         elif source == "blob_v2":
-            blob_key = request.GET.get("blob_key")
-            if blob_key:
+            if request.GET.get("blob_key") or request.GET.get("start_blob_key"):
                 return self._stream_blob_v2_to_client(recording, request, event_properties)
             else:
                 return self._gather_session_recording_sources(recording, is_v2_enabled)
@@ -833,7 +869,7 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
     def _stream_blob_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
-    ) -> HttpResponse:
+    ) -> HttpResponse | StreamingHttpResponse:
         blob_key = request.GET.get("blob_key", "")
         self._validate_blob_key(blob_key)
 
@@ -849,6 +885,11 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             else:
                 blob_prefix = settings.OBJECT_STORAGE_SESSION_RECORDING_BLOB_INGESTION_FOLDER
                 file_key = f"{recording.build_blob_ingestion_storage_path(root_prefix=blob_prefix)}/{blob_key}"
+
+            prefetched_blob = get_prefetched_blob(self.team.pk, file_key)
+            if prefetched_blob:
+                return self._send_prefetched_blob_to_client(prefetched_blob, request, blob_key, event_properties)
+
             url = object_storage.get_presigned_url(file_key, expiration=60)
             if not url:
                 raise exceptions.NotFound("Snapshot file not found")
@@ -861,62 +902,113 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
             event_properties,
         )
 
-        with STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time():
-            # streams the file from S3 to the client
-            # will not decompress the possibly large file because of `stream=True`
-            #
-            # we pass some headers through to the client
-            # particularly we should signal the content-encoding
-            # to help the client know it needs to decompress
-            #
-            # if the client provides an e-tag we can use it to check if the file has changed
-            # object store will respect this and send back 304 if the file hasn't changed,
-            # and we don't need to send the large file over the wire
-
-            if_none_match = request.headers.get("If-None-Match")
-            headers = {}
-            if if_none_match:
-                headers["If-None-Match"] = ensure_not_weak(if_none_match)
-
-            with stream_from(url=url, headers=headers) as streaming_response:
-                streaming_response.raise_for_status()
-
-                response = HttpResponse(content=streaming_response.raw, status=streaming_response.status_code)
-
-                etag = streaming_response.headers.get("ETag")
-                if etag:
-                    response["ETag"] = ensure_not_weak(etag)
-
-                # blobs are immutable, _really_ we can cache forever
-                # but let's cache for an hour since people won't re-watch too often
-                # we're setting cache control and ETag which might be considered overkill,
-                # but it helps avoid network latency from the client to PostHog, then to object storage, and back again
-                # when a client has a fresh copy
-                response["Cache-Control"] = streaming_response.headers.get("Cache-Control") or "max-age=3600"
-
-                response["Content-Type"] = "application/json"
-                response["Content-Disposition"] = "inline"
-
-                return response
+        # streams the file from S3 to the client
+        # will not decompress the possibly large file because of `stream=True`
+        #
+        # we pass some headers through to the client
+        # particularly we should signal the content-encoding
+        # to help the client know it needs to decompress
+        #
+        # if the client provides an e-tag we can use it to check if the file has changed
+        # object store will respect this and send back 304 if the file hasn't changed,
+        # and we don't need to send the large file over the wire
+
+        if_none_match = request.headers.get("If-None-Match")
+        headers = {}
+        if if_none_match:
+            headers["If-None-Match"] = ensure_not_weak(if_none_match)
+
+        if settings.SESSION_RECORDING_BLOB_X_ACCEL_REDIRECT_PREFIX:
+            # the proxy in front of us fetches the blob, passing the client's If-None-Match along
+            response = HttpResponse()
+            response["X-Accel-Redirect"] = (
+                f"{settings.SESSION_RECORDING_BLOB_X_ACCEL_REDIRECT_PREFIX.rstrip('/')}/{url}"
+            )
+            response["Cache-Control"] = "max-age=3600"
+            response["Content-Type"] = "application/json"
+            response["Content-Disposition"] = "inline"
+            return response
+
+        started_at = time.perf_counter()
+        with ExitStack() as resources:
+            streaming_response = resources.enter_context(stream_from(url=url, headers=headers))
+            streaming_response.raise_for_status()
+
+            response = StreamingHttpResponse(
+                streaming_content=RawBlobStream(streaming_response, resources.pop_all(), started_at),
+                status=streaming_response.status_code,
+            )
+
+        etag = streaming_response.headers.get("ETag")
+        if etag:
+            response["ETag"] = ensure_not_weak(etag)
+
+        # blobs are immutable, _really_ we can cache forever
+        # but let's cache for an hour since people won't re-watch too often
+        # we're setting cache control and ETag which might be considered overkill,
+        # but it helps avoid network latency from the client to PostHog, then to object storage, and back again
+        # when a client has a fresh copy
+        response["Cache-Control"] = streaming_response.headers.get("Cache-Control") or "max-age=3600"
+
+        response["Content-Type"] = "application/json"
+        response["Content-Disposition"] = "inline"
+
+        return response
+
+    def _send_prefetched_blob_to_client(
+        self, prefetched_blob: PrefetchedBlob, request: request.Request, blob_key: str, event_properties: dict
+    ) -> HttpResponse:
+        event_properties["source"] = "blob"
+        event_properties["blob_key"] = blob_key
+        event_properties["prefetched"] = True
+        posthoganalytics.capture(
+            self._distinct_id_from_request(request),
+            "session recording snapshots v2 loaded",
+            event_properties,
+        )
+
+        # the same conditional response object storage would have sent for this ETag
+        if_none_match = request.headers.get("If-None-Match")
+        if if_none_match and ensure_not_weak(if_none_match) == prefetched_blob.etag:
+            response = HttpResponse(status=304)
+        else:
+            response = HttpResponse(content=prefetched_blob.content)
+            response["Content-Type"] = "application/json"
+            response["Content-Disposition"] = "inline"
+
+        response["ETag"] = prefetched_blob.etag
+        response["Cache-Control"] = prefetched_blob.cache_control or "max-age=3600"
+        return response
 
     def _stream_blob_v2_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
-    ) -> HttpResponse:
-        """Stream a v2 session recording blob to the client.
+    ) -> StreamingHttpResponse:
+        """Stream v2 session recording blocks to the client.
 
-        The blob_key is the block index in the metadata arrays.
+        The blob_key is the block index in the metadata arrays. Several consecutive blocks can be loaded at once with
+        start_blob_key and end_blob_key (inclusive) instead, and are returned as one JSONL response.
         """
         blob_key = request.GET.get("blob_key", "")
-        if not blob_key:
-            raise exceptions.ValidationError("Must provide a blob key")
+        start_blob_key = request.GET.get("start_blob_key", "")
+        end_blob_key = request.GET.get("end_blob_key", "")
+        if not blob_key and not (start_blob_key and end_blob_key):
+            raise exceptions.ValidationError("Must provide a blob key, or a start and end blob key")
 
         try:
-            block_index = int(blob_key)
+            if blob_key:
+                start_block_index = end_block_index = int(blob_key)
+            else:
+                start_block_index, end_block_index = int(start_blob_key), int(end_blob_key)
         except ValueError:
             raise exceptions.ValidationError("Blob key must be an integer")
 
+        if start_block_index < 0 or end_block_index < start_block_index:
+            raise exceptions.ValidationError("Invalid blob key range")
+        if end_block_index - start_block_index + 1 > MAX_BLOB_V2_BLOCKS_PER_REQUEST:
+            raise exceptions.ValidationError(f"At most {MAX_BLOB_V2_BLOCKS_PER_REQUEST} blocks can be loaded at once")
+
         event_properties["source"] = "blob_v2"
-        event_properties["blob_key"] = blob_key
+        event_properties["blob_key"] = blob_key or f"{start_blob_key}-{end_blob_key}"
         posthoganalytics.capture(
             self._distinct_id_from_request(request),
             "session recording snapshots v2 loaded",
@@ -924,27 +1016,29 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
         )
 
         with STREAM_RESPONSE_TO_CLIENT_HISTOGRAM.time():
-            blocks = list_blocks(recording)
+            blocks = list_blocks_cached(recording, min_block_count=end_block_index + 1)
             if not blocks:
                 raise exceptions.NotFound("Session recording not found")
 
-            if block_index >= len(blocks):
+            if end_block_index >= len(blocks):
                 raise exceptions.NotFound("Block index out of range")
 
-            block = blocks[block_index]
+            block_urls = [blocks[block_index]["url"] for block_index in range(start_block_index, end_block_index + 1)]
+            decompressed_blocks = session_recording_v2_object_storage.client().fetch_blocks(block_urls)
             try:
-                decompressed_block = session_recording_v2_object_storage.client().fetch_block(block["url"])
+                # the first block is read before responding, so that a missing recording is still an error response
+                first_block = next(decompressed_blocks)
             except BlockFetchError:
                 logger.exception(
                     "Failed to fetch block",
                     recording_id=recording.session_id,
                     team_id=self.team.id,
-                    block_index=block_index,
+                    block_index=start_block_index,
                 )
                 raise exceptions.APIException("Failed to load recording block")
 
-            response = HttpResponse(
-                content=decompressed_block,
+            response = StreamingHttpResponse(
+                streaming_content=self._join_blob_v2_blocks(recording, first_block, decompressed_blocks),
                 content_type="application/jsonl",
             )
 
@@ -954,6 +1048,19 @@ class SessionRecordingViewSet(TeamAndOrgViewSetMixin, viewsets.GenericViewSet, U
 
             return response
 
+    def _join_blob_v2_blocks(
+        self, recording: SessionRecording, first_block: str, decompressed_blocks: Iterator[str]
+    ) -> Iterator[str]:
+        yield first_block
+        try:
+            for block in decompressed_blocks:
+                yield "\n"
+                yield block
+        except BlockFetchError:
+            # the response has started already, raising aborts it, so the client doesn't take it as complete
+            logger.exception("Failed to fetch block", recording_id=recording.session_id, team_id=self.team.id)
+            raise
+
     def _send_realtime_snapshots_to_client(
         self, recording: SessionRecording, request: request.Request, event_properties: dict
     ) -> HttpResponse | Response:
@@ -1,12 +1,37 @@
-from datetime import datetime
-from typing import TypedDict
+import threading
+from datetime import datetime, timedelta, UTC
+from typing import Optional, TypedDict
 import structlog
+from cachetools import TTLCache
+from django.core.cache import cache
+from prometheus_client import Counter
 
+from posthog.exceptions_capture import capture_exception
 from posthog.session_recordings.models.session_recording import SessionRecording
 from posthog.session_recordings.queries.session_replay_events_v2_test import SessionReplayEventsV2Test
+from posthog.utils import get_safe_cache
 
 logger = structlog.get_logger(__name__)
 
+BLOCK_MANIFEST_CACHE_COUNTER = Counter(
+    "session_recording_v2_block_manifest_cache_total",
+    "Lookups of the blocks of v2 session recordings in the block manifest cache, by where they were found.",
+    labelnames=["result"],
+)
+
+# Blocks are immutable and only ever appended to a recording, so a manifest only goes stale by missing new blocks
+BLOCK_MANIFEST_TTL_SECONDS = 24 * 60 * 60
+# Recordings with a block in the last hour may still be ongoing
+ONGOING_BLOCK_MANIFEST_TTL_SECONDS = 60
+ONGOING_RECORDING_WINDOW = timedelta(hours=1)
+LOCAL_BLOCK_MANIFEST_CACHE_SIZE = 1024
+LOCAL_BLOCK_MANIFEST_CACHE_TTL_SECONDS = 60
+
+_local_block_manifests: TTLCache = TTLCache(
+    maxsize=LOCAL_BLOCK_MANIFEST_CACHE_SIZE, ttl=LOCAL_BLOCK_MANIFEST_CACHE_TTL_SECONDS
+)
+_local_block_manifests_lock = threading.Lock()
+
 
 class RecordingBlock(TypedDict):
     start_time: datetime
@@ -19,7 +44,58 @@ def list_blocks(recording: SessionRecording) -> list[RecordingBlock]:
     Returns a list of recording blocks with their timestamps and URLs.
     The blocks are sorted by start time and guaranteed to start from the beginning of the recording.
     Returns empty list if the recording is invalid or incomplete.
+    Always reads the metadata from ClickHouse, and refreshes the block manifest cache with the result.
     """
+    blocks = _list_blocks_from_metadata(recording)
+    if blocks:
+        _set_block_manifest(recording, blocks)
+    return blocks
+
+
+def list_blocks_cached(recording: SessionRecording, min_block_count: int = 0) -> list[RecordingBlock]:
+    """
+    Like list_blocks, but served from the block manifest cache when it has at least `min_block_count` blocks. A
+    manifest with fewer blocks may be missing ones that landed since, so the blocks are listed again.
+    """
+    cache_key = _block_manifest_cache_key(recording)
+
+    with _local_block_manifests_lock:
+        blocks: Optional[list[RecordingBlock]] = _local_block_manifests.get(cache_key)
+    if blocks is not None and len(blocks) >= min_block_count:
+        BLOCK_MANIFEST_CACHE_COUNTER.labels(result="local").inc()
+        return blocks
+
+    blocks = get_safe_cache(cache_key)
+    if blocks is not None and len(blocks) >= min_block_count:
+        BLOCK_MANIFEST_CACHE_COUNTER.labels(result="redis").inc()
+        with _local_block_manifests_lock:
+            _local_block_manifests[cache_key] = blocks
+        return blocks
+
+    BLOCK_MANIFEST_CACHE_COUNTER.labels(result="miss").inc()
+    return list_blocks(recording)
+
+
+def _block_manifest_cache_key(recording: SessionRecording) -> str:
+    return f"session_recording_v2_block_manifest:{recording.team_id}:{recording.session_id}"
+
+
+def _set_block_manifest(recording: SessionRecording, blocks: list[RecordingBlock]) -> None:
+    cache_key = _block_manifest_cache_key(recording)
+    last_block_end_time = blocks[-1]["end_time"]
+    if last_block_end_time.tzinfo is None:
+        last_block_end_time = last_block_end_time.replace(tzinfo=UTC)
+    is_ongoing = last_block_end_time > datetime.now(UTC) - ONGOING_RECORDING_WINDOW
+
+    with _local_block_manifests_lock:
+        _local_block_manifests[cache_key] = blocks
+    try:
+        cache.set(cache_key, blocks, ONGOING_BLOCK_MANIFEST_TTL_SECONDS if is_ongoing else BLOCK_MANIFEST_TTL_SECONDS)
+    except Exception as e:
+        capture_exception(e)
+
+
+def _list_blocks_from_metadata(recording: SessionRecording) -> list[RecordingBlock]:
     metadata = SessionReplayEventsV2Test().get_metadata(recording.session_id, recording.team)
     if not metadata:
         return []
@@ -0,0 +1,230 @@
+import time
+from dataclasses import dataclass
+from typing import Optional
+
+import requests
+import structlog
+from django.conf import settings
+from django.core.cache import cache
+from prometheus_client import Counter
+
+from posthog import redis
+from posthog.exceptions_capture import capture_exception
+from posthog.models import Team
+from posthog.session_recordings.models.session_recording import SessionRecording
+from posthog.storage import object_storage
+from posthog.utils import get_safe_cache
+
+logger = structlog.get_logger(__name__)
+
+SNAPSHOT_PREFETCH_COUNTER = Counter(
+    "session_recording_snapshot_prefetch_total",
+    "Blobs the snapshot prefetcher looked at, by what it did with them.",
+    labelnames=["result"],
+)
+
+PREFETCHED_BLOB_CACHE_COUNTER = Counter(
+    "session_recording_prefetched_blob_cache_total",
+    "Lookups of snapshot blobs in the prefetch cache when they are loaded for playback.",
+    labelnames=["result"],
+)
+
+# a listing is usually followed by a few more as filters change, there is no need to queue the same recording again
+PREFETCH_REQUEUE_SECONDS = 60
+PREFETCH_REQUEST_TIMEOUT_SECONDS = 10
+
+# Prefetched blobs by when they were last stored or refreshed, and their sizes, to keep the cache within its budget
+PREFETCHED_BLOBS_KEY = "session_recording_snapshot_prefetch_index:blobs"
+PREFETCHED_BLOB_SIZES_KEY = "session_recording_snapshot_prefetch_index:sizes"
+PREFETCHED_BYTES_KEY = "session_recording_snapshot_prefetch_index:bytes"
+
+# Records a stored blob, forgets blobs that have expired from the cache since, and then evicts the least recently
+# stored ones while over budget. Returns the file keys of the evicted blobs.
+track_prefetched_blob_lua_script = """
+local blobs_key, sizes_key, bytes_key = KEYS[1], KEYS[2], KEYS[3]
+local file_key = ARGV[1]
+local size = tonumber(ARGV[2])
+local now = tonumber(ARGV[3])
+local expired_before = tonumber(ARGV[4])
+local max_bytes = tonumber(ARGV[5])
+
+local function forget(key)
+    local forgotten_size = tonumber(redis.call('HGET', sizes_key, key) or '0')
+    redis.call('HDEL', sizes_key, key)
+    redis.call('ZREM', blobs_key, key)
+    return redis.call('INCRBY', bytes_key, -forgotten_size)
+end
+
+forget(file_key)
+for _, expired in ipairs(redis.call('ZRANGEBYSCORE', blobs_key, '-inf', expired_before)) do
+    forget(expired)
+end
+
+redis.call('HSET', sizes_key, file_key, size)
+redis.call('ZADD', blobs_key, now, file_key)
+local total = redis.call('INCRBY', bytes_key, size)
+
+local evicted = {}
+while total > max_bytes do
+    local oldest = redis.call('ZRANGE', blobs_key, 0, 0)[1]
+    if oldest == nil then
+        break
+    end
+    total = forget(oldest)
+    table.insert(evicted, oldest)
+end
+return evicted
+"""
+
+
+@dataclass(frozen=True)
+class PrefetchedBlob:
+    etag: str
+    content: bytes
+    cache_control: Optional[str]
+
+
+def ensure_not_weak(etag: str) -> str:
+    """
+    minio at least doesn't like weak etags, so we need to strip the W/ prefix if it exists.
+    we don't really care about the semantic difference between a strong and a weak etag here,
+    so we can just strip it.
+    """
+    if etag.startswith("W/"):
+        return etag[2:].lstrip('"').rstrip('"')
+    return etag
+
+
+def is_snapshot_prefetch_enabled(team_id: int) -> bool:
+    return (
+        "*" in settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS
+        or str(team_id) in settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS
+    )
+
+
+def enqueue_snapshot_prefetch(team: Team, recordings: list[SessionRecording]) -> None:
+    """Queues warming the snapshot cache with the first blobs of the top listed recordings, for opted-in teams."""
+    if not is_snapshot_prefetch_enabled(team.id):
+        return
+
+    from posthog.tasks.tasks import prefetch_recording_snapshots
+
+    try:
+        session_ids = [
+            recording.session_id
+            for recording in recordings[: settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_RECORDINGS]
+            if cache.add(
+                f"session_recording_snapshot_prefetch_queued:{team.id}:{recording.session_id}",
+                True,
+                timeout=PREFETCH_REQUEUE_SECONDS,
+            )
+        ]
+        if session_ids:
+            prefetch_recording_snapshots.delay(team.id, session_ids)
+    except Exception as e:
+        # prefetching is best effort, the listing should never fail because of it
+        logger.exception("session_recording_snapshot_prefetch.enqueue_failed", team_id=team.id, error=e)
+        capture_exception(e)
+
+
+def prefetch_recordings(team_id: int, session_ids: list[str]) -> None:
+    persisted_recordings = {
+        recording.session_id: recording
+        for recording in SessionRecording.objects.filter(team_id=team_id, session_id__in=session_ids)
+    }
+    for session_id in session_ids:
+        recording = persisted_recordings.get(session_id) or SessionRecording(session_id=session_id, team_id=team_id)
+        if recording.deleted:
+            continue
+        for file_key in _first_blob_file_keys(recording, settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_BLOBS):
+            prefetch_blob(file_key)
+
+
+def prefetch_blob(file_key: str) -> None:
+    """
+    Downloads the blob into the cache, unless the cached copy still has the blob's ETag, in which case the object store
+    answers with a 304 and the cached copy only has its TTL refreshed.
+    """
+    cache_key = _prefetched_blob_cache_key(file_key)
+    prefetched: Optional[PrefetchedBlob] = get_safe_cache(cache_key)
+
+    url = object_storage.get_presigned_url(file_key, expiration=60)
+    if not url:
+        SNAPSHOT_PREFETCH_COUNTER.labels(result="not_found").inc()
+        return
+
+    headers = {"If-None-Match": prefetched.etag} if prefetched else {}
+    try:
+        with requests.get(url, headers=headers, stream=True, timeout=PREFETCH_REQUEST_TIMEOUT_SECONDS) as response:
+            if response.status_code == 304 and prefetched:
+                cache.touch(cache_key, settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_TTL_SECONDS)
+                _track_prefetched_blob(file_key, len(prefetched.content))
+                SNAPSHOT_PREFETCH_COUNTER.labels(result="not_modified").inc()
+                return
+
+            response.raise_for_status()
+            etag = response.headers.get("ETag")
+            # the raw body, like the one the snapshots API streams to the client
+            content = response.raw.read(settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_BLOB_BYTES + 1)
+            if not etag or len(content) > settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_BLOB_BYTES:
+                SNAPSHOT_PREFETCH_COUNTER.labels(result="skipped").inc()
+                return
+
+            cache.set(
+                cache_key,
+                PrefetchedBlob(
+                    etag=ensure_not_weak(etag), content=content, cache_control=response.headers.get("Cache-Control")
+                ),
+                timeout=settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_TTL_SECONDS,
+            )
+            _track_prefetched_blob(file_key, len(content))
+            SNAPSHOT_PREFETCH_COUNTER.labels(result="downloaded").inc()
+    except requests.RequestException as e:
+        SNAPSHOT_PREFETCH_COUNTER.labels(result="error").inc()
+        logger.warning("session_recording_snapshot_prefetch.download_failed", file_key=file_key, error=e)
+
+
+def get_prefetched_blob(team_id: int, file_key: str) -> Optional[PrefetchedBlob]:
+    if not is_snapshot_prefetch_enabled(team_id):
+        return None
+
+    prefetched: Optional[PrefetchedBlob] = get_safe_cache(_prefetched_blob_cache_key(file_key))
+    PREFETCHED_BLOB_CACHE_COUNTER.labels(result="hit" if prefetched else "miss").inc()
+    return prefetched
+
+
+def _track_prefetched_blob(file_key: str, size: int) -> None:
+    """Keeps the prefetched blobs within SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_TOTAL_BYTES, least recently stored first."""
+    now = time.time()
+    evicted: list[bytes] = redis.get_client().eval(
+        track_prefetched_blob_lua_script,
+        3,
+        PREFETCHED_BLOBS_KEY,
+        PREFETCHED_BLOB_SIZES_KEY,
+        PREFETCHED_BYTES_KEY,
+        file_key,
+        size,
+        now,
+        now - settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_TTL_SECONDS,
+        settings.SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_TOTAL_BYTES,
+    )
+    if evicted:
+        cache.delete_many([_prefetched_blob_cache_key(evicted_key.decode()) for evicted_key in evicted])
+        SNAPSHOT_PREFETCH_COUNTER.labels(result="evicted").inc(len(evicted))
+
+
+def _first_blob_file_keys(recording: SessionRecording, count: int) -> list[str]:
+    if recording.object_storage_path:
+        if recording.storage_version != "2023-08-01":
+            return []
+        blob_prefix = recording.object_storage_path
+    else:
+        blob_prefix = recording.build_blob_ingestion_storage_path()
+
+    file_keys = object_storage.list_objects(blob_prefix) or []
+    # keys end in {first timestamp}-{last timestamp}, optionally with an extension
+    return sorted(file_keys, key=lambda file_key: int(file_key.rsplit("/", 1)[-1].split(".")[0].split("-")[0]))[:count]
+
+
+def _prefetched_blob_cache_key(file_key: str) -> str:
+    return f"session_recording_snapshot_prefetch:{file_key}"
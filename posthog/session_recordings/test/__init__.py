@@ -12,7 +12,7 @@ def setup_stream_from(headers: dict | None = None) -> Mock:
     # Setup status code and content if necessary
     streaming_interaction.status_code = 200
     streaming_interaction.content = b"Example content"
-    streaming_interaction.raw = b"Example content"
+    streaming_interaction.raw.stream = Mock(side_effect=lambda *args, **kwargs: iter([b"Example ", b"content"]))
 
     # Setup headers and the .get method for headers
     streaming_interaction.headers = headers
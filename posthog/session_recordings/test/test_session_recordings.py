@@ -8,6 +8,7 @@ from urllib.parse import urlencode
 
 from dateutil.parser import parse
 from dateutil.relativedelta import relativedelta
+from django.core.cache import cache
 from django.utils.timezone import now
 from freezegun import freeze_time
 from parameterized import parameterized
@@ -27,7 +28,9 @@ from posthog.session_recordings.models.session_recording_event import (
 from posthog.session_recordings.queries.test.session_replay_sql import (
     produce_replay_summary,
 )
+from posthog.session_recordings.snapshot_prefetch import PrefetchedBlob
 from posthog.session_recordings.test import setup_stream_from
+from posthog.storage.session_recording_v2_object_storage import BlockFetchError
 from posthog.test.base import (
     APIBaseTest,
     ClickhouseTestMixin,
@@ -888,8 +891,13 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
 
         mock_presigned_url.side_effect = presigned_url_sideeffect
 
-        response = self.client.get(url)
-        assert response.status_code == status.HTTP_200_OK
+        with patch("posthog.session_recordings.session_recording_api.STREAM_RESPONSE_TO_CLIENT_HISTOGRAM") as histogram:
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            # the time to stream is recorded once the whole body has been sent
+            histogram.observe.assert_not_called()
+            assert b"".join(response.streaming_content) == b"Example content"
+            histogram.observe.assert_called_once()
 
         # default headers if the object store does nothing
         assert response.headers.__dict__ == {
@@ -899,7 +907,6 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
                 "content-disposition": ("Content-Disposition", "inline"),
                 "allow": ("Allow", "GET, HEAD, OPTIONS"),
                 "x-frame-options": ("X-Frame-Options", "SAMEORIGIN"),
-                "content-length": ("Content-Length", "15"),
                 "vary": ("Vary", "Origin"),
                 "x-content-type-options": ("X-Content-Type-Options", "nosniff"),
                 "referrer-policy": ("Referrer-Policy", "same-origin"),
@@ -955,6 +962,155 @@ class TestSessionRecordings(APIBaseTest, ClickhouseTestMixin, QueryMatchingTest)
         assert response.headers.get("etag") == "represents the file contents"  # we don't allow weak etags
         assert response.headers.get("cache-control") == "more specific cache control"
 
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.list_blocks_cached")
+    @patch("posthog.session_recordings.session_recording_api.session_recording_v2_object_storage.client")
+    def test_can_get_several_session_recording_v2_blocks(
+        self,
+        mock_storage_client,
+        mock_list_blocks_cached,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+        mock_list_blocks_cached.return_value = [
+            {"start_time": now(), "end_time": now(), "url": f"s3://bucket/key?range=bytes={index}-{index}"}
+            for index in range(4)
+        ]
+        mock_storage_client.return_value.fetch_blocks.side_effect = lambda urls: (
+            f'{{"block": "{url[-1]}"}}' for url in urls
+        )
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/"
+            f"?source=blob_v2&start_blob_key=1&end_blob_key=3"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        assert b"".join(response.streaming_content).decode().splitlines() == [
+            '{"block": "1"}',
+            '{"block": "2"}',
+            '{"block": "3"}',
+        ]
+        mock_list_blocks_cached.assert_called_once_with(ANY, min_block_count=4)
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/"
+            f"?source=blob_v2&start_blob_key=3&end_blob_key=4"
+        )
+        assert response.status_code == status.HTTP_404_NOT_FOUND
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/"
+            f"?source=blob_v2&start_blob_key=3&end_blob_key=1"
+        )
+        assert response.status_code == status.HTTP_400_BAD_REQUEST
+
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.list_blocks_cached")
+    @patch("posthog.session_recordings.session_recording_api.session_recording_v2_object_storage.client")
+    def test_session_recording_v2_blocks_response_aborts_when_a_later_block_fails(
+        self,
+        mock_storage_client,
+        mock_list_blocks_cached,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+        mock_list_blocks_cached.return_value = [
+            {"start_time": now(), "end_time": now(), "url": f"s3://bucket/key?range=bytes={index}-{index}"}
+            for index in range(2)
+        ]
+
+        def fetch_blocks(urls):
+            yield '{"block": "0"}'
+            raise BlockFetchError("Block content not found")
+
+        mock_storage_client.return_value.fetch_blocks.side_effect = fetch_blocks
+
+        response = self.client.get(
+            f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/"
+            f"?source=blob_v2&start_blob_key=0&end_blob_key=1"
+        )
+
+        assert response.status_code == status.HTTP_200_OK
+        with pytest.raises(BlockFetchError):
+            b"".join(response.streaming_content)
+
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch(
+        "posthog.session_recordings.session_recording_api.object_storage.get_presigned_url",
+        return_value="https://test.com/blob?signature=abc",
+    )
+    @patch("posthog.session_recordings.session_recording_api.stream_from")
+    def test_can_offload_session_recording_blob_to_proxy(
+        self,
+        mock_stream_from,
+        _mock_presigned_url,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        url = f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob&blob_key=1682608337071"
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+
+        with self.settings(SESSION_RECORDING_BLOB_X_ACCEL_REDIRECT_PREFIX="/_blob_proxy/"):
+            response = self.client.get(url)
+
+        assert response.status_code == status.HTTP_200_OK
+        assert response.headers["X-Accel-Redirect"] == "/_blob_proxy/https://test.com/blob?signature=abc"
+        assert response.content == b""
+        mock_stream_from.assert_not_called()
+
+    @patch(
+        "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
+        return_value=True,
+    )
+    @patch("posthog.session_recordings.session_recording_api.SessionRecording.get_or_build")
+    @patch("posthog.session_recordings.session_recording_api.object_storage.get_presigned_url")
+    @patch("posthog.session_recordings.session_recording_api.stream_from")
+    def test_can_get_prefetched_session_recording_blob(
+        self,
+        mock_stream_from,
+        mock_presigned_url,
+        mock_get_session_recording,
+        _mock_exists,
+    ) -> None:
+        session_id = str(uuid.uuid4())
+        blob_key = "1682608337071"
+        url = f"/api/projects/{self.team.pk}/session_recordings/{session_id}/snapshots/?source=blob&blob_key={blob_key}"
+        mock_get_session_recording.return_value = SessionRecording(session_id=session_id, team=self.team, deleted=False)
+        cache.set(
+            f"session_recording_snapshot_prefetch:session_recordings/team_id/{self.team.pk}/session_id/{session_id}/data/{blob_key}",
+            PrefetchedBlob(etag="prefetched-etag", content=b'{"prefetched": true}', cache_control=None),
+        )
+
+        with self.settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS=[str(self.team.pk)]):
+            response = self.client.get(url)
+            assert response.status_code == status.HTTP_200_OK
+            assert response.content == b'{"prefetched": true}'
+            assert response.headers["ETag"] == "prefetched-etag"
+
+            response = self.client.get(url, headers={"If-None-Match": "prefetched-etag"})
+            assert response.status_code == status.HTTP_304_NOT_MODIFIED
+
+        mock_presigned_url.assert_not_called()
+        mock_stream_from.assert_not_called()
+
     @patch(
         "posthog.session_recordings.queries.session_replay_events.SessionReplayEvents.exists",
         return_value=True,
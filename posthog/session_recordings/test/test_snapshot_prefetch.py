@@ -0,0 +1,111 @@
+import itertools
+from unittest.mock import MagicMock, patch
+
+from django.core.cache import cache
+from django.test import override_settings
+
+from posthog import redis
+from posthog.session_recordings.models.session_recording import SessionRecording
+from posthog.session_recordings.snapshot_prefetch import (
+    PREFETCHED_BLOB_SIZES_KEY,
+    PREFETCHED_BLOBS_KEY,
+    PREFETCHED_BYTES_KEY,
+    enqueue_snapshot_prefetch,
+    get_prefetched_blob,
+    prefetch_blob,
+    prefetch_recordings,
+)
+from posthog.test.base import BaseTest
+
+
+def _object_store_response(status_code: int, content: bytes = b"", etag: str | None = None) -> MagicMock:
+    response = MagicMock(status_code=status_code, headers={"ETag": etag} if etag else {})
+    response.__enter__.return_value = response
+    response.raw.read.side_effect = lambda amount: content[:amount]
+    return response
+
+
+@override_settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS=["*"])
+@patch(
+    "posthog.session_recordings.snapshot_prefetch.object_storage.get_presigned_url", return_value="https://test.com/"
+)
+@patch("posthog.session_recordings.snapshot_prefetch.requests.get")
+class TestSnapshotPrefetch(BaseTest):
+    def setUp(self):
+        super().setUp()
+        cache.clear()
+        redis.get_client().delete(PREFETCHED_BLOBS_KEY, PREFETCHED_BLOB_SIZES_KEY, PREFETCHED_BYTES_KEY)
+
+    def test_prefetches_blob(self, mock_get, _mock_presigned_url):
+        mock_get.return_value = _object_store_response(200, b'{"some": "snapshot"}', etag='W/"etag"')
+
+        prefetch_blob("some/file/1-2")
+
+        prefetched = get_prefetched_blob(self.team.pk, "some/file/1-2")
+        assert prefetched is not None
+        assert prefetched.content == b'{"some": "snapshot"}'
+        assert prefetched.etag == "etag"
+        assert mock_get.call_args.kwargs["headers"] == {}
+
+    def test_unchanged_blobs_are_not_downloaded_again(self, mock_get, _mock_presigned_url):
+        mock_get.return_value = _object_store_response(200, b'{"some": "snapshot"}', etag="etag")
+        prefetch_blob("some/file/1-2")
+
+        mock_get.return_value = _object_store_response(304)
+        prefetch_blob("some/file/1-2")
+
+        assert mock_get.call_args.kwargs["headers"] == {"If-None-Match": "etag"}
+        mock_get.return_value.raw.read.assert_not_called()
+        prefetched = get_prefetched_blob(self.team.pk, "some/file/1-2")
+        assert prefetched is not None and prefetched.content == b'{"some": "snapshot"}'
+
+    @override_settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_BLOB_BYTES=5)
+    def test_large_blobs_are_not_prefetched(self, mock_get, _mock_presigned_url):
+        mock_get.return_value = _object_store_response(200, b'{"some": "snapshot"}', etag="etag")
+
+        prefetch_blob("some/file/1-2")
+
+        assert get_prefetched_blob(self.team.pk, "some/file/1-2") is None
+
+    @override_settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_TOTAL_BYTES=50)
+    @patch("posthog.session_recordings.snapshot_prefetch.time.time", side_effect=itertools.count(1000))
+    def test_least_recently_prefetched_blobs_are_evicted_beyond_budget(self, _mock_time, mock_get, _mock_presigned_url):
+        mock_get.return_value = _object_store_response(200, b"x" * 20, etag="etag")
+        for file_key in ("some/file/1-2", "some/file/3-4"):
+            prefetch_blob(file_key)
+        # refreshing the first blob makes the second the least recently prefetched
+        mock_get.return_value = _object_store_response(304)
+        prefetch_blob("some/file/1-2")
+
+        mock_get.return_value = _object_store_response(200, b"x" * 20, etag="etag")
+        prefetch_blob("some/file/5-6")
+
+        assert get_prefetched_blob(self.team.pk, "some/file/1-2") is not None
+        assert get_prefetched_blob(self.team.pk, "some/file/3-4") is None
+        assert get_prefetched_blob(self.team.pk, "some/file/5-6") is not None
+        assert int(redis.get_client().get(PREFETCHED_BYTES_KEY)) == 40
+
+    @override_settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_BLOBS=2)
+    @patch("posthog.session_recordings.snapshot_prefetch.object_storage.list_objects")
+    def test_prefetches_first_blobs_of_recordings(self, mock_list_objects, mock_get, mock_presigned_url):
+        prefix = f"session_recordings/team_id/{self.team.pk}/session_id/a-session/data"
+        mock_list_objects.return_value = [f"{prefix}/30-40", f"{prefix}/1-10", f"{prefix}/11-20"]
+        mock_get.return_value = _object_store_response(200, b"{}", etag="etag")
+
+        prefetch_recordings(self.team.pk, ["a-session"])
+
+        mock_list_objects.assert_called_once_with(prefix)
+        assert [call.args[0] for call in mock_presigned_url.call_args_list] == [f"{prefix}/1-10", f"{prefix}/11-20"]
+
+    @override_settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS=[], SESSION_RECORDING_SNAPSHOT_PREFETCH_RECORDINGS=2)
+    @patch("posthog.tasks.tasks.prefetch_recording_snapshots.delay")
+    def test_enqueues_top_recordings_of_opted_in_teams(self, mock_delay, _mock_get, _mock_presigned_url):
+        recordings = [SessionRecording(session_id=session_id, team=self.team) for session_id in ["a", "b", "c"]]
+
+        enqueue_snapshot_prefetch(self.team, recordings)
+        mock_delay.assert_not_called()
+
+        with self.settings(SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS=[str(self.team.pk)]):
+            enqueue_snapshot_prefetch(self.team, recordings)
+            enqueue_snapshot_prefetch(self.team, recordings)
+        mock_delay.assert_called_once_with(self.team.pk, ["a", "b"])
@@ -1,11 +1,13 @@
+import uuid
 from datetime import datetime
 from unittest.mock import Mock, patch
 
+from django.core.cache import cache
 from django.test import TestCase
 from freezegun import freeze_time
 
 from posthog.session_recordings.models.session_recording import SessionRecording
-from posthog.session_recordings.session_recording_v2_service import list_blocks
+from posthog.session_recordings.session_recording_v2_service import list_blocks, list_blocks_cached
 
 
 class TestSessionRecordingV2Service(TestCase):
@@ -102,3 +104,55 @@ class TestSessionRecordingV2Service(TestCase):
         self.assertEqual(blocks[0]["url"], "s3://bucket/key1")
         self.assertEqual(blocks[1]["url"], "s3://bucket/key3")
         self.assertEqual(blocks[2]["url"], "s3://bucket/key2")
+
+    def _metadata(self, block_count: int) -> dict:
+        return {
+            "block_first_timestamps": [datetime(2024, 1, 1, 12, index) for index in range(block_count)],
+            "block_last_timestamps": [datetime(2024, 1, 1, 12, index, 30) for index in range(block_count)],
+            "block_urls": [f"s3://bucket/key{index}" for index in range(block_count)],
+            "start_time": datetime(2024, 1, 1, 12, 0),
+        }
+
+    @freeze_time("2024-01-01T12:05:00Z")
+    @patch("posthog.session_recordings.session_recording_v2_service.SessionReplayEventsV2Test")
+    def test_list_blocks_cached_reads_metadata_once(self, mock_replay_events):
+        self.recording.session_id = str(uuid.uuid4())
+        mock_replay_events.return_value.get_metadata.return_value = self._metadata(2)
+
+        first = list_blocks_cached(self.recording)
+        second = list_blocks_cached(self.recording, min_block_count=2)
+
+        self.assertEqual(first, second)
+        self.assertEqual(len(second), 2)
+        self.assertEqual(mock_replay_events.return_value.get_metadata.call_count, 1)
+
+    @freeze_time("2024-01-01T12:05:00Z")
+    @patch("posthog.session_recordings.session_recording_v2_service.SessionReplayEventsV2Test")
+    def test_list_blocks_cached_lists_blocks_again_when_new_blocks_are_requested(self, mock_replay_events):
+        self.recording.session_id = str(uuid.uuid4())
+        mock_replay_events.return_value.get_metadata.return_value = self._metadata(2)
+        list_blocks_cached(self.recording)
+
+        mock_replay_events.return_value.get_metadata.return_value = self._metadata(3)
+        blocks = list_blocks_cached(self.recording, min_block_count=3)
+
+        self.assertEqual(len(blocks), 3)
+        self.assertEqual(mock_replay_events.return_value.get_metadata.call_count, 2)
+        self.assertEqual(len(list_blocks_cached(self.recording, min_block_count=3)), 3)
+        self.assertEqual(mock_replay_events.return_value.get_metadata.call_count, 2)
+
+    @freeze_time("2024-01-01T12:05:00Z")
+    @patch("posthog.session_recordings.session_recording_v2_service.SessionReplayEventsV2Test")
+    def test_list_blocks_refreshes_cached_manifest(self, mock_replay_events):
+        self.recording.session_id = str(uuid.uuid4())
+        mock_replay_events.return_value.get_metadata.return_value = self._metadata(1)
+        list_blocks_cached(self.recording)
+
+        mock_replay_events.return_value.get_metadata.return_value = self._metadata(2)
+        list_blocks(self.recording)
+
+        self.assertEqual(len(list_blocks_cached(self.recording)), 2)
+        self.assertEqual(
+            len(cache.get(f"session_recording_v2_block_manifest:1:{self.recording.session_id}")),
+            2,
+        )
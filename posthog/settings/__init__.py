@@ -114,6 +114,22 @@ IN_EVAL_TESTING: bool = get_from_env("DEEPEVAL", False, type_cast=str_to_bool)
 
 HOGQL_INCREASED_MAX_EXECUTION_TIME: int = get_from_env("HOGQL_INCREASED_MAX_EXECUTION_TIME", 600, type_cast=int)
 
+# Per-process cache of built HogQL databases, invalidated by the team's schema version (see hogql/database/schema_version.py)
+HOGQL_DATABASE_CACHE_ENABLED: bool = get_from_env("HOGQL_DATABASE_CACHE_ENABLED", False, type_cast=str_to_bool)
+HOGQL_DATABASE_CACHE_MAX_SIZE: int = get_from_env("HOGQL_DATABASE_CACHE_MAX_SIZE", 256, type_cast=int)
+# Upper bound on staleness for schema changes made outside of Django, e.g. group types created by ingestion
+HOGQL_DATABASE_CACHE_TTL_SECONDS: int = get_from_env("HOGQL_DATABASE_CACHE_TTL_SECONDS", 60, type_cast=int)
+
+# Per-process cache of ClickHouse SQL printed from HogQL, keyed on the query's AST and the team's schema version.
+# Printing also depends on property definitions and materialized columns, which the TTL bounds the staleness of.
+HOGQL_PRINTED_SQL_CACHE_ENABLED: bool = get_from_env("HOGQL_PRINTED_SQL_CACHE_ENABLED", False, type_cast=str_to_bool)
+HOGQL_PRINTED_SQL_CACHE_MAX_SIZE: int = get_from_env("HOGQL_PRINTED_SQL_CACHE_MAX_SIZE", 2048, type_cast=int)
+HOGQL_PRINTED_SQL_CACHE_TTL_SECONDS: int = get_from_env("HOGQL_PRINTED_SQL_CACHE_TTL_SECONDS", 60, type_cast=int)
+
+# Per-process LRU of parsed HogQL, keyed on the source text. Callers always get their own clone of a cached tree.
+HOGQL_PARSE_CACHE_ENABLED: bool = get_from_env("HOGQL_PARSE_CACHE_ENABLED", False, type_cast=str_to_bool)
+HOGQL_PARSE_CACHE_MAX_SIZE: int = get_from_env("HOGQL_PARSE_CACHE_MAX_SIZE", 4096, type_cast=int)
+
 # Extend and override these settings with EE's ones
 if "ee.apps.EnterpriseConfig" in INSTALLED_APPS:
     from ee.settings import *  # noqa: F401, F403
@@ -17,6 +17,22 @@ BUFFER_CONVERSION_SECONDS = get_from_env("BUFFER_CONVERSION_SECONDS", default=60
 # partitioning-related settings below.
 CAPTURE_ALLOW_RANDOM_PARTITIONING = get_from_env("CAPTURE_ALLOW_RANDOM_PARTITIONING", True, type_cast=str_to_bool)
 
+# Produce the analytics events of a capture request as one batch: serialized with orjson, partition keys decided once
+# per key for the whole batch and a single producer flush before waiting on the acks.
+CAPTURE_BATCH_PRODUCE_ENABLED = get_from_env("CAPTURE_BATCH_PRODUCE_ENABLED", False, type_cast=str_to_bool)
+
+# Route capture to the async view, which awaits the Kafka acks on the event loop. Only useful under an ASGI server.
+CAPTURE_ASYNC_ENABLED = get_from_env("CAPTURE_ASYNC_ENABLED", False, type_cast=str_to_bool)
+
+# Inflate and parse gzip capture bodies a chunk and an event at a time, checking the token and dropping events over
+# quota as they are parsed. The decompressed size of a body is capped, as it can't be checked up front like its size.
+CAPTURE_STREAMING_DECOMPRESSION_ENABLED = get_from_env(
+    "CAPTURE_STREAMING_DECOMPRESSION_ENABLED", False, type_cast=str_to_bool
+)
+CAPTURE_STREAMING_MAX_DECOMPRESSED_BYTES = get_from_env(
+    "CAPTURE_STREAMING_MAX_DECOMPRESSED_BYTES", 200 * 1024 * 1024, type_cast=int
+)
+
 # A list of <team_id:distinct_id> pairs (in the format 2:myLovelyId) that we should use
 # random partitioning for when producing events to the Kafka topic consumed by the plugin server.
 # This is a measure to handle hot partitions in ad-hoc cases.
@@ -41,6 +57,20 @@ PARTITION_KEY_BUCKET_CAPACITY = get_from_env("PARTITION_KEY_BUCKET_CAPACITY", ty
 PARTITION_KEY_BUCKET_REPLENTISH_RATE = get_from_env(
     "PARTITION_KEY_BUCKET_REPLENTISH_RATE", type_cast=float, default=1.0
 )
+# Every this many seconds, add up in Redis how many events of each partition key all capture processes took from their
+# buckets, so that keys bursting across processes overflow too. 0 leaves every process with its own bucket only.
+PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS = get_from_env(
+    "PARTITION_KEY_BUCKET_RECONCILE_INTERVAL_SECONDS", type_cast=int, default=0
+)
+# Only keys a process took at least this many events of in an interval are added up, so the rest of the long tail of
+# partition keys stays out of Redis. A key can go unnoticed by up to this many events per process.
+PARTITION_KEY_BUCKET_RECONCILE_MIN_COUNT = get_from_env(
+    "PARTITION_KEY_BUCKET_RECONCILE_MIN_COUNT", type_cast=int, default=100
+)
+# At most this many keys are kept per interval, the ones that took the fewest events are dropped first.
+PARTITION_KEY_BUCKET_RECONCILE_MAX_KEYS = get_from_env(
+    "PARTITION_KEY_BUCKET_RECONCILE_MAX_KEYS", type_cast=int, default=10000
+)
 
 # Overflow configuration for session replay
 REPLAY_OVERFLOW_FORCED_TOKENS = get_set(os.getenv("REPLAY_OVERFLOW_FORCED_TOKENS", ""))
@@ -55,3 +85,7 @@ NEW_ANALYTICS_CAPTURE_EXCLUDED_TEAM_IDS = get_set(os.getenv("NEW_ANALYTICS_CAPTU
 ELEMENT_CHAIN_AS_STRING_EXCLUDED_TEAMS = get_set(os.getenv("ELEMENT_CHAIN_AS_STRING_EXCLUDED_TEAMS", ""))
 
 DROP_EVENTS_BY_TOKEN_DISTINCT_ID = get_from_env("DROP_EVENTS_BY_TOKEN_DISTINCT_ID", None, type_cast=str, optional=True)
+# Also drop the events that EventIngestionRestrictionConfig drops from ingestion in capture, before they reach Kafka.
+CAPTURE_INGESTION_RESTRICTION_CONFIG_ENABLED = get_from_env(
+    "CAPTURE_INGESTION_RESTRICTION_CONFIG_ENABLED", False, type_cast=str_to_bool
+)
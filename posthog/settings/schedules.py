@@ -1,5 +1,5 @@
 from posthog.settings.base_variables import TEST
-from posthog.settings.utils import get_from_env
+from posthog.settings.utils import get_from_env, str_to_bool
 
 USE_PRECALCULATED_CH_COHORT_PEOPLE = not TEST
 
@@ -36,6 +36,15 @@ COUNT_TILES_WITH_NO_FILTERS_HASH_INTERVAL_SECONDS = get_from_env(
 
 
 CACHED_RESULTS_TTL = 7 * 24 * 60 * 60  # how long to keep cached results for
+# Encoding of cached query results written to Redis, "json" or "columnar". Both are always readable, so switching
+# is safe once all processes run a version that knows the encoding.
+QUERY_CACHE_ENCODING = get_from_env("QUERY_CACHE_ENCODING", "json")
+
+# In-process cache of decoded query results in front of Redis, invalidated via Redis pub/sub on writes
+QUERY_CACHE_LOCAL_ENABLED = get_from_env("QUERY_CACHE_LOCAL_ENABLED", False, type_cast=str_to_bool)
+QUERY_CACHE_LOCAL_MAX_SIZE_BYTES = get_from_env("QUERY_CACHE_LOCAL_MAX_SIZE_BYTES", 64 * 1024 * 1024, type_cast=int)
+# Upper bound on how long a result can be served locally, should an invalidation message get lost
+QUERY_CACHE_LOCAL_TTL_SECONDS = get_from_env("QUERY_CACHE_LOCAL_TTL_SECONDS", 60, type_cast=int)
 
 # Schedule to run asynchronous data deletion on. Follows crontab syntax.
 # Use empty string to prevent this
@@ -56,3 +56,34 @@ PLAYLIST_COUNTER_PROCESSING_COOLDOWN_SECONDS = get_from_env(
 PLAYLIST_COUNTER_PROCESSING_PLAYLISTS_LIMIT = get_from_env(
     "PLAYLIST_COUNTER_PROCESSING_PLAYLISTS_LIMIT", 2500, type_cast=int
 )
+
+# teams whose recording listings warm the snapshot cache with the first blobs of the top listed recordings
+# can be a comma separated list of team ids or '*' to allow all teams
+SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS = get_list(get_from_env("SESSION_RECORDING_SNAPSHOT_PREFETCH_TEAMS", ""))
+SESSION_RECORDING_SNAPSHOT_PREFETCH_RECORDINGS = get_from_env(
+    "SESSION_RECORDING_SNAPSHOT_PREFETCH_RECORDINGS", 5, type_cast=int
+)
+SESSION_RECORDING_SNAPSHOT_PREFETCH_BLOBS = get_from_env("SESSION_RECORDING_SNAPSHOT_PREFETCH_BLOBS", 2, type_cast=int)
+# larger blobs are streamed from object storage as before, so the cache holds at most
+# recordings * blobs * max bytes per listing
+SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_BLOB_BYTES = get_from_env(
+    "SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_BLOB_BYTES", 5 * 1024 * 1024, type_cast=int
+)
+SESSION_RECORDING_SNAPSHOT_PREFETCH_TTL_SECONDS = get_from_env(
+    "SESSION_RECORDING_SNAPSHOT_PREFETCH_TTL_SECONDS", 3600, type_cast=int
+)
+# across all teams, the least recently prefetched blobs are evicted beyond this
+SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_TOTAL_BYTES = get_from_env(
+    "SESSION_RECORDING_SNAPSHOT_PREFETCH_MAX_TOTAL_BYTES", 1024 * 1024 * 1024, type_cast=int
+)
+
+# v1 blobs are passed through to the client in chunks of this size,
+# over a pool of up to this many kept-alive connections to object storage per worker
+SESSION_RECORDING_BLOB_STREAM_CHUNK_SIZE = get_from_env(
+    "SESSION_RECORDING_BLOB_STREAM_CHUNK_SIZE", 64 * 1024, type_cast=int
+)
+SESSION_RECORDING_BLOB_STREAM_POOL_SIZE = get_from_env("SESSION_RECORDING_BLOB_STREAM_POOL_SIZE", 10, type_cast=int)
+# when set, v1 blobs are not streamed through the worker at all, the response hands the presigned URL to the proxy
+# in front of us with an X-Accel-Redirect to {prefix}/{presigned url}. e.g. for nginx and a prefix of /_blob_proxy
+#   location ~ ^/_blob_proxy/(.*)$ { internal; proxy_pass $1$is_args$args; }
+SESSION_RECORDING_BLOB_X_ACCEL_REDIRECT_PREFIX = get_from_env("SESSION_RECORDING_BLOB_X_ACCEL_REDIRECT_PREFIX", "")
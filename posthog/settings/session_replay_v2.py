@@ -28,3 +28,12 @@ SESSION_RECORDING_V2_S3_REGION = os.getenv("SESSION_RECORDING_V2_S3_REGION", "us
 SESSION_RECORDING_V2_S3_BUCKET = os.getenv("SESSION_RECORDING_V2_S3_BUCKET", "posthog")
 SESSION_RECORDING_V2_S3_PREFIX = os.getenv("SESSION_RECORDING_V2_S3_PREFIX", "session_recordings_v2")
 SESSION_RECORDING_V2_S3_LTS_PREFIX = os.getenv("SESSION_RECORDING_V2_S3_LTS_PREFIX", "session_recordings_v2_lts")
+
+# Blocks of a recording are read with up to this many concurrent requests, and adjacent blocks of the same file are
+# read together in ranges of up to this many bytes
+SESSION_RECORDING_V2_BLOCK_FETCH_MAX_WORKERS = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_FETCH_MAX_WORKERS", 8, type_cast=int
+)
+SESSION_RECORDING_V2_BLOCK_FETCH_MAX_RANGE_BYTES = get_from_env(
+    "SESSION_RECORDING_V2_BLOCK_FETCH_MAX_RANGE_BYTES", 16 * 1024 * 1024, type_cast=int
+)
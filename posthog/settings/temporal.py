@@ -1,6 +1,6 @@
 import os
 
-from posthog.settings.utils import get_from_env, get_list
+from posthog.settings.utils import get_from_env, get_list, str_to_bool
 
 TEMPORAL_NAMESPACE: str = os.getenv("TEMPORAL_NAMESPACE", "default")
 TEMPORAL_TASK_QUEUE: str = os.getenv("TEMPORAL_TASK_QUEUE", "general-purpose-task-queue")
@@ -22,6 +22,8 @@ BATCH_EXPORT_S3_UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024 * 50  # 50MB
 BATCH_EXPORT_S3_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES: int = get_from_env(
     "BATCH_EXPORT_S3_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES", 0, type_cast=int
 )
+# Parts of a multipart upload uploaded while the next one is written, 0 uploads every part before writing the next
+BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS: int = get_from_env("BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS", 0, type_cast=int)
 
 BATCH_EXPORT_SNOWFLAKE_UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024 * 100  # 100MB
 BATCH_EXPORT_SNOWFLAKE_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES: int = get_from_env(
@@ -32,6 +34,12 @@ BATCH_EXPORT_POSTGRES_UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024 * 50  # 50MB
 BATCH_EXPORT_POSTGRES_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES: int = get_from_env(
     "BATCH_EXPORT_POSTGRES_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES", 1024 * 1024 * 300, type_cast=int
 )
+BATCH_EXPORT_POSTGRES_ARROW_CSV_WRITER_ENABLED: bool = get_from_env(
+    "BATCH_EXPORT_POSTGRES_ARROW_CSV_WRITER_ENABLED", False, type_cast=str_to_bool
+)
+BATCH_EXPORT_POSTGRES_BINARY_COPY_ENABLED: bool = get_from_env(
+    "BATCH_EXPORT_POSTGRES_BINARY_COPY_ENABLED", False, type_cast=str_to_bool
+)
 
 BATCH_EXPORT_BIGQUERY_UPLOAD_CHUNK_SIZE_BYTES: int = 1024 * 1024 * 100  # 100MB
 BATCH_EXPORT_BIGQUERY_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES: int = get_from_env(
@@ -48,6 +56,10 @@ BATCH_EXPORT_HTTP_UPLOAD_CHUNK_SIZE_BYTES: int = get_from_env(
 )
 BATCH_EXPORT_HTTP_BATCH_SIZE: int = get_from_env("BATCH_EXPORT_HTTP_BATCH_SIZE", 5000, type_cast=int)
 
+# How many sub-ranges of each interval the batch export producer queries concurrently, for queries that can be split
+# into sub-ranges without changing which rows they select, see `can_split_query_range`
+BATCH_EXPORT_PRODUCER_CONCURRENT_RANGES: int = get_from_env("BATCH_EXPORT_PRODUCER_CONCURRENT_RANGES", 1, type_cast=int)
+
 BATCH_EXPORT_BUFFER_QUEUE_MAX_SIZE_BYTES: int = 1024 * 1024 * 300  # 300MB
 
 BATCH_EXPORT_HEARTBEAT_TIMEOUT_SECONDS: int = get_from_env("BATCH_EXPORT_HEARTBEAT_TIMEOUT_SECONDS", 30, type_cast=int)
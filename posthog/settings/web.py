@@ -398,6 +398,14 @@ DECIDE_SHORT_CIRCUITED_TEAM_IDS = [0]
 
 # Decide db settings
 DECIDE_SKIP_POSTGRES_FLAGS = get_from_env("DECIDE_SKIP_POSTGRES_FLAGS", False, type_cast=str_to_bool)
+# Leave flag conditions that can be matched against the passed in properties out of the flag matching query
+DECIDE_SKIP_LOCAL_FLAG_CONDITIONS_IN_POSTGRES = get_from_env(
+    "DECIDE_SKIP_LOCAL_FLAG_CONDITIONS_IN_POSTGRES", True, type_cast=str_to_bool
+)
+# How many distinct flag conditions to keep parsed in memory, see CompiledFlagCondition
+DECIDE_COMPILED_FLAG_CONDITIONS_CACHE_SIZE = get_from_env(
+    "DECIDE_COMPILED_FLAG_CONDITIONS_CACHE_SIZE", 10_000, type_cast=int
+)
 
 # Decide billing analytics
 DECIDE_BILLING_SAMPLING_RATE = get_from_env("DECIDE_BILLING_SAMPLING_RATE", 0.1, type_cast=float)
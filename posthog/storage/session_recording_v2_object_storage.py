@@ -1,4 +1,7 @@
 import abc
+from collections import deque
+from collections.abc import Iterator
+from concurrent.futures import Future, ThreadPoolExecutor
 import structlog
 from boto3 import client as boto3_client
 from botocore.client import Config
@@ -32,6 +35,11 @@ class SessionRecordingV2ObjectStorageBase(metaclass=abc.ABCMeta):
         """Returns the decompressed block or raises BlockFetchError"""
         pass
 
+    def fetch_blocks(self, block_urls: list[str]) -> Iterator[str]:
+        """Yields the decompressed blocks in the order of block_urls, or raises BlockFetchError"""
+        for block_url in block_urls:
+            yield self.fetch_block(block_url)
+
     @abc.abstractmethod
     def store_lts_recording(self, recording_id: str, recording_data: str) -> tuple[Optional[str], Optional[str]]:
         """Returns a tuple of (target_key, error_message)"""
@@ -110,31 +118,9 @@ class SessionRecordingV2ObjectStorage(SessionRecordingV2ObjectStorageBase):
 
     def fetch_block(self, block_url: str) -> str:
         try:
-            # Parse URL and extract key and byte range
-            parsed_url = urlparse(block_url)
-            key = parsed_url.path.lstrip("/")
-            query_params = parse_qs(parsed_url.query)
-            byte_range = query_params.get("range", [""])[0].replace("bytes=", "")
-            start_byte, end_byte = map(int, byte_range.split("-")) if "-" in byte_range else (None, None)
-
-            if start_byte is None or end_byte is None:
-                raise BlockFetchError("Invalid byte range in block URL")
-
-            expected_length = end_byte - start_byte + 1
+            key, start_byte, end_byte = _parse_block_url(block_url)
             compressed_block = self.read_bytes(key, first_byte=start_byte, last_byte=end_byte)
-
-            if not compressed_block:
-                raise BlockFetchError("Block content not found")
-
-            if len(compressed_block) != expected_length:
-                raise BlockFetchError(
-                    f"Unexpected data length. Expected {expected_length} bytes, got {len(compressed_block)} bytes"
-                )
-
-            decompressed_block = snappy.decompress(compressed_block).decode("utf-8")
-            # Strip any trailing newlines
-            decompressed_block = decompressed_block.rstrip("\n")
-            return decompressed_block
+            return _decompress_block(compressed_block, end_byte - start_byte + 1)
 
         except BlockFetchError:
             raise
@@ -142,6 +128,59 @@ class SessionRecordingV2ObjectStorage(SessionRecordingV2ObjectStorageBase):
             logger.exception("Failed to read and decompress block", error=e)
             raise BlockFetchError(f"Failed to read and decompress block: {str(e)}")
 
+    def fetch_blocks(self, block_urls: list[str]) -> Iterator[str]:
+        """
+        Blocks are written one after the other into the same file, so consecutive blocks are usually adjacent byte
+        ranges of one key. Those are read with one ranged request, and different keys are read concurrently. Blocks are
+        decompressed one at a time as they are yielded, so the whole recording is never held as one string.
+
+        Ranges are read in the order their blocks are yielded, with at most SESSION_RECORDING_V2_BLOCK_FETCH_MAX_WORKERS
+        of them read or waiting to be yielded at once, and each range is released once its last block is yielded.
+        """
+        block_ranges = [_parse_block_url(block_url) for block_url in block_urls]
+        coalesced_ranges = _coalesce_block_ranges(
+            block_ranges, settings.SESSION_RECORDING_V2_BLOCK_FETCH_MAX_RANGE_BYTES
+        )
+        if not coalesced_ranges:
+            return
+
+        max_ranges_in_flight = settings.SESSION_RECORDING_V2_BLOCK_FETCH_MAX_WORKERS
+        pending_ranges = deque(sorted(coalesced_ranges, key=lambda coalesced_range: min(coalesced_range[3])))
+        executor = ThreadPoolExecutor(
+            max_workers=min(len(coalesced_ranges), max_ranges_in_flight),
+            thread_name_prefix="session-recording-v2-block-fetch",
+        )
+        try:
+            reads: dict[int, tuple[Future[bytes | None], int]] = {}
+            blocks_left_by_read: dict[Future[bytes | None], int] = {}
+
+            for block_index, (_, start_byte, end_byte) in enumerate(block_ranges):
+                # the range of this block might not have been started yet, if earlier ranges have blocks left
+                while pending_ranges and (block_index not in reads or len(blocks_left_by_read) < max_ranges_in_flight):
+                    key, first_byte, last_byte, block_indexes = pending_ranges.popleft()
+                    future = executor.submit(self.read_bytes, key, first_byte, last_byte)
+                    blocks_left_by_read[future] = len(block_indexes)
+                    for range_block_index in block_indexes:
+                        reads[range_block_index] = (future, first_byte)
+
+                future, first_byte = reads.pop(block_index)
+                blocks_left_by_read[future] -= 1
+                if blocks_left_by_read[future] == 0:
+                    del blocks_left_by_read[future]
+
+                data = future.result()
+                compressed_block = data[start_byte - first_byte : end_byte - first_byte + 1] if data else None
+                try:
+                    yield _decompress_block(compressed_block, end_byte - start_byte + 1)
+                except BlockFetchError:
+                    raise
+                except Exception as e:
+                    logger.exception("Failed to decompress block", error=e)
+                    raise BlockFetchError(f"Failed to read and decompress block: {str(e)}")
+        finally:
+            # the caller might stop reading early, don't start reads nobody is waiting for
+            executor.shutdown(wait=False, cancel_futures=True)
+
     def store_lts_recording(self, recording_id: str, recording_data: str) -> tuple[Optional[str], Optional[str]]:
         try:
             compressed_data = snappy.compress(recording_data.encode("utf-8"))
@@ -168,6 +207,66 @@ class SessionRecordingV2ObjectStorage(SessionRecordingV2ObjectStorageBase):
         return bool(settings.SESSION_RECORDING_V2_S3_LTS_PREFIX)
 
 
+def _parse_block_url(block_url: str) -> tuple[str, int, int]:
+    """Returns the key, first byte and last byte of a block URL like s3://bucket/key?range=bytes=0-100"""
+    parsed_url = urlparse(block_url)
+    key = parsed_url.path.lstrip("/")
+    query_params = parse_qs(parsed_url.query)
+    byte_range = query_params.get("range", [""])[0].replace("bytes=", "")
+    try:
+        start_byte, end_byte = map(int, byte_range.split("-"))
+    except ValueError:
+        raise BlockFetchError("Invalid byte range in block URL")
+    return key, start_byte, end_byte
+
+
+def _coalesce_block_ranges(
+    block_ranges: list[tuple[str, int, int]], max_range_bytes: int
+) -> list[tuple[str, int, int, list[int]]]:
+    """
+    Merges the byte ranges of the same key that touch or overlap into ranges of at most max_range_bytes, unless a single
+    block is larger than that. Returns (key, first byte, last byte, indexes of the blocks in block_ranges) per range.
+    """
+    coalesced_ranges: list[tuple[str, int, int, list[int]]] = []
+    by_key: dict[str, list[int]] = {}
+    for block_index, (key, _, _) in enumerate(block_ranges):
+        by_key.setdefault(key, []).append(block_index)
+
+    for key, block_indexes in by_key.items():
+        block_indexes.sort(key=lambda block_index: block_ranges[block_index][1])
+        first_byte, last_byte, current_indexes = -1, -1, []
+        for block_index in block_indexes:
+            _, start_byte, end_byte = block_ranges[block_index]
+            if (
+                current_indexes
+                and start_byte <= last_byte + 1
+                and max(last_byte, end_byte) - first_byte + 1 <= max_range_bytes
+            ):
+                last_byte = max(last_byte, end_byte)
+                current_indexes.append(block_index)
+            else:
+                if current_indexes:
+                    coalesced_ranges.append((key, first_byte, last_byte, current_indexes))
+                first_byte, last_byte, current_indexes = start_byte, end_byte, [block_index]
+        coalesced_ranges.append((key, first_byte, last_byte, current_indexes))
+
+    return coalesced_ranges
+
+
+def _decompress_block(compressed_block: bytes | None, expected_length: int) -> str:
+    if not compressed_block:
+        raise BlockFetchError("Block content not found")
+
+    if len(compressed_block) != expected_length:
+        raise BlockFetchError(
+            f"Unexpected data length. Expected {expected_length} bytes, got {len(compressed_block)} bytes"
+        )
+
+    decompressed_block = snappy.decompress(compressed_block).decode("utf-8")
+    # Strip any trailing newlines
+    return decompressed_block.rstrip("\n")
+
+
 _client: SessionRecordingV2ObjectStorageBase = UnavailableSessionRecordingV2ObjectStorage()
 
 
@@ -155,6 +155,81 @@ class TestSessionRecordingV2Storage(APIBaseTest):
             storage.fetch_block("s3://bucket/key1?range=bytes=0-100")
         assert "Unexpected data length" in str(cm.exception)
 
+    def _storage_serving(self, objects: dict[str, bytes]) -> tuple[SessionRecordingV2ObjectStorage, MagicMock]:
+        def get_object(Bucket, Key, Range):
+            first_byte, last_byte = map(int, Range.replace("bytes=", "").split("-"))
+            return {"Body": MagicMock(read=MagicMock(return_value=objects[Key][first_byte : last_byte + 1]))}
+
+        mock_client = MagicMock()
+        mock_client.get_object.side_effect = get_object
+        return SessionRecordingV2ObjectStorage(mock_client, TEST_BUCKET), mock_client
+
+    def _block_urls(self, key: str, blocks: list[str]) -> tuple[bytes, list[str]]:
+        data, block_urls = b"", []
+        for block in blocks:
+            compressed_block = snappy.compress(block.encode("utf-8"))
+            block_urls.append(f"s3://bucket/{key}?range=bytes={len(data)}-{len(data) + len(compressed_block) - 1}")
+            data += compressed_block
+        return data, block_urls
+
+    def test_fetch_blocks_coalesces_adjacent_ranges(self):
+        key1_data, key1_urls = self._block_urls("key1", ['{"a": 1}\n', '{"a": 2}\n', '{"a": 3}\n'])
+        key2_data, key2_urls = self._block_urls("key2", ['{"b": 1}\n', '{"b": 2}\n'])
+        storage, mock_client = self._storage_serving({"key1": key1_data, "key2": key2_data})
+
+        blocks = list(storage.fetch_blocks([key2_urls[1], key1_urls[0], key1_urls[1], key2_urls[0], key1_urls[2]]))
+
+        assert blocks == ['{"b": 2}', '{"a": 1}', '{"a": 2}', '{"b": 1}', '{"a": 3}']
+        assert sorted(call.kwargs["Range"] for call in mock_client.get_object.call_args_list) == [
+            f"bytes=0-{len(key1_data) - 1}",
+            f"bytes=0-{len(key2_data) - 1}",
+        ]
+
+    def test_fetch_blocks_reads_gaps_separately(self):
+        data, block_urls = self._block_urls("key1", ["first", "skipped", "third"])
+        storage, mock_client = self._storage_serving({"key1": data})
+
+        assert list(storage.fetch_blocks([block_urls[0], block_urls[2]])) == ["first", "third"]
+        assert mock_client.get_object.call_count == 2
+
+    def test_fetch_blocks_limits_range_size(self):
+        data, block_urls = self._block_urls("key1", ["first", "second", "third"])
+        storage, mock_client = self._storage_serving({"key1": data})
+
+        with override_settings(SESSION_RECORDING_V2_BLOCK_FETCH_MAX_RANGE_BYTES=1):
+            assert list(storage.fetch_blocks(block_urls)) == ["first", "second", "third"]
+        assert mock_client.get_object.call_count == 3
+
+    def test_fetch_blocks_bounds_ranges_in_flight(self):
+        data, block_urls = self._block_urls("key1", ["first", "second", "third"])
+        storage, mock_client = self._storage_serving({"key1": data})
+
+        with override_settings(
+            SESSION_RECORDING_V2_BLOCK_FETCH_MAX_RANGE_BYTES=1, SESSION_RECORDING_V2_BLOCK_FETCH_MAX_WORKERS=1
+        ):
+            blocks = storage.fetch_blocks(block_urls)
+            assert next(blocks) == "first"
+            assert mock_client.get_object.call_count == 1
+            assert next(blocks) == "second"
+            assert mock_client.get_object.call_count == 2
+            assert list(blocks) == ["third"]
+        assert mock_client.get_object.call_count == 3
+
+    def test_fetch_blocks_wrong_content_length(self):
+        data, block_urls = self._block_urls("key1", ["first", "second"])
+        storage, _ = self._storage_serving({"key1": data[:-1]})
+
+        with self.assertRaises(BlockFetchError) as cm:
+            list(storage.fetch_blocks(block_urls))
+        assert "Unexpected data length" in str(cm.exception)
+
+    def test_fetch_blocks_invalid_url(self):
+        storage, mock_client = self._storage_serving({})
+
+        with self.assertRaises(BlockFetchError):
+            list(storage.fetch_blocks(["s3://bucket/key1?range=invalid"]))
+        mock_client.get_object.assert_not_called()
+
     def test_store_lts_recording_success(self):
         mock_client = MagicMock()
         storage = SessionRecordingV2ObjectStorage(mock_client, TEST_BUCKET)
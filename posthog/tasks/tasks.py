@@ -898,6 +898,13 @@ def ee_persist_finished_recordings_v2() -> None:
         persist_finished_recordings_v2()
 
 
+@shared_task(ignore_result=True, queue=CeleryQueue.SESSION_REPLAY_GENERAL.value)
+def prefetch_recording_snapshots(team_id: int, session_ids: list[str]) -> None:
+    from posthog.session_recordings.snapshot_prefetch import prefetch_recordings
+
+    prefetch_recordings(team_id, session_ids)
+
+
 @shared_task(
     ignore_result=True,
     queue=CeleryQueue.SESSION_REPLAY_GENERAL.value,
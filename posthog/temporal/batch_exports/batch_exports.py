@@ -246,6 +246,8 @@ def iter_records(
         query = SELECT_FROM_EVENTS_VIEW
         lookback_days = settings.OVERRIDE_TIMESTAMP_TEAM_IDS.get(team_id, settings.DEFAULT_TIMESTAMP_LOOKBACK_DAYS)
         base_query_parameters["lookback_days"] = lookback_days
+        base_query_parameters["timestamp_interval_start"] = data_interval_start_ch
+        base_query_parameters["timestamp_interval_end"] = data_interval_end_ch
 
     query_str = query.safe_substitute(fields=query_fields, filters=filters_str or "")
 
@@ -10,6 +10,22 @@ def get_bytes_exported_metric() -> MetricCounter:
     return activity.metric_meter().create_counter("batch_export_bytes_exported", "Number of bytes exported.")
 
 
+def get_bytes_compressed_metric(compression: str) -> MetricCounter:
+    return (
+        activity.metric_meter()
+        .with_additional_attributes({"compression": compression})
+        .create_counter("batch_export_bytes_compressed", "Number of bytes compressed, before compression.")
+    )
+
+
+def get_compression_time_metric(compression: str) -> MetricCounter:
+    return (
+        activity.metric_meter()
+        .with_additional_attributes({"compression": compression})
+        .create_counter("batch_export_compression_time", "Time spent compressing bytes.", "ms")
+    )
+
+
 def get_export_started_metric() -> MetricCounter:
     return workflow.metric_meter().create_counter("batch_export_started", "Number of batch exports started.")
 
@@ -44,8 +44,11 @@ from posthog.temporal.batch_exports.spmc import (
     wait_for_schema_or_producer,
 )
 from posthog.temporal.batch_exports.temporary_file import (
+    POSTGRES_BINARY_COPY_SIGNATURE,
+    POSTGRES_BINARY_COPY_TRAILER,
     BatchExportTemporaryFile,
     WriterFormat,
+    is_postgres_binary_copy_supported,
 )
 from posthog.temporal.batch_exports.utils import (
     JsonType,
@@ -257,6 +260,18 @@ class PostgreSQLClient:
         Returns:
             A list of column names in the table.
         """
+        return list(await self.aget_table_column_types(schema, table_name))
+
+    async def aget_table_column_types(self, schema: str | None, table_name: str) -> dict[str, str]:
+        """Get the column names and types for a table in PostgreSQL.
+
+        Args:
+            schema: Name of the schema where the table is located.
+            table_name: Name of the table to get columns for.
+
+        Returns:
+            A dictionary of column types, like 'character varying(200)', by column name.
+        """
         if schema:
             table_identifier = sql.Identifier(schema, table_name)
         else:
@@ -265,8 +280,7 @@ class PostgreSQLClient:
         async with self.connection.transaction():
             async with self.connection.cursor() as cursor:
                 await cursor.execute(sql.SQL("SELECT * FROM {} WHERE 1=0").format(table_identifier))
-                columns = [column.name for column in cursor.description or []]
-                return columns
+                return {column.name: column.type_display for column in cursor.description or []}
 
     @contextlib.asynccontextmanager
     async def managed_table(
@@ -423,6 +437,42 @@ class PostgreSQLClient:
                         data = data.replace(b"\\u0000", b"")
                         await copy.write(data)
 
+    async def copy_binary_to_postgres(
+        self,
+        binary_file,
+        schema: str,
+        table_name: str,
+        schema_columns: list[str],
+    ) -> None:
+        """Execute a binary COPY FROM query with given connection to copy tuples in binary_file.
+
+        Arguments:
+            binary_file: A file-like object with tuples in PostgreSQL's binary COPY format, without
+                the header and trailer, as written by `PostgresBinaryBatchExportWriter`.
+            schema: The schema where the table we are COPYing into exists.
+            table_name: The name of the table we are COPYing into.
+            schema_columns: The column names of the table we are COPYing into.
+        """
+        binary_file.seek(0)
+
+        async with self.connection.transaction():
+            async with self.connection.cursor() as cursor:
+                if schema:
+                    await cursor.execute(sql.SQL("SET search_path TO {schema}").format(schema=sql.Identifier(schema)))
+
+                await cursor.execute("SET TRANSACTION READ WRITE")
+
+                async with cursor.copy(
+                    sql.SQL("COPY {table_name} ({fields}) FROM STDIN WITH (FORMAT BINARY)").format(
+                        table_name=sql.Identifier(table_name),
+                        fields=sql.SQL(",").join(sql.Identifier(column) for column in schema_columns),
+                    )
+                ) as copy:
+                    await copy.write(POSTGRES_BINARY_COPY_SIGNATURE)
+                    while data := await asyncio.to_thread(binary_file.read):
+                        await copy.write(data)
+                    await copy.write(POSTGRES_BINARY_COPY_TRAILER)
+
 
 def postgres_default_fields() -> list[BatchExportField]:
     batch_export_fields = default_fields()
@@ -547,7 +597,12 @@ class PostgreSQLConsumer(Consumer):
             bytes_since_last_flush,
         )
 
-        await self.postgresql_client.copy_tsv_to_postgres(
+        if self.writer_format == WriterFormat.POSTGRES_BINARY:
+            copy_to_postgres = self.postgresql_client.copy_binary_to_postgres
+        else:
+            copy_to_postgres = self.postgresql_client.copy_tsv_to_postgres
+
+        await copy_to_postgres(
             batch_export_file,
             self.postgresql_table_schema,
             self.postgresql_table,
@@ -681,11 +736,18 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs) -> Records
         )[:63]
 
         async with PostgreSQLClient.from_inputs(inputs).connect() as pg_client:
+            # The types of the table we copy into, which must match exactly to copy binary data. Tables we create
+            # have the types in `table_fields`, otherwise we only know them if we can read them.
+            copy_fields: list[tuple[str, str]] | None = list(table_fields)
             # handle the case where the final table doesn't contain all the fields present in the record batch schema
             try:
-                columns = await pg_client.aget_table_columns(inputs.schema, inputs.table_name)
-                table_fields = [field for field in table_fields if field[0] in columns]
+                column_types = await pg_client.aget_table_column_types(inputs.schema, inputs.table_name)
+                table_fields = [field for field in table_fields if field[0] in column_types]
+                copy_fields = [
+                    (name, pg_type if requires_merge else column_types[name]) for name, pg_type in table_fields
+                ]
             except psycopg.errors.InsufficientPrivilege:
+                copy_fields = list(table_fields) if requires_merge else None
                 await logger.awarning(
                     "Insufficient privileges to get table columns for table '%s.%s'; "
                     "will assume all columns are present. If this results in an error, please grant SELECT "
@@ -700,6 +762,23 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs) -> Records
 
             schema_columns = [field[0] for field in table_fields]
 
+            if (
+                settings.BATCH_EXPORT_POSTGRES_BINARY_COPY_ENABLED
+                and copy_fields is not None
+                and is_postgres_binary_copy_supported(record_batch_schema, copy_fields)
+            ):
+                writer_format = WriterFormat.POSTGRES_BINARY
+                writer_file_kwargs: dict[str, typing.Any] = {"fields": copy_fields}
+            else:
+                writer_format = WriterFormat.CSV
+                writer_file_kwargs = {
+                    "delimiter": "\t",
+                    "quoting": csv.QUOTE_MINIMAL,
+                    "escape_char": None,
+                    "field_names": schema_columns,
+                    "use_arrow_csv_writer": settings.BATCH_EXPORT_POSTGRES_ARROW_CSV_WRITER_ENABLED,
+                }
+
             async with (
                 pg_client.managed_table(
                     inputs.schema, inputs.table_name, table_fields, delete=False, primary_key=primary_key
@@ -718,7 +797,7 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs) -> Records
                     heartbeat_details=details,
                     data_interval_end=data_interval_end,
                     data_interval_start=data_interval_start,
-                    writer_format=WriterFormat.CSV,
+                    writer_format=writer_format,
                     postgresql_client=pg_client,
                     postgresql_table=pg_stage_table if requires_merge else pg_table,
                     postgresql_table_schema=inputs.schema,
@@ -732,12 +811,7 @@ async def insert_into_postgres_activity(inputs: PostgresInsertInputs) -> Records
                         schema=record_batch_schema,
                         max_bytes=settings.BATCH_EXPORT_POSTGRES_UPLOAD_CHUNK_SIZE_BYTES,
                         json_columns=(),
-                        writer_file_kwargs={
-                            "delimiter": "\t",
-                            "quoting": csv.QUOTE_MINIMAL,
-                            "escape_char": None,
-                            "field_names": schema_columns,
-                        },
+                        writer_file_kwargs=writer_file_kwargs,
                         multiple_files=True,
                     )
                 finally:
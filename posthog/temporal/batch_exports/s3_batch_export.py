@@ -87,6 +87,7 @@ COMPRESSION_EXTENSIONS = {
     "snappy": "sz",
     "brotli": "br",
     "ztsd": "zst",
+    "zstd": "zst",
     "lz4": "lz4",
 }
 
@@ -228,6 +229,7 @@ class S3MultiPartUpload:
         kms_key_id: If using 'aws:kms' encryption, the KMS key ID.
         aws_access_key_id: The AWS access key ID used to connect to the bucket.
         aws_secret_access_key: The AWS secret access key used to connect to the bucket.
+        max_concurrent_uploads: How many parts `upload_part_in_background` uploads at the same time.
     """
 
     def __init__(
@@ -240,6 +242,7 @@ class S3MultiPartUpload:
         aws_access_key_id: str | None = None,
         aws_secret_access_key: str | None = None,
         endpoint_url: str | None = None,
+        max_concurrent_uploads: int = 0,
     ):
         self._session = aioboto3.Session()
         self.region_name = region_name
@@ -253,6 +256,9 @@ class S3MultiPartUpload:
         self.upload_id: str | None = None
         self.parts: list[Part] = []
         self.pending_parts: list[Part] = []
+        self.max_concurrent_uploads = max_concurrent_uploads
+        self._upload_slots = asyncio.Semaphore(max(max_concurrent_uploads, 1))
+        self._upload_tasks: list[asyncio.Task] = []
 
         if self.endpoint_url == "":
             raise InvalidS3EndpointError("Endpoint URL is empty.")
@@ -265,7 +271,21 @@ class S3MultiPartUpload:
         if self.is_upload_in_progress() is False or self.upload_id is None:
             raise NoUploadInProgressError()
 
-        return S3MultiPartUploadState(self.upload_id, self.parts)
+        return S3MultiPartUploadState(self.upload_id, self.resumable_parts)
+
+    @property
+    def resumable_parts(self) -> list[Part]:
+        """Return the uploaded parts that precede any pending part.
+
+        Parts uploaded in the background can finish out of order, and resuming assumes no part is missing
+        before the last one. Parts after a gap are uploaded again when resuming, overwriting them.
+        """
+        first_pending_part_number = min((part["PartNumber"] for part in self.pending_parts), default=None)
+        return [
+            part
+            for part in sorted(self.parts, key=operator.itemgetter("PartNumber"))
+            if first_pending_part_number is None or part["PartNumber"] < first_pending_part_number
+        ]
 
     @property
     def part_number(self):
@@ -333,6 +353,8 @@ class S3MultiPartUpload:
         if self.is_upload_in_progress() is False:
             raise NoUploadInProgressError()
 
+        await self.wait_for_pending_parts()
+
         sorted_parts = sorted(self.parts, key=operator.itemgetter("PartNumber"))
         async with self.s3_client() as s3_client:
             response = await s3_client.complete_multipart_upload(
@@ -352,6 +374,11 @@ class S3MultiPartUpload:
         if self.is_upload_in_progress() is False:
             raise NoUploadInProgressError()
 
+        for task in self._upload_tasks:
+            task.cancel()
+        await asyncio.gather(*self._upload_tasks, return_exceptions=True)
+        self._upload_tasks = []
+
         async with self.s3_client() as s3_client:
             await s3_client.abort_multipart_upload(
                 Bucket=self.bucket_name,
@@ -372,10 +399,75 @@ class S3MultiPartUpload:
         exponential_backoff_coefficient: int = 2,
     ):
         """Upload a part of this multi-part upload."""
-        next_part_number = self.part_number + 1
-        part = {"PartNumber": next_part_number, "ETag": ""}
+        await self._upload_pending_part(
+            self._add_pending_part(),
+            body,
+            rewind=rewind,
+            max_attempts=max_attempts,
+            initial_retry_delay=initial_retry_delay,
+            max_retry_delay=max_retry_delay,
+            exponential_backoff_coefficient=exponential_backoff_coefficient,
+        )
+
+    async def upload_part_in_background(
+        self,
+        body: BatchExportTemporaryFile,
+        on_uploaded: collections.abc.Callable[[int], collections.abc.Awaitable[None]] | None = None,
+    ) -> int:
+        """Start uploading a part of this multi-part upload without waiting for it to finish.
+
+        Only waits while `max_concurrent_uploads` parts are already being uploaded. The body is closed
+        once uploaded, and `on_uploaded` is called with the number of the part. Errors of parts that
+        failed are raised by the next call to this method or to `wait_for_pending_parts`.
+
+        Returns:
+            The number of the part being uploaded.
+        """
+        self._raise_for_failed_uploads()
+        await self._upload_slots.acquire()
+
+        part = self._add_pending_part()
+        part_number = typing.cast(int, part["PartNumber"])
+
+        async def upload():
+            try:
+                await self._upload_pending_part(part, body)
+            finally:
+                body.close()
+                self._upload_slots.release()
+
+            if on_uploaded is not None:
+                await on_uploaded(part_number)
+
+        self._upload_tasks.append(asyncio.create_task(upload()))
+        return part_number
+
+    async def wait_for_pending_parts(self):
+        """Wait for all parts uploading in the background, raising the first error if any failed."""
+        upload_tasks, self._upload_tasks = self._upload_tasks, []
+        await asyncio.gather(*upload_tasks)
+
+    def _raise_for_failed_uploads(self):
+        for task in self._upload_tasks:
+            if task.done() and not task.cancelled() and task.exception() is not None:
+                raise typing.cast(BaseException, task.exception())
+        self._upload_tasks = [task for task in self._upload_tasks if not task.done()]
+
+    def _add_pending_part(self) -> Part:
+        part: Part = {"PartNumber": self.part_number + 1, "ETag": ""}
         self.pending_parts.append(part)
+        return part
 
+    async def _upload_pending_part(
+        self,
+        part: Part,
+        body: BatchExportTemporaryFile,
+        rewind: bool = True,
+        max_attempts: int = 5,
+        initial_retry_delay: float | int = 2,
+        max_retry_delay: float | int = 32,
+        exponential_backoff_coefficient: int = 2,
+    ):
         if rewind is True:
             body.rewind()
 
@@ -387,7 +479,7 @@ class S3MultiPartUpload:
         try:
             etag = await self.upload_part_retryable(
                 reader,
-                next_part_number,
+                typing.cast(int, part["PartNumber"]),
                 max_attempts=max_attempts,
                 initial_retry_delay=initial_retry_delay,
                 max_retry_delay=max_retry_delay,
@@ -549,6 +641,8 @@ class S3Consumer(Consumer):
         self.s3_inputs = s3_inputs
         self.file_number = 0
         self.files_uploaded: list[str] = []
+        # Parts uploading in the background, with what to track once they are uploaded
+        self.parts_in_flight: collections.deque[tuple[int, int, int, DateRange]] = collections.deque()
 
     async def flush(
         self,
@@ -582,6 +676,19 @@ class S3Consumer(Consumer):
                 records_since_last_flush,
                 bytes_since_last_flush,
             )
+
+            if s3_upload.max_concurrent_uploads > 0 and not is_last:
+                # The writer continues with an empty file while this part uploads, and progress is only
+                # tracked once it's uploaded
+                part_number = await s3_upload.upload_part_in_background(
+                    batch_export_file.split(), on_uploaded=self.track_uploaded_parts
+                )
+                self.parts_in_flight.append(
+                    (part_number, records_since_last_flush, bytes_since_last_flush, last_date_range)
+                )
+                return
+
+            await s3_upload.wait_for_pending_parts()
             await s3_upload.upload_part(batch_export_file)
 
             self.rows_exported_counter.add(records_since_last_flush)
@@ -604,6 +711,27 @@ class S3Consumer(Consumer):
         self.heartbeat_details.records_completed += records_since_last_flush
         self.heartbeat_details.track_done_range(last_date_range, self.data_interval_start)
 
+    async def track_uploaded_parts(self, part_number: int):
+        """Track the progress of parts uploaded in the background.
+
+        Parts are tracked in the order they were flushed, so a part that finishes before an earlier one
+        waits for it. Otherwise, resuming from a heartbeat could skip the range of the earlier part.
+        """
+        if self.s3_upload is None:
+            return
+
+        uploaded_part_numbers = {part["PartNumber"] for part in self.s3_upload.parts}
+        while self.parts_in_flight and self.parts_in_flight[0][0] in uploaded_part_numbers:
+            _, records, bytes_uploaded, date_range = self.parts_in_flight.popleft()
+
+            self.rows_exported_counter.add(records)
+            self.bytes_exported_counter.add(bytes_uploaded)
+            self.heartbeat_details.records_completed += records
+            self.heartbeat_details.track_done_range(date_range, self.data_interval_start)
+
+        self.heartbeat_details.append_upload_state(self.s3_upload.to_state())
+        self.heartbeater.set_from_heartbeat_details(self.heartbeat_details)
+
     async def close(self):
         if self.s3_upload is not None:
             await self.logger.adebug(
@@ -670,6 +798,7 @@ def initialize_upload(inputs: S3InsertInputs, file_number: int) -> S3MultiPartUp
         aws_access_key_id=inputs.aws_access_key_id,
         aws_secret_access_key=inputs.aws_secret_access_key,
         endpoint_url=inputs.endpoint_url or None,
+        max_concurrent_uploads=settings.BATCH_EXPORT_S3_MAX_CONCURRENT_UPLOADS,
     )
 
 
@@ -743,7 +872,8 @@ async def insert_into_s3_activity(inputs: S3InsertInputs) -> RecordsCompleted:
         full_range = (data_interval_start, data_interval_end)
 
         queue = RecordBatchQueue(max_size_bytes=settings.BATCH_EXPORT_S3_RECORD_BATCH_QUEUE_MAX_SIZE_BYTES)
-        producer = Producer(record_batch_model)
+        # Files are numbered when split by `max_file_size_mb`, so records are kept in order across them
+        producer = Producer(record_batch_model, ordered=True)
         producer_task = await producer.start(
             queue=queue,
             model_name=model_name,
@@ -54,7 +54,7 @@ from posthog.temporal.batch_exports.utils import (
     cast_record_batch_json_columns,
     cast_record_batch_schema_json_columns,
 )
-from posthog.temporal.common.clickhouse import get_client
+from posthog.temporal.common.clickhouse import ClickHouseClient, get_client
 from posthog.temporal.common.heartbeat import Heartbeater
 from posthog.temporal.common.logger import get_internal_logger
 from posthog.warehouse.util import database_sync_to_async
@@ -71,15 +71,22 @@ class RecordBatchQueue(asyncio.Queue):
         # This is set by `asyncio.Queue.__init__` calling `_init`
         self._queue: collections.deque
 
+        self.record_batches_put = 0
+        self.record_batches_got = 0
+        self._tracked_ranges: list[DateRange] | None = None
+        self._record_batches_put_by_done_range: dict[DateRange, int] = {}
+
     def _get(self) -> pa.RecordBatch:
         """Override parent `_get` to keep track of bytes."""
         item = self._queue.popleft()
         self._bytes_size -= item.get_total_buffer_size()
+        self.record_batches_got += 1
         return item
 
     def _put(self, item: pa.RecordBatch) -> None:
         """Override parent `_put` to keep track of bytes."""
         self._bytes_size += item.get_total_buffer_size()
+        self.record_batches_put += 1
 
         if not self._schema_set.is_set():
             self.set_schema(item)
@@ -110,6 +117,44 @@ class RecordBatchQueue(asyncio.Queue):
         """
         return self._bytes_size
 
+    def start_tracking_ranges(self, ranges: collections.abc.Iterable[DateRange]) -> None:
+        """Start tracking which of `ranges` have been fully consumed.
+
+        Used when record batches from multiple ranges are produced concurrently, as
+        then the `_inserted_at` of the record batches consumers get no longer tells
+        which ranges are done.
+        """
+        self._tracked_ranges = sorted(ranges, key=operator.itemgetter(0))
+        self._record_batches_put_by_done_range = {}
+
+    def mark_range_done(self, date_range: DateRange) -> None:
+        """Mark all record batches of a tracked range as put in the queue."""
+        self._record_batches_put_by_done_range[date_range] = self.record_batches_put
+
+    def get_done_date_range(self) -> DateRange | None:
+        """Return the date range covered by the record batches consumed so far.
+
+        A tracked range is done once it has been marked as done and consumers have
+        got every record batch put in the queue up to then. As the queue is FIFO,
+        that includes all record batches of the range. The returned range spans from
+        the start of the first tracked range to the end of the last one done without
+        any pending range before it, so it is empty if the first one is not done yet.
+
+        Returns:
+            The done date range, or `None` if this queue is not tracking ranges.
+        """
+        if not self._tracked_ranges:
+            return None
+
+        start_at = end_at = self._tracked_ranges[0][0]
+        for date_range in self._tracked_ranges:
+            record_batches_put = self._record_batches_put_by_done_range.get(date_range, None)
+            if record_batches_put is None or record_batches_put > self.record_batches_got:
+                break
+            end_at = date_range[1]
+
+        return (start_at, end_at)
+
 
 class TaskNotDoneError(Exception):
     """Raised when a task that should be done, isn't."""
@@ -308,6 +353,8 @@ class Consumer:
             max_file_size_bytes=max_file_size_bytes,
             **kwargs,
         )
+        # The queue only tracks date ranges when they are produced concurrently, otherwise the writer tracks its own
+        writer.date_range_tracker = queue.get_done_date_range
 
         record_batches_count = 0
         record_batches_count_total = 0
@@ -703,16 +750,31 @@ def use_distributed_events_recent_table(
     return False
 
 
+MIN_SUB_RANGE_DURATION = dt.timedelta(minutes=1)
+# Record batches buffered per sub-range queried concurrently while waiting for the sub-ranges before it
+ORDERED_SUB_RANGE_MAX_BUFFERED_RECORD_BATCHES = 10
+
+
 class Producer:
     """Async producer for batch exports.
 
     Attributes:
         clickhouse_client: ClickHouse client used to produce RecordBatches.
+        concurrent_ranges: How many sub-ranges of each range to query concurrently.
+            Defaults to `settings.BATCH_EXPORT_PRODUCER_CONCURRENT_RANGES`.
+        ordered: Whether record batches of concurrent sub-ranges should still be put
+            in the queue in the order of their sub-ranges.
         _task: Used to keep track of producer background task.
     """
 
-    def __init__(self, model: RecordBatchModel | None = None):
+    def __init__(
+        self, model: RecordBatchModel | None = None, concurrent_ranges: int | None = None, ordered: bool = False
+    ):
         self.model = model
+        self.concurrent_ranges = (
+            settings.BATCH_EXPORT_PRODUCER_CONCURRENT_RANGES if concurrent_ranges is None else concurrent_ranges
+        )
+        self.ordered = ordered
         self.logger = get_internal_logger()
         self._task: asyncio.Task | None = None
 
@@ -881,6 +943,8 @@ class Producer:
                 max_record_batch_size_bytes=max_record_batch_size_bytes,
                 min_records_per_batch=min_records_per_batch,
                 team_id=team_id,
+                concurrent_ranges=self.concurrent_ranges if can_split_query_range(model_name) else 1,
+                ordered=self.ordered,
             ),
             name="record_batch_producer",
         )
@@ -897,6 +961,8 @@ class Producer:
         team_id: int,
         max_record_batch_size_bytes: int = 0,
         min_records_per_batch: int = 100,
+        concurrent_ranges: int = 1,
+        ordered: bool = False,
     ):
         """Produce Arrow record batches for a given date range into `queue`.
 
@@ -914,6 +980,11 @@ class Producer:
                 into smaller record batches.
             min_records_batch_per_batch: If slicing a record batch, each slice should contain at least
                 this number of records.
+            concurrent_ranges: If larger than 1, each range to query is split into this many sub-ranges
+                that are queried concurrently. Only for models `can_split_query_range` allows.
+            ordered: Whether record batches from concurrent sub-ranges should be put in `queue` in the
+                order of their sub-ranges. Otherwise, they are put as soon as they are available and
+                `queue` tracks which sub-ranges are done, which consumers use to track progress.
         """
 
         clickhouse_url = None
@@ -935,31 +1006,184 @@ class Producer:
             if not await client.is_alive():
                 raise ConnectionError("Cannot establish connection to ClickHouse")
 
-            for interval_start, interval_end in generate_query_ranges(full_range, done_ranges):
-                if interval_start is not None:
-                    query_parameters["interval_start"] = interval_start.strftime("%Y-%m-%d %H:%M:%S.%f")
-                query_parameters["interval_end"] = interval_end.strftime("%Y-%m-%d %H:%M:%S.%f")
-                query_id = uuid.uuid4()
-
-                if isinstance(query_or_model, RecordBatchModel):
-                    query, query_parameters = await query_or_model.as_query_with_parameters(
-                        interval_start, interval_end
+            query_ranges = list(generate_query_ranges(full_range, done_ranges))
+            bounded_query_ranges = [(start_at, end_at) for start_at, end_at in query_ranges if start_at is not None]
+
+            if concurrent_ranges <= 1 or len(bounded_query_ranges) < len(query_ranges):
+                # Ranges without a start cannot be split, so we query everything sequentially.
+                for interval_start, interval_end in query_ranges:
+                    await self.produce_record_batches_from_query_range(
+                        client,
+                        query_or_model,
+                        interval_start,
+                        interval_end,
+                        {**query_parameters, **format_timestamp_interval_parameters((interval_start, interval_end))},
+                        queue.put,
+                        max_record_batch_size_bytes,
+                        min_records_per_batch,
                     )
-                else:
-                    query = query_or_model
+                return
+
+            # Sub-ranges keep the timestamp bounds of the range they are split from, so they select the same
+            # events as querying it at once, except for duplicates in different sub-ranges.
+            sub_ranges = [
+                (sub_range, {**query_parameters, **format_timestamp_interval_parameters(query_range)})
+                for query_range in bounded_query_ranges
+                for sub_range in split_date_range(query_range, concurrent_ranges)
+            ]
+            await self.logger.adebug(
+                "Producing record batches from %s sub-ranges with %s concurrent queries",
+                len(sub_ranges),
+                concurrent_ranges,
+            )
+
+            if ordered:
+                await self.produce_sub_ranges_in_order(
+                    client,
+                    query_or_model,
+                    sub_ranges,
+                    queue,
+                    concurrent_ranges,
+                    max_record_batch_size_bytes,
+                    min_records_per_batch,
+                )
+            else:
+                await self.produce_sub_ranges_as_available(
+                    client,
+                    query_or_model,
+                    sub_ranges,
+                    queue,
+                    concurrent_ranges,
+                    max_record_batch_size_bytes,
+                    min_records_per_batch,
+                )
+
+    async def produce_sub_ranges_as_available(
+        self,
+        client: ClickHouseClient,
+        query_or_model: str | RecordBatchModel,
+        sub_ranges: list[tuple[DateRange, dict[str, typing.Any]]],
+        queue: RecordBatchQueue,
+        concurrent_ranges: int,
+        max_record_batch_size_bytes: int = 0,
+        min_records_per_batch: int = 100,
+    ):
+        """Query up to `concurrent_ranges` sub-ranges at a time, putting record batches as they arrive.
+
+        Record batches of different sub-ranges are interleaved in `queue`, so `queue` tracks which
+        sub-ranges are done for consumers to report progress.
+        """
+        semaphore = asyncio.Semaphore(concurrent_ranges)
+        queue.start_tracking_ranges(sub_range for sub_range, _ in sub_ranges)
+
+        async def produce_sub_range(sub_range: DateRange, query_parameters: dict[str, typing.Any]):
+            async with semaphore:
+                await self.produce_record_batches_from_query_range(
+                    client,
+                    query_or_model,
+                    sub_range[0],
+                    sub_range[1],
+                    query_parameters,
+                    queue.put,
+                    max_record_batch_size_bytes,
+                    min_records_per_batch,
+                )
+            queue.mark_range_done(sub_range)
+
+        async with asyncio.TaskGroup() as tg:
+            for sub_range, query_parameters in sub_ranges:
+                tg.create_task(produce_sub_range(sub_range, query_parameters))
 
-                try:
-                    async for record_batch in client.astream_query_as_arrow(
-                        query, query_parameters=query_parameters, query_id=str(query_id)
-                    ):
-                        for record_batch_slice in slice_record_batch(
-                            record_batch, max_record_batch_size_bytes, min_records_per_batch
-                        ):
-                            await queue.put(record_batch_slice)
+    async def produce_sub_ranges_in_order(
+        self,
+        client: ClickHouseClient,
+        query_or_model: str | RecordBatchModel,
+        sub_ranges: list[tuple[DateRange, dict[str, typing.Any]]],
+        queue: RecordBatchQueue,
+        concurrent_ranges: int,
+        max_record_batch_size_bytes: int = 0,
+        min_records_per_batch: int = 100,
+    ):
+        """Query up to `concurrent_ranges` sub-ranges at a time, putting record batches in sub-range order.
 
-                except Exception as e:
-                    await self.logger.aexception("Unexpected error occurred while producing record batches", exc_info=e)
-                    raise
+        Each sub-range being queried buffers its record batches in its own bounded queue, which are drained
+        into `queue` one after the other. The next sub-range is only queried once the first one is drained.
+        """
+        pending_sub_ranges = collections.deque(sub_ranges)
+        sub_range_queues: collections.deque[asyncio.Queue[pa.RecordBatch | None]] = collections.deque()
+
+        async def produce_sub_range(
+            sub_range: DateRange,
+            query_parameters: dict[str, typing.Any],
+            sub_range_queue: asyncio.Queue[pa.RecordBatch | None],
+        ):
+            await self.produce_record_batches_from_query_range(
+                client,
+                query_or_model,
+                sub_range[0],
+                sub_range[1],
+                query_parameters,
+                sub_range_queue.put,
+                max_record_batch_size_bytes,
+                min_records_per_batch,
+            )
+            await sub_range_queue.put(None)
+
+        async with asyncio.TaskGroup() as tg:
+
+            def start_next_sub_range():
+                sub_range_queue: asyncio.Queue[pa.RecordBatch | None] = asyncio.Queue(
+                    maxsize=ORDERED_SUB_RANGE_MAX_BUFFERED_RECORD_BATCHES
+                )
+                tg.create_task(produce_sub_range(*pending_sub_ranges.popleft(), sub_range_queue))
+                sub_range_queues.append(sub_range_queue)
+
+            while pending_sub_ranges and len(sub_range_queues) < concurrent_ranges:
+                start_next_sub_range()
+
+            while sub_range_queues:
+                sub_range_queue = sub_range_queues[0]
+                while (record_batch := await sub_range_queue.get()) is not None:
+                    await queue.put(record_batch)
+
+                sub_range_queues.popleft()
+                if pending_sub_ranges:
+                    start_next_sub_range()
+
+    async def produce_record_batches_from_query_range(
+        self,
+        client: ClickHouseClient,
+        query_or_model: str | RecordBatchModel,
+        interval_start: dt.datetime | None,
+        interval_end: dt.datetime,
+        query_parameters: dict[str, typing.Any],
+        put: collections.abc.Callable[[pa.RecordBatch], collections.abc.Awaitable[None]],
+        max_record_batch_size_bytes: int = 0,
+        min_records_per_batch: int = 100,
+    ):
+        """Stream the record batches of a single query range, passing each slice to `put`."""
+        if interval_start is not None:
+            query_parameters["interval_start"] = interval_start.strftime("%Y-%m-%d %H:%M:%S.%f")
+        query_parameters["interval_end"] = interval_end.strftime("%Y-%m-%d %H:%M:%S.%f")
+        query_id = uuid.uuid4()
+
+        if isinstance(query_or_model, RecordBatchModel):
+            query, query_parameters = await query_or_model.as_query_with_parameters(interval_start, interval_end)
+        else:
+            query = query_or_model
+
+        try:
+            async for record_batch in client.astream_query_as_arrow(
+                query, query_parameters=query_parameters, query_id=str(query_id)
+            ):
+                for record_batch_slice in slice_record_batch(
+                    record_batch, max_record_batch_size_bytes, min_records_per_batch
+                ):
+                    await put(record_batch_slice)
+
+        except Exception as e:
+            await self.logger.aexception("Unexpected error occurred while producing record batches", exc_info=e)
+            raise
 
 
 def slice_record_batch(
@@ -1003,6 +1227,44 @@ def slice_record_batch(
         length = total_rows - yielded_rows
 
 
+def can_split_query_range(model_name: str) -> bool:
+    """Whether the range of a model's query can be split into sub-ranges that are queried concurrently.
+
+    The persons query selects the latest version of each person up to `interval_end`, so splitting it would
+    export persons updated in multiple sub-ranges more than once. The events queries deduplicate with
+    `DISTINCT ON` within each sub-range, so duplicates in different sub-ranges are exported, like duplicates
+    in consecutive runs already are.
+    """
+    return model_name != "persons"
+
+
+def format_timestamp_interval_parameters(
+    date_range: tuple[dt.datetime | None, dt.datetime],
+) -> dict[str, str]:
+    """Query parameters of the range the events queries bound `timestamp` relative to."""
+    start_at, end_at = date_range
+    parameters = {"timestamp_interval_end": end_at.strftime("%Y-%m-%d %H:%M:%S.%f")}
+    if start_at is not None:
+        parameters["timestamp_interval_start"] = start_at.strftime("%Y-%m-%d %H:%M:%S.%f")
+    return parameters
+
+
+def split_date_range(date_range: DateRange, parts: int) -> list[DateRange]:
+    """Split a date range into up to `parts` contiguous sub-ranges of equal duration.
+
+    Sub-ranges are never shorter than `MIN_SUB_RANGE_DURATION`, as a query per tiny
+    range would cost more than what querying them concurrently saves.
+    """
+    start_at, end_at = date_range
+    parts = min(parts, (end_at - start_at) // MIN_SUB_RANGE_DURATION)
+    if parts <= 1:
+        return [date_range]
+
+    step = (end_at - start_at) / parts
+    boundaries = [start_at, *(start_at + step * part for part in range(1, parts)), end_at]
+    return list(zip(boundaries[:-1], boundaries[1:]))
+
+
 def generate_query_ranges(
     remaining_range: tuple[dt.datetime | None, dt.datetime],
     done_ranges: collections.abc.Sequence[tuple[dt.datetime, dt.datetime]],
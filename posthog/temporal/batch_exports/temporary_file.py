@@ -3,24 +3,36 @@
 import abc
 import asyncio
 import collections.abc
+import concurrent.futures
 import contextlib
 import csv
 import datetime as dt
 import enum
 import gzip
+import itertools
 import json
+import os
+import re
+import struct
 import tempfile
+import time
 import typing
 
 import brotli
+import numpy as np
 import orjson
 import psycopg
 import pyarrow as pa
+import pyarrow.compute as pc
+import pyarrow.csv as pa_csv
 import pyarrow.parquet as pq
 import structlog
+import zstd
 from psycopg import sql
+from temporalio import activity
 
 from posthog.temporal.batch_exports.heartbeat import DateRange
+from posthog.temporal.batch_exports.metrics import get_bytes_compressed_metric, get_compression_time_metric
 
 logger = structlog.get_logger()
 
@@ -47,6 +59,69 @@ def json_dumps_bytes(d) -> bytes:
         return orjson.dumps(cleaned_d, default=str)
 
 
+ZSTD_COMPRESSION_LEVEL = 3
+# Writes larger than this are compressed in chunks in parallel, for compressions which have no state between writes
+PARALLEL_COMPRESSION_CHUNK_SIZE_BYTES = 1024 * 1024
+# zlib and zstd release the GIL while compressing, so threads compress in parallel
+_compression_executor = concurrent.futures.ThreadPoolExecutor(
+    max_workers=min(4, os.cpu_count() or 1), thread_name_prefix="batch-export-compression"
+)
+
+# Characters orjson escapes in strings, any other character is written as is
+JSON_ESCAPED_CHARACTERS_REGEX = r'["\\\x00-\x1f]'
+
+
+def json_encode_array(array: pa.Array) -> pa.Array:
+    """JSON encode every value of an array as `orjson.dumps(value, default=str)` would.
+
+    Integers, booleans and strings without characters to escape are encoded by Arrow, without
+    converting them to Python objects. Any other value is encoded by orjson.
+
+    Raises:
+        orjson.JSONEncodeError: If orjson fails to encode any value.
+        pa.ArrowInvalid: If a string is not valid UTF-8.
+    """
+    json_null = pa.scalar(b"null", pa.large_binary())
+
+    if pa.types.is_null(array.type):
+        return pa.repeat(json_null, len(array))
+
+    if pa.types.is_integer(array.type) or pa.types.is_boolean(array.type):
+        return array.cast(pa.string()).cast(pa.large_binary()).fill_null(json_null)
+
+    if pa.types.is_string(array.type) or pa.types.is_large_string(array.type):
+        array.validate(full=True)
+
+        if not pc.any(pc.match_substring_regex(array, JSON_ESCAPED_CHARACTERS_REGEX)).as_py():
+            quote = pa.scalar(b'"', pa.large_binary())
+            return pc.binary_join_element_wise(
+                quote, array.cast(pa.large_binary()), quote, pa.scalar(b"", pa.large_binary())
+            ).fill_null(json_null)
+
+    return pa.array([orjson.dumps(value, default=str) for value in array.to_pylist()], type=pa.large_binary())
+
+
+def record_batch_to_jsonl(record_batch: pa.RecordBatch) -> bytes:
+    """Serialize a record batch as JSONL by encoding it column by column, instead of row by row.
+
+    Output matches dumping every row of `record_batch.to_pylist()` with orjson, and raises the same
+    exceptions as `json_encode_array` when that doesn't work.
+    """
+    if record_batch.num_rows == 0 or record_batch.num_columns == 0:
+        return b""
+
+    row_parts: list[pa.Array | pa.Scalar] = []
+    for index, (name, array) in enumerate(zip(record_batch.schema.names, record_batch.columns)):
+        key = (b"{" if index == 0 else b",") + orjson.dumps(name) + b":"
+        row_parts.append(pa.scalar(key, pa.large_binary()))
+        row_parts.append(json_encode_array(array))
+    row_parts.append(pa.scalar(b"}\n", pa.large_binary()))
+
+    rows = pc.binary_join_element_wise(*row_parts, pa.scalar(b"", pa.large_binary()))
+    all_rows = pa.LargeListArray.from_arrays(pa.array([0, len(rows)], type=pa.int64()), rows)
+    return pc.binary_join(all_rows, pa.scalar(b"", pa.large_binary()))[0].as_py()
+
+
 class BatchExportTemporaryFile:
     """A TemporaryFile used to as an intermediate step while exporting data.
 
@@ -68,22 +143,27 @@ class BatchExportTemporaryFile:
         *,
         errors: str | None = None,
     ):
-        self._file = tempfile.NamedTemporaryFile(
-            mode=mode,
-            encoding=encoding,
-            newline=newline,
-            buffering=buffering,
-            suffix=suffix,
-            prefix=prefix,
-            dir=dir,
-            errors=errors,
-        )
+        self._file_kwargs = {
+            "mode": mode,
+            "encoding": encoding,
+            "newline": newline,
+            "buffering": buffering,
+            "suffix": suffix,
+            "prefix": prefix,
+            "dir": dir,
+            "errors": errors,
+        }
+        self._file = tempfile.NamedTemporaryFile(**self._file_kwargs)
         self.compression = compression
         self.bytes_total = 0
         self.records_total = 0
         self.bytes_since_last_reset = 0
         self.records_since_last_reset = 0
+        self.uncompressed_bytes_since_last_reset = 0
+        self.compression_seconds_since_last_reset = 0.0
         self._brotli_compressor = None
+        self._brotli_executor: concurrent.futures.ThreadPoolExecutor | None = None
+        self._deferred_writes: list[bytes] | None = None
 
     def __getattr__(self, name):
         """Pass get attr to underlying tempfile.NamedTemporaryFile."""
@@ -97,6 +177,11 @@ class BatchExportTemporaryFile:
     def __exit__(self, exc, value, tb):
         """Context-manager protocol exit method."""
         self._file.__exit__(exc, value, tb)
+
+        if self._brotli_executor is not None:
+            self._brotli_executor.shutdown()
+            self._brotli_executor = None
+
         return False
 
     def __iter__(self):
@@ -111,15 +196,31 @@ class BatchExportTemporaryFile:
             self._brotli_compressor = brotli.Compressor()
         return self._brotli_compressor
 
+    @property
+    def brotli_executor(self) -> concurrent.futures.ThreadPoolExecutor:
+        """A single worker executor, so this file's brotli stream is compressed in order off the event loop."""
+        if self._brotli_executor is None:
+            self._brotli_executor = concurrent.futures.ThreadPoolExecutor(
+                max_workers=1, thread_name_prefix="batch-export-brotli"
+            )
+        return self._brotli_executor
+
     def finish_brotli_compressor(self):
         """Flush remaining brotli bytes."""
         # TODO: Move compression out of `BatchExportTemporaryFile` to a standard class for all writers.
         if self.compression != "brotli":
             raise ValueError(f"Compression is '{self.compression}', not 'brotli'")
 
-        result = self._file.write(self.brotli_compressor.finish())
-        self.bytes_total += result
-        self.bytes_since_last_reset += result
+        self._write_compressed(self.brotli_compressor.finish())
+        self._brotli_compressor = None
+
+    async def afinish_brotli_compressor(self):
+        """Flush remaining brotli bytes, finishing the stream in this file's brotli executor."""
+        if self.compression != "brotli":
+            raise ValueError(f"Compression is '{self.compression}', not 'brotli'")
+
+        loop = asyncio.get_running_loop()
+        self._write_compressed(await loop.run_in_executor(self.brotli_executor, self.brotli_compressor.finish))
         self._brotli_compressor = None
 
     def compress(self, content: bytes | str) -> bytes:
@@ -128,21 +229,103 @@ class BatchExportTemporaryFile:
         else:
             encoded = content
 
+        if self.compression is None:
+            return encoded
+
+        start = time.perf_counter()
+        compressed = self._compress(encoded)
+        self.compression_seconds_since_last_reset += time.perf_counter() - start
+        self.uncompressed_bytes_since_last_reset += len(encoded)
+
+        return compressed
+
+    def _compress(self, encoded: bytes) -> bytes:
+        """Compress encoded content.
+
+        gzip members and zstd frames can be concatenated, so large content is split in chunks that are compressed in
+        parallel, and then concatenated in order. Brotli has a single stream per file, so it's compressed as is.
+        """
+        if self.compression == "brotli":
+            return self._compress_brotli(encoded)
+        return compress_in_parallel(self._chunk_compressor(), encoded)
+
+    async def acompress(self, content: bytes | str) -> bytes:
+        """Compress content like `compress`, but in executors instead of the calling thread.
+
+        gzip and zstd chunks are compressed in the shared compression executor, brotli in this file's own
+        single worker executor, which keeps its stream in order.
+        """
+        encoded = content.encode("utf-8") if isinstance(content, str) else content
+
+        if self.compression is None:
+            return encoded
+
+        loop = asyncio.get_running_loop()
+        start = time.perf_counter()
+
+        if self.compression == "brotli":
+            compressed = await loop.run_in_executor(self.brotli_executor, self._compress_brotli, encoded)
+        else:
+            compress = self._chunk_compressor()
+            compressed_chunks = await asyncio.gather(
+                *(loop.run_in_executor(_compression_executor, compress, chunk) for chunk in split_in_chunks(encoded))
+            )
+            compressed = b"".join(compressed_chunks)
+
+        self.compression_seconds_since_last_reset += time.perf_counter() - start
+        self.uncompressed_bytes_since_last_reset += len(encoded)
+
+        return compressed
+
+    def _chunk_compressor(self) -> collections.abc.Callable[[bytes], bytes]:
+        """Function compressing a chunk on its own, for compressions which have no state between writes."""
         match self.compression:
             case "gzip":
-                return gzip.compress(encoded)
-            case "brotli":
-                self.brotli_compressor.process(encoded)
-                return self.brotli_compressor.flush()
-            case None:
-                return encoded
+                return gzip.compress
+            case "zstd":
+                return lambda chunk: zstd.compress(chunk, ZSTD_COMPRESSION_LEVEL)
             case _:
                 raise ValueError(f"Unsupported compression: '{self.compression}'")
 
+    def _compress_brotli(self, encoded: bytes) -> bytes:
+        self.brotli_compressor.process(encoded)
+        return self.brotli_compressor.flush()
+
     def write(self, content: bytes | str):
-        """Write bytes to underlying file keeping track of how many bytes were written."""
-        compressed_content = self.compress(content)
+        """Write bytes to underlying file keeping track of how many bytes were written.
+
+        Within `deferred_compression`, content is buffered instead, and the number of uncompressed bytes
+        buffered is returned.
+        """
+        if self._deferred_writes is not None:
+            encoded = content.encode("utf-8") if isinstance(content, str) else content
+            self._deferred_writes.append(encoded)
+            return len(encoded)
+
+        return self._write_compressed(self.compress(content))
+
+    async def awrite(self, content: bytes | str):
+        """Write bytes to underlying file like `write`, compressing them off the event loop."""
+        return self._write_compressed(await self.acompress(content))
+
+    @contextlib.asynccontextmanager
+    async def deferred_compression(self):
+        """Buffer content written within this context, and compress it off the event loop when exiting.
 
+        This lets synchronous code, like the writers serializing record batches in a thread, write to this
+        file without compressing in that thread.
+        """
+        self._deferred_writes = []
+        try:
+            yield self
+            content = b"".join(self._deferred_writes)
+        finally:
+            self._deferred_writes = None
+
+        if content:
+            await self.awrite(content)
+
+    def _write_compressed(self, compressed_content: bytes) -> int:
         if "b" in self.mode:
             result = self._file.write(compressed_content)
         else:
@@ -250,6 +433,44 @@ class BatchExportTemporaryFile:
 
         self.bytes_since_last_reset = 0
         self.records_since_last_reset = 0
+        self.uncompressed_bytes_since_last_reset = 0
+        self.compression_seconds_since_last_reset = 0.0
+
+    def split(self) -> "BatchExportTemporaryFile":
+        """Move what was written since the last reset to a new file, and continue writing to an empty one.
+
+        This lets the caller hold on to the written data, for example while uploading it, without blocking
+        further writes. Compression state stays with this file, so the data on either side of a split still
+        makes a single stream once concatenated. The caller is responsible for closing the returned file.
+        """
+        split_file = BatchExportTemporaryFile(**self._file_kwargs)
+        split_file._file, self._file = self._file, split_file._file
+        split_file.bytes_total = split_file.bytes_since_last_reset = self.bytes_since_last_reset
+        split_file.records_total = split_file.records_since_last_reset = self.records_since_last_reset
+        split_file.rewind()
+
+        self.reset()
+        return split_file
+
+
+def split_in_chunks(content: bytes, chunk_size: int = PARALLEL_COMPRESSION_CHUNK_SIZE_BYTES) -> list[bytes]:
+    """Split content in chunks of chunk_size, always returning at least one chunk."""
+    if len(content) <= chunk_size:
+        return [content]
+    return [content[start : start + chunk_size] for start in range(0, len(content), chunk_size)]
+
+
+def compress_in_parallel(
+    compress: collections.abc.Callable[[bytes], bytes],
+    content: bytes,
+    chunk_size: int = PARALLEL_COMPRESSION_CHUNK_SIZE_BYTES,
+) -> bytes:
+    """Compress content in chunks of chunk_size in parallel, concatenating the compressed chunks in order."""
+    chunks = split_in_chunks(content, chunk_size)
+    if len(chunks) == 1:
+        return compress(content)
+
+    return b"".join(_compression_executor.map(compress, chunks))
 
 
 IsLast = bool
@@ -309,6 +530,10 @@ class BatchExportWriter(abc.ABC):
         records_since_last_flush: The number of records written since last flush.
         bytes_total: The total number of bytes written.
         bytes_since_last_flush: The number of bytes written since last flush.
+        date_range_tracker: Optional callable returning the date range done so far, used instead of
+            the `_inserted_at` range of the records written when it returns a range. Record batches
+            produced from multiple ranges concurrently are interleaved, so their `_inserted_at`
+            range would include records of ranges that are not done yet.
     """
 
     def __init__(
@@ -324,6 +549,7 @@ class BatchExportWriter(abc.ABC):
         self.file_kwargs: collections.abc.Mapping[str, typing.Any] = file_kwargs or {}
 
         self._batch_export_file: BatchExportTemporaryFile | None = None
+        self.date_range_tracker: collections.abc.Callable[[], DateRange | None] | None = None
         self.reset_writer_tracking()
 
     def reset_writer_tracking(self):
@@ -442,7 +668,12 @@ class BatchExportWriter(abc.ABC):
         if not include_inserted_at:
             column_names.pop(column_names.index("_inserted_at"))
 
-        await asyncio.to_thread(self._write_record_batch, record_batch.select(column_names))
+        if self.batch_export_file.compression is None:
+            await asyncio.to_thread(self._write_record_batch, record_batch.select(column_names))
+        else:
+            # Serialize in a thread, and compress in the compression executors once serialized
+            async with self.batch_export_file.deferred_compression():
+                await asyncio.to_thread(self._write_record_batch, record_batch.select(column_names))
 
         self.track_records_written(record_batch)
         self.track_bytes_written(self.batch_export_file)
@@ -462,12 +693,17 @@ class BatchExportWriter(abc.ABC):
         The underlying batch export temporary file will be reset after calling `flush_callable`.
         """
         if is_last is True and self.batch_export_file.compression == "brotli":
-            self.batch_export_file.finish_brotli_compressor()
+            await self.batch_export_file.afinish_brotli_compressor()
 
+        self.track_compression(self.batch_export_file)
         self.batch_export_file.seek(0)
 
-        if self.date_range_since_last_flush is not None:
-            self.flushed_date_ranges.append(self.date_range_since_last_flush)
+        date_range = self.date_range_tracker() if self.date_range_tracker is not None else None
+        if date_range is None:
+            date_range = self.date_range_since_last_flush
+
+        if date_range is not None:
+            self.flushed_date_ranges.append(date_range)
 
         await self.flush_callable(
             self.batch_export_file,
@@ -486,6 +722,18 @@ class BatchExportWriter(abc.ABC):
         self.start_at_since_last_flush = None
         self.end_at_since_last_flush = None
 
+    def track_compression(self, batch_export_file: BatchExportTemporaryFile) -> None:
+        """Report how much was compressed since the last flush and how long it took, to monitor throughput."""
+        if batch_export_file.compression is None or not activity.in_activity():
+            return
+
+        get_bytes_compressed_metric(batch_export_file.compression).add(
+            batch_export_file.uncompressed_bytes_since_last_reset
+        )
+        get_compression_time_metric(batch_export_file.compression).add(
+            int(batch_export_file.compression_seconds_since_last_reset * 1000)
+        )
+
     async def hard_flush(self):
         """Flush the underlying file by closing the temporary file and creating a new one.
 
@@ -501,6 +749,7 @@ class WriterFormat(enum.StrEnum):
     PARQUET = enum.auto()
     CSV = enum.auto()
     REDSHIFT_INSERT = enum.auto()
+    POSTGRES_BINARY = enum.auto()
 
     @staticmethod
     def from_str(format_str: str, destination: str):
@@ -513,6 +762,8 @@ class WriterFormat(enum.StrEnum):
                 return WriterFormat.CSV
             case "REDSHIFT_INSERT":
                 return WriterFormat.REDSHIFT_INSERT
+            case "POSTGRES_BINARY":
+                return WriterFormat.POSTGRES_BINARY
             case _:
                 raise UnsupportedFileFormatError(format_str, destination)
 
@@ -552,6 +803,16 @@ def get_batch_export_writer(
                 **kwargs,
             )
 
+        case WriterFormat.POSTGRES_BINARY:
+            # the writer encodes by the PostgreSQL types of `fields`, so it has no use for the record batch schema
+            kwargs.pop("schema", None)
+            return PostgresBinaryBatchExportWriter(
+                max_bytes=max_bytes,
+                flush_callable=flush_callable,
+                max_file_size_bytes=max_file_size_bytes,
+                **kwargs,
+            )
+
 
 class JSONLBatchExportWriter(BatchExportWriter):
     """A `BatchExportWriter` for JSONLines format.
@@ -623,7 +884,20 @@ class JSONLBatchExportWriter(BatchExportWriter):
         return n
 
     def _write_record_batch(self, record_batch: pa.RecordBatch) -> None:
-        """Write records to a temporary file as JSONL."""
+        """Write records to a temporary file as JSONL.
+
+        Record batches are serialized column by column. Any that orjson fails to encode, or that have
+        invalid unicode, are written row by row instead, which can work around those failures.
+        """
+        try:
+            jsonl = record_batch_to_jsonl(record_batch)
+        except (orjson.JSONEncodeError, pa.ArrowInvalid):
+            self._write_record_batch_by_row(record_batch)
+        else:
+            if jsonl:
+                self.batch_export_file.write(jsonl)
+
+    def _write_record_batch_by_row(self, record_batch: pa.RecordBatch) -> None:
         for record_dict in record_batch.to_pylist():
             if not record_dict:
                 continue
@@ -648,6 +922,7 @@ class CSVBatchExportWriter(BatchExportWriter):
         quoting=csv.QUOTE_NONE,
         compression: str | None = None,
         max_file_size_bytes: int = 0,
+        use_arrow_csv_writer: bool = False,
     ):
         super().__init__(
             max_bytes=max_bytes,
@@ -662,6 +937,14 @@ class CSVBatchExportWriter(BatchExportWriter):
         self.escape_char = escape_char
         self.line_terminator = line_terminator
         self.quoting = quoting
+        # Arrow only supports the dialect of the PostgreSQL batch export, which is what we need it for
+        self.use_arrow_csv_writer = (
+            use_arrow_csv_writer
+            and quoting == csv.QUOTE_MINIMAL
+            and quote_char == '"'
+            and escape_char is None
+            and line_terminator == "\n"
+        )
 
         self._csv_writer: csv.DictWriter | None = None
 
@@ -695,6 +978,10 @@ class CSVBatchExportWriter(BatchExportWriter):
         replacement of [] for {} to support PostgreSQL literal arrays when writing
         a list.
         """
+        if self.use_arrow_csv_writer:
+            self._write_record_batch_with_arrow(record_batch)
+            return
+
         rows = []
         for record in record_batch.to_pylist():
             rows.append(
@@ -702,6 +989,58 @@ class CSVBatchExportWriter(BatchExportWriter):
             )
         self.csv_writer.writerows(rows)
 
+    def _write_record_batch_with_arrow(self, record_batch: pa.RecordBatch) -> None:
+        """Write records to a temporary file as CSV with `pyarrow.csv`, without converting rows to Python.
+
+        Columns of types Arrow can't write as CSV are converted to strings like `csv.DictWriter` would.
+        In contrast to `csv.DictWriter`, strings are always quoted, so empty strings are not written
+        the same way as nulls.
+        """
+        arrays = []
+        for field_name in self.field_names:
+            index = record_batch.schema.get_field_index(field_name)
+            if index == -1:
+                arrays.append(pa.nulls(record_batch.num_rows))
+                continue
+
+            array = record_batch.column(index)
+            if is_arrow_csv_type(array.type):
+                arrays.append(array)
+            else:
+                arrays.append(pa.array([to_csv_string(value) for value in array.to_pylist()], type=pa.large_string()))
+
+        buffer = pa.BufferOutputStream()
+        pa_csv.write_csv(
+            pa.RecordBatch.from_arrays(arrays, names=list(self.field_names)),
+            buffer,
+            write_options=pa_csv.WriteOptions(include_header=False, delimiter=self.delimiter, quoting_style="needed"),
+        )
+        self.batch_export_file.write(buffer.getvalue().to_pybytes())
+
+
+def to_csv_string(value: typing.Any) -> str | None:
+    """Convert a value to the string `CSVBatchExportWriter` writes for it, keeping nulls."""
+    if value is None:
+        return None
+    if isinstance(value, list):
+        return str(value).replace("[", "{").replace("]", "}")
+    return str(value)
+
+
+def is_arrow_csv_type(data_type: pa.DataType) -> bool:
+    """Whether `pyarrow.csv` can write values of a type."""
+    return (
+        pa.types.is_null(data_type)
+        or pa.types.is_boolean(data_type)
+        or pa.types.is_integer(data_type)
+        or pa.types.is_floating(data_type)
+        or pa.types.is_decimal(data_type)
+        or pa.types.is_string(data_type)
+        or pa.types.is_large_string(data_type)
+        or pa.types.is_timestamp(data_type)
+        or pa.types.is_date(data_type)
+    )
+
 
 class ParquetBatchExportWriter(BatchExportWriter):
     """A `BatchExportWriter` for Apache Parquet format.
@@ -906,3 +1245,222 @@ class RedshiftInsertBatchExportWriter(BatchExportWriter):
         """Ensure we mark next query as first after closing a file."""
         await super().close_temporary_file()
         self.first = True
+
+
+# See: https://www.postgresql.org/docs/current/sql-copy.html#id-1.9.3.55.9.4
+POSTGRES_BINARY_COPY_SIGNATURE = b"PGCOPY\n\xff\r\n\x00" + struct.pack(">ii", 0, 0)
+POSTGRES_BINARY_COPY_TRAILER = struct.pack(">h", -1)
+# PostgreSQL timestamps are microseconds since 2000-01-01
+POSTGRES_EPOCH_MICROSECONDS = 946_684_800_000_000
+
+_POSTGRES_NULL_FIELD = struct.pack(">i", -1)
+_INT32 = struct.Struct(">i")
+
+_POSTGRES_TYPE_ALIASES = {
+    "int": "integer",
+    "int2": "smallint",
+    "int4": "integer",
+    "int8": "bigint",
+    "float4": "real",
+    "float8": "double precision",
+    "bool": "boolean",
+    "timestamp": "timestamp without time zone",
+    "timestamptz": "timestamp with time zone",
+    "varchar": "character varying",
+}
+# Arrow types the binary format of fixed size PostgreSQL types is written from
+_POSTGRES_FIXED_SIZE_TYPES = {
+    "smallint": pa.int16(),
+    "integer": pa.int32(),
+    "bigint": pa.int64(),
+    "real": pa.float32(),
+    "double precision": pa.float64(),
+    "boolean": pa.bool_(),
+}
+_POSTGRES_TEXT_TYPES = {"text", "character varying", "json", "jsonb"}
+# Element type OIDs of the array types we write
+_POSTGRES_TEXT_ARRAY_TYPES = {"text[]": 25, "character varying[]": 1043}
+
+
+def normalize_postgres_type(pg_type: str) -> str:
+    """Normalize a PostgreSQL type to its canonical name without modifiers, e.g. 'VARCHAR(200)' to 'character varying'."""
+    pg_type = " ".join(re.sub(r"\(\d+\)", "", pg_type.lower()).split())
+    is_array = pg_type.endswith("[]")
+    pg_type = pg_type.removesuffix("[]").strip()
+    pg_type = _POSTGRES_TYPE_ALIASES.get(pg_type, pg_type)
+    return f"{pg_type}[]" if is_array else pg_type
+
+
+def is_postgres_binary_copy_supported(schema: pa.Schema, fields: collections.abc.Iterable[tuple[str, str]]) -> bool:
+    """Whether `PostgresBinaryBatchExportWriter` can write record batches of `schema` into columns of `fields`.
+
+    Fields missing from `schema` are supported, as they are written as nulls.
+    """
+    for name, pg_type in fields:
+        index = schema.get_field_index(name)
+        if index == -1:
+            continue
+
+        data_type = schema.field(index).type
+        if isinstance(data_type, pa.ExtensionType):
+            data_type = data_type.storage_type
+
+        pg_type = normalize_postgres_type(pg_type)
+        if pg_type in ("smallint", "integer", "bigint"):
+            supported = pa.types.is_integer(data_type)
+        elif pg_type in ("real", "double precision"):
+            supported = pa.types.is_integer(data_type) or pa.types.is_floating(data_type)
+        elif pg_type == "boolean":
+            supported = pa.types.is_boolean(data_type)
+        elif pg_type in ("timestamp with time zone", "timestamp without time zone"):
+            supported = pa.types.is_timestamp(data_type)
+        elif pg_type in _POSTGRES_TEXT_TYPES:
+            supported = pa.types.is_string(data_type) or pa.types.is_large_string(data_type)
+        elif pg_type in _POSTGRES_TEXT_ARRAY_TYPES:
+            supported = (pa.types.is_list(data_type) or pa.types.is_large_list(data_type)) and (
+                pa.types.is_string(data_type.value_type) or pa.types.is_large_string(data_type.value_type)
+            )
+        else:
+            supported = False
+
+        if not supported:
+            return False
+
+    return True
+
+
+class PostgresBinaryBatchExportWriter(BatchExportWriter):
+    """A `BatchExportWriter` for the tuples of PostgreSQL's binary COPY format.
+
+    Each column is encoded from its Arrow array into the binary format of its PostgreSQL
+    type at once, instead of converting every value to Python and to a string that
+    PostgreSQL has to parse again. Only tuples are written: Each flush is copied on its
+    own, so `POSTGRES_BINARY_COPY_SIGNATURE` and `POSTGRES_BINARY_COPY_TRAILER` have to be
+    sent around the file contents.
+
+    Use `is_postgres_binary_copy_supported` to check the record batch schema can be written
+    into the PostgreSQL types of `fields`.
+
+    Arguments:
+        fields: Names and PostgreSQL types of the columns to write, in order. Types must
+            match the destination table exactly, as PostgreSQL rejects binary data of any
+            other type.
+    """
+
+    def __init__(
+        self,
+        max_bytes: int,
+        flush_callable: FlushCallable,
+        fields: collections.abc.Sequence[tuple[str, str]],
+        max_file_size_bytes: int = 0,
+    ):
+        super().__init__(
+            max_bytes=max_bytes,
+            flush_callable=flush_callable,
+            file_kwargs={"compression": None},
+            max_file_size_bytes=max_file_size_bytes,
+        )
+        self.fields = [(name, normalize_postgres_type(pg_type)) for name, pg_type in fields]
+        self._tuple_header = struct.pack(">h", len(self.fields))
+
+    def _write_record_batch(self, record_batch: pa.RecordBatch) -> None:
+        """Write records to a temporary file as binary COPY tuples."""
+        columns = []
+        for name, pg_type in self.fields:
+            index = record_batch.schema.get_field_index(name)
+            if index == -1:
+                columns.append(itertools.repeat(_POSTGRES_NULL_FIELD, record_batch.num_rows))
+                continue
+
+            columns.append(encode_postgres_binary_column(record_batch.column(index), pg_type))
+
+        self.batch_export_file.write(
+            b"".join(itertools.chain.from_iterable(zip(itertools.repeat(self._tuple_header), *columns)))
+        )
+
+
+def encode_postgres_binary_column(array: pa.Array, pg_type: str) -> list[bytes]:
+    """Encode an Arrow array as binary COPY fields of a PostgreSQL type, including each field's length."""
+    if isinstance(array, pa.ExtensionArray):
+        array = array.storage
+
+    if pg_type in _POSTGRES_FIXED_SIZE_TYPES:
+        # Safe casts raise on overflow, except when there is nothing to lose by it, like integers in floats
+        safe = not pa.types.is_floating(_POSTGRES_FIXED_SIZE_TYPES[pg_type])
+        return _encode_postgres_fixed_size_column(array.cast(_POSTGRES_FIXED_SIZE_TYPES[pg_type], safe=safe))
+
+    elif pg_type in ("timestamp with time zone", "timestamp without time zone"):
+        microseconds = array.cast(pa.timestamp("us", tz=array.type.tz), safe=False).cast(pa.int64())
+        return _encode_postgres_fixed_size_column(pc.subtract(microseconds, POSTGRES_EPOCH_MICROSECONDS))
+
+    elif pg_type in ("json", "jsonb"):
+        # \u0000 cannot be present in PostgreSQL's jsonb type, and will cause an error.
+        # See: https://www.postgresql.org/docs/17/datatype-json.html
+        array = pc.replace_substring(array, "\\u0000", "")
+        # jsonb is prefixed with the version of its binary format
+        return _encode_postgres_bytes_column(array, b"\x01" if pg_type == "jsonb" else b"")
+
+    elif pg_type in _POSTGRES_TEXT_TYPES:
+        return _encode_postgres_bytes_column(array)
+
+    elif pg_type in _POSTGRES_TEXT_ARRAY_TYPES:
+        return _encode_postgres_text_array_column(array, _POSTGRES_TEXT_ARRAY_TYPES[pg_type])
+
+    raise TypeError(f"Unsupported PostgreSQL type for binary COPY: '{pg_type}'")
+
+
+def _encode_postgres_fixed_size_column(array: pa.Array) -> list[bytes]:
+    values = pc.fill_null(array, False if pa.types.is_boolean(array.type) else 0).to_numpy(zero_copy_only=False)
+    value_dtype = values.dtype.newbyteorder(">")
+
+    fields = np.empty(len(values), dtype=[("length", ">i4"), ("value", value_dtype)])
+    fields["length"] = value_dtype.itemsize
+    fields["value"] = values
+
+    field_size = fields.dtype.itemsize
+    buffer = fields.tobytes()
+    encoded = [buffer[offset : offset + field_size] for offset in range(0, len(buffer), field_size)]
+
+    if array.null_count > 0:
+        for index in np.flatnonzero(array.is_null().to_numpy(zero_copy_only=False)):
+            encoded[index] = _POSTGRES_NULL_FIELD
+
+    return encoded
+
+
+def _encode_postgres_bytes_column(array: pa.Array, prefix: bytes = b"") -> list[bytes]:
+    # Casting to binary keeps the UTF-8 encoded strings as they are, without decoding them into Python strings
+    values = array.cast(pa.large_binary()).to_pylist()
+    return [
+        _POSTGRES_NULL_FIELD if value is None else _INT32.pack(len(prefix) + len(value)) + prefix + value
+        for value in values
+    ]
+
+
+def _encode_postgres_text_array_column(array: pa.Array, element_oid: int) -> list[bytes]:
+    encoded = []
+    for elements in array.to_pylist():
+        if elements is None:
+            encoded.append(_POSTGRES_NULL_FIELD)
+            continue
+
+        if not elements:
+            # Empty arrays have no dimensions
+            data = struct.pack(">iii", 0, 0, element_oid)
+        else:
+            has_nulls = False
+            encoded_elements = []
+            for element in elements:
+                if element is None:
+                    has_nulls = True
+                    encoded_elements.append(_POSTGRES_NULL_FIELD)
+                else:
+                    element_bytes = element.encode("utf-8")
+                    encoded_elements.append(_INT32.pack(len(element_bytes)) + element_bytes)
+
+            # One dimension with its size and lower bound
+            data = struct.pack(">iiiii", 1, has_nulls, element_oid, len(elements), 1) + b"".join(encoded_elements)
+
+        encoded.append(_INT32.pack(len(data)) + data)
+
+    return encoded
@@ -288,6 +288,7 @@ TEST_MODELS: list[BatchExportModel | BatchExportSchema | None] = [
 ]
 
 
+@pytest.mark.parametrize("binary_copy", [False, True])
 @pytest.mark.parametrize("exclude_events", [None, ["test-exclude"]], indirect=True)
 @pytest.mark.parametrize("model", TEST_MODELS)
 async def test_insert_into_postgres_activity_inserts_data_into_postgres_table(
@@ -301,6 +302,7 @@ async def test_insert_into_postgres_activity_inserts_data_into_postgres_table(
     data_interval_start,
     data_interval_end,
     ateam,
+    binary_copy,
 ):
     """Test that the insert_into_postgres_activity function inserts data into a PostgreSQL table.
 
@@ -316,6 +318,8 @@ async def test_insert_into_postgres_activity_inserts_data_into_postgres_table(
     that they appear in the expected PostgreSQL table. This function utilizes the local
     development postgres instance for testing. But we setup and manage our own database
     to avoid conflicting with PostHog itself.
+
+    We run it copying both TSV and PostgreSQL's binary format, which should insert the same data.
     """
     if (
         isinstance(model, BatchExportModel)
@@ -342,7 +346,9 @@ async def test_insert_into_postgres_activity_inserts_data_into_postgres_table(
         **postgres_config,
     )
 
-    with override_settings(BATCH_EXPORT_POSTGRES_UPLOAD_CHUNK_SIZE_BYTES=5 * 1024**2):
+    with override_settings(
+        BATCH_EXPORT_POSTGRES_UPLOAD_CHUNK_SIZE_BYTES=5 * 1024**2, BATCH_EXPORT_POSTGRES_BINARY_COPY_ENABLED=binary_copy
+    ):
         await activity_environment.run(insert_into_postgres_activity, insert_inputs)
 
     sort_key = "event"
@@ -55,7 +55,7 @@ from posthog.temporal.batch_exports.spmc import (
     RecordBatchQueue,
     SessionsRecordBatchModel,
 )
-from posthog.temporal.batch_exports.temporary_file import UnsupportedFileFormatError
+from posthog.temporal.batch_exports.temporary_file import BatchExportTemporaryFile, UnsupportedFileFormatError
 from posthog.temporal.common.clickhouse import ClickHouseClient
 from posthog.temporal.tests.batch_exports.utils import (
     get_record_batch_from_queue,
@@ -396,7 +396,7 @@ TEST_S3_MODELS: list[BatchExportModel | BatchExportSchema | None] = [
 ]
 
 
-@pytest.mark.parametrize("compression", [None, "gzip", "brotli"], indirect=True)
+@pytest.mark.parametrize("compression", [None, "gzip", "brotli", "zstd"], indirect=True)
 @pytest.mark.parametrize("exclude_events", [None, ["test-exclude"]], indirect=True)
 @pytest.mark.parametrize("model", TEST_S3_MODELS)
 @pytest.mark.parametrize("file_format", FILE_FORMAT_EXTENSIONS.keys())
@@ -2057,6 +2057,45 @@ async def test_s3_multi_part_upload_raises_retryable_exception(bucket_name, s3_k
         await s3_upload.upload_part(io.BytesIO(b"1010"), rewind=False)  # type: ignore
 
 
+async def test_s3_multi_part_upload_uploads_parts_in_background(minio_client, bucket_name, s3_key_prefix):
+    """Test parts uploaded in the background are tracked once uploaded and completed into a single object."""
+    s3_upload = S3MultiPartUpload(
+        bucket_name=bucket_name,
+        key=s3_key_prefix,
+        encryption=None,
+        kms_key_id=None,
+        region_name="us-east-1",
+        aws_access_key_id="object_storage_root_user",
+        aws_secret_access_key="object_storage_root_password",
+        endpoint_url=settings.OBJECT_STORAGE_ENDPOINT,
+        max_concurrent_uploads=2,
+    )
+    uploaded_part_numbers = []
+
+    async def on_uploaded(part_number: int):
+        uploaded_part_numbers.append(part_number)
+
+    # All parts except the last one must be at least 5MB.
+    contents = [b"a" * 5 * 1024**2, b"b" * 5 * 1024**2, b"c" * 1024]
+
+    async with s3_upload:
+        with BatchExportTemporaryFile() as batch_export_file:
+            for content in contents:
+                batch_export_file.write(content)
+                part = batch_export_file.split()
+                await s3_upload.upload_part_in_background(part, on_uploaded=on_uploaded)
+
+        await s3_upload.wait_for_pending_parts()
+
+        assert sorted(uploaded_part_numbers) == [1, 2, 3]
+        assert [part["PartNumber"] for part in s3_upload.to_state().parts] == [1, 2, 3]
+
+        await s3_upload.complete()
+
+    s3_object = await minio_client.get_object(Bucket=bucket_name, Key=s3_key_prefix)
+    assert await s3_object["Body"].read() == b"".join(contents)
+
+
 async def test_s3_multi_part_upload_raises_exception_if_invalid_endpoint(bucket_name, s3_key_prefix):
     """Test a InvalidS3EndpointError is raised if the endpoint is invalid."""
     s3_upload = S3MultiPartUpload(
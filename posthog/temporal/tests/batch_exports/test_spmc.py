@@ -13,8 +13,10 @@ from posthog.temporal.batch_exports.spmc import (
     Producer,
     RecordBatchQueue,
     SessionsRecordBatchModel,
+    can_split_query_range,
     compose_filters_clause,
     slice_record_batch,
+    split_date_range,
     use_distributed_events_recent_table,
 )
 from posthog.temporal.tests.utils.events import generate_test_events_in_clickhouse
@@ -73,6 +75,36 @@ async def test_record_batch_queue_sets_schema():
     assert schema == record_batch.schema
 
 
+async def test_record_batch_queue_tracks_done_ranges():
+    """Test `RecordBatchQueue` only reports ranges done once all their record batches are consumed."""
+    record_batch = pa.RecordBatch.from_pylist([{"test": 1}])
+    start_at = dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC)
+    ranges = [
+        (start_at + dt.timedelta(minutes=10 * index), start_at + dt.timedelta(minutes=10 * (index + 1)))
+        for index in range(3)
+    ]
+
+    queue = RecordBatchQueue()
+    assert queue.get_done_date_range() is None
+
+    queue.start_tracking_ranges(ranges)
+    assert queue.get_done_date_range() == (start_at, start_at)
+
+    await queue.put(record_batch)
+    queue.mark_range_done(ranges[1])
+    await queue.put(record_batch)
+    queue.mark_range_done(ranges[0])
+
+    await queue.get()
+    assert queue.get_done_date_range() == (start_at, start_at)
+
+    await queue.get()
+    assert queue.get_done_date_range() == (start_at, ranges[1][1])
+
+    queue.mark_range_done(ranges[2])
+    assert queue.get_done_date_range() == (start_at, ranges[2][1])
+
+
 async def get_record_batch_from_queue(queue, produce_task):
     while not queue.empty() or not produce_task.done():
         try:
@@ -143,6 +175,153 @@ async def test_record_batch_producer_uses_extra_query_parameters(clickhouse_clie
         assert record["custom_prop"] == expected["properties"]["custom"]
 
 
+SELECT_INSERTED_EVENTS = """
+SELECT
+    toString(uuid) AS uuid,
+    COALESCE(inserted_at, _timestamp) AS _inserted_at
+FROM
+    events
+WHERE
+    team_id = {team_id}::Int64
+    AND COALESCE(inserted_at, _timestamp) >= {interval_start}::DateTime64
+    AND COALESCE(inserted_at, _timestamp) < {interval_end}::DateTime64
+FORMAT ArrowStream
+"""
+
+
+@pytest.mark.parametrize("ordered", [False, True])
+async def test_record_batch_producer_produces_concurrent_ranges(clickhouse_client, ordered):
+    """Test RecordBatch Producer produces all events when querying sub-ranges concurrently."""
+    team_id = random.randint(1, 1000000)
+    data_interval_end = dt.datetime.fromisoformat("2023-04-25T15:00:00.000000+00:00")
+    data_interval_start = dt.datetime.fromisoformat("2023-04-25T14:00:00.000000+00:00")
+
+    (events, _, _) = await generate_test_events_in_clickhouse(
+        client=clickhouse_client,
+        team_id=team_id,
+        start_time=data_interval_start,
+        end_time=data_interval_end,
+        count=1000,
+        count_outside_range=10,
+        count_other_team=10,
+        duplicate=False,
+    )
+
+    queue = RecordBatchQueue()
+    producer = Producer()
+    producer_task = asyncio.create_task(
+        producer.produce_batch_export_record_batches_from_range(
+            query_or_model=SELECT_INSERTED_EVENTS,
+            full_range=(data_interval_start, data_interval_end),
+            done_ranges=[],
+            queue=queue,
+            query_parameters={"team_id": team_id},
+            team_id=team_id,
+            max_record_batch_size_bytes=1024,
+            concurrent_ranges=4,
+            ordered=ordered,
+        )
+    )
+
+    records = await get_all_record_batches_from_queue(queue, producer_task)
+
+    assert sorted(record["uuid"] for record in records) == sorted(event["uuid"] for event in events)
+
+    if ordered:
+        sub_ranges = split_date_range((data_interval_start, data_interval_end), 4)
+        sub_range_indexes = [
+            next(
+                index
+                for index, (start_at, end_at) in enumerate(sub_ranges)
+                if start_at <= record["_inserted_at"].replace(tzinfo=dt.UTC) < end_at
+            )
+            for record in records
+        ]
+        assert sub_range_indexes == sorted(sub_range_indexes)
+    else:
+        assert queue.get_done_date_range() == (data_interval_start, data_interval_end)
+
+
+async def test_record_batch_producer_splits_events_ranges(clickhouse_client):
+    """Test RecordBatch Producer queries sub-ranges of the events model concurrently."""
+    team_id = random.randint(1, 1000000)
+    data_interval_end = dt.datetime.fromisoformat("2023-04-25T15:00:00.000000+00:00")
+    data_interval_start = dt.datetime.fromisoformat("2023-04-25T14:00:00.000000+00:00")
+
+    (events, _, _) = await generate_test_events_in_clickhouse(
+        client=clickhouse_client,
+        team_id=team_id,
+        start_time=data_interval_start,
+        end_time=data_interval_end,
+        count=100,
+        count_outside_range=10,
+        count_other_team=10,
+        duplicate=False,
+    )
+
+    queue = RecordBatchQueue()
+    producer = Producer(concurrent_ranges=4)
+    producer_task = await producer.start(
+        queue=queue,
+        team_id=team_id,
+        is_backfill=False,
+        backfill_details=None,
+        model_name="events",
+        full_range=(data_interval_start, data_interval_end),
+        done_ranges=[],
+    )
+
+    records = await get_all_record_batches_from_queue(queue, producer_task)
+
+    assert sorted(record["uuid"] for record in records) == sorted(event["uuid"] for event in events)
+    # sub-ranges are put in the queue as they are available, so the queue tracks them
+    assert queue.get_done_date_range() == (data_interval_start, data_interval_end)
+
+
+@pytest.mark.parametrize(
+    "model_name,expected",
+    [
+        ("events", True),
+        ("persons", False),
+        ("sessions", True),
+    ],
+)
+def test_can_split_query_range(model_name, expected):
+    assert can_split_query_range(model_name) is expected
+
+
+@pytest.mark.parametrize(
+    "date_range,parts,expected",
+    [
+        (
+            (dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 15, 0, tzinfo=dt.UTC)),
+            1,
+            [(dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 15, 0, tzinfo=dt.UTC))],
+        ),
+        (
+            (dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 15, 0, tzinfo=dt.UTC)),
+            3,
+            [
+                (dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 14, 20, tzinfo=dt.UTC)),
+                (dt.datetime(2023, 4, 25, 14, 20, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 14, 40, tzinfo=dt.UTC)),
+                (dt.datetime(2023, 4, 25, 14, 40, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 15, 0, tzinfo=dt.UTC)),
+            ],
+        ),
+        (
+            (dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 14, 2, tzinfo=dt.UTC)),
+            4,
+            [
+                (dt.datetime(2023, 4, 25, 14, 0, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 14, 1, tzinfo=dt.UTC)),
+                (dt.datetime(2023, 4, 25, 14, 1, tzinfo=dt.UTC), dt.datetime(2023, 4, 25, 14, 2, tzinfo=dt.UTC)),
+            ],
+        ),
+    ],
+)
+def test_split_date_range(date_range, parts, expected):
+    """Test date ranges are split into contiguous sub-ranges no shorter than a minute."""
+    assert split_date_range(date_range, parts) == expected
+
+
 def test_slice_record_batch_into_single_record_slices():
     """Test we slice a record batch into slices with a single record."""
     n_legs = pa.array([2, 2, 4, 4, 5, 100])
@@ -1,11 +1,17 @@
 import csv
 import datetime as dt
+import gzip
 import io
 import json
+import struct
+import threading
 
+import brotli
+import orjson
 import pyarrow as pa
 import pyarrow.parquet as pq
 import pytest
+import zstd
 
 from posthog.temporal.batch_exports.temporary_file import (
     BatchExportTemporaryFile,
@@ -13,7 +19,12 @@ from posthog.temporal.batch_exports.temporary_file import (
     JSONLBatchExportWriter,
     DateRange,
     ParquetBatchExportWriter,
+    PostgresBinaryBatchExportWriter,
+    WriterFormat,
+    compress_in_parallel,
+    get_batch_export_writer,
     json_dumps_bytes,
+    record_batch_to_jsonl,
 )
 
 
@@ -98,6 +109,95 @@ def test_batch_export_temporary_file_write_records_to_jsonl_invalid_unicode():
         assert json.loads(be_file.readlines()[0]) == "hello?world"
 
 
+@pytest.mark.parametrize("compression", ["gzip", "zstd"])
+def test_batch_export_temporary_file_compresses_large_writes_in_chunks(compression):
+    """Test large writes are compressed in chunks which decompress to the content written, in order."""
+    content = b"".join(orjson.dumps({"index": index, "value": "a" * (index % 50)}) + b"\n" for index in range(100_000))
+
+    with BatchExportTemporaryFile(compression=compression) as be_file:
+        be_file.write(content)
+
+        assert be_file.uncompressed_bytes_since_last_reset == len(content)
+        assert be_file.compression_seconds_since_last_reset > 0
+
+        be_file.rewind()
+        compressed = be_file.read()
+
+    decompress = gzip.decompress if compression == "gzip" else zstd.decompress
+    assert decompress(compressed) == content
+
+
+@pytest.mark.parametrize("compression", ["gzip", "zstd", "brotli"])
+@pytest.mark.parametrize("size", [10, 3 * 1024 * 1024])
+@pytest.mark.asyncio
+async def test_batch_export_temporary_file_compresses_deferred_writes_off_the_event_loop(compression, size):
+    """Test writes within `deferred_compression` are compressed outside of the event loop's thread."""
+    content = b"".join(orjson.dumps({"index": index}) + b"\n" for index in range(size // 14 + 1))
+    loop_thread = threading.current_thread()
+    compressing_threads = set()
+
+    with BatchExportTemporaryFile(compression=compression) as be_file:
+        compress_brotli = be_file._compress_brotli
+        chunk_compressor = be_file._chunk_compressor
+
+        def record_thread(compress):
+            def compress_in_thread(chunk):
+                compressing_threads.add(threading.current_thread())
+                return compress(chunk)
+
+            return compress_in_thread
+
+        be_file._compress_brotli = record_thread(compress_brotli)
+        be_file._chunk_compressor = lambda: record_thread(chunk_compressor())
+
+        async with be_file.deferred_compression():
+            be_file.write(content[: len(content) // 2])
+            be_file.write(content[len(content) // 2 :])
+
+            assert be_file.bytes_total == 0
+
+        if compression == "brotli":
+            await be_file.afinish_brotli_compressor()
+
+        assert be_file.uncompressed_bytes_since_last_reset == len(content)
+
+        be_file.rewind()
+        compressed = be_file.read()
+
+    assert compressing_threads
+    assert loop_thread not in compressing_threads
+
+    decompress = {"gzip": gzip.decompress, "zstd": zstd.decompress, "brotli": brotli.decompress}[compression]
+    assert decompress(compressed) == content
+
+
+def test_compress_in_parallel_concatenates_chunks_in_order():
+    compressed = compress_in_parallel(lambda chunk: chunk[::-1], b"abcdefghij", chunk_size=3)
+
+    assert compressed == b"cbafedihgj"
+
+
+def test_batch_export_temporary_file_split_keeps_compression_stream():
+    """Test splitting moves written data to a new file and the compressed parts make a single stream."""
+    with BatchExportTemporaryFile(compression="brotli") as be_file:
+        be_file.write_records_to_jsonl([{"part": 1}])
+        first_part = be_file.split()
+
+        assert be_file.bytes_since_last_reset == 0
+        assert be_file.records_since_last_reset == 0
+        assert first_part.records_since_last_reset == 1
+        assert first_part.bytes_since_last_reset == first_part.bytes_total > 0
+
+        be_file.write_records_to_jsonl([{"part": 2}])
+        be_file.finish_brotli_compressor()
+        be_file.rewind()
+
+        with first_part:
+            content = brotli.decompress(first_part.read() + be_file.read())
+
+    assert content.splitlines() == [b'{"part":1}', b'{"part":2}']
+
+
 @pytest.mark.parametrize(
     "records",
     TEST_RECORDS,
@@ -264,6 +364,149 @@ async def test_jsonl_writer_writes_record_batches(record_batch):
     ]
 
 
+MIXED_TYPES_RECORD_BATCH = pa.RecordBatch.from_pydict(
+    {
+        "event": pa.array(["$pageview", 'quoted "event"', "back\\slash", "new\nline\ttab", None, "ünïcødé 🦔"]),
+        "team_id": pa.array([1, 2, None, 4, 5, 2**62], type=pa.int64()),
+        "is_identified": pa.array([True, False, None, True, False, True]),
+        "score": pa.array([1.0, 0.5, None, float("nan"), -1e20, 3.14159]),
+        "timestamp": pa.array(
+            [dt.datetime(2024, 1, 1, 0, 0, i, i * 1000, tzinfo=dt.UTC) for i in range(5)] + [None],
+            type=pa.timestamp("us", tz="UTC"),
+        ),
+        "elements": pa.array([["a", "b"], [], None, ["c"], ["d", None], ["e"]]),
+        "nothing": pa.nulls(6),
+    }
+)
+
+
+def test_record_batch_to_jsonl_matches_encoding_row_by_row():
+    """Test encoding a record batch column by column produces the same JSONL as encoding its rows."""
+    expected = b"".join(orjson.dumps(row, default=str) + b"\n" for row in MIXED_TYPES_RECORD_BATCH.to_pylist())
+
+    assert record_batch_to_jsonl(MIXED_TYPES_RECORD_BATCH) == expected
+    assert record_batch_to_jsonl(MIXED_TYPES_RECORD_BATCH.slice(0, 0)) == b""
+
+
+@pytest.mark.asyncio
+async def test_csv_writer_with_arrow_writes_same_values_as_csv_module():
+    """Test the CSV written by Arrow reads back to the same values as the CSV written by the csv module."""
+    record_batch = MIXED_TYPES_RECORD_BATCH.select(["event", "team_id", "elements", "nothing"]).append_column(
+        "_inserted_at", pa.array([dt.datetime(2024, 1, 1, tzinfo=dt.UTC)] * MIXED_TYPES_RECORD_BATCH.num_rows)
+    )
+
+    async def write_csv(use_arrow_csv_writer: bool) -> bytes:
+        flushed = io.BytesIO()
+
+        async def store_in_memory_on_flush(batch_export_file, *args):
+            flushed.write(batch_export_file.read())
+
+        writer = CSVBatchExportWriter(
+            max_bytes=1024,
+            flush_callable=store_in_memory_on_flush,
+            field_names=["team_id", "event", "elements", "nothing", "missing"],
+            delimiter="\t",
+            quoting=csv.QUOTE_MINIMAL,
+            escape_char=None,
+            use_arrow_csv_writer=use_arrow_csv_writer,
+        )
+        async with writer.open_temporary_file():
+            await writer.write_record_batch(record_batch)
+
+        return flushed.getvalue()
+
+    def read_rows(content: bytes) -> list[list[str]]:
+        return list(csv.reader(io.StringIO(content.decode("utf-8"), newline=""), delimiter="\t"))
+
+    written_by_arrow = await write_csv(use_arrow_csv_writer=True)
+    written_by_csv_module = await write_csv(use_arrow_csv_writer=False)
+
+    assert written_by_arrow != written_by_csv_module
+    assert read_rows(written_by_arrow) == read_rows(written_by_csv_module)
+
+
+@pytest.mark.asyncio
+async def test_postgres_binary_writer_writes_binary_copy_tuples():
+    """Test record batches are written as tuples in PostgreSQL's binary COPY format."""
+    timestamp = dt.datetime(2000, 1, 1, 0, 0, 1, tzinfo=dt.UTC)
+    record_batch = pa.RecordBatch.from_pydict(
+        {
+            "team_id": pa.array([1, 2], type=pa.int64()),
+            "event": pa.array(["test", None]),
+            "properties": pa.array(['{"a": "b\\u0000"}', "{}"]),
+            "elements": pa.array([["a", None], []], type=pa.list_(pa.string())),
+            "timestamp": pa.array([timestamp, None], type=pa.timestamp("us", tz="UTC")),
+            "_inserted_at": pa.array([timestamp, timestamp], type=pa.timestamp("us", tz="UTC")),
+        }
+    )
+    flushed = io.BytesIO()
+
+    async def store_in_memory_on_flush(batch_export_file, *args):
+        flushed.write(batch_export_file.read())
+
+    writer = PostgresBinaryBatchExportWriter(
+        max_bytes=1024,
+        flush_callable=store_in_memory_on_flush,
+        fields=[
+            ("team_id", "INTEGER"),
+            ("event", "VARCHAR(200)"),
+            ("properties", "JSONB"),
+            ("elements", "TEXT[]"),
+            ("timestamp", "TIMESTAMP WITH TIME ZONE"),
+            ("missing", "TEXT"),
+        ],
+    )
+    async with writer.open_temporary_file():
+        await writer.write_record_batch(record_batch)
+
+    null = struct.pack(">i", -1)
+    elements = struct.pack(">iiiiii", 1, 1, 25, 2, 1, 1) + b"a" + null
+    assert flushed.getvalue() == (
+        struct.pack(">h", 6)
+        + struct.pack(">ii", 4, 1)
+        + struct.pack(">i", 4)
+        + b"test"
+        + struct.pack(">i", 11)
+        + b'\x01{"a": "b"}'
+        + struct.pack(">i", len(elements))
+        + elements
+        + struct.pack(">iq", 8, 1_000_000)
+        + null
+        + struct.pack(">h", 6)
+        + struct.pack(">ii", 4, 2)
+        + null
+        + struct.pack(">i", 3)
+        + b"\x01{}"
+        + struct.pack(">iiii", 12, 0, 0, 25)
+        + null
+        + null
+    )
+
+
+@pytest.mark.asyncio
+async def test_get_batch_export_writer_drops_schema_for_postgres_binary():
+    """Test the schema every consumer passes is not handed to `PostgresBinaryBatchExportWriter`."""
+    record_batch = pa.RecordBatch.from_pydict({"team_id": pa.array([1], type=pa.int64())})
+    flushed = io.BytesIO()
+
+    async def store_in_memory_on_flush(batch_export_file, *args):
+        flushed.write(batch_export_file.read())
+
+    writer = get_batch_export_writer(
+        WriterFormat.POSTGRES_BINARY,
+        store_in_memory_on_flush,
+        max_bytes=1024,
+        schema=record_batch.schema,
+        fields=[("team_id", "BIGINT")],
+    )
+    assert isinstance(writer, PostgresBinaryBatchExportWriter)
+
+    async with writer.open_temporary_file():
+        await writer.write_record_batch(record_batch)
+
+    assert flushed.getvalue() == struct.pack(">h", 1) + struct.pack(">iq", 8, 1)
+
+
 @pytest.mark.parametrize(
     "record_batch",
     TEST_RECORD_BATCHES,
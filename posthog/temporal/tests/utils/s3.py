@@ -8,6 +8,7 @@ import os
 from django.conf import settings
 import gzip
 import brotli
+import zstd
 
 
 async def read_parquet_from_s3(
@@ -70,6 +71,8 @@ def read_s3_data_as_json(data: bytes, compression: str | None) -> list:
             data = gzip.decompress(data)
         case "brotli":
             data = brotli.decompress(data)
+        case "zstd":
+            data = zstd.decompress(data)
         case _:
             pass
 
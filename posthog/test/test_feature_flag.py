@@ -1,10 +1,11 @@
 import concurrent.futures
 from datetime import datetime
 from typing import cast
+from unittest.mock import patch
 
 from django.core.cache import cache
 from django.db import IntegrityError, connection
-from django.test import TransactionTestCase
+from django.test import TransactionTestCase, override_settings
 from django.utils import timezone
 from freezegun import freeze_time
 from parameterized import parameterized
@@ -12,12 +13,15 @@ import pytest
 
 from posthog.models import Cohort, FeatureFlag, GroupTypeMapping, Person
 from posthog.models.feature_flag import get_feature_flags_for_team_in_cache
+from posthog.models.feature_flag import flag_matching
 from posthog.models.feature_flag.flag_matching import (
     FeatureFlagHashKeyOverride,
     FeatureFlagMatch,
     FeatureFlagMatcher,
     FeatureFlagMatchReason,
     FlagsMatcherCache,
+    clear_compiled_flag_conditions,
+    compile_flag_condition,
     get_all_feature_flags,
     get_feature_flag_hash_key_overrides,
     set_feature_flag_hash_key_overrides,
@@ -49,6 +53,14 @@ class TestFeatureFlagCohortExpansion(BaseTest):
         result = FeatureFlagMatcher.calculate_hash("holdout-", identifier, "")
         self.assertAlmostEqual(result, expected_hash)
 
+    def test_calculate_hashes(self):
+        identifiers = ["some_distinct_id", "test-identifier", "example_id", "", "ü" * 100]
+
+        for prefix, salt in (("holdout-", ""), ("beta-feature.", "variant")):
+            assert FeatureFlagMatcher.calculate_hashes(prefix, identifiers, salt).tolist() == [
+                FeatureFlagMatcher.calculate_hash(prefix, identifier, salt) for identifier in identifiers
+            ]
+
     def test_cohort_expansion(self):
         cohort = Cohort.objects.create(
             team=self.team,
@@ -672,6 +684,96 @@ class TestFeatureFlagCohortExpansion(BaseTest):
         )
 
 
+class TestCompiledFlagConditions(BaseTest):
+    def setUp(self):
+        super().setUp()
+        clear_compiled_flag_conditions()
+        self.addCleanup(clear_compiled_flag_conditions)
+
+    def test_conditions_are_compiled_once(self):
+        first = compile_flag_condition(
+            {"properties": [{"key": "email", "value": "a@b.com", "type": "person"}], "rollout_percentage": 50}
+        )
+        second = compile_flag_condition(
+            {"rollout_percentage": 50, "properties": [{"type": "person", "value": "a@b.com", "key": "email"}]}
+        )
+        other = compile_flag_condition({"properties": [{"key": "email", "value": "c@d.com", "type": "person"}]})
+
+        assert first is second
+        assert other is not first
+        assert first.property_keys == frozenset({"email"})
+        assert not first.uses_cohorts
+        assert first.can_compute_locally({"email": "a@b.com", "name": "a"})
+        assert not first.can_compute_locally({"name": "a"})
+        assert first.matches_locally({"email": "a@b.com"})
+        assert not first.matches_locally({"email": "c@d.com"})
+
+    def test_cohort_conditions_are_not_computed_locally(self):
+        compiled = compile_flag_condition({"properties": [{"key": "id", "value": 1, "type": "cohort"}]})
+
+        assert compiled.uses_cohorts
+        assert not compiled.can_compute_locally({"id": 1})
+
+    def test_matching_with_overrides_does_not_parse_filters_again(self):
+        flags = [
+            FeatureFlag(
+                id=index,
+                team=self.team,
+                key=f"flag-{index}",
+                filters={"groups": [{"properties": [{"key": "plan", "value": "paid", "type": "person"}]}]},
+            )
+            for index in range(3)
+        ]
+
+        with patch.object(flag_matching, "Filter", wraps=flag_matching.Filter) as filter_class:
+            for _ in range(2):
+                flag_values = FeatureFlagMatcher(
+                    self.team.id, self.project.id, flags, "307", property_value_overrides={"plan": "paid"}
+                ).get_matches_with_details()[0]
+
+        assert flag_values == {"flag-0": True, "flag-1": True, "flag-2": True}
+        assert filter_class.call_count == 1
+
+    def test_local_conditions_are_not_queried(self):
+        Person.objects.create(team=self.team, distinct_ids=["307"], properties={"email": "a@b.com"})
+        local_flag = FeatureFlag.objects.create(
+            team=self.team,
+            key="local",
+            created_by=self.user,
+            filters={"groups": [{"properties": [{"key": "plan", "value": "paid", "type": "person"}]}]},
+        )
+        database_flag = FeatureFlag.objects.create(
+            team=self.team,
+            key="database",
+            created_by=self.user,
+            filters={"groups": [{"properties": [{"key": "email", "value": "a@b.com", "type": "person"}]}]},
+        )
+
+        matcher = FeatureFlagMatcher(
+            self.team.id,
+            self.project.id,
+            [local_flag, database_flag],
+            "307",
+            property_value_overrides={"plan": "paid"},
+        )
+
+        assert matcher.get_matches_with_details()[0] == {"local": True, "database": True}
+        assert f"flag_{database_flag.pk}_condition_0" in matcher.query_conditions
+        assert f"flag_{local_flag.pk}_condition_0" not in matcher.query_conditions
+
+        with override_settings(DECIDE_SKIP_LOCAL_FLAG_CONDITIONS_IN_POSTGRES=False):
+            matcher = FeatureFlagMatcher(
+                self.team.id,
+                self.project.id,
+                [local_flag, database_flag],
+                "307",
+                property_value_overrides={"plan": "paid"},
+            )
+
+            assert matcher.get_matches_with_details()[0] == {"local": True, "database": True}
+            assert f"flag_{local_flag.pk}_condition_0" in matcher.query_conditions
+
+
 class TestModelCache(BaseTest):
     def setUp(self):
         cache.clear()
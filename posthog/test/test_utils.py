@@ -1,13 +1,15 @@
 import base64
+import gzip
 from datetime import datetime
 import json
 from unittest.mock import call, patch
 from zoneinfo import ZoneInfo
 
 import pytest
+from django.core.exceptions import RequestDataTooBig
 from django.core.handlers.wsgi import WSGIRequest
 from django.http import HttpRequest
-from django.test import TestCase
+from django.test import TestCase, override_settings
 from django.test.client import RequestFactory
 from freezegun import freeze_time
 from rest_framework.request import Request
@@ -21,6 +23,8 @@ from posthog.utils import (
     PotentialSecurityProblemException,
     absolute_uri,
     base64_decode,
+    decompress,
+    decompress_streaming,
     flatten,
     format_query_params_absolute_url,
     get_available_timezones_with_offsets,
@@ -413,6 +417,64 @@ class TestLoadDataFromRequest(TestCase):
         self.assertEqual({"what is it": "the decompressed value"}, data)
 
 
+@patch("posthog.utils.STREAMING_DECOMPRESSION_CHUNK_SIZE", 16)
+class TestDecompressStreaming(TestCase):
+    def test_parses_like_decompress(self):
+        payloads = [
+            {"api_key": "token", "batch": [{"event": "$pageview", "properties": {"emoji": "🦔", "n": 1.5}}] * 5},
+            [{"event": "$pageview", "properties": {"$current_url": "x" * 100}}, None, {"event": "other"}],
+            {"event": "$pageview", "properties": {"nested": [1, 2, {"a": None}]}, "sent_at": 1234567890123},
+        ]
+        for payload in payloads:
+            data = gzip.compress(json.dumps(payload).encode())
+            self.assertEqual(decompress_streaming(data, "gzip"), decompress(data, "gzip"))
+
+    def test_parses_numbers_split_across_chunks(self):
+        body = b'{"batch": [{"event": "a", "properties": {"n": [1.5, 1.25e-3, 1e+21, -0.5, 1E5, 100]}}], "sent_at": 7}'
+        for chunk_size in range(1, 6):
+            with patch("posthog.utils.STREAMING_DECOMPRESSION_CHUNK_SIZE", chunk_size):
+                self.assertEqual(decompress_streaming(gzip.compress(body), "gzip"), json.loads(body))
+
+    def test_drops_events_as_they_are_parsed(self):
+        payload = {"api_key": "token", "batch": [{"event": "keep"}, {"event": "drop"}, {"event": "keep"}]}
+        seen = []
+
+        def keep_event(event, payload):
+            seen.append(dict(payload))
+            return event["event"] == "keep"
+
+        data = decompress_streaming(gzip.compress(json.dumps(payload).encode()), "gzip", keep_event)
+
+        self.assertEqual(data, {"api_key": "token", "batch": [{"event": "keep"}, {"event": "keep"}]})
+        self.assertEqual(seen, [{"api_key": "token"}] * 3)
+
+    def test_stops_at_the_first_event_keep_event_fails_on(self):
+        def keep_event(event, payload):
+            raise ValueError(event["event"])
+
+        with self.assertRaisesMessage(ValueError, "first"):
+            decompress_streaming(
+                gzip.compress(json.dumps([{"event": "first"}, {"event": "second"}]).encode()), "gzip", keep_event
+            )
+
+    def test_raises_parsing_errors(self):
+        for body in [b'[{"event": "a"},]', b'{"batch": [1, 2] x', b'[{"event": "a"}']:
+            with self.assertRaises(RequestParsingError):
+                decompress_streaming(gzip.compress(body), "gzip")
+        with self.assertRaises(RequestParsingError):
+            decompress_streaming(gzip.compress(b'[{"event": "a"}]')[:-10], "gzip")
+
+    @override_settings(CAPTURE_STREAMING_MAX_DECOMPRESSED_BYTES=1000)
+    def test_caps_the_decompressed_size(self):
+        with self.assertRaises(RequestDataTooBig):
+            decompress_streaming(gzip.compress(json.dumps([{"event": "a"}] * 1000).encode()), "gzip")
+
+    def test_leaves_other_bodies_to_decompress(self):
+        body = base64.b64encode(json.dumps({"event": "a"}).encode())
+        self.assertEqual(decompress_streaming(gzip.compress(body), "gzip"), {"event": "a"})
+        self.assertEqual(decompress_streaming(json.dumps({"event": "a"}).encode(), ""), {"event": "a"})
+
+
 class TestShouldRefresh(TestCase):
     def test_refresh_requested_by_client_with_refresh_true(self):
         request = HttpRequest()
@@ -149,6 +149,8 @@ def opt_slash_path(route: str, view: Callable, name: Optional[str] = None) -> UR
     return re_path(rf"^{route}/?(?:[?#].*)?$", view, name=name)  # type: ignore
 
 
+capture_view = capture.get_event_async if settings.CAPTURE_ASYNC_ENABLED else capture.get_event
+
 urlpatterns = [
     path("api/schema/", SpectacularAPIView.as_view(), name="schema"),
     # Optional UI:
@@ -221,12 +223,12 @@ urlpatterns = [
     # ingestion
     # NOTE: When adding paths here that should be public make sure to update ALWAYS_ALLOWED_ENDPOINTS in middleware.py
     opt_slash_path("decide", decide.get_decide),
-    opt_slash_path("e", capture.get_event),
-    opt_slash_path("engage", capture.get_event),
-    opt_slash_path("track", capture.get_event),
-    opt_slash_path("capture", capture.get_event),
-    opt_slash_path("batch", capture.get_event),
-    opt_slash_path("s", capture.get_event),  # session recordings
+    opt_slash_path("e", capture_view),
+    opt_slash_path("engage", capture_view),
+    opt_slash_path("track", capture_view),
+    opt_slash_path("capture", capture_view),
+    opt_slash_path("batch", capture_view),
+    opt_slash_path("s", capture_view),  # session recordings
     opt_slash_path("robots.txt", robots_txt),
     opt_slash_path(".well-known/security.txt", security_txt),
     # auth
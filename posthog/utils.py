@@ -1,5 +1,6 @@
 import asyncio
 import base64
+import codecs
 import dataclasses
 import datetime
 import datetime as dt
@@ -13,7 +14,7 @@ import string
 import time
 import uuid
 import zlib
-from collections.abc import Generator, Mapping
+from collections.abc import Callable, Generator, Iterator, Mapping
 from contextlib import contextmanager
 from enum import Enum
 from functools import lru_cache, wraps
@@ -34,6 +35,7 @@ from dateutil.relativedelta import relativedelta
 from django.apps import apps
 from django.conf import settings
 from django.core.cache import cache
+from django.core.exceptions import RequestDataTooBig
 from django.db import ProgrammingError
 from django.db.utils import DatabaseError
 from django.http import HttpRequest, HttpResponse
@@ -767,8 +769,177 @@ def decompress(data: Any, compression: str):
     return data
 
 
+STREAMING_DECOMPRESSION_CHUNK_SIZE = 64 * 1024
+
+
+def decompress_streaming(
+    data: bytes, compression: str, keep_event: Optional[Callable[[Any, Optional[dict]], bool]] = None
+) -> Any:
+    """
+    decompress for gzip bodies holding a JSON object or array, without ever holding the whole decompressed text: the
+    text is inflated in chunks and parsed a value at a time. Events, the items of a top level array or of the "batch"
+    of a top level object, are handed to keep_event as they are parsed, along with the keys of the object parsed so
+    far, and are left out of the result if it returns False. Anything else goes through decompress.
+    """
+    if compression not in ("gzip", "gzip-js") or not isinstance(data, bytes) or not data or data == b"undefined":
+        return decompress(data, compression)
+
+    chunks = _gunzipped_text_chunks(data, settings.CAPTURE_STREAMING_MAX_DECOMPRESSED_BYTES)
+    first_chunk = next(chunks, "")
+    if not first_chunk.lstrip().startswith(("{", "[")):
+        # empty, base64 encoded after compression or not JSON at all, which decompress knows how to deal with
+        return decompress(data, compression)
+
+    reader = _StreamedJSONReader(first_chunk, chunks)
+    keep = keep_event or (lambda event, payload: True)
+    if reader.peek() == "[":
+        value: Any = reader.read_array(lambda event: keep(event, None))
+    else:
+        value = reader.read_object(keep)
+    reader.expect_end()
+    return value
+
+
+def _gunzipped_text_chunks(data: bytes, max_decompressed_bytes: int) -> Iterator[str]:
+    text_decoder = codecs.getincrementaldecoder("utf-8")("surrogatepass")
+    decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+    decompressed_bytes = 0
+    remaining = data
+    try:
+        while True:
+            chunk = decompressor.decompress(remaining, STREAMING_DECOMPRESSION_CHUNK_SIZE)
+            decompressed_bytes += len(chunk)
+            if decompressed_bytes > max_decompressed_bytes:
+                raise RequestDataTooBig("Decompressed request body exceeded the allowed size.")
+            if chunk:
+                yield text_decoder.decode(chunk)
+
+            if decompressor.eof:
+                if not decompressor.unused_data:
+                    break
+                # gzip.decompress reads concatenated members too
+                remaining = decompressor.unused_data
+                decompressor = zlib.decompressobj(wbits=zlib.MAX_WBITS | 16)
+            elif chunk or decompressor.unconsumed_tail:
+                remaining = decompressor.unconsumed_tail
+            else:
+                raise RequestParsingError(
+                    "Failed to decompress data. Compressed file ended before the end-of-stream marker was reached"
+                )
+        text_decoder.decode(b"", final=True)
+    except zlib.error as error:
+        raise RequestParsingError(f"Failed to decompress data. {error}")
+    except UnicodeDecodeError as error:
+        raise RequestParsingError(f"Invalid JSON: {error}")
+
+
+_JSON_NUMBER_START_CHARACTERS = "-0123456789"
+_JSON_NUMBER_CHARACTERS_REGEX = re.compile(r"[0-9eE+\-.]*")
+
+
+class _StreamedJSONReader:
+    """Parses JSON values out of text that arrives in chunks, holding only the text that hasn't been parsed yet."""
+
+    def __init__(self, first_chunk: str, chunks: Iterator[str]):
+        self._buffer = first_chunk
+        self._position = 0
+        self._chunks = chunks
+        self._exhausted = False
+        self._decoder = json.JSONDecoder(parse_constant=lambda x: None)
+
+    def peek(self) -> str:
+        """The next character that isn't whitespace, or an empty string at the end of the text."""
+        while True:
+            while self._position < len(self._buffer) and self._buffer[self._position] in " \t\n\r":
+                self._position += 1
+            if self._position < len(self._buffer) or not self._read_more(1):
+                return self._buffer[self._position : self._position + 1]
+
+    def expect(self, character: str) -> None:
+        if self.peek() != character:
+            raise RequestParsingError(f"Invalid JSON: expected '{character}'")
+        self._position += 1
+
+    def expect_end(self) -> None:
+        if self.peek():
+            raise RequestParsingError("Invalid JSON: extra data after the payload")
+
+    def read_value(self) -> Any:
+        self.peek()
+        while True:
+            try:
+                value, end = self._decoder.raw_decode(self._buffer, self._position)
+            except json.JSONDecodeError as error:
+                # most likely the value continues in the text that hasn't been read yet, reading twice as much
+                # every time keeps values that span many chunks from being parsed over and over again
+                if self._read_more(2 * (len(self._buffer) - self._position)):
+                    continue
+                raise RequestParsingError(f"Invalid JSON: {error}")
+            # a number may go on in the next chunk, even when it ends in a "." or "e" that doesn't parse yet
+            if (
+                self._buffer[self._position] in _JSON_NUMBER_START_CHARACTERS
+                and _JSON_NUMBER_CHARACTERS_REGEX.match(self._buffer, end).end() == len(self._buffer)
+                and self._read_more(1)
+            ):
+                continue
+            self._position = end
+            return value
+
+    def read_array(self, keep: Callable[[Any], bool]) -> list:
+        self.expect("[")
+        items: list = []
+        if self.peek() == "]":
+            self._position += 1
+            return items
+        while True:
+            item = self.read_value()
+            if keep(item):
+                items.append(item)
+            if self.peek() == "]":
+                self._position += 1
+                return items
+            self.expect(",")
+
+    def read_object(self, keep_event: Callable[[Any, Optional[dict]], bool]) -> dict:
+        self.expect("{")
+        payload: dict = {}
+        if self.peek() == "}":
+            self._position += 1
+            return payload
+        while True:
+            if self.peek() != '"':
+                raise RequestParsingError("Invalid JSON: expected a key")
+            key = self.read_value()
+            self.expect(":")
+            if key == "batch" and self.peek() == "[":
+                payload[key] = self.read_array(lambda event: keep_event(event, payload))
+            else:
+                payload[key] = self.read_value()
+            if self.peek() == "}":
+                self._position += 1
+                return payload
+            self.expect(",")
+
+    def _read_more(self, at_least: int) -> bool:
+        """Drops the parsed text and appends at least as many characters as asked for, or whatever is left."""
+        if self._exhausted:
+            return False
+        pieces = [self._buffer[self._position :]]
+        read = 0
+        while read < at_least or not read:
+            chunk = next(self._chunks, None)
+            if chunk is None:
+                self._exhausted = True
+                break
+            pieces.append(chunk)
+            read += len(chunk)
+        self._buffer = "".join(pieces)
+        self._position = 0
+        return read > 0
+
+
 # Used by non-DRF endpoints from capture.py and decide.py (/decide, /batch, /capture, etc)
-def load_data_from_request(request):
+def load_data_from_request(request, keep_event: Optional[Callable[[Any, Optional[dict]], bool]] = None):
     if request.method == "POST":
         if request.content_type in ["", "text/plain", "application/json"]:
             data = request.body
@@ -795,6 +966,8 @@ def load_data_from_request(request):
         request.GET.get("compression") or request.POST.get("compression") or request.headers.get("content-encoding", "")
     ).lower()
 
+    if keep_event is not None:
+        return decompress_streaming(data, compression, keep_event)
     return decompress(data, compression)
 
 